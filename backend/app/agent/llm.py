@@ -7,6 +7,7 @@ import asyncio
 import random
 
 from app.agent.matcher import demo_matcher
+from app.config import settings
 
 
 class DemoResponseEngine:
@@ -38,7 +39,7 @@ class DemoResponseEngine:
             Generated response text
         """
         # Simulate processing delay for realism
-        await asyncio.sleep(random.uniform(0.3, 0.8))
+        await asyncio.sleep(random.uniform(settings.demo_delay_min_seconds, settings.demo_delay_max_seconds))
         
         # Check for context-based queries (e.g., "what about that?")
         context_category = self.matcher.detect_context_from_history(query, conversation_history)
@@ -0,0 +1,154 @@
+"""
+Intent pre-routing for the chat pipeline.
+Cheaply classifies a message before retrieval so pure small talk and
+turns that only share contact details never pay for embedding and vector
+search. Anything that asks a question is retrieved.
+"""
+from typing import Any, Dict, List, Optional
+import re
+
+from app.agent.demo_responses import DEMO_RESPONSES
+
+
+# Contact details shared with lead capture (see AgentTools.detect_lead_intent)
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERN = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
+
+# Categories whose answers never use knowledge base context
+SMALL_TALK_CATEGORIES = ["greetings", "thanks", "goodbye"]
+LEAD_CAPTURE_CATEGORY = "lead_capture"
+
+# Categories that never indicate a knowledge-seeking question on their own
+NON_KNOWLEDGE_CATEGORIES = SMALL_TALK_CATEGORIES + [LEAD_CAPTURE_CATEGORY, "complaint", "contact", "fallback"]
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Words that open a question ("where is...", "can I...")
+QUESTION_WORDS = {"what", "where", "when", "why", "how", "who", "whom", "whose", "which"}
+AUXILIARY_QUESTION_WORDS = {
+    "can", "could", "do", "does", "did", "is", "are", "was", "were", "will", "would", "should", "may", "shall"
+}
+
+# Words that pad small talk without asking anything ("thank you so much", "hey there")
+FILLER_WORDS = {
+    "there", "you", "so", "much", "very", "ok", "okay", "it", "a", "lot", "again", "all", "for", "your",
+    "the", "help", "oh", "well", "and", "too", "guys", "everyone", "folks", "now", "really", "i", "m", "me"
+}
+
+
+def _keyword_pattern(keywords: List[str]) -> Optional[re.Pattern]:
+    """Compile keywords into a single whole-word regex."""
+    if not keywords:
+        return None
+    alternatives = sorted({re.escape(keyword) for keyword in keywords}, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+
+class IntentRouter:
+    """Decides whether a message needs knowledge base retrieval."""
+
+    def __init__(self, max_small_talk_words: int = 6):
+        """
+        Initialize the router from the DemoMatcher keyword tables.
+
+        Args:
+            max_small_talk_words: Longest message still treated as small talk
+        """
+        self.max_small_talk_words = max_small_talk_words
+
+        # Whole-word matching avoids DemoMatcher's substring hits ("hi" in "which")
+        self.small_talk_patterns = {
+            category: _keyword_pattern(DEMO_RESPONSES[category]["keywords"])
+            for category in SMALL_TALK_CATEGORIES
+        }
+        self.knowledge_pattern = _keyword_pattern([
+            keyword
+            for category, data in DEMO_RESPONSES.items()
+            if category not in NON_KNOWLEDGE_CATEGORIES
+            for keyword in data.get("keywords", [])
+        ])
+
+        # Routing statistics
+        self.total_routed = 0
+        self.retrievals_skipped = 0
+        self.skipped_by_category: Dict[str, int] = {}
+
+    def classify(self, query: str) -> Dict[str, Any]:
+        """
+        Classify a message without updating statistics.
+
+        Args:
+            query: The user's message
+
+        Returns:
+            Dictionary with the routed category and whether retrieval is needed
+        """
+        query_lower = query.lower().strip()
+        has_contact_details = bool(EMAIL_PATTERN.search(query) or PHONE_PATTERN.search(query))
+
+        # Contact details are the payload of a lead-capture turn, not a question
+        text = PHONE_PATTERN.sub(" ", EMAIL_PATTERN.sub(" ", query_lower))
+        words = _WORD_PATTERN.findall(text)
+
+        if not words and not has_contact_details:
+            return {"category": "empty", "needs_retrieval": False}
+
+        if self.knowledge_pattern.search(text) or self._is_question(query, words):
+            return {"category": "knowledge", "needs_retrieval": True}
+
+        if has_contact_details:
+            return {"category": LEAD_CAPTURE_CATEGORY, "needs_retrieval": False}
+
+        # Only pure small talk skips retrieval: nothing may be left once its
+        # keywords and padding are removed ("hi, do you ship to canada" keeps "ship")
+        if len(words) <= self.max_small_talk_words:
+            remaining = text
+            matched = None
+            for category, pattern in self.small_talk_patterns.items():
+                if pattern.search(remaining):
+                    matched = matched or category
+                    remaining = pattern.sub(" ", remaining)
+            if matched and all(word in FILLER_WORDS for word in _WORD_PATTERN.findall(remaining)):
+                return {"category": matched, "needs_retrieval": False}
+
+        return {"category": "knowledge", "needs_retrieval": True}
+
+    @staticmethod
+    def _is_question(query: str, words: List[str]) -> bool:
+        """Check for a question mark, a question word, or a leading "can/do/is..."."""
+        if "?" in query:
+            return True
+        return bool(words) and (words[0] in AUXILIARY_QUESTION_WORDS or any(word in QUESTION_WORDS for word in words))
+
+    def route(self, query: str) -> Dict[str, Any]:
+        """
+        Classify a message and record the routing decision.
+
+        Args:
+            query: The user's message
+
+        Returns:
+            Dictionary with the routed category and whether retrieval is needed
+        """
+        decision = self.classify(query)
+
+        self.total_routed += 1
+        if not decision["needs_retrieval"]:
+            self.retrievals_skipped += 1
+            category = decision["category"]
+            self.skipped_by_category[category] = self.skipped_by_category.get(category, 0) + 1
+
+        return decision
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get routing statistics."""
+        return {
+            "total_routed": self.total_routed,
+            "retrievals_skipped": self.retrievals_skipped,
+            "skip_rate": round(self.retrievals_skipped / self.total_routed, 4) if self.total_routed else 0.0,
+            "skipped_by_category": dict(self.skipped_by_category)
+        }
+
+
+# Global router instance
+intent_router = IntentRouter()
@@ -3,12 +3,14 @@ Agent tools for specialized tasks.
 Implements tool functions for lead capture, question answering, etc.
 """
 from typing import Dict, Any, Optional
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import re
 
+from app.config import settings
 from app.database import Lead, ChatSession
-from app.rag.engine import rag_engine
+from app.rag.engine import get_rag_engine
+from app.agent.router import EMAIL_PATTERN, PHONE_PATTERN
 
 
 class AgentTools:
@@ -33,6 +35,7 @@ class AgentTools:
         Returns:
             Response dictionary with answer and metadata
         """
+        rag_engine = await asyncio.to_thread(get_rag_engine)
         response = await rag_engine.generate_response(
             query=query,
             bot_id=bot_id,
@@ -153,12 +156,10 @@ class AgentTools:
         has_intent = any(keyword in message_lower for keyword in contact_keywords)
         
         # Extract email if present
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, message)
+        emails = EMAIL_PATTERN.findall(message)
         
         # Extract phone if present
-        phone_pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
-        phones = re.findall(phone_pattern, message)
+        phones = PHONE_PATTERN.findall(message)
         
         return {
             "has_lead_intent": has_intent,
@@ -170,14 +171,16 @@ class AgentTools:
     @staticmethod
     def should_escalate_to_human(
         message: str,
-        confidence: float
+        confidence: float,
+        threshold: Optional[float] = None
     ) -> bool:
         """
         Determine if conversation should be escalated to human agent.
         
         Args:
             message: User's message
-            confidence: Confidence score of RAG response
+            confidence: Calibrated confidence of the RAG response
+            threshold: Escalate below this confidence (default from settings)
             
         Returns:
             True if should escalate, False otherwise
@@ -193,7 +196,9 @@ class AgentTools:
         has_escalation_request = any(kw in message_lower for kw in escalation_keywords)
         
         # Escalate if explicitly requested or confidence too low
-        return has_escalation_request or confidence < 0.5
+        if threshold is None:
+            threshold = settings.escalation_confidence_threshold
+        return has_escalation_request or confidence < threshold
 
 
 # Global instance
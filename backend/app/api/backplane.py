@@ -0,0 +1,406 @@
+"""
+Pub/sub backplane for WebSocket session broadcasts.
+Each worker process keeps its own WebSocket connections; the backplane relays
+session messages between workers (and nodes) so every tab of a session sees
+them, whichever worker it is connected to.
+
+Backends:
+    memory  - single process, messages are delivered in-process
+    socket  - workers connect to a small relay hub over TCP or a Unix socket
+              (run `python backplane_hub.py`; a local stand-in for Redis)
+    redis   - Redis pub/sub, one channel per session (`pip install redis`)
+"""
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Called with (session_id, message) for every message published to a
+# session this process subscribes to, including its own
+DeliveryHandler = Callable[[int, dict], Awaitable[None]]
+
+# Hub frames are newline-delimited JSON; allow long AI responses
+MAX_FRAME_BYTES = 4 * 1024 * 1024
+
+
+class Backplane:
+    """Interface shared by all backplane backends."""
+
+    name = "base"
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self._handler: Optional[DeliveryHandler] = None
+        self._subscriptions: Set[int] = set()
+
+    async def start(self, handler: DeliveryHandler):
+        """
+        Start relaying messages.
+
+        Args:
+            handler: Coroutine delivering a message to this process's sockets
+        """
+        self._handler = handler
+
+    async def close(self):
+        """Stop relaying messages."""
+        self._handler = None
+
+    async def subscribe(self, session_id: int):
+        """Receive messages published to a session on other workers."""
+        self._subscriptions.add(session_id)
+
+    async def unsubscribe(self, session_id: int):
+        """Stop receiving messages for a session."""
+        self._subscriptions.discard(session_id)
+
+    async def publish(self, session_id: int, message: dict):
+        """
+        Deliver a message to every connection of a session on every worker.
+        Local connections are served directly, without a round-trip.
+
+        Args:
+            session_id: Chat session ID
+            message: JSON-serializable message
+        """
+        if self._handler is not None:
+            await self._handler(session_id, message)
+
+    async def _deliver_remote(self, session_id: int, message: dict):
+        """Hand a message received from another worker to the local sockets."""
+        if self._handler is not None and session_id in self._subscriptions:
+            await self._handler(session_id, message)
+
+
+class InMemoryBackplane(Backplane):
+    """Single-process backplane: publishing only reaches local connections."""
+
+    name = "memory"
+
+
+def _encode_frame(frame: dict) -> bytes:
+    return json.dumps(frame, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def parse_socket_url(url: str) -> Tuple[str, Optional[str], Optional[int]]:
+    """
+    Parse a hub address.
+
+    Args:
+        url: "tcp://host:port" or "unix:///path/to/socket"
+
+    Returns:
+        Tuple of (scheme, host or socket path, port)
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return "unix", parsed.path, None
+    if parsed.scheme == "tcp" and parsed.hostname and parsed.port:
+        return "tcp", parsed.hostname, parsed.port
+    raise ValueError(f"Unsupported backplane address '{url}' (use tcp://host:port or unix:///path)")
+
+
+async def _open_connection(url: str):
+    scheme, host, port = parse_socket_url(url)
+    if scheme == "unix":
+        return await asyncio.open_unix_connection(host, limit=MAX_FRAME_BYTES)
+    return await asyncio.open_connection(host, port, limit=MAX_FRAME_BYTES)
+
+
+class SocketBackplane(Backplane):
+    """
+    Backplane client for the relay hub in `backplane_hub.py`.
+    Reconnects with backoff; while the hub is unreachable, broadcasts still
+    reach this worker's own connections.
+    """
+
+    name = "socket"
+
+    def __init__(self, url: Optional[str] = None, reconnect_max_seconds: float = 5.0):
+        """
+        Initialize the hub client.
+
+        Args:
+            url: Hub address (default from settings)
+            reconnect_max_seconds: Upper bound of the reconnect backoff
+        """
+        super().__init__()
+        self.url = url or settings.backplane_url
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self.connected = asyncio.Event()
+
+    async def start(self, handler: DeliveryHandler):
+        await super().start(handler)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_writer()
+        await super().close()
+
+    async def subscribe(self, session_id: int):
+        await super().subscribe(session_id)
+        self._send({"op": "sub", "session": session_id})
+
+    async def unsubscribe(self, session_id: int):
+        await super().unsubscribe(session_id)
+        self._send({"op": "unsub", "session": session_id})
+
+    async def publish(self, session_id: int, message: dict):
+        # The hub skips the publishing connection, so deliver locally here
+        self._send({"op": "pub", "session": session_id, "origin": self.node_id, "message": message})
+        await super().publish(session_id, message)
+
+    def _send(self, frame: dict):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(_encode_frame(frame))
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.connected.clear()
+
+    async def _run(self):
+        """Keep a hub connection open and deliver incoming messages."""
+        backoff = 0.1
+        while True:
+            try:
+                reader, writer = await _open_connection(self.url)
+            except OSError as e:
+                if backoff >= self.reconnect_max_seconds:
+                    logger.warning("Backplane hub %s unreachable: %s", self.url, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.reconnect_max_seconds)
+                continue
+
+            self._writer = writer
+            for session_id in self._subscriptions:
+                self._send({"op": "sub", "session": session_id})
+            self.connected.set()
+            backoff = 0.1
+
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    # One bad frame or failed delivery must not stop cross-worker broadcasts
+                    try:
+                        frame = json.loads(line)
+                        await self._deliver_remote(frame["session"], frame["message"])
+                    except Exception:
+                        logger.exception("Dropping backplane frame that could not be delivered")
+            except (OSError, ValueError, asyncio.LimitOverrunError) as e:
+                logger.warning("Backplane connection lost: %s", e)
+            finally:
+                self._close_writer()
+
+
+class BackplaneHub:
+    """
+    Relay hub for SocketBackplane workers.
+    Forwards every published frame to the other connections subscribed to
+    the session. Connections that stop reading are dropped once their
+    write buffer exceeds max_buffer_bytes.
+    """
+
+    def __init__(self, url: Optional[str] = None, max_buffer_bytes: int = 16 * 1024 * 1024):
+        """
+        Initialize the hub.
+
+        Args:
+            url: Address to listen on (default from settings)
+            max_buffer_bytes: Per-connection write buffer limit
+        """
+        self.url = url or settings.backplane_url
+        self.max_buffer_bytes = max_buffer_bytes
+        self.subscribers: Dict[int, Set[asyncio.StreamWriter]] = {}
+        self.frames_relayed = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start listening."""
+        scheme, host, port = parse_socket_url(self.url)
+        if scheme == "unix":
+            self._server = await asyncio.start_unix_server(self._handle, host, limit=MAX_FRAME_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_FRAME_BYTES)
+
+    async def serve_forever(self):
+        """Start listening and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening and drop all connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writers in self.subscribers.values():
+            for writer in writers:
+                writer.close()
+        self.subscribers.clear()
+
+    def _drop(self, writer: asyncio.StreamWriter):
+        for session_id in [s for s, writers in self.subscribers.items() if writer in writers]:
+            self.subscribers[session_id].discard(writer)
+            if not self.subscribers[session_id]:
+                del self.subscribers[session_id]
+        writer.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                op = frame.get("op")
+                session_id = frame.get("session")
+
+                if op == "sub":
+                    self.subscribers.setdefault(session_id, set()).add(writer)
+                elif op == "unsub":
+                    self.subscribers.get(session_id, set()).discard(writer)
+                elif op == "pub":
+                    # Encode once and fan out to every other subscriber
+                    data = line if line.endswith(b"\n") else line + b"\n"
+                    for target in list(self.subscribers.get(session_id, ())):
+                        if target is writer:
+                            continue
+                        if target.transport.get_write_buffer_size() > self.max_buffer_bytes:
+                            logger.warning("Dropping slow backplane subscriber")
+                            self._drop(target)
+                            continue
+                        target.write(data)
+                        self.frames_relayed += 1
+        except (OSError, ValueError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self._drop(writer)
+
+
+class RedisBackplane(Backplane):
+    """Backplane over Redis pub/sub with one channel per session."""
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, channel_prefix: Optional[str] = None):
+        """
+        Initialize the Redis client.
+
+        Args:
+            url: Redis URL (default from settings)
+            channel_prefix: Prefix of the per-session channels
+        """
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError("The redis backplane requires redis. Install it with: pip install redis")
+
+        self.url = url or settings.backplane_url
+        self.channel_prefix = channel_prefix or settings.backplane_channel_prefix
+        self._redis = redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub()
+        self._task: Optional[asyncio.Task] = None
+
+    def _channel(self, session_id: int) -> str:
+        return f"{self.channel_prefix}:session:{session_id}"
+
+    async def start(self, handler: DeliveryHandler):
+        await super().start(handler)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._pubsub.close()
+        await self._redis.close()
+        await super().close()
+
+    async def subscribe(self, session_id: int):
+        await super().subscribe(session_id)
+        await self._pubsub.subscribe(self._channel(session_id))
+
+    async def unsubscribe(self, session_id: int):
+        await super().unsubscribe(session_id)
+        await self._pubsub.unsubscribe(self._channel(session_id))
+
+    async def publish(self, session_id: int, message: dict):
+        frame = {"session": session_id, "origin": self.node_id, "message": message}
+        await self._redis.publish(self._channel(session_id), json.dumps(frame, separators=(",", ":")))
+        await super().publish(session_id, message)
+
+    async def _run(self):
+        """Deliver messages published by other workers."""
+        while True:
+            if not self._pubsub.subscribed:
+                await asyncio.sleep(0.05)
+                continue
+            try:
+                item = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as e:
+                logger.warning("Redis backplane error: %s", e)
+                await asyncio.sleep(1.0)
+                continue
+            if item is None or item.get("type") != "message":
+                continue
+            # One bad frame or failed delivery must not stop cross-worker broadcasts
+            try:
+                frame = json.loads(item["data"])
+                # Redis echoes our own publishes back; they were delivered already
+                if frame["origin"] != self.node_id:
+                    await self._deliver_remote(frame["session"], frame["message"])
+            except Exception:
+                logger.exception("Dropping backplane frame that could not be delivered")
+
+
+BACKPLANE_BACKENDS = {
+    "memory": InMemoryBackplane,
+    "socket": SocketBackplane,
+    "redis": RedisBackplane,
+}
+
+
+def create_backplane(backend: Optional[str] = None, **kwargs) -> Backplane:
+    """
+    Create a backplane by name.
+
+    Args:
+        backend: "memory", "socket" or "redis" (default from settings)
+        **kwargs: Passed to the backend constructor
+
+    Returns:
+        Backplane instance
+    """
+    backend = backend or settings.backplane_backend
+    if backend not in BACKPLANE_BACKENDS:
+        raise ValueError(f"Unknown backplane backend '{backend}'. Choose from: {', '.join(BACKPLANE_BACKENDS)}")
+    return BACKPLANE_BACKENDS[backend](**kwargs)
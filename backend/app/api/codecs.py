@@ -0,0 +1,179 @@
+"""
+Frame codecs for the chat WebSocket.
+Clients pick a protocol with the WebSocket subprotocol header; without one
+the original JSON protocol is used. The compact protocols send an ack
+instead of echoing the sender's own message back, fold the typing indicator
+into the echo, omit empty fields, and encode with orjson or msgpack.
+
+    (none)                 - JSON, full echoes and separate typing frames
+    chat.compact.json      - compact frames as JSON text (orjson if installed)
+    chat.compact.msgpack   - compact frames as msgpack binary (`pip install msgpack`)
+
+Broadcast frames are encoded once per codec and variant, not once per
+connection. Compression is permessage-deflate, negotiated by the server
+(see WEBSOCKET_PER_MESSAGE_DEFLATE).
+"""
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+from app.config import settings
+
+
+Frame = Union[str, bytes]
+
+# Keys starting with "_" are routing metadata and never sent to clients
+ORIGIN_KEY = "_origin"
+
+
+def new_connection_id() -> str:
+    """Unique ID tying a user echo to the connection that sent the message."""
+    return uuid.uuid4().hex
+
+
+def public_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip routing metadata from a frame."""
+    return {key: value for key, value in message.items() if not key.startswith("_")}
+
+
+class FrameCodec:
+    """The original JSON protocol."""
+
+    name = "json"
+    subprotocol: Optional[str] = None
+    compact = False
+
+    def transform(self, message: Dict[str, Any], own_echo: bool) -> Optional[Dict[str, Any]]:
+        """
+        Shape a frame for this protocol.
+
+        Args:
+            message: Frame as broadcast
+            own_echo: Whether it echoes a message sent on this connection
+
+        Returns:
+            Frame to send, or None to send nothing
+        """
+        return public_fields(message)
+
+    def dumps(self, message: Dict[str, Any]) -> Frame:
+        # Same encoding as WebSocket.send_json
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def loads(self, data: Frame) -> Dict[str, Any]:
+        return json.loads(data)
+
+    def encode(self, message: Dict[str, Any], own_echo: bool = False) -> Optional[Frame]:
+        """Transform and serialize a frame; None if nothing should be sent."""
+        shaped = self.transform(message, own_echo)
+        return None if shaped is None else self.dumps(shaped)
+
+
+class CompactJsonCodec(FrameCodec):
+    """Compact frames as JSON text."""
+
+    name = "compact-json"
+    subprotocol = "chat.compact.json"
+    compact = True
+
+    def __init__(self):
+        try:
+            import orjson
+            self._orjson = orjson
+        except ImportError:
+            self._orjson = None
+
+    def transform(self, message: Dict[str, Any], own_echo: bool) -> Optional[Dict[str, Any]]:
+        role = message.get("role")
+        # The typing indicator rides on the echo / ack instead
+        if role == "system" and message.get("content") == "typing":
+            return None
+        if role == "user":
+            if own_echo:
+                return {
+                    "type": "ack",
+                    "id": message.get("client_id"),
+                    "session_id": message.get("session_id"),
+                    "timestamp": message.get("timestamp"),
+                    "typing": True
+                }
+            return {**_without_empty(message), "typing": True}
+        return _without_empty(message)
+
+    def dumps(self, message: Dict[str, Any]) -> Frame:
+        if self._orjson is not None:
+            return self._orjson.dumps(message).decode("utf-8")
+        return super().dumps(message)
+
+    def loads(self, data: Frame) -> Dict[str, Any]:
+        if self._orjson is not None:
+            return self._orjson.loads(data)
+        return super().loads(data)
+
+
+class MsgpackCodec(CompactJsonCodec):
+    """Compact frames as msgpack binary."""
+
+    name = "msgpack"
+    subprotocol = "chat.compact.msgpack"
+
+    def __init__(self):
+        super().__init__()
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, message: Dict[str, Any]) -> Frame:
+        return self._msgpack.packb(message)
+
+    def loads(self, data: Frame) -> Dict[str, Any]:
+        if isinstance(data, str):
+            return json.loads(data)
+        return self._msgpack.unpackb(data)
+
+
+def _without_empty(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value for key, value in message.items()
+        if not key.startswith("_") and key != "client_id" and value is not None and value != []
+    }
+
+
+JSON_CODEC = FrameCodec()
+
+# Compact codecs in order of preference
+COMPACT_CODECS = {
+    MsgpackCodec.subprotocol: MsgpackCodec,
+    CompactJsonCodec.subprotocol: CompactJsonCodec,
+}
+
+_codec_instances: Dict[str, FrameCodec] = {}
+
+
+def get_codec(subprotocol: str) -> Optional[FrameCodec]:
+    """Get the shared codec for a subprotocol, or None if it is unknown or unavailable."""
+    if subprotocol not in COMPACT_CODECS:
+        return None
+    if subprotocol not in _codec_instances:
+        try:
+            _codec_instances[subprotocol] = COMPACT_CODECS[subprotocol]()
+        except ImportError:
+            return None
+    return _codec_instances[subprotocol]
+
+
+def negotiate_codec(offered: List[str]) -> FrameCodec:
+    """
+    Pick the protocol for a connection.
+
+    Args:
+        offered: Subprotocols the client listed, in its order of preference
+
+    Returns:
+        The first offered compact codec that is available, else the JSON codec
+    """
+    if settings.websocket_compact_protocols:
+        for subprotocol in offered:
+            codec = get_codec(subprotocol)
+            if codec is not None:
+                return codec
+    return JSON_CODEC
@@ -4,13 +4,24 @@ Handles document upload, processing, and ingestion.
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func
 from typing import List
-import pypdf
 from datetime import datetime
+import asyncio
+import tarfile
+import zipfile
 
-from app.database import get_db, Document, Bot
-from app.rag.ingestion import document_ingestion
+from app.config import settings
+from app.metrics import timed
+from app.tracing import trace_request
+from app.database import get_db, Document, Bot, KnowledgeBaseStats
+from app.blobstore import blob_store
+from app.rag.ingestion import get_document_ingestion
+from app.rag.extraction import extract_text_from_pdf
+from app.rag.bulk import ArchiveLimitError, bulk_ingestion, is_archive, iter_archive
+from app.rag.stats import record_ingestion, record_deletion, serialize_stats
+from app.rag.tokens import estimate_tokens
+from app.rag.vectorstore import get_vector_store
 
 router = APIRouter()
 
@@ -42,71 +53,89 @@ async def upload_document(
             detail="Only PDF and TXT files are supported"
         )
     
-    try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Extract text based on file type
-        if file_extension == "pdf":
-            text_content = extract_text_from_pdf(file_content)
-        else:  # txt
-            text_content = file_content.decode("utf-8")
-        
-        if not text_content.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Document appears to be empty or text could not be extracted"
+    # One trace per upload; slow uploads are also kept for admin slow-traces
+    with trace_request("upload", bot_id=bot_id, filename=filename):
+        try:
+            # Read file content
+            file_content = await file.read()
+            
+            # Extract text based on file type
+            with timed("extraction"):
+                if file_extension == "pdf":
+                    text_content = extract_text_from_pdf(file_content)
+                else:  # txt
+                    text_content = file_content.decode("utf-8")
+            
+            if not text_content.strip():
+                raise HTTPException(
+                    status_code=400,
+                    detail="Document appears to be empty or text could not be extracted"
+                )
+            
+            # Store document body in the blob store and metadata in the database
+            content_hash, content_size = await asyncio.to_thread(blob_store.put, text_content)
+            db_document = Document(
+                bot_id=bot_id,
+                filename=filename,
+                content_hash=content_hash,
+                content_size=content_size,
+                token_count=estimate_tokens(text_content),
+                chunk_count=0  # Will be updated after ingestion
             )
-        
-        # Store document in database
-        db_document = Document(
-            bot_id=bot_id,
-            filename=filename,
-            content=text_content,
-            chunk_count=0  # Will be updated after ingestion
-        )
-        db.add(db_document)
-        await db.commit()
-        await db.refresh(db_document)
-        
-        # Ingest document into vector store
-        metadata = {
-            "filename": filename,
-            "document_id": db_document.id,
-            "upload_date": datetime.utcnow().isoformat(),
-            "file_type": file_extension
-        }
-        
-        ingestion_result = await document_ingestion.ingest_document(
-            content=text_content,
-            metadata=metadata,
-            bot_id=bot_id
-        )
-        
-        if ingestion_result["success"]:
-            # Update chunk count
-            db_document.chunk_count = ingestion_result["chunk_count"]
-            await db.commit()
+            db.add(db_document)
+            with timed("db_write"):
+                await db.commit()
+                await db.refresh(db_document)
             
-            return {
-                "success": True,
-                "message": "Document uploaded and ingested successfully",
-                "document_id": db_document.id,
+            # Ingest document into vector store
+            metadata = {
                 "filename": filename,
-                "chunk_count": ingestion_result["chunk_count"],
-                "collection_name": ingestion_result["collection_name"]
+                "document_id": db_document.id,
+                "upload_date": datetime.utcnow().isoformat(),
+                "file_type": file_extension
             }
-        else:
+            
+            # The first use loads the embedding model; keep the event loop free meanwhile
+            ingestion = await asyncio.to_thread(get_document_ingestion)
+            ingestion_result = await ingestion.ingest_document(
+                content=text_content,
+                metadata=metadata,
+                bot_id=bot_id
+            )
+            
+            if ingestion_result["success"]:
+                # Update chunk count and knowledge base stats
+                db_document.chunk_count = ingestion_result["chunk_count"]
+                await record_ingestion(
+                    db,
+                    bot_id,
+                    documents=1,
+                    chunks=db_document.chunk_count,
+                    tokens=db_document.token_count,
+                    size_bytes=content_size
+                )
+                with timed("db_write"):
+                    await db.commit()
+                
+                return {
+                    "success": True,
+                    "message": "Document uploaded and ingested successfully",
+                    "document_id": db_document.id,
+                    "filename": filename,
+                    "chunk_count": ingestion_result["chunk_count"],
+                    "collection_name": ingestion_result["collection_name"]
+                }
+            else:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Ingestion failed: {ingestion_result.get('error', 'Unknown error')}"
+                )
+        
+        except Exception as e:
             raise HTTPException(
                 status_code=500,
-                detail=f"Ingestion failed: {ingestion_result.get('error', 'Unknown error')}"
+                detail=f"Error processing document: {str(e)}"
             )
-    
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing document: {str(e)}"
-        )
 
 
 @router.post("/api/v1/documents/text", tags=["Documents"])
@@ -129,53 +158,119 @@ async def add_text_document(
     if not content.strip():
         raise HTTPException(status_code=400, detail="Content cannot be empty")
     
-    try:
-        # Store document in database
-        db_document = Document(
-            bot_id=bot_id,
-            filename=f"{title}.txt",
-            content=content,
-            chunk_count=0
-        )
-        db.add(db_document)
-        await db.commit()
-        await db.refresh(db_document)
-        
-        # Ingest into vector store
-        metadata = {
-            "filename": f"{title}.txt",
-            "document_id": db_document.id,
-            "upload_date": datetime.utcnow().isoformat(),
-            "file_type": "text"
-        }
-        
-        ingestion_result = await document_ingestion.ingest_document(
-            content=content,
-            metadata=metadata,
-            bot_id=bot_id
-        )
-        
-        if ingestion_result["success"]:
-            db_document.chunk_count = ingestion_result["chunk_count"]
-            await db.commit()
+    with trace_request("upload", bot_id=bot_id, filename=f"{title}.txt"):
+        try:
+            # Store document body in the blob store and metadata in the database
+            content_hash, content_size = await asyncio.to_thread(blob_store.put, content)
+            db_document = Document(
+                bot_id=bot_id,
+                filename=f"{title}.txt",
+                content_hash=content_hash,
+                content_size=content_size,
+                token_count=estimate_tokens(content),
+                chunk_count=0
+            )
+            db.add(db_document)
+            with timed("db_write"):
+                await db.commit()
+                await db.refresh(db_document)
             
-            return {
-                "success": True,
-                "message": "Text content added successfully",
+            # Ingest into vector store
+            metadata = {
+                "filename": f"{title}.txt",
                 "document_id": db_document.id,
-                "chunk_count": ingestion_result["chunk_count"]
+                "upload_date": datetime.utcnow().isoformat(),
+                "file_type": "text"
             }
-        else:
+            
+            ingestion = await asyncio.to_thread(get_document_ingestion)
+            ingestion_result = await ingestion.ingest_document(
+                content=content,
+                metadata=metadata,
+                bot_id=bot_id
+            )
+            
+            if ingestion_result["success"]:
+                db_document.chunk_count = ingestion_result["chunk_count"]
+                await record_ingestion(
+                    db,
+                    bot_id,
+                    documents=1,
+                    chunks=db_document.chunk_count,
+                    tokens=db_document.token_count,
+                    size_bytes=content_size
+                )
+                with timed("db_write"):
+                    await db.commit()
+                
+                return {
+                    "success": True,
+                    "message": "Text content added successfully",
+                    "document_id": db_document.id,
+                    "chunk_count": ingestion_result["chunk_count"]
+                }
+            else:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Ingestion failed: {ingestion_result.get('error', 'Unknown error')}"
+                )
+        
+        except Exception as e:
             raise HTTPException(
                 status_code=500,
-                detail=f"Ingestion failed: {ingestion_result.get('error', 'Unknown error')}"
+                detail=f"Error processing content: {str(e)}"
             )
+
+
+@router.post("/api/v1/documents/bulk", tags=["Documents"])
+async def bulk_upload_documents(
+    bot_id: int = Form(...),
+    archive: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk-ingest a zip or tar archive of PDF, TXT and Markdown files
+    into the bot's knowledge base.
+    """
+    # Verify bot exists
+    bot_result = await db.execute(select(Bot).where(Bot.id == bot_id))
+    bot = bot_result.scalar_one_or_none()
+    
+    if not bot:
+        raise HTTPException(status_code=404, detail=f"Bot {bot_id} not found")
     
+    if not archive.filename or not is_archive(archive.filename):
+        raise HTTPException(
+            status_code=400,
+            detail="Only .zip and .tar (optionally .gz, .bz2, .xz) archives are supported"
+        )
+    
+    try:
+        report = await bulk_ingestion.ingest_files(
+            iter_archive(archive.file, archive.filename),
+            bot_id=bot_id,
+            db=db
+        )
+    except ArchiveLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (zipfile.BadZipFile, tarfile.TarError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid archive: {str(e)}")
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing content: {str(e)}"
+            detail=f"Error processing archive: {str(e)}"
+        )
+    
+    if not report["success"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No documents could be ingested from the archive ({report['documents_failed']} failed)"
         )
+    
+    return {
+        "message": "Archive ingested successfully",
+        **report
+    }
 
 
 @router.get("/api/v1/documents/bot/{bot_id}", tags=["Documents"])
@@ -187,26 +282,38 @@ async def get_bot_documents(
 ):
     """
     Get all documents for a specific bot.
+    Totals come from the precomputed knowledge base stats, not ChromaDB.
     """
-    # Verify bot exists
-    bot_result = await db.execute(select(Bot).where(Bot.id == bot_id))
-    bot = bot_result.scalar_one_or_none()
+    # Verify bot exists and load its knowledge base stats in one query
+    bot_result = await db.execute(
+        select(Bot.id, KnowledgeBaseStats)
+        .outerjoin(KnowledgeBaseStats, KnowledgeBaseStats.bot_id == Bot.id)
+        .where(Bot.id == bot_id)
+    )
+    bot_row = bot_result.one_or_none()
     
-    if not bot:
+    if not bot_row:
         raise HTTPException(status_code=404, detail=f"Bot {bot_id} not found")
     
-    # Get documents
+    stats = serialize_stats(bot_row.KnowledgeBaseStats)
+    # The first use creates the backend's client; keep the event loop free meanwhile
+    vector_store = await asyncio.to_thread(get_vector_store)
+    
+    # Get documents (metadata columns only)
     result = await db.execute(
-        select(Document)
+        select(
+            Document.id,
+            Document.filename,
+            Document.chunk_count,
+            Document.content_size,
+            Document.created_at
+        )
         .where(Document.bot_id == bot_id)
         .order_by(desc(Document.created_at))
         .offset(skip)
         .limit(limit)
     )
-    documents = result.scalars().all()
-    
-    # Get collection stats
-    stats = document_ingestion.get_collection_stats(bot_id)
+    documents = result.all()
     
     return {
         "documents": [
@@ -214,12 +321,18 @@ async def get_bot_documents(
                 "id": doc.id,
                 "filename": doc.filename,
                 "chunk_count": doc.chunk_count,
+                "size_bytes": doc.content_size,
                 "created_at": doc.created_at.isoformat()
             }
             for doc in documents
         ],
-        "total_documents": len(documents),
-        "collection_stats": stats
+        "total_documents": stats["documents"],
+        "collection_stats": {
+            "success": True,
+            "collection_name": vector_store.collection_name(bot_id),
+            "document_count": stats["chunks"],
+            **stats
+        }
     }
 
 
@@ -229,8 +342,7 @@ async def delete_document(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Delete a document from the knowledge base.
-    Note: This removes from database but not from ChromaDB (would need collection rebuild).
+    Delete a document and its chunks from the knowledge base.
     """
     result = await db.execute(select(Document).where(Document.id == document_id))
     document = result.scalar_one_or_none()
@@ -238,38 +350,37 @@ async def delete_document(
     if not document:
         raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
     
+    # Remove the document's chunks from the vector store (off the event loop: the
+    # first use loads the embedding model)
+    ingestion = await asyncio.to_thread(get_document_ingestion)
+    await asyncio.to_thread(ingestion.delete_document_chunks, document.bot_id, document.id)
+    
+    # Only successfully ingested documents are counted in the stats
+    if document.chunk_count:
+        await record_deletion(
+            db,
+            document.bot_id,
+            chunks=document.chunk_count,
+            tokens=document.token_count or 0,
+            size_bytes=document.content_size or 0
+        )
+    
+    content_hash = document.content_hash
     await db.delete(document)
     await db.commit()
     
+    # Remove the body from the blob store once no other document shares it. An
+    # upload of the same content stores the blob before committing its row, so
+    # recently stored blobs are kept even when no committed row refers to them.
+    if content_hash:
+        refs_result = await db.execute(
+            select(func.count()).select_from(Document).where(Document.content_hash == content_hash)
+        )
+        if refs_result.scalar_one() == 0:
+            await asyncio.to_thread(blob_store.delete, content_hash, settings.blob_delete_grace_seconds)
+    
     return {
         "success": True,
         "message": "Document deleted successfully",
         "document_id": document_id
     }
-
-
-def extract_text_from_pdf(pdf_content: bytes) -> str:
-    """
-    Extract text from PDF file content.
-    
-    Args:
-        pdf_content: PDF file content as bytes
-        
-    Returns:
-        Extracted text
-    """
-    try:
-        import io
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = pypdf.PdfReader(pdf_file)
-        
-        text_parts = []
-        for page_num, page in enumerate(pdf_reader.pages):
-            text = page.extract_text()
-            if text.strip():
-                text_parts.append(f"[Page {page_num + 1}]\n{text}")
-        
-        return "\n\n".join(text_parts)
-    
-    except Exception as e:
-        raise Exception(f"Failed to extract text from PDF: {str(e)}")
@@ -0,0 +1,136 @@
+"""
+Per-session processing pipeline for WebSocket chat.
+The receive loop only parses frames and submits user messages; a worker
+task processes them one at a time, in arrival order, so responses are
+delivered in order while the socket keeps answering pings and cancel
+requests. A newer message cancels the generation still in flight.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPipeline:
+    """Ordered, cancellable processing of one chat session's user messages."""
+
+    def __init__(
+        self,
+        session_id: int,
+        handler: Callable[..., Awaitable[None]],
+        max_pending: Optional[int] = None,
+        cancel_on_new_message: Optional[bool] = None,
+        on_error: Optional[Callable[["SessionPipeline", Exception], Awaitable[None]]] = None
+    ):
+        """
+        Initialize the pipeline and start its worker task.
+
+        Args:
+            session_id: Chat session ID
+            handler: Coroutine called with (pipeline, message, **context) per user message
+            max_pending: Messages that may wait behind the one in progress (default from settings)
+            cancel_on_new_message: Cancel the in-flight generation when a message arrives
+            on_error: Coroutine called when the handler raises
+        """
+        self.session_id = session_id
+        self.handler = handler
+        self.on_error = on_error
+        self.cancel_on_new_message = (
+            settings.websocket_cancel_on_new_message if cancel_on_new_message is None else cancel_on_new_message
+        )
+        self.connections = 0
+        self.cancelled_turns = 0
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending or settings.websocket_max_pending_turns)
+        self._in_flight: Optional[asyncio.Task] = None
+        self._worker = asyncio.create_task(self._run())
+
+    @property
+    def pending(self) -> int:
+        """Messages waiting to be processed."""
+        return self._queue.qsize()
+
+    def submit(self, message: str, **context) -> bool:
+        """
+        Queue a user message for processing.
+
+        Args:
+            message: The user's message
+            **context: Passed to the handler with the message
+
+        Returns:
+            False if too many messages are already waiting
+        """
+        if self._queue.full():
+            return False
+        self._queue.put_nowait((message, context))
+        if self.cancel_on_new_message:
+            self.cancel()
+        return True
+
+    def cancel(self) -> bool:
+        """
+        Cancel the generation in flight, if any.
+
+        Returns:
+            True if a generation was cancelled
+        """
+        if self._in_flight is not None and not self._in_flight.done():
+            self._in_flight.cancel()
+            return True
+        return False
+
+    async def run_cancellable(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run a step that a newer message or a cancel request may interrupt.
+        The step is skipped outright if a newer message is already waiting.
+
+        Args:
+            func: Coroutine function to run
+            *args, **kwargs: Passed to func
+
+        Returns:
+            Tuple of (result, cancelled); result is None when cancelled
+        """
+        if self.cancel_on_new_message and not self._queue.empty():
+            self.cancelled_turns += 1
+            return None, True
+
+        task = asyncio.create_task(func(*args, **kwargs))
+        self._in_flight = task
+        try:
+            # wait() does not propagate the step's own cancellation
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            self._in_flight = None
+
+        if task.cancelled():
+            self.cancelled_turns += 1
+            return None, True
+        return task.result(), False
+
+    async def close(self):
+        """Stop processing and cancel anything in flight."""
+        self.cancel()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        """Process queued messages one at a time."""
+        while True:
+            message, context = await self._queue.get()
+            try:
+                await self.handler(self, message, **context)
+            except Exception as e:
+                logger.exception("Failed to process message in session %s: %s", self.session_id, e)
+                if self.on_error is not None:
+                    await self.on_error(self, e)
@@ -3,12 +3,18 @@ REST API routes for the chatbot backend.
 Handles session management, message history, lead capture, and health checks.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
 from pydantic import BaseModel
+import asyncio
 
 from app.database import get_db, Bot, ChatSession, Message, Lead, Document
+from app.api.websocket import manager
 from app.config import settings
+from app.metrics import CONTENT_TYPE, registry
+from app.rag.readiness import get_readiness
+from app.rag.vectorstore import get_vector_store
 from app.schemas import (
     SessionCreate,
     SessionResponse,
@@ -17,6 +23,7 @@ from app.schemas import (
     LeadResponse,
     BotCreate,
     BotResponse,
+    BotUpdate,
     ChatHistoryResponse,
     DashboardStatsResponse
 )
@@ -41,15 +48,6 @@ async def verify_admin(x_token: str = Header(None)):
 
 
 # Root Endpoint
-@router.get("/")
-async def root():
-    return {
-        "status": "healthy",
-        "service": "AI Customer Support Chatbot",
-        "version": "1.0.0"
-    }
-
-
 # Login Endpoint
 @router.post("/api/v1/login", tags=["Auth"])
 async def login(creds: LoginRequest):
@@ -72,6 +70,27 @@ async def health_check():
     }
 
 
+@router.get("/ready", tags=["System"])
+async def readiness_check():
+    """
+    Readiness check: 200 once the embedding model and vector store are loaded,
+    503 while they are still loading or failed to load.
+    """
+    readiness = get_readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=readiness
+    )
+
+
+@router.get("/metrics", tags=["System"])
+async def metrics():
+    """Pipeline stage latencies, connection gauges and cache counters in Prometheus text format."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
 # Admin Stats
 @router.get("/api/v1/admin/stats", response_model=DashboardStatsResponse, tags=["Admin"], dependencies=[Depends(verify_admin)])
 async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
@@ -100,21 +119,72 @@ async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
     )
 
 
+@router.get("/api/v1/admin/websockets", tags=["Admin"], dependencies=[Depends(verify_admin)])
+async def get_websocket_stats():
+    """Get this worker's WebSocket send queue depth, send latency and slow-consumer counts."""
+    return manager.get_stats()
+
+
 # Bot Management
+async def apply_embedding_quantization(bot_id: int, mode: str):
+    """Convert a bot's vector collection to a quantization mode (in a thread: large collections take a while)."""
+    try:
+        vector_store = await asyncio.to_thread(get_vector_store)
+        await asyncio.to_thread(vector_store.set_quantization, bot_id, mode)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.post("/api/v1/bots", response_model=BotResponse, tags=["Bots"])
 async def create_bot(bot: BotCreate, db: AsyncSession = Depends(get_db)):
     """Create a new bot configuration."""
     db_bot = Bot(
         name=bot.name,
         system_prompt=bot.system_prompt,
-        welcome_message=bot.welcome_message
+        welcome_message=bot.welcome_message,
+        embedding_quantization=bot.embedding_quantization
     )
     db.add(db_bot)
+    await db.flush()
+    
+    if bot.embedding_quantization:
+        await apply_embedding_quantization(db_bot.id, bot.embedding_quantization)
+    
     await db.commit()
     await db.refresh(db_bot)
     return db_bot
 
 
+@router.patch("/api/v1/bots/{bot_id}", response_model=BotResponse, tags=["Bots"])
+async def update_bot(bot_id: int, update: BotUpdate, db: AsyncSession = Depends(get_db)):
+    """
+    Update bot configuration.
+    Changing embedding_quantization re-encodes the bot's stored embeddings.
+    """
+    result = await db.execute(select(Bot).where(Bot.id == bot_id))
+    bot = result.scalar_one_or_none()
+    
+    if not bot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Bot with id {bot_id} not found"
+        )
+    
+    changes = update.model_dump(exclude_unset=True)
+    if "embedding_quantization" in changes:
+        await apply_embedding_quantization(bot_id, changes["embedding_quantization"] or settings.vector_quantization)
+    
+    for field, value in changes.items():
+        setattr(bot, field, value)
+    
+    await db.commit()
+    await db.refresh(bot)
+    return bot
+
+
 @router.get("/api/v1/bots/{bot_id}", response_model=BotResponse, tags=["Bots"])
 async def get_bot(bot_id: int, db: AsyncSession = Depends(get_db)):
     """Get bot configuration by ID."""
@@ -0,0 +1,205 @@
+"""
+Per-connection send queues for WebSocket fan-out.
+Every connection gets a bounded queue drained by its own writer task, so a
+broadcast only enqueues and one slow client never delays the others. When a
+client cannot keep up, the slow-consumer policy either drops its oldest
+queued messages or disconnects it.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+from fastapi import WebSocket
+
+from app.api.codecs import JSON_CODEC, Frame, FrameCodec, new_connection_id
+from app.config import settings
+from app.metrics import observe_stage
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+
+# "Try again later": the client fell behind and should reconnect
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def validate_slow_consumer_policy(policy: str) -> str:
+    """Check a slow-consumer policy name and return it."""
+    if policy not in SLOW_CONSUMER_POLICIES:
+        raise ValueError(
+            f"Unknown slow consumer policy '{policy}'. Choose from: {', '.join(SLOW_CONSUMER_POLICIES)}"
+        )
+    return policy
+
+
+class SendMetrics:
+    """Send counters and a rolling window of queue-to-wire latencies for one worker."""
+
+    def __init__(self, window: int = 2048):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.disconnected = 0
+
+    def record_send(self, seconds: float):
+        self.sent += 1
+        self.latencies.append(seconds)
+        observe_stage("send", seconds)
+
+    def snapshot(self, senders: Iterable["ConnectionSender"]) -> Dict[str, float]:
+        """
+        Summarize the metrics.
+
+        Args:
+            senders: The worker's open connection senders
+
+        Returns:
+            Dictionary with queue depths, send latency percentiles (ms) and counters
+        """
+        depths = [sender.depth for sender in senders]
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 2)
+
+        return {
+            "connections": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "send_latency_p50_ms": percentile(0.5),
+            "send_latency_p99_ms": percentile(0.99),
+            "send_latency_max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "messages_sent": self.sent,
+            "messages_dropped": self.dropped,
+            "send_failures": self.failed,
+            "slow_consumer_disconnects": self.disconnected
+        }
+
+
+class ConnectionSender:
+    """Bounded send queue and writer task for one WebSocket connection."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        metrics: SendMetrics,
+        max_queue: Optional[int] = None,
+        policy: Optional[str] = None,
+        timeout_ms: Optional[float] = None,
+        codec: Optional[FrameCodec] = None
+    ):
+        """
+        Initialize the sender and start its writer task.
+
+        Args:
+            websocket: Accepted WebSocket connection
+            metrics: Worker-wide metrics to update
+            max_queue: Messages queued before the policy applies (default from settings)
+            policy: "drop_oldest" or "disconnect" (default from settings)
+            timeout_ms: With "disconnect", how long a message may wait or a send may take
+            codec: Protocol negotiated for the connection (default JSON)
+        """
+        self.websocket = websocket
+        self.codec = codec or JSON_CODEC
+        self.connection_id = new_connection_id()
+        self.metrics = metrics
+        self.max_queue = max_queue or settings.websocket_send_queue_size
+        self.policy = validate_slow_consumer_policy(policy or settings.websocket_slow_consumer_policy)
+        self.timeout = (timeout_ms or settings.websocket_slow_consumer_timeout_ms) / 1000
+        self.closed = False
+        self._queue: Deque[Tuple[float, Frame]] = deque()
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be sent."""
+        return len(self._queue)
+
+    def enqueue(self, frame: Frame) -> bool:
+        """
+        Queue an encoded frame without waiting for the client.
+
+        Args:
+            frame: Text or binary frame from the connection's codec
+
+        Returns:
+            False if the connection is closed or was disconnected as a slow consumer
+        """
+        if self.closed:
+            return False
+
+        now = time.perf_counter()
+        if self.policy == "disconnect":
+            stale = bool(self._queue) and now - self._queue[0][0] > self.timeout
+            if stale or len(self._queue) >= self.max_queue:
+                self._disconnect_slow_consumer()
+                return False
+        elif len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.metrics.dropped += 1
+
+        self._queue.append((now, frame))
+        self._ready.set()
+        return True
+
+    async def close(self):
+        """Stop the writer task and discard anything still queued."""
+        self.closed = True
+        self._queue.clear()
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        """Send queued messages in order."""
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            enqueued_at, frame = self._queue.popleft()
+            if isinstance(frame, bytes):
+                send = self.websocket.send_bytes(frame)
+            else:
+                send = self.websocket.send_text(frame)
+            try:
+                if self.policy == "disconnect":
+                    await asyncio.wait_for(send, self.timeout)
+                else:
+                    await send
+            except asyncio.TimeoutError:
+                self._disconnect_slow_consumer()
+                return
+            except Exception as e:
+                self.metrics.failed += 1
+                self.closed = True
+                self._queue.clear()
+                logger.warning("WebSocket send failed: %s", e)
+                return
+            self.metrics.record_send(time.perf_counter() - enqueued_at)
+
+    def _disconnect_slow_consumer(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self.metrics.disconnected += 1
+        logger.warning("Disconnecting slow WebSocket consumer")
+        asyncio.create_task(self._close_websocket())
+
+    async def _close_websocket(self):
+        try:
+            await self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Client too slow")
+        except Exception:
+            pass
@@ -6,44 +6,140 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
-import json
+from functools import partial
 from typing import Optional
+import asyncio
+import logging
+import time
 
+from app.config import settings
 from app.database import get_db, ChatSession, Message, Bot
+from app.api.backplane import Backplane, create_backplane
+from app.api.codecs import ORIGIN_KEY, FrameCodec, negotiate_codec
+from app.api.pipeline import SessionPipeline
+from app.api.sender import ConnectionSender, SendMetrics
+from app.metrics import TURN_SECONDS, registry, timed
+from app.rag.prefetch import retrieval_prefetcher
+from app.rag.stats import get_knowledge_base_version
+from app.tracing import trace_request
 from app.schemas import ChatMessageRequest, ChatMessageResponse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
-    """Manages active WebSocket connections."""
+    """
+    Manages this worker's WebSocket connections.
+    Broadcasts go through the backplane so connections of the same session
+    on other workers receive them too. Each connection is written by its own
+    sender, so delivery only enqueues and never waits on a slow client.
+    """
     
-    def __init__(self):
+    def __init__(self, backplane: Optional[Backplane] = None, **sender_options):
+        """
+        Initialize the connection manager.
+        
+        Args:
+            backplane: Backplane to broadcast through (default from settings)
+            **sender_options: Passed to every ConnectionSender (max_queue, policy, timeout_ms)
+        """
         self.active_connections: dict[int, list[WebSocket]] = {}
+        self.senders: dict[WebSocket, ConnectionSender] = {}
+        self.metrics = SendMetrics()
+        self.sender_options = sender_options
+        self._backplane = backplane
+        self._started = False
+    
+    @property
+    def backplane(self) -> Backplane:
+        """The backplane, created from settings on first use."""
+        if self._backplane is None:
+            self._backplane = create_backplane()
+        return self._backplane
     
-    async def connect(self, websocket: WebSocket, session_id: int):
-        """Accept and register a new WebSocket connection."""
-        await websocket.accept()
+    async def start(self):
+        """Start receiving broadcasts from other workers."""
+        if not self._started:
+            await self.backplane.start(self.deliver_local)
+            self._started = True
+    
+    async def close(self):
+        """Stop all senders and the backplane."""
+        for sender in list(self.senders.values()):
+            await sender.close()
+        self.senders.clear()
+        if self._started:
+            await self.backplane.close()
+            self._started = False
+    
+    async def connect(self, websocket: WebSocket, session_id: int, codec: Optional[FrameCodec] = None):
+        """
+        Accept and register a new WebSocket connection.
+        
+        Args:
+            websocket: The connection
+            session_id: Chat session ID
+            codec: Protocol negotiated for the connection (default JSON)
+        """
+        await websocket.accept(subprotocol=codec.subprotocol if codec else None)
+        await self.start()
         if session_id not in self.active_connections:
             self.active_connections[session_id] = []
+            await self.backplane.subscribe(session_id)
         self.active_connections[session_id].append(websocket)
+        self.senders[websocket] = ConnectionSender(websocket, self.metrics, codec=codec, **self.sender_options)
     
-    def disconnect(self, websocket: WebSocket, session_id: int):
+    async def disconnect(self, websocket: WebSocket, session_id: int):
         """Remove a WebSocket connection."""
-        if session_id in self.active_connections:
-            self.active_connections[session_id].remove(websocket)
-            if not self.active_connections[session_id]:
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            await sender.close()
+        connections = self.active_connections.get(session_id)
+        if connections and websocket in connections:
+            connections.remove(websocket)
+            if not connections:
                 del self.active_connections[session_id]
+                await self.backplane.unsubscribe(session_id)
     
     async def send_message(self, message: dict, websocket: WebSocket):
-        """Send a message to a specific WebSocket connection."""
-        await websocket.send_json(message)
+        """Queue a message for a specific WebSocket connection."""
+        sender = self.senders.get(websocket)
+        if sender is not None:
+            frame = sender.codec.encode(message)
+            if frame is not None:
+                sender.enqueue(frame)
+        else:
+            await websocket.send_json(message)
     
     async def broadcast(self, message: dict, session_id: int):
-        """Broadcast a message to all connections in a session."""
-        if session_id in self.active_connections:
-            for connection in self.active_connections[session_id]:
-                await connection.send_json(message)
+        """Broadcast a message to all connections in a session, on every worker."""
+        await self.backplane.publish(session_id, message)
+    
+    async def deliver_local(self, session_id: int, message: dict):
+        """Queue a message for each of this worker's connections in a session."""
+        # Encode once per protocol (and once more for the sender's own echo)
+        frames = {}
+        origin = message.get(ORIGIN_KEY)
+        for connection in self.active_connections.get(session_id, []):
+            sender = self.senders.get(connection)
+            if sender is None:
+                continue
+            own_echo = origin is not None and origin == sender.connection_id
+            key = (sender.codec.name, own_echo)
+            if key not in frames:
+                frames[key] = sender.codec.encode(message, own_echo)
+            if frames[key] is not None:
+                sender.enqueue(frames[key])
+    
+    def connection_id(self, websocket: WebSocket) -> Optional[str]:
+        """ID tagging messages sent on a connection, so its echo can be acknowledged."""
+        sender = self.senders.get(websocket)
+        return sender.connection_id if sender is not None else None
+    
+    def get_stats(self) -> dict:
+        """Send queue depth, send latency and slow-consumer counters for this worker."""
+        return self.metrics.snapshot(self.senders.values())
 
 
 manager = ConnectionManager()
@@ -59,65 +155,113 @@ async def get_db_session():
             await session.close()
 
 
-@router.websocket("/ws/chat/{session_id}")
-async def websocket_chat_endpoint(
-    websocket: WebSocket,
-    session_id: int
+# This worker's processing pipelines, one per session with open connections
+session_pipelines: dict[int, SessionPipeline] = {}
+
+
+# Connection state is read when /metrics is scraped
+def _send_counters() -> dict:
+    metrics = manager.metrics
+    return {
+        ("sent",): metrics.sent,
+        ("dropped",): metrics.dropped,
+        ("failed",): metrics.failed,
+        ("slow_consumer_disconnect",): metrics.disconnected
+    }
+
+
+registry.gauge_callback(
+    "chatbot_websocket_connections",
+    "Open WebSocket connections on this worker",
+    lambda: len(manager.senders)
+)
+registry.gauge_callback(
+    "chatbot_websocket_sessions",
+    "Chat sessions with open connections on this worker",
+    lambda: len(manager.active_connections)
+)
+registry.gauge_callback(
+    "chatbot_websocket_send_queue_depth",
+    "Messages waiting in WebSocket send queues",
+    lambda: sum(sender.depth for sender in manager.senders.values())
+)
+registry.gauge_callback(
+    "chatbot_pending_turns",
+    "User messages waiting behind the one in progress on session pipelines",
+    lambda: sum(pipeline.pending for pipeline in session_pipelines.values())
+)
+registry.counter_callback(
+    "chatbot_websocket_messages_total",
+    "WebSocket frames by delivery result",
+    _send_counters,
+    ["result"]
+)
+TURN_ERRORS = registry.counter(
+    "chatbot_turn_errors_total",
+    "Chat messages that failed to process"
+)
+BUSY_REJECTIONS = registry.counter(
+    "chatbot_busy_rejections_total",
+    "Chat messages rejected because the session queue was full"
+)
+
+
+async def load_conversation_history(db: AsyncSession, session_id: int, limit: int = 10) -> list[dict]:
+    """
+    Get a session's most recent messages, oldest first.
+    
+    Args:
+        db: Database session
+        session_id: Chat session ID
+        limit: Number of messages
+        
+    Returns:
+        Messages as role / content dicts
+    """
+    with timed("db_read"):
+        history_result = await db.execute(
+            select(Message)
+            .where(Message.session_id == session_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit)
+        )
+        history_messages = history_result.scalars().all()
+    return [
+        {"role": msg.role, "content": msg.content}
+        for msg in reversed(history_messages)
+    ]
+
+
+async def process_user_message(
+    pipeline: SessionPipeline,
+    user_message: str,
+    bot_id: int,
+    system_prompt: Optional[str],
+    origin: Optional[str] = None,
+    client_id: Optional[str] = None
 ):
     """
-    WebSocket endpoint for real-time chat.
-    Handles incoming user messages and sends AI-generated responses.
+    Process one user message: persist it, generate a response and broadcast both.
+    Runs on the session's pipeline, so messages are handled in arrival order.
+    
+    Args:
+        pipeline: The session's pipeline (generation runs as its cancellable step)
+        user_message: The user's message
+        bot_id: Bot serving the session
+        system_prompt: The bot's system prompt
+        origin: Connection the message was sent on (compact clients get an ack, not an echo)
+        client_id: Client's ID for the message, returned in the echo / ack
     """
     from app.database import AsyncSessionLocal
+    from app.rag.engine import get_rag_engine
+    from app.agent.tools import agent_tools
     
-    # Create database session
-    db = AsyncSessionLocal()
+    session_id = pipeline.session_id
+    start = time.perf_counter()
     
-    try:
-        # Verify session exists
-        result = await db.execute(
-            select(ChatSession).where(ChatSession.id == session_id)
-        )
-        chat_session = result.scalar_one_or_none()
-        
-        if not chat_session:
-            await websocket.close(code=1008, reason="Session not found")
-            return
-        
-        # Get bot configuration
-        bot_result = await db.execute(
-            select(Bot).where(Bot.id == chat_session.bot_id)
-        )
-        bot = bot_result.scalar_one_or_none()
-        
-        if not bot:
-            await websocket.close(code=1008, reason="Bot configuration not found")
-            return
-        
-        # Accept connection
-        await manager.connect(websocket, session_id)
-        
-        # Send welcome message
-        welcome_response = ChatMessageResponse(
-            role="assistant",
-            content=bot.welcome_message,
-            session_id=session_id,
-            timestamp=datetime.utcnow()
-        )
-        await manager.send_message(welcome_response.model_dump(mode="json"), websocket)
-        
-        # Listen for messages
-        while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            
-            # Validate and parse message
-            user_message = message_data.get("message", "")
-            
-            if not user_message.strip():
-                continue
-            
+    # One trace per turn; slow turns are also kept for admin slow-traces
+    with trace_request("chat_turn", session_id=session_id, bot_id=bot_id):
+        async with AsyncSessionLocal() as db:
             # Save user message to database
             user_msg = Message(
                 session_id=session_id,
@@ -125,7 +269,8 @@ async def websocket_chat_endpoint(
                 content=user_message
             )
             db.add(user_msg)
-            await db.commit()
+            with timed("db_write"):
+                await db.commit()
             
             # Echo user message back (for confirmation)
             user_response = ChatMessageResponse(
@@ -134,7 +279,12 @@ async def websocket_chat_endpoint(
                 session_id=session_id,
                 timestamp=datetime.utcnow()
             )
-            await manager.send_message(user_response.model_dump(mode="json"), websocket)
+            echo = user_response.model_dump(mode="json")
+            if origin is not None:
+                echo[ORIGIN_KEY] = origin
+            if client_id is not None:
+                echo["client_id"] = client_id
+            await manager.broadcast(echo, session_id)
             
             # Send typing indicator
             typing_indicator = {
@@ -142,48 +292,52 @@ async def websocket_chat_endpoint(
                 "content": "typing",
                 "session_id": session_id
             }
-            await manager.send_message(typing_indicator, websocket)
-            
-            # Get conversation history for context
-            history_result = await db.execute(
-                select(Message)
-                .where(Message.session_id == session_id)
-                .order_by(Message.created_at)
-                .limit(10)
-            )
-            history_messages = history_result.scalars().all()
-            conversation_history = [
-                {"role": msg.role, "content": msg.content}
-                for msg in history_messages
-            ]
+            await manager.broadcast(typing_indicator, session_id)
             
-            # Generate AI response using RAG engine
-            from app.rag.engine import rag_engine
-            from app.agent.tools import agent_tools
+            # Get the most recent conversation history for context
+            conversation_history = await load_conversation_history(db, session_id)
+            with timed("db_read"):
+                knowledge_base_version = await get_knowledge_base_version(db, bot_id)
             
             # Check for lead intent
             lead_intent = agent_tools.detect_lead_intent(user_message)
             
-            # Generate response
-            rag_response = await rag_engine.generate_response(
+            # The first message may arrive while the models are still loading;
+            # wait for them off the event loop so /health and /ready keep answering
+            rag_engine = await asyncio.to_thread(get_rag_engine)
+            
+            # Generate response; a newer message or a cancel request interrupts it
+            rag_response, cancelled = await pipeline.run_cancellable(
+                rag_engine.generate_response,
                 query=user_message,
-                bot_id=chat_session.bot_id,
-                system_prompt=bot.system_prompt,
+                bot_id=bot_id,
+                system_prompt=system_prompt,
                 conversation_history=conversation_history,
-                session_id=session_id
+                session_id=session_id,
+                knowledge_base_version=knowledge_base_version
             )
             
+            if cancelled:
+                await manager.broadcast({
+                    "role": "system",
+                    "content": "cancelled",
+                    "session_id": session_id
+                }, session_id)
+                TURN_SECONDS.observe(time.perf_counter() - start, outcome="cancelled")
+                return
+            
             ai_response_content = rag_response["response"]
             confidence = rag_response.get("confidence", 0.0)
             
             # Handle lead capture if email/phone detected
             if lead_intent["extracted_email"] or lead_intent["extracted_phone"]:
-                lead_capture_result = await agent_tools.capture_lead(
-                    session_id=session_id,
-                    email=lead_intent["extracted_email"],
-                    phone=lead_intent["extracted_phone"],
-                    db=db
-                )
+                with timed("db_write"):
+                    lead_capture_result = await agent_tools.capture_lead(
+                        session_id=session_id,
+                        email=lead_intent["extracted_email"],
+                        phone=lead_intent["extracted_phone"],
+                        db=db
+                    )
                 
                 if lead_capture_result["success"]:
                     ai_response_content += "\n\nThank you! I've saved your contact information. Someone from our team will reach out to you soon."
@@ -199,9 +353,10 @@ async def websocket_chat_endpoint(
                 content=ai_response_content
             )
             db.add(ai_msg)
-            await db.commit()
+            with timed("db_write"):
+                await db.commit()
             
-            # Send AI response to client
+            # Send AI response to every connection of the session
             ai_response = ChatMessageResponse(
                 role="assistant",
                 content=ai_response_content,
@@ -210,15 +365,176 @@ async def websocket_chat_endpoint(
                 confidence=confidence,
                 sources=rag_response.get("sources", [])
             )
-            await manager.send_message(ai_response.model_dump(mode="json"), websocket)
+            await manager.broadcast(ai_response.model_dump(mode="json"), session_id)
+            outcome = "cached" if rag_response.get("cached") else "replied"
+            TURN_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+
+
+async def speculate_retrieval(draft: str, session_id: int, bot_id: int) -> Optional[dict]:
+    """
+    Retrieve for a message still being typed, so the sent message finds it ready.
+    Runs as a background task of the session's RetrievalPrefetcher.
+    
+    Args:
+        draft: The message typed so far
+        session_id: Chat session ID
+        bot_id: Bot serving the session
+        
+    Returns:
+        Prefetched retrieval, or None if the draft needs none
+    """
+    from app.database import AsyncSessionLocal
+    from app.rag.engine import get_rag_engine
+    
+    async with AsyncSessionLocal() as db:
+        conversation_history = await load_conversation_history(db, session_id)
+        with timed("db_read"):
+            knowledge_base_version = await get_knowledge_base_version(db, bot_id)
+    rag_engine = await asyncio.to_thread(get_rag_engine)
+    return await rag_engine.prefetch_retrieval(draft, bot_id, conversation_history, knowledge_base_version)
+
+
+async def report_processing_error(pipeline: SessionPipeline, error: Exception):
+    """Tell the session's clients that their message could not be processed."""
+    TURN_ERRORS.inc()
+    await manager.broadcast({
+        "role": "system",
+        "content": "error",
+        "session_id": pipeline.session_id
+    }, pipeline.session_id)
+
+
+async def release_pipeline(session_id: int):
+    """Drop a connection's reference to its session pipeline, closing it after the last one."""
+    pipeline = session_pipelines.get(session_id)
+    if pipeline is None:
+        return
+    pipeline.connections -= 1
+    if pipeline.connections <= 0:
+        del session_pipelines[session_id]
+        retrieval_prefetcher.discard(session_id)
+        await pipeline.close()
+
+
+@router.websocket("/ws/chat/{session_id}")
+async def websocket_chat_endpoint(
+    websocket: WebSocket,
+    session_id: int
+):
+    """
+    WebSocket endpoint for real-time chat.
+    The receive loop only parses frames; user messages are processed on the
+    session's pipeline so pings and cancel requests are answered at once.
+    
+    The protocol is negotiated with the WebSocket subprotocol (see app.api.codecs).
+    
+    Client frames:
+        {"message": "...", "id": ...}  - a user message (cancels the response in progress)
+        {"type": "cancel"}  - cancel the response in progress
+        {"type": "draft", "message": "..."}  - the message being typed; its retrieval
+                            is prefetched in the background (optional, never answered)
+        {"type": "ping"}    - answered with {"type": "pong"}
+    """
+    from app.database import AsyncSessionLocal
+    
+    pipeline = None
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            # Verify session exists
+            result = await db.execute(
+                select(ChatSession).where(ChatSession.id == session_id)
+            )
+            chat_session = result.scalar_one_or_none()
+            
+            if not chat_session:
+                await websocket.close(code=1008, reason="Session not found")
+                return
+            
+            # Get bot configuration
+            bot_result = await db.execute(
+                select(Bot).where(Bot.id == chat_session.bot_id)
+            )
+            bot = bot_result.scalar_one_or_none()
+            
+            if not bot:
+                await websocket.close(code=1008, reason="Bot configuration not found")
+                return
+        
+        # Accept connection with the protocol the client asked for
+        codec = negotiate_codec(websocket.scope.get("subprotocols", []))
+        await manager.connect(websocket, session_id, codec)
+        connection_id = manager.connection_id(websocket)
+        
+        # Tabs of the same session share one pipeline on this worker
+        pipeline = session_pipelines.get(session_id)
+        if pipeline is None:
+            pipeline = SessionPipeline(
+                session_id,
+                partial(process_user_message, bot_id=bot.id, system_prompt=bot.system_prompt),
+                on_error=report_processing_error
+            )
+            session_pipelines[session_id] = pipeline
+        pipeline.connections += 1
+        
+        # Send welcome message
+        welcome_response = ChatMessageResponse(
+            role="assistant",
+            content=bot.welcome_message,
+            session_id=session_id,
+            timestamp=datetime.utcnow()
+        )
+        await manager.send_message(welcome_response.model_dump(mode="json"), websocket)
+        
+        # Listen for messages
+        while True:
+            # Receive message from client (text, or binary for msgpack)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            data = frame.get("text")
+            message_data = codec.loads(data if data is not None else frame.get("bytes"))
+            message_type = message_data.get("type", "message")
+            
+            if message_type == "ping":
+                await manager.send_message({"type": "pong", "session_id": session_id}, websocket)
+                continue
+            
+            if message_type == "cancel":
+                pipeline.cancel()
+                continue
+            
+            if message_type == "draft":
+                if settings.prefetch_enabled:
+                    retrieval_prefetcher.draft(
+                        session_id,
+                        str(message_data.get("message", "")),
+                        partial(speculate_retrieval, session_id=session_id, bot_id=bot.id)
+                    )
+                continue
+            
+            # Validate and parse message
+            user_message = message_data.get("message", "")
+            
+            if not user_message.strip():
+                continue
+            
+            if not pipeline.submit(user_message, origin=connection_id, client_id=message_data.get("id")):
+                BUSY_REJECTIONS.inc()
+                await manager.send_message({
+                    "role": "system",
+                    "content": "busy",
+                    "session_id": session_id
+                }, websocket)
     
     except WebSocketDisconnect:
-        manager.disconnect(websocket, session_id)
-        print(f"Client disconnected from session {session_id}")
+        logger.info("Client disconnected from session %s", session_id)
     
     except Exception as e:
-        print(f"WebSocket error: {str(e)}")
+        logger.exception("WebSocket error: %s", e)
         await websocket.close(code=1011, reason="Internal server error")
     
     finally:
-        await db.close()
+        if pipeline is not None:
+            await release_pipeline(session_id)
+        await manager.disconnect(websocket, session_id)
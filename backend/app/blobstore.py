@@ -0,0 +1,123 @@
+"""
+Content-addressed blob storage for document bodies.
+Stores zlib-compressed text on local disk, keyed by its SHA-256 digest,
+so the documents table only has to hold metadata.
+A blob's modification time is refreshed every time it is stored, and
+deletes can skip recently stored blobs: an upload stores its body before
+its document row is committed, so a concurrent delete of another document
+with the same content must not count references in between and remove it.
+"""
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from typing import Optional, Tuple
+
+from app.config import settings
+
+
+class BlobStore:
+    """Compressed, content-addressed blob store on the local filesystem."""
+
+    def __init__(self, root: Optional[str] = None, compression_level: int = 6):
+        """
+        Initialize the blob store.
+
+        Args:
+            root: Directory holding the blobs (default from settings)
+            compression_level: zlib compression level (1-9)
+        """
+        self.root = root or settings.blob_store_path
+        self.compression_level = compression_level
+
+    def _path(self, digest: str) -> str:
+        """Get the on-disk path for a digest, sharded by its first 4 hex characters."""
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.z")
+
+    def put(self, text: str) -> Tuple[str, int]:
+        """
+        Store text and return its content address.
+        Identical content is only stored once; storing it again refreshes
+        the blob's age (see delete).
+
+        Args:
+            text: The text to store
+
+        Returns:
+            Tuple of (SHA-256 hex digest, uncompressed size in bytes)
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+
+        try:
+            # Already stored: refresh its age so a concurrent delete keeps it
+            os.utime(path)
+            return digest, len(data)
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(zlib.compress(data, self.compression_level))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return digest, len(data)
+
+    def get(self, digest: str) -> str:
+        """
+        Load text by its content address.
+
+        Args:
+            digest: SHA-256 hex digest returned by put()
+
+        Returns:
+            The stored text
+        """
+        with open(self._path(digest), "rb") as f:
+            return zlib.decompress(f.read()).decode("utf-8")
+
+    def exists(self, digest: str) -> bool:
+        """Check whether a blob is stored."""
+        return os.path.exists(self._path(digest))
+
+    def delete(self, digest: str, min_age_seconds: float = 0) -> bool:
+        """
+        Delete a blob unless it was stored within min_age_seconds.
+
+        The blob is moved aside before its age is checked, so a concurrent
+        put() either refreshed it first (and it is put back) or finds it
+        missing and writes it again.
+
+        Args:
+            digest: SHA-256 hex digest of the blob
+            min_age_seconds: Keep the blob if put() stored it more recently than this
+
+        Returns:
+            True if a blob was removed, False if it did not exist or was too recent
+        """
+        path = self._path(digest)
+        doomed = f"{path}.{uuid.uuid4().hex}.deleting"
+        try:
+            os.replace(path, doomed)
+        except FileNotFoundError:
+            return False
+
+        if time.time() - os.stat(doomed).st_mtime < min_age_seconds:
+            os.replace(doomed, path)
+            return False
+        os.remove(doomed)
+        return True
+
+
+# Global instance
+blob_store = BlobStore()
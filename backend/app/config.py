@@ -16,19 +16,135 @@ class Settings(BaseSettings):
     chroma_path: str = "./chroma_db"
     chroma_collection_name: str = "knowledge_base"
     
+    # Load the embedding model and vector store in the background at startup
+    rag_preload: bool = True
+    
+    # Embedding Model Configuration ("torch" or "onnx")
+    embedding_runtime: str = "torch"
+    embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    onnx_model_path: str = "./models/all-MiniLM-L6-v2-onnx"
+    onnx_threads: int = 0  # 0 lets onnxruntime pick
+    onnx_verify_on_load: bool = True
+    embedding_compat_tolerance: float = 0.98  # min cosine vs the PyTorch model
+    
+    # Vector Store Configuration ("chroma", "numpy" or "hnsw")
+    vector_store_backend: str = "chroma"
+    vector_store_path: str = "./vector_store"
+    vector_store_dtype: str = "float32"
+    vector_quantization: str = "none"  # "none", "int8" or "binary" (numpy backend only)
+    vector_rescore_multiplier: int = 20
+    vector_rescore_dtype: str = "float16"  # Copy quantized indexes rescore with: "float32", "float16" or "none"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    
+    # Document Blob Store Configuration
+    blob_store_path: str = "./blob_store"
+    blob_delete_grace_seconds: float = 3600  # Blobs stored (or stored again) this recently are never deleted
+    
     # Server Configuration
     host: str = "0.0.0.0"
     port: int = 8000
     reload: bool = True
     
+    # WebSocket Backplane ("memory", "socket" or "redis")
+    backplane_backend: str = "memory"
+    backplane_url: str = "tcp://127.0.0.1:8765"  # or unix:///path, redis://host:6379/0
+    backplane_channel_prefix: str = "chatbot"
+    
+    # WebSocket Send Queues
+    websocket_send_queue_size: int = 256  # Per connection
+    websocket_slow_consumer_policy: str = "drop_oldest"  # or "disconnect"
+    websocket_slow_consumer_timeout_ms: float = 5000  # "disconnect" only
+    
+    # WebSocket Protocol
+    websocket_compact_protocols: bool = True  # allow chat.compact.json / chat.compact.msgpack
+    websocket_per_message_deflate: bool = True
+    
+    # WebSocket Message Processing
+    websocket_cancel_on_new_message: bool = True
+    websocket_max_pending_turns: int = 8  # Per session
+    
     # CORS Configuration
     allowed_origins: str = "*"
     
     # RAG Configuration
-    chunk_size: int = 800
+    chunker: str = "structured"  # structured (token-sized) or recursive (character-sized)
+    chunk_tokens: int = 192  # Structured chunks, within MiniLM's 256-token window
+    chunk_overlap_tokens: int = 32
+    chunk_size: int = 800  # Recursive chunks, in characters
     chunk_overlap: int = 100
+    parent_retrieval_enabled: bool = False  # Embed small chunks, give the LLM their parent sections
+    parent_chunk_tokens: int = 384
+    parent_store_path: str = "./parent_store"
     retrieval_top_k: int = 5
-    confidence_threshold: float = 0.7
+    keyword_boost: float = 0.05  # Relevance added per query keyword in a chunk
+    keyword_boost_max: float = 0.2
+    confidence_threshold: float = 0.7  # Calibrated probability that the context answers the query
+    escalation_confidence_threshold: float = 0.5
+    context_token_budget: int = 1000
+    query_rewrite_enabled: bool = True  # Rewrite follow-ups with the recent user turns
+    query_rewrite_max_queries: int = 3  # Including the message itself
+    query_rewrite_history_turns: int = 2
+    query_rewrite_budget_ms: float = 50  # Time rewrite searches may add to a turn
+    intent_routing_enabled: bool = True
+    
+    # Cross-Encoder Reranking (ONNX model from export_reranker_model.py)
+    rerank_enabled: bool = False
+    rerank_model_path: str = "./models/ms-marco-MiniLM-L-6-v2-onnx"
+    rerank_candidates: int = 20  # Chunks fetched from the vector store and rescored
+    rerank_budget_ms: float = 150  # Per request; over budget keeps the vector order (0 = no limit)
+    rerank_batch_size: int = 16
+    rerank_max_seq_length: int = 256
+    
+    # Confidence Calibration (per-bot fits from calibrate_confidence.py)
+    calibration_path: str = "./calibration"
+    calibration_default_slope: float = 12.0  # Curve for uncalibrated bots, rough fit for all-MiniLM-L6-v2
+    calibration_default_intercept: float = -4.5
+    
+    # Semantic Answer Cache
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_max_entries: int = 512  # Per bot
+    semantic_cache_ttl_seconds: float = 3600
+    
+    # Speculative Retrieval (for "draft" frames sent while the user types)
+    prefetch_enabled: bool = True
+    prefetch_min_interval_ms: float = 300  # Per session
+    prefetch_max_concurrent: int = 4  # Per worker
+    prefetch_min_chars: int = 8
+    prefetch_ttl_seconds: float = 60
+    
+    # Bulk Ingestion
+    bulk_ingest_workers: int = 4
+    bulk_embed_batch_size: int = 256
+    bulk_write_batch_size: int = 2000
+    bulk_document_window: int = 500
+    bulk_archive_max_mb: int = 2048  # Total uncompressed size of an archive's members
+    bulk_archive_max_members: int = 100000
+    
+    # Demo Engine (simulated generation delay; 0 for load tests)
+    demo_delay_min_seconds: float = 0.3
+    demo_delay_max_seconds: float = 0.8
+    
+    # Metrics (/metrics, Prometheus text format)
+    metrics_enabled: bool = True
+    
+    # Profiling (admin sampling profiler is opt-in; slow-request capture: 0 disables)
+    profiling_enabled: bool = False
+    profiler_max_seconds: float = 30
+    profiler_interval_ms: float = 10
+    slow_trace_threshold_ms: float = 2000
+    slow_trace_buffer_size: int = 100
+    
+    # Tracing (spans as JSON lines; OTLP/HTTP export when otlp_endpoint is set)
+    tracing_enabled: bool = False
+    trace_log_file: str = ""  # empty: stderr
+    trace_queue_size: int = 10000
+    trace_service_name: str = "chatbot-backend"
+    otlp_endpoint: str = ""  # e.g. http://localhost:4318
+    otlp_batch_size: int = 64
+    otlp_flush_interval_seconds: float = 5
     
     # Rate Limiting
     rate_limit_messages_per_hour: int = 50
@@ -7,8 +7,13 @@ from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
 from datetime import datetime
 from typing import AsyncGenerator
+import logging
 
 from app.config import settings
+from app.migrations import run_migrations
+
+
+logger = logging.getLogger(__name__)
 
 
 # SQLAlchemy Base Class
@@ -24,6 +29,7 @@ class Bot(Base):
     name = Column(String(255), nullable=False)
     system_prompt = Column(Text, nullable=False)
     welcome_message = Column(Text, nullable=False)
+    embedding_quantization = Column(String(16), nullable=True)  # None uses VECTOR_QUANTIZATION
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
@@ -63,11 +69,26 @@ class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
     bot_id = Column(Integer, ForeignKey("bots.id"), nullable=False)
     filename = Column(String(255), nullable=False)
-    content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # Body lives in the blob store
+    content_size = Column(Integer, default=0)  # Uncompressed body size in bytes
+    token_count = Column(Integer, default=0)
     chunk_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class KnowledgeBaseStats(Base):
+    __tablename__ = "knowledge_base_stats"
+    
+    bot_id = Column(Integer, ForeignKey("bots.id"), primary_key=True)
+    document_count = Column(Integer, default=0, nullable=False)
+    chunk_count = Column(Integer, default=0, nullable=False)
+    token_count = Column(Integer, default=0, nullable=False)
+    byte_count = Column(Integer, default=0, nullable=False)
+    last_ingested_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, default=0, nullable=False)  # Bumped by every knowledge base change
+
+
 # Async Engine and Session Factory
 engine = create_async_engine(
     settings.database_url,
@@ -88,7 +109,8 @@ async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    print("✅ Database tables created successfully")
+        await run_migrations(conn)
+    logger.info("✅ Database tables created successfully")
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -2,13 +2,25 @@
 FastAPI Application Entry Point
 Main application setup with CORS, routing, and lifecycle management.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import logging
 
 from app.config import settings
 from app.database import init_db
 from app.api import routes, websocket, documents
+from app.api.routes import verify_admin
+from app.profiling import ProfilerBusyError, profiler, slow_traces
+from app.tracing import TracingMiddleware, tracer
+from app.rag.bulk import bulk_ingestion
+from app.rag.readiness import load_rag_components
+
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -17,21 +29,33 @@ async def lifespan(app: FastAPI):
     Application lifespan manager.
     Handles startup and shutdown events.
     """
-    # Startup
-    print("🚀 Starting AI Customer Support Chatbot Backend...")
-    print(f"📊 Database: {settings.database_url}")
-    print(f"🗄️  ChromaDB Path: {settings.chroma_path}")
+    # Startup: log records and spans are written on the tracer's listener
+    # thread; requests only enqueue
+    tracer.start()
+    logger.info("🚀 Starting AI Customer Support Chatbot Backend...")
+    logger.info("📊 Database: %s", settings.database_url)
+    logger.info("🗄️  ChromaDB Path: %s", settings.chroma_path)
     
     # Initialize database
     await init_db()
     
-    # TODO: Initialize ChromaDB vector store
-    print("✅ Application startup complete")
+    # One chunking worker pool for all bulk uploads
+    bulk_ingestion.start()
+    
+    # Load the embedding model and vector store without blocking startup;
+    # /ready reports when they are available
+    if settings.rag_preload:
+        asyncio.get_running_loop().run_in_executor(None, load_rag_components)
+    
+    logger.info("✅ Application startup complete")
     
     yield
     
     # Shutdown
-    print("👋 Shutting down application...")
+    logger.info("👋 Shutting down application...")
+    await websocket.manager.close()
+    bulk_ingestion.shutdown()
+    tracer.stop()
 
 
 # Create FastAPI app
@@ -51,6 +75,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Trace ids for REST requests (WebSocket chat turns are traced per message)
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(routes.router)
 app.include_router(websocket.router)
@@ -65,7 +92,48 @@ async def root():
         "version": "1.0.0",
         "status": "running",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready",
+        "metrics": "/metrics"
+    }
+
+
+
+@app.get("/api/v1/admin/profile", tags=["Admin"], dependencies=[Depends(verify_admin)])
+async def profile(
+    seconds: float = Query(10, gt=0, description="Sampling time (capped by PROFILER_MAX_SECONDS)"),
+    interval_ms: Optional[float] = Query(None, ge=1, description="Time between samples")
+):
+    """
+    Sample every thread's Python stack for a while (opt-in: PROFILING_ENABLED).
+    Returns collapsed stacks, one "frame;frame;frame count" line per stack,
+    ready for flamegraph.pl or speedscope.
+    """
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    
+    # Sample from a worker thread so the event loop keeps serving (and being profiled)
+    try:
+        result = await asyncio.to_thread(profiler.run, seconds, interval_ms)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    return PlainTextResponse(
+        result["collapsed"],
+        headers={"X-Profile-Samples": str(result["samples"]), "X-Profile-Seconds": str(result["seconds"])}
+    )
+
+
+@app.get("/api/v1/admin/slow-traces", tags=["Admin"], dependencies=[Depends(verify_admin)])
+async def get_slow_traces(
+    kind: Optional[str] = Query(None, description="chat_turn or upload"),
+    limit: int = Query(50, ge=1)
+):
+    """Per-stage timings of recent chat turns and uploads over SLOW_TRACE_THRESHOLD_MS."""
+    return {
+        "threshold_ms": settings.slow_trace_threshold_ms,
+        "captured": slow_traces.captured,
+        "traces": slow_traces.recent(kind, limit)
     }
 
 
@@ -75,5 +143,6 @@ if __name__ == "__main__":
         "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.reload
+        reload=settings.reload,
+        ws_per_message_deflate=settings.websocket_per_message_deflate
     )
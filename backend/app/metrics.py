@@ -0,0 +1,358 @@
+"""
+Lightweight metrics for the chat and ingestion pipelines.
+Counters and latency histograms are updated in-process and rendered in the
+Prometheus text format on /metrics. State that already lives elsewhere
+(open connections, cache hit counts) is read through callbacks at scrape
+time, so it costs nothing on the hot path.
+
+Each worker process keeps its own metrics; scrape every worker.
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.config import settings
+from app.tracing import RequestTrace, current_trace
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Sub-millisecond buckets too: most stages (cache lookup, keyword boost) are fast
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+CallbackValue = Union[float, Dict[LabelValues, float]]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Common parts of a labelled metric family."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        """Add to the count for a label set."""
+        if not settings.metrics_enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramSeries:
+    """Bucket counts and sum for one label set of a histogram."""
+
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...], lock: threading.Lock):
+        self.buckets = buckets
+        # Non-cumulative; the last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = lock
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds unless buckets say otherwise) in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def labels(self, **labels: str) -> _HistogramSeries:
+        """The series for a label set; hot paths keep it to skip label handling."""
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, _HistogramSeries(self.buckets, self._lock))
+        return series
+
+    def observe(self, value: float, **labels: str):
+        """Record one observation for a label set."""
+        if settings.metrics_enabled:
+            self.labels(**labels).observe(value)
+
+    def time(self, **labels: str) -> "_Timer":
+        """Context manager observing the duration of its block."""
+        return _Timer(self.labels(**labels))
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series.counts) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return series.sum if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            snapshot = sorted((key, list(series.counts), series.sum) for key, series in self._series.items())
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """
+    Observe elapsed wall time into a histogram series when the block completes,
+    and add it as a stage span to the trace of the surrounding turn or upload.
+    """
+
+    __slots__ = ("series", "stage", "trace", "start")
+
+    def __init__(self, series: _HistogramSeries, stage: Optional[str] = None, trace: Optional[RequestTrace] = None):
+        self.series = series
+        self.stage = stage
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        # Failed and cancelled blocks are not latency samples
+        if exc_type is None and settings.metrics_enabled:
+            self.series.observe(elapsed)
+        if self.trace is not None:
+            self.trace.record(self.stage, self.start, elapsed, error=exc_type is not None)
+        return False
+
+
+class _NullTimer:
+    """Stand-in for _Timer while metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class CallbackMetric(_Metric):
+    """Counter or gauge whose value is read from a callback at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], CallbackValue],
+        labelnames: Iterable[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception as e:
+            logger.warning("Metric %s failed: %s", self.name, e)
+            return []
+        series = value if isinstance(value, dict) else {(): value}
+        lines = self.header()
+        for key, sample in sorted(series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of one worker process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Module reloads (tests) re-register the same metric
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered")
+                if isinstance(metric, CallbackMetric):
+                    existing.callback = metric.callback
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], CallbackValue],
+        labelnames: Iterable[str] = ()
+    ) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, "gauge", callback, labelnames))
+
+    def counter_callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], CallbackValue],
+        labelnames: Iterable[str] = ()
+    ) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, "counter", callback, labelnames))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Pipeline stages. Chat turns: db_read, db_write, embedding, cache_lookup,
+# vector_search, keyword_boost, rerank, parent_expansion, context_build,
+# generation, send. Uploads: chunking, parent_write, ingest_embedding, vector_write.
+STAGE_SECONDS = registry.histogram(
+    "chatbot_stage_seconds",
+    "Time spent in each chat and ingestion pipeline stage",
+    ["stage"]
+)
+TURN_SECONDS = registry.histogram(
+    "chatbot_turn_seconds",
+    "Time to process a chat message, from dequeue to reply broadcast",
+    ["outcome"]
+)
+INGEST_SECONDS = registry.histogram(
+    "chatbot_ingest_seconds",
+    "Time to chunk, embed and store one document",
+    ["outcome"]
+)
+INGESTED_CHUNKS = registry.counter(
+    "chatbot_ingested_chunks_total",
+    "Chunks written to the vector store"
+)
+
+
+_stage_series: Dict[str, _HistogramSeries] = {}
+
+
+def _stage(stage: str) -> _HistogramSeries:
+    series = _stage_series.get(stage)
+    if series is None:
+        series = _stage_series[stage] = STAGE_SECONDS.labels(stage=stage)
+    return series
+
+
+def timed(stage: str):
+    """
+    Time a block as a pipeline stage.
+
+    Args:
+        stage: Stage label, e.g. "vector_search"
+
+    Returns:
+        Context manager observing into chatbot_stage_seconds
+    """
+    trace = current_trace()
+    if not settings.metrics_enabled and trace is None:
+        return _NULL_TIMER
+    return _Timer(_stage(stage), stage, trace)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration measured elsewhere (e.g. send queue latency)."""
+    if settings.metrics_enabled:
+        _stage(stage).observe(seconds)
@@ -0,0 +1,243 @@
+"""
+Lightweight schema migrations for existing databases.
+Run from init_db() after create_all(); every migration is idempotent.
+"""
+import asyncio
+import logging
+
+from sqlalchemy import Column, ForeignKey, MetaData, Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.blobstore import blob_store
+from app.rag.tokens import estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+# ALTER TABLE ... DROP COLUMN needs SQLite 3.35; older versions rebuild the table
+SQLITE_DROP_COLUMN_VERSION = (3, 35, 0)
+
+
+async def _get_columns(conn: AsyncConnection, table: str) -> set:
+    """Get the column names of a table."""
+    return await conn.run_sync(
+        lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns(table)}
+    )
+
+
+def _rebuild_without_column(sync_conn: Connection, table_name: str, column: str):
+    """
+    Drop a column the way SQLite documents for versions without DROP COLUMN:
+    copy the other columns into a new table, drop the old one, rename the
+    new one and recreate the old table's indexes.
+    """
+    metadata = MetaData()
+    table = Table(table_name, metadata, autoload_with=sync_conn)
+    kept = [c for c in table.columns if c.name != column]
+
+    rebuilt = Table(
+        f"{table_name}_rebuilt",
+        metadata,
+        *(
+            Column(
+                c.name,
+                c.type,
+                *(ForeignKey(fk.target_fullname) for fk in c.foreign_keys),
+                primary_key=c.primary_key,
+                nullable=c.nullable,
+                server_default=c.server_default.arg if c.server_default is not None else None
+            )
+            for c in kept
+        )
+    )
+    rebuilt.create(sync_conn)
+    names = ", ".join(c.name for c in kept)
+    sync_conn.execute(text(f"INSERT INTO {rebuilt.name} ({names}) SELECT {names} FROM {table_name}"))
+
+    indexes = [index for index in table.indexes if column not in {c.name for c in index.columns}]
+    table.drop(sync_conn)
+    sync_conn.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {table_name}"))
+    for index in indexes:
+        unique = "UNIQUE " if index.unique else ""
+        columns = ", ".join(c.name for c in index.columns)
+        sync_conn.execute(text(f"CREATE {unique}INDEX {index.name} ON {table_name} ({columns})"))
+
+
+async def _drop_column(conn: AsyncConnection, table: str, column: str):
+    """Drop a column, rebuilding the table on SQLite versions without DROP COLUMN."""
+    if conn.dialect.name == "sqlite":
+        version = (await conn.execute(text("SELECT sqlite_version()"))).scalar_one()
+        if tuple(int(part) for part in version.split(".")) < SQLITE_DROP_COLUMN_VERSION:
+            await conn.run_sync(_rebuild_without_column, table, column)
+            return
+    await conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+
+
+async def migrate_document_content(conn: AsyncConnection, batch_size: int = 500) -> int:
+    """
+    Move document bodies from documents.content into the blob store.
+
+    Older databases stored the full extracted text of every document in the
+    documents table. This copies each body into the blob store, records its
+    content hash and size, and drops the content column.
+
+    Args:
+        conn: Open connection inside a transaction
+        batch_size: Number of rows moved per query
+
+    Returns:
+        Number of documents migrated
+    """
+    columns = await _get_columns(conn, "documents")
+    if "content" not in columns:
+        return 0
+
+    if "content_hash" not in columns:
+        await conn.execute(text("ALTER TABLE documents ADD COLUMN content_hash VARCHAR(64)"))
+    if "content_size" not in columns:
+        await conn.execute(text("ALTER TABLE documents ADD COLUMN content_size INTEGER DEFAULT 0"))
+
+    migrated = 0
+    while True:
+        result = await conn.execute(
+            text(
+                "SELECT id, content FROM documents "
+                "WHERE content_hash IS NULL ORDER BY id LIMIT :limit"
+            ),
+            {"limit": batch_size}
+        )
+        rows = result.all()
+        if not rows:
+            break
+
+        for document_id, content in rows:
+            content_hash, content_size = await asyncio.to_thread(blob_store.put, content or "")
+            await conn.execute(
+                text(
+                    "UPDATE documents SET content_hash = :content_hash, "
+                    "content_size = :content_size WHERE id = :id"
+                ),
+                {"content_hash": content_hash, "content_size": content_size, "id": document_id}
+            )
+        migrated += len(rows)
+
+    await _drop_column(conn, "documents", "content")
+    await conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash)")
+    )
+    return migrated
+
+
+async def migrate_document_token_counts(conn: AsyncConnection) -> int:
+    """
+    Add documents.token_count and backfill it from the stored bodies.
+
+    Args:
+        conn: Open connection inside a transaction
+
+    Returns:
+        Number of documents backfilled
+    """
+    columns = await _get_columns(conn, "documents")
+    if "token_count" in columns:
+        return 0
+
+    await conn.execute(text("ALTER TABLE documents ADD COLUMN token_count INTEGER DEFAULT 0"))
+
+    result = await conn.execute(
+        text("SELECT id, content_hash FROM documents WHERE content_hash IS NOT NULL")
+    )
+    rows = result.all()
+    for document_id, content_hash in rows:
+        token_count = estimate_tokens(blob_store.get(content_hash)) if blob_store.exists(content_hash) else 0
+        await conn.execute(
+            text("UPDATE documents SET token_count = :token_count WHERE id = :id"),
+            {"token_count": token_count, "id": document_id}
+        )
+    return len(rows)
+
+
+async def migrate_bot_quantization(conn: AsyncConnection) -> bool:
+    """
+    Add bots.embedding_quantization to databases created before it existed.
+
+    Args:
+        conn: Open connection inside a transaction
+
+    Returns:
+        True if the column was added
+    """
+    columns = await _get_columns(conn, "bots")
+    if "embedding_quantization" in columns:
+        return False
+
+    await conn.execute(text("ALTER TABLE bots ADD COLUMN embedding_quantization VARCHAR(16)"))
+    return True
+
+
+async def migrate_knowledge_base_version(conn: AsyncConnection) -> bool:
+    """
+    Add knowledge_base_stats.version to databases created before it existed.
+
+    Args:
+        conn: Open connection inside a transaction
+
+    Returns:
+        True if the column was added
+    """
+    columns = await _get_columns(conn, "knowledge_base_stats")
+    if "version" in columns:
+        return False
+
+    await conn.execute(text("ALTER TABLE knowledge_base_stats ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+    return True
+
+
+async def backfill_knowledge_base_stats(conn: AsyncConnection) -> int:
+    """
+    Build knowledge_base_stats rows from existing documents.
+    Only runs when the stats table is empty and documents exist. Failed
+    uploads (no chunks) are left out, as record_ingestion leaves them out.
+
+    Args:
+        conn: Open connection inside a transaction
+
+    Returns:
+        Number of bots backfilled
+    """
+    existing = await conn.execute(text("SELECT COUNT(*) FROM knowledge_base_stats"))
+    if existing.scalar_one():
+        return 0
+
+    result = await conn.execute(
+        text(
+            "INSERT INTO knowledge_base_stats "
+            "(bot_id, document_count, chunk_count, token_count, byte_count, last_ingested_at, updated_at, version) "
+            "SELECT bot_id, COUNT(*), COALESCE(SUM(chunk_count), 0), COALESCE(SUM(token_count), 0), "
+            "COALESCE(SUM(content_size), 0), MAX(created_at), CURRENT_TIMESTAMP, 1 "
+            "FROM documents WHERE chunk_count > 0 GROUP BY bot_id"
+        )
+    )
+    return result.rowcount
+
+
+async def run_migrations(conn: AsyncConnection):
+    """Apply all pending migrations."""
+    migrated = await migrate_document_content(conn)
+    if migrated:
+        logger.info("✅ Moved %s document bodies to the blob store", migrated)
+    
+    backfilled = await migrate_document_token_counts(conn)
+    if backfilled:
+        logger.info("✅ Backfilled token counts for %s documents", backfilled)
+    
+    if await migrate_bot_quantization(conn):
+        logger.info("✅ Added embedding quantization setting to bots")
+    
+    if await migrate_knowledge_base_version(conn):
+        logger.info("✅ Added knowledge base versions to stats")
+    
+    bots = await backfill_knowledge_base_stats(conn)
+    if bots:
+        logger.info("✅ Built knowledge base stats for %s bots", bots)
@@ -0,0 +1,108 @@
+"""
+Production profiling helpers.
+A sampling profiler that records every thread's Python stack at a fixed
+interval for a bounded time and returns collapsed stacks (the input format
+of flamegraph.pl, speedscope and similar tools), and the ring buffer where
+slow-request capture (app.tracing) keeps chat turns and uploads that
+exceeded the latency threshold.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import settings
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling all threads' stacks from a background thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, seconds: float, interval_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Sample every thread for a while. Blocks the calling thread.
+
+        Args:
+            seconds: How long to sample (capped by settings.profiler_max_seconds)
+            interval_ms: Time between samples (default from settings)
+
+        Returns:
+            Dictionary with collapsed stack text, sample count and duration
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            seconds = min(max(seconds, 0.0), settings.profiler_max_seconds)
+            interval = (interval_ms or settings.profiler_interval_ms) / 1000
+            return self._sample(seconds, interval)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float) -> Dict[str, Any]:
+        own_thread = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        return {
+            "collapsed": collapsed + "\n" if collapsed else "",
+            "samples": samples,
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+
+
+class SlowTraceBuffer:
+    """Ring buffer of the most recent slow traces."""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=max_size or settings.slow_trace_buffer_size)
+        self.captured = 0
+
+    def add(self, trace: Dict[str, Any]):
+        self._traces.append(trace)
+        self.captured += 1
+
+    def recent(self, kind: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Captured traces, newest first."""
+        traces = [trace for trace in reversed(self._traces) if kind is None or trace["kind"] == kind]
+        return traces[:limit] if limit else traces
+
+    def clear(self):
+        self._traces.clear()
+
+
+profiler = SamplingProfiler()
+slow_traces = SlowTraceBuffer()
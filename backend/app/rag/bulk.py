@@ -0,0 +1,466 @@
+"""
+Bulk document ingestion for large knowledge bases.
+Loads whole directories or archives, chunks files across a worker pool,
+embeds chunks in large batches and writes them to the vector store in batched adds.
+Archives are checked against a member count and total uncompressed size
+before anything is read, so a zip bomb is rejected up front.
+"""
+import asyncio
+import os
+import tarfile
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.blobstore import BlobStore
+from app.config import settings
+from app.database import Document
+from app.rag.chunking import chunker_settings, create_chunker
+from app.rag.extraction import SUPPORTED_EXTENSIONS, extract_text, get_file_extension
+from app.rag.ingestion import DocumentIngestion, get_document_ingestion
+from app.rag.parents import assign_parents
+from app.rag.stats import record_ingestion
+from app.rag.tokens import estimate_tokens
+
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Maximum number of per-file errors kept in an ingestion report
+MAX_REPORTED_ERRORS = 100
+
+
+class ArchiveLimitError(ValueError):
+    """Raised when an archive has too many members or unpacks to too many bytes."""
+
+
+# Chunkers cached per worker process, keyed by (chunker, chunk_size, chunk_overlap)
+_chunkers: Dict[Tuple[str, int, int], Any] = {}
+
+
+def _get_chunker(chunker: str, chunk_size: int, chunk_overlap: int) -> Any:
+    """Get a chunker configured like DocumentIngestion's."""
+    key = (chunker, chunk_size, chunk_overlap)
+    if key not in _chunkers:
+        _chunkers[key] = create_chunker(chunker, chunk_size, chunk_overlap)
+    return _chunkers[key]
+
+
+def prepare_document(
+    filename: str,
+    content: bytes,
+    chunker: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    blob_store_path: str,
+    parent_tokens: int = 0
+) -> Dict[str, Any]:
+    """
+    Extract, store and chunk a single file. Runs inside the worker pool.
+
+    Args:
+        filename: File name (relative path inside the directory or archive)
+        content: Raw file content
+        chunker: "structured" or "recursive"
+        chunk_size: Chunk size, in tokens for structured and characters for recursive
+        chunk_overlap: Overlap between chunks, in the same unit
+        blob_store_path: Blob store directory for the document body
+        parent_tokens: Parent section size in tokens, 0 for no parents
+            (structured chunker only)
+
+    Returns:
+        Dictionary with the body's content address, chunks (content and
+        positional metadata) and parent sections, or an error
+    """
+    try:
+        text = extract_text(filename, content)
+    except Exception as e:
+        return {"success": False, "filename": filename, "error": str(e)}
+
+    if not text.strip():
+        return {
+            "success": False,
+            "filename": filename,
+            "error": "Document appears to be empty or text could not be extracted"
+        }
+
+    # Compress and store the body here so it never crosses back to the parent
+    content_hash, content_size = BlobStore(blob_store_path).put(text)
+
+    chunks = _get_chunker(chunker, chunk_size, chunk_overlap).chunk(text)
+    parents = None
+    if parent_tokens and chunker == "structured":
+        parents = _get_chunker("structured", parent_tokens, 0).chunk(text)
+        assign_parents(chunks, parents)
+
+    return {
+        "success": True,
+        "filename": filename,
+        "file_type": get_file_extension(filename),
+        "content_hash": content_hash,
+        "content_size": content_size,
+        "token_count": estimate_tokens(text),
+        "chunks": chunks,
+        "parents": parents
+    }
+
+
+def is_supported_file(path: str) -> bool:
+    """Check whether a path inside a directory or archive should be ingested."""
+    parts = path.replace("\\", "/").split("/")
+    if any(part.startswith(".") or part == "__MACOSX" for part in parts if part):
+        return False
+    return get_file_extension(path) in SUPPORTED_EXTENSIONS
+
+
+def is_archive(filename: str) -> bool:
+    """Check whether a filename looks like a supported archive."""
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_directory(path: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    Walk a directory and yield supported files.
+
+    Args:
+        path: Root directory
+
+    Yields:
+        Tuples of (path relative to the root, file content)
+    """
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            full_path = os.path.join(root, name)
+            relative_path = os.path.relpath(full_path, path)
+            if not is_supported_file(relative_path):
+                continue
+            with open(full_path, "rb") as f:
+                yield relative_path, f.read()
+
+
+def _check_archive_limits(members: int, total_bytes: int, max_members: int, max_bytes: int) -> None:
+    """Raise ArchiveLimitError if the members read so far exceed either limit."""
+    if members > max_members:
+        raise ArchiveLimitError(f"Archive has more than {max_members} members")
+    if total_bytes > max_bytes:
+        raise ArchiveLimitError(f"Archive unpacks to more than {max_bytes} bytes")
+
+
+def iter_archive(
+    fileobj: BinaryIO,
+    filename: str,
+    max_members: Optional[int] = None,
+    max_bytes: Optional[int] = None
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Iterate over supported files inside a zip or tar archive.
+
+    Every member, supported or not, counts towards the limits, which are
+    checked from the archive's headers before any file is read. Zip members
+    cannot unpack past their declared size; tar members are exactly their
+    header size.
+
+    Args:
+        fileobj: Seekable binary file object with the archive content
+        filename: Archive file name (used to detect the format)
+        max_members: Maximum number of members (default from settings)
+        max_bytes: Maximum total uncompressed size (default from settings)
+
+    Yields:
+        Tuples of (member path, file content)
+
+    Raises:
+        ArchiveLimitError: If the archive exceeds a limit
+    """
+    max_members = max_members or settings.bulk_archive_max_members
+    max_bytes = max_bytes or settings.bulk_archive_max_mb * 1024 * 1024
+
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            infos = archive.infolist()
+            _check_archive_limits(len(infos), sum(info.file_size for info in infos), max_members, max_bytes)
+            for info in infos:
+                if info.is_dir() or not is_supported_file(info.filename):
+                    continue
+                yield info.filename, archive.read(info)
+        return
+
+    if not is_archive(filename):
+        raise ValueError(f"Unsupported archive type: {filename}")
+
+    with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+        # Reading the headers decompresses the stream, so stop at the first limit
+        members: List[tarfile.TarInfo] = []
+        total_bytes = 0
+        for member in archive:
+            members.append(member)
+            total_bytes += member.size if member.isfile() else 0
+            _check_archive_limits(len(members), total_bytes, max_members, max_bytes)
+
+        for member in members:
+            if not member.isfile() or not is_supported_file(member.name):
+                continue
+            extracted = archive.extractfile(member)
+            if extracted is not None:
+                yield member.name, extracted.read()
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class BulkIngestion:
+    """
+    Ingests many documents at once with parallel chunking and batched writes.
+    The server calls start() once so that uploads share one worker pool;
+    without it (the CLI), each ingest_files call creates its own.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        write_batch_size: Optional[int] = None,
+        document_window: Optional[int] = None
+    ):
+        """
+        Initialize the bulk ingestion pipeline.
+
+        Args:
+            workers: Number of chunking worker processes (1 = no process pool)
+            embed_batch_size: Number of chunks embedded per call
+            write_batch_size: Number of chunks per vector store add call
+            document_window: Number of documents processed per window
+        """
+        self.workers = workers or settings.bulk_ingest_workers
+        self.embed_batch_size = embed_batch_size or settings.bulk_embed_batch_size
+        self.write_batch_size = write_batch_size or settings.bulk_write_batch_size
+        self.document_window = document_window or settings.bulk_document_window
+        self.executor: Optional[Executor] = None
+
+    @property
+    def ingestion(self) -> DocumentIngestion:
+        """The shared ingestion pipeline (loads the embedding model on first use)."""
+        return get_document_ingestion()
+
+    def _create_executor(self) -> Executor:
+        """Create the pool used for text extraction and chunking."""
+        if self.workers > 1:
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=1)
+
+    def start(self) -> None:
+        """Create the worker pool shared by every ingest_files call."""
+        if self.executor is None:
+            self.executor = self._create_executor()
+
+    def shutdown(self) -> None:
+        """Stop the shared worker pool."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _prepare_window(
+        self,
+        executor: Executor,
+        window: List[Tuple[str, bytes]]
+    ) -> List[Dict[str, Any]]:
+        """Extract and chunk a window of files in the worker pool."""
+        loop = asyncio.get_running_loop()
+        chunker, chunk_size, chunk_overlap = chunker_settings()
+        parent_tokens = settings.parent_chunk_tokens if settings.parent_retrieval_enabled else 0
+        return await asyncio.gather(*(
+            loop.run_in_executor(
+                executor,
+                prepare_document,
+                filename,
+                content,
+                chunker,
+                chunk_size,
+                chunk_overlap,
+                settings.blob_store_path,
+                parent_tokens
+            )
+            for filename, content in window
+        ))
+
+    def _write_chunks(
+        self,
+        bot_id: int,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        parents: Iterable[Tuple[int, List[Dict[str, Any]]]] = ()
+    ) -> None:
+        """Store parent sections, then embed chunks in large batches and add them to a bot's collection."""
+        for document_id, document_parents in parents:
+            self.ingestion.parent_store.save(bot_id, document_id, document_parents)
+
+        vector_store = self.ingestion.vector_store
+        write_batch_size = min(self.write_batch_size, vector_store.max_batch_size)
+
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), self.embed_batch_size):
+            embeddings.extend(
+                self.ingestion.embeddings.embed_documents(texts[start:start + self.embed_batch_size])
+            )
+
+        for start in range(0, len(texts), write_batch_size):
+            end = start + write_batch_size
+            vector_store.add(
+                bot_id=bot_id,
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=texts[start:end],
+                metadatas=metadatas[start:end]
+            )
+
+    async def ingest_files(
+        self,
+        files: Iterable[Tuple[str, bytes]],
+        bot_id: int,
+        db: AsyncSession,
+        source: str = "bulk"
+    ) -> Dict[str, Any]:
+        """
+        Ingest many files into a bot's knowledge base.
+
+        Files are processed in windows: while one window is being embedded and
+        written, the next window is already being chunked in the worker pool.
+        Files are read (and archives unpacked) in a worker thread.
+
+        Args:
+            files: Iterable of (filename, content) tuples
+            bot_id: The bot ID the documents belong to
+            db: Database session used to store document rows
+            source: Source label stored in chunk metadata
+
+        Returns:
+            Dictionary with counts, errors and throughput
+        """
+        start_time = time.perf_counter()
+        documents_ingested = 0
+        documents_failed = 0
+        chunks_ingested = 0
+        errors: List[Dict[str, str]] = []
+
+        loop = asyncio.get_running_loop()
+        # The first use loads the embedding model; keep the event loop free meanwhile
+        ingestion = await asyncio.to_thread(get_document_ingestion)
+        collection_name = ingestion.vector_store.collection_name(bot_id)
+
+        executor = self.executor or self._create_executor()
+        pending = None
+        try:
+            windows = _batched(files, self.document_window)
+            window = await asyncio.to_thread(next, windows, None)
+            pending = asyncio.ensure_future(self._prepare_window(executor, window)) if window else None
+
+            while pending is not None:
+                prepared = await pending
+
+                # Start chunking the next window while this one is embedded
+                window = await asyncio.to_thread(next, windows, None)
+                pending = asyncio.ensure_future(self._prepare_window(executor, window)) if window else None
+
+                ready = []
+                for result in prepared:
+                    if result["success"] and result["chunks"]:
+                        ready.append(result)
+                        continue
+                    documents_failed += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({
+                            "filename": result["filename"],
+                            "error": result.get("error", "No chunks generated from document")
+                        })
+
+                if not ready:
+                    continue
+
+                db_documents = [
+                    Document(
+                        bot_id=bot_id,
+                        filename=result["filename"],
+                        content_hash=result["content_hash"],
+                        content_size=result["content_size"],
+                        token_count=result["token_count"],
+                        chunk_count=len(result["chunks"])
+                    )
+                    for result in ready
+                ]
+                db.add_all(db_documents)
+                await db.flush()
+
+                upload_date = datetime.utcnow().isoformat()
+                ids: List[str] = []
+                texts: List[str] = []
+                metadatas: List[Dict[str, Any]] = []
+                parents = [
+                    (db_document.id, result["parents"])
+                    for db_document, result in zip(db_documents, ready)
+                    if result.get("parents")
+                ]
+                for db_document, result in zip(db_documents, ready):
+                    chunk_count = len(result["chunks"])
+                    for i, chunk in enumerate(result["chunks"]):
+                        ids.append(f"doc{db_document.id}_chunk{i}")
+                        texts.append(chunk["content"])
+                        metadatas.append({
+                            **chunk["metadata"],
+                            "filename": result["filename"],
+                            "document_id": db_document.id,
+                            "upload_date": upload_date,
+                            "file_type": result["file_type"],
+                            "source": source,
+                            "bot_id": bot_id,
+                            "chunk_index": i,
+                            "chunk_count": chunk_count
+                        })
+
+                await loop.run_in_executor(None, self._write_chunks, bot_id, ids, texts, metadatas, parents)
+                await record_ingestion(
+                    db,
+                    bot_id,
+                    documents=len(ready),
+                    chunks=len(texts),
+                    tokens=sum(result["token_count"] for result in ready),
+                    size_bytes=sum(result["content_size"] for result in ready)
+                )
+                await db.commit()
+
+                documents_ingested += len(ready)
+                chunks_ingested += len(texts)
+        finally:
+            if pending is not None:
+                pending.cancel()
+            if executor is not self.executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.perf_counter() - start_time
+        return {
+            "success": documents_ingested > 0,
+            "documents_ingested": documents_ingested,
+            "documents_failed": documents_failed,
+            "chunks_ingested": chunks_ingested,
+            "collection_name": collection_name,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(documents_ingested / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(chunks_ingested / elapsed, 2) if elapsed else 0.0,
+            "errors": errors
+        }
+
+
+# Global instance
+bulk_ingestion = BulkIngestion()
@@ -0,0 +1,188 @@
+"""
+Semantic answer cache for near-duplicate questions.
+Returns a stored answer when a new query embeds close enough to a cached
+one and the bot's knowledge base has not changed since it was stored.
+Knowledge base versions come from the knowledge_base_stats table, so
+changes made by other workers or the bulk ingestion CLI are seen too.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import copy
+import itertools
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.metrics import registry
+
+
+class _BotCache:
+    """LRU cache entries and their stacked embeddings for one bot."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._keys: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> np.ndarray:
+        """Get the (entries x dim) embedding matrix, rebuilding it after changes."""
+        if self._matrix is None:
+            self._keys = list(self.entries.keys())
+            self._matrix = np.stack([entry["embedding"] for entry in self.entries.values()])
+        return self._matrix
+
+    def keys(self) -> List[int]:
+        """Get entry keys in matrix row order."""
+        self.matrix()
+        return self._keys
+
+    def mark_dirty(self):
+        """Force the embedding matrix to be rebuilt on the next lookup."""
+        self._matrix = None
+
+
+class SemanticCache:
+    """Per-bot LRU cache of RAG responses keyed by query embedding."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        similarity_threshold: Optional[float] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            max_entries: Maximum cached answers per bot
+            similarity_threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Maximum age of a cached answer
+        """
+        self.max_entries = max_entries or settings.semantic_cache_max_entries
+        self.similarity_threshold = similarity_threshold or settings.semantic_cache_threshold
+        self.ttl_seconds = ttl_seconds or settings.semantic_cache_ttl_seconds
+
+        self._bots: Dict[int, _BotCache] = {}
+        self._versions: Dict[int, int] = {}
+        self._ids = itertools.count()
+
+        # Cache statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, bot_id: int, version: int):
+        """Drop a bot's answers once a newer knowledge base version is seen."""
+        seen = self._versions.get(bot_id)
+        if seen is not None and version > seen and self._bots.pop(bot_id, None) is not None:
+            self.invalidations += 1
+        if seen is None or version > seen:
+            self._versions[bot_id] = version
+
+    def lookup(self, bot_id: int, embedding: List[float], version: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a semantically equivalent query.
+
+        Args:
+            bot_id: The bot the query was sent to
+            embedding: The query embedding
+            version: The bot's current knowledge base version (see get_knowledge_base_version)
+
+        Returns:
+            Copy of the cached response, or None on a miss
+        """
+        self._check_version(bot_id, version)
+        bot_cache = self._bots.get(bot_id)
+        if not bot_cache or not bot_cache.entries:
+            self.misses += 1
+            return None
+
+        similarities = bot_cache.matrix() @ self._normalize(embedding)
+        best_row = int(np.argmax(similarities))
+        key = bot_cache.keys()[best_row]
+        entry = bot_cache.entries[key]
+
+        expired = time.monotonic() - entry["stored_at"] > self.ttl_seconds
+        stale = entry["version"] != version
+        if expired or stale:
+            del bot_cache.entries[key]
+            bot_cache.mark_dirty()
+            self.misses += 1
+            return None
+
+        if similarities[best_row] < self.similarity_threshold:
+            self.misses += 1
+            return None
+
+        bot_cache.entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry["response"])
+
+    def store(self, bot_id: int, embedding: List[float], response: Dict[str, Any], version: int = 0):
+        """
+        Cache a response, evicting the least recently used entry if full.
+
+        Args:
+            bot_id: The bot the query was sent to
+            embedding: The query embedding
+            response: The response dictionary to return on future hits
+            version: The knowledge base version the response was built from
+        """
+        self._check_version(bot_id, version)
+        if version < self._versions[bot_id]:
+            return  # Built from a knowledge base that has changed since
+        bot_cache = self._bots.setdefault(bot_id, _BotCache())
+        bot_cache.entries[next(self._ids)] = {
+            "embedding": self._normalize(embedding),
+            "response": copy.deepcopy(response),
+            "version": version,
+            "stored_at": time.monotonic()
+        }
+
+        while len(bot_cache.entries) > self.max_entries:
+            bot_cache.entries.popitem(last=False)
+            self.evictions += 1
+        bot_cache.mark_dirty()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit-rate and size statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": sum(len(bot_cache.entries) for bot_cache in self._bots.values()),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+# Global instance
+semantic_cache = SemanticCache()
+
+
+registry.counter_callback(
+    "chatbot_semantic_cache_lookups_total",
+    "Semantic answer cache lookups by result",
+    lambda: {("hit",): semantic_cache.hits, ("miss",): semantic_cache.misses},
+    ["result"]
+)
+registry.counter_callback(
+    "chatbot_semantic_cache_evictions_total",
+    "Answers evicted from the semantic cache",
+    lambda: semantic_cache.evictions
+)
+registry.gauge_callback(
+    "chatbot_semantic_cache_entries",
+    "Answers held in the semantic cache",
+    lambda: sum(len(bot_cache.entries) for bot_cache in semantic_cache._bots.values())
+)
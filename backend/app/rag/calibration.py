@@ -0,0 +1,185 @@
+"""
+Per-bot confidence calibration.
+Maps a retrieval score (cosine similarity of the best chunk plus its keyword
+boost) to the probability that the retrieved context answers the query,
+using a logistic (Platt) curve fitted on labelled queries. Fits are stored
+as one JSON file per bot; bots without a fit use the default curve from
+settings.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+import json
+import math
+import os
+import tempfile
+import threading
+
+from app.config import settings
+
+
+def sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+def fit_platt(
+    scores: Sequence[float],
+    labels: Sequence[bool],
+    iterations: int = 100,
+    regularization: float = 1e-3
+) -> Dict[str, float]:
+    """
+    Fit p = sigmoid(slope * score + intercept) by Newton's method.
+
+    Uses Platt's smoothed targets, so a perfectly separable sample still
+    gives a finite slope.
+
+    Args:
+        scores: Retrieval scores
+        labels: Whether the context for each score answered the query
+        iterations: Maximum Newton steps
+        regularization: L2 penalty on the slope
+
+    Returns:
+        Dictionary with slope and intercept
+
+    Raises:
+        ValueError: If the sample does not contain both outcomes
+    """
+    positives = sum(1 for label in labels if label)
+    negatives = len(labels) - positives
+    if not positives or not negatives:
+        raise ValueError("Calibration needs both answered and unanswered queries")
+
+    high = (positives + 1.0) / (positives + 2.0)
+    low = 1.0 / (negatives + 2.0)
+    targets = [high if label else low for label in labels]
+
+    slope, intercept = 0.0, math.log((positives + 1.0) / (negatives + 1.0))
+    for _ in range(iterations):
+        # Gradient and Hessian of the regularized log loss
+        g_slope, g_intercept = regularization * slope, 0.0
+        h_ss, h_si, h_ii = regularization, 0.0, 0.0
+        for score, target in zip(scores, targets):
+            p = sigmoid(slope * score + intercept)
+            error, weight = p - target, max(p * (1.0 - p), 1e-12)
+            g_slope += error * score
+            g_intercept += error
+            h_ss += weight * score * score
+            h_si += weight * score
+            h_ii += weight
+        determinant = h_ss * h_ii - h_si * h_si
+        if determinant <= 0:
+            break
+        step_slope = (h_ii * g_slope - h_si * g_intercept) / determinant
+        step_intercept = (h_ss * g_intercept - h_si * g_slope) / determinant
+        slope -= step_slope
+        intercept -= step_intercept
+        if abs(step_slope) < 1e-9 and abs(step_intercept) < 1e-9:
+            break
+
+    return {"slope": slope, "intercept": intercept}
+
+
+class ConfidenceCalibrator:
+    """Stores per-bot calibration curves and applies them to retrieval scores."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the calibrator.
+
+        Args:
+            path: Directory holding the per-bot fits (default from settings)
+        """
+        self.path = path or settings.calibration_path
+        self._fits: Dict[int, Tuple[Optional[int], Optional[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def _file(self, bot_id: int) -> str:
+        return os.path.join(self.path, f"bot_{bot_id}.json")
+
+    def get(self, bot_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get a bot's stored fit.
+
+        Args:
+            bot_id: The bot ID
+
+        Returns:
+            The fit (slope, intercept and fit details), or None if the bot is not calibrated
+        """
+        # Reload when the file changes, so fits from the calibration script
+        # reach a running server without a restart
+        try:
+            mtime = os.stat(self._file(bot_id)).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        cached = self._fits.get(bot_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        fit = None
+        if mtime is not None:
+            with open(self._file(bot_id), encoding="utf-8") as f:
+                fit = json.load(f)
+        with self._lock:
+            self._fits[bot_id] = (mtime, fit)
+        return fit
+
+    def save(self, bot_id: int, fit: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a bot's fit, replacing any previous one.
+
+        Args:
+            bot_id: The bot ID
+            fit: Dictionary with slope and intercept, plus any details worth keeping
+
+        Returns:
+            The stored fit
+        """
+        fit = {**fit, "bot_id": bot_id, "fitted_at": datetime.utcnow().isoformat()}
+        os.makedirs(self.path, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial fit
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(fit, f, indent=2)
+            os.replace(tmp_path, self._file(bot_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._fits.pop(bot_id, None)
+        return fit
+
+    def delete(self, bot_id: int):
+        """Drop a bot's fit so it falls back to the default curve."""
+        with self._lock:
+            self._fits.pop(bot_id, None)
+            if os.path.exists(self._file(bot_id)):
+                os.remove(self._file(bot_id))
+
+    def calibrate(self, bot_id: int, score: float) -> float:
+        """
+        Convert a retrieval score to a calibrated confidence.
+
+        Args:
+            bot_id: The bot the score was retrieved for
+            score: Top result relevance (cosine similarity plus keyword boost)
+
+        Returns:
+            Probability (0-1) that the retrieved context answers the query
+        """
+        fit = self.get(bot_id)
+        if fit is None:
+            slope, intercept = settings.calibration_default_slope, settings.calibration_default_intercept
+        else:
+            slope, intercept = fit["slope"], fit["intercept"]
+        return sigmoid(slope * score + intercept)
+
+
+# Global instance
+confidence_calibrator = ConfidenceCalibrator()
@@ -0,0 +1,297 @@
+"""
+Document chunkers.
+The structured chunker splits at [Page N] markers, headings, paragraphs and
+list items, measures chunks in (estimated) model tokens so they fit the
+embedding model's window, and records where each chunk came from: page,
+section heading and character offsets into the extracted text. The
+recursive chunker is the previous fixed-size character splitter.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+
+from app.config import settings
+from app.rag.tokens import estimate_tokens
+
+
+CHUNKERS = ("structured", "recursive")
+
+# Written by extract_text_from_pdf before each page's text
+PAGE_MARKER = re.compile(r"\[Page (\d+)\]")
+_MARKDOWN_HEADING = re.compile(r"#{1,6}\s+\S")
+_LIST_ITEM = re.compile(r"(?:[-*+•]|\d{1,3}[.)])\s+\S")
+_SENTENCE = re.compile(r"[^.!?]+(?:[.!?]+|$)")
+_WORD = re.compile(r"\S+")
+
+# Longest line (characters) read as a "Title:" style heading
+MAX_HEADING_CHARS = 60
+
+_PARAGRAPH, _ITEM, _HEADING = "paragraph", "item", "heading"
+
+
+class _Unit:
+    """A span of the text that is never split unless it exceeds a chunk."""
+
+    __slots__ = ("start", "end", "kind", "page", "section", "tokens")
+
+    def __init__(self, start: int, end: int, kind: str, page: Optional[int], section: Optional[str]):
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.page = page
+        self.section = section
+        self.tokens = 0
+
+
+class StructuredChunker:
+    """Splits text at structural boundaries into token-limited chunks with source offsets."""
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        count_tokens: Callable[[str], int] = estimate_tokens
+    ):
+        """
+        Initialize the chunker.
+
+        Args:
+            max_tokens: Largest chunk in tokens (default from settings)
+            overlap_tokens: Trailing paragraphs or items of up to this many tokens are
+                repeated at the start of the next chunk of the same section (default from settings)
+            count_tokens: Token counter (default: the WordPiece estimate)
+        """
+        self.max_tokens = max_tokens or settings.chunk_tokens
+        self.overlap_tokens = settings.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+        self.count_tokens = count_tokens
+
+    def _units(self, text: str) -> List[_Unit]:
+        """Read the text line by line into headings, paragraphs, list items and page breaks."""
+        units: List[_Unit] = []
+        page: Optional[int] = None
+        section: Optional[str] = None
+        current: Optional[_Unit] = None
+        position = 0
+
+        for line in text.splitlines(keepends=True):
+            line_start = position
+            position += len(line)
+            stripped = line.strip()
+            if not stripped:
+                current = None
+                continue
+
+            start = line_start + len(line) - len(line.lstrip())
+            end = line_start + len(line.rstrip())
+
+            if stripped[0] == "[":
+                marker = PAGE_MARKER.fullmatch(stripped)
+                if marker:
+                    page = int(marker.group(1))
+                    section = None
+                    current = None
+                    units.append(_Unit(start, start, "page", page, None))
+                    continue
+
+            is_heading = _MARKDOWN_HEADING.match(stripped) is not None or (
+                current is None
+                and stripped[-1] == ":"
+                and len(stripped) <= MAX_HEADING_CHARS
+                and _LIST_ITEM.match(stripped) is None
+            )
+            if is_heading:
+                section = stripped.lstrip("#").strip().rstrip(":").strip()
+                current = None
+                units.append(_Unit(start, end, _HEADING, page, section))
+                continue
+
+            if _LIST_ITEM.match(stripped):
+                # A short line directly above a list ("Starter Plan - $49/month") titles it
+                if (
+                    current is not None
+                    and current.kind == _PARAGRAPH
+                    and current.end - current.start <= MAX_HEADING_CHARS
+                    and "\n" not in text[current.start:current.end]
+                ):
+                    current.kind = _HEADING
+                    section = current.section = text[current.start:current.end].rstrip(":").strip()
+                current = _Unit(start, end, _ITEM, page, section)
+                units.append(current)
+            elif current is not None:
+                current.end = end  # Wrapped line of the same paragraph or item
+            else:
+                current = _Unit(start, end, _PARAGRAPH, page, section)
+                units.append(current)
+
+        for unit in units:
+            unit.tokens = self.count_tokens(text[unit.start:unit.end]) if unit.end > unit.start else 0
+        return units
+
+    def _split_oversized(self, text: str, unit: _Unit) -> List[_Unit]:
+        """Split a unit longer than a chunk into sentences, and overlong sentences at words."""
+        pieces: List[_Unit] = []
+        piece: Optional[_Unit] = None
+
+        def add(start: int, end: int, tokens: int):
+            nonlocal piece
+            if piece is not None and piece.tokens + tokens <= self.max_tokens:
+                piece.end = end
+                piece.tokens += tokens
+                return
+            piece = _Unit(start, end, unit.kind, unit.page, unit.section)
+            piece.tokens = tokens
+            pieces.append(piece)
+
+        for sentence in _SENTENCE.finditer(text, unit.start, unit.end):
+            start = sentence.start() + len(sentence.group()) - len(sentence.group().lstrip())
+            end = sentence.start() + len(sentence.group().rstrip())
+            if end <= start:
+                continue
+            tokens = self.count_tokens(text[start:end])
+            piece = None
+            if tokens <= self.max_tokens:
+                add(start, end, tokens)
+                piece = None
+                continue
+            for word in _WORD.finditer(text, start, end):
+                word_tokens = self.count_tokens(word.group())
+                if word_tokens <= self.max_tokens:
+                    add(word.start(), word.end(), word_tokens)
+                    continue
+                # A single unbroken token run (URLs, encoded data): cut by characters
+                step = max(1, len(word.group()) * self.max_tokens // word_tokens)
+                for cut in range(word.start(), word.end(), step):
+                    cut_end = min(cut + step, word.end())
+                    add(cut, cut_end, self.count_tokens(text[cut:cut_end]))
+        return pieces
+
+    def chunk(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Split text into chunks.
+
+        Chunks never cross a page marker or start mid-paragraph, a heading
+        always starts a new chunk, and each chunk's content is exactly
+        text[char_start:char_end].
+
+        Args:
+            text: The document text
+
+        Returns:
+            List of chunks with content and metadata (char_start, char_end,
+            token_count, and page and section when known)
+        """
+        chunks: List[Dict[str, Any]] = []
+        current: List[_Unit] = []
+        tokens = 0
+
+        def flush(overlap: bool):
+            nonlocal current, tokens
+            if current:
+                first = current[0]
+                metadata: Dict[str, Any] = {
+                    "char_start": first.start,
+                    "char_end": current[-1].end,
+                    "token_count": tokens
+                }
+                if first.page is not None:
+                    metadata["page"] = first.page
+                # Headings only open chunks, so the last unit names the section
+                if current[-1].section is not None:
+                    metadata["section"] = current[-1].section
+                chunks.append({"content": text[first.start:current[-1].end], "metadata": metadata})
+
+            # Repeat the trailing paragraphs or items that fit in the overlap
+            carried: List[_Unit] = []
+            carried_tokens = 0
+            if overlap and self.overlap_tokens:
+                for unit in reversed(current[1:]):
+                    if unit.kind == _HEADING or carried_tokens + unit.tokens > self.overlap_tokens:
+                        break
+                    carried.insert(0, unit)
+                    carried_tokens += unit.tokens
+            current, tokens = carried, carried_tokens
+
+        for unit in self._units(text):
+            if unit.kind == "page":
+                flush(overlap=False)
+                continue
+            if unit.kind == _HEADING and any(queued.kind != _HEADING for queued in current):
+                flush(overlap=False)  # Consecutive headings stay with the text that follows
+
+            for piece in self._split_oversized(text, unit) if unit.tokens > self.max_tokens else (unit,):
+                if current and tokens + piece.tokens > self.max_tokens:
+                    flush(overlap=True)
+                    # Drop the overlap if it leaves no room for the new piece
+                    if tokens + piece.tokens > self.max_tokens:
+                        current, tokens = [], 0
+                current.append(piece)
+                tokens += piece.tokens
+
+        flush(overlap=False)
+        return chunks
+
+
+class RecursiveChunker:
+    """Fixed-size character chunks from LangChain's recursive splitter."""
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        length_function: Callable[[str], int] = len
+    ):
+        """
+        Initialize the splitter.
+
+        Args:
+            chunk_size: Maximum chunk length (default from settings)
+            chunk_overlap: Length shared by neighbouring chunks (default from settings)
+            length_function: Measures length (default: characters)
+        """
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size or settings.chunk_size,
+            chunk_overlap=settings.chunk_overlap if chunk_overlap is None else chunk_overlap,
+            length_function=length_function,
+            separators=["\n\n", "\n", " ", ""]
+        )
+
+    def chunk(self, text: str) -> List[Dict[str, Any]]:
+        """Split text into chunks without positional metadata."""
+        return [{"content": chunk, "metadata": {}} for chunk in self.text_splitter.split_text(text)]
+
+
+def create_chunker(name: Optional[str] = None, size: Optional[int] = None, overlap: Optional[int] = None) -> Any:
+    """
+    Create a chunker.
+
+    Args:
+        name: "structured" or "recursive" (default from settings)
+        size: Chunk size, in tokens for structured and characters for recursive
+        overlap: Overlap, in the same unit as size
+
+    Returns:
+        Object with a chunk(text) method
+    """
+    name = (name or settings.chunker).lower()
+    if name == "structured":
+        return StructuredChunker(size, overlap)
+    if name == "recursive":
+        return RecursiveChunker(size, overlap)
+    raise ValueError(f"Unknown chunker: {name} (expected one of {', '.join(CHUNKERS)})")
+
+
+def chunker_settings(name: Optional[str] = None) -> Tuple[str, int, int]:
+    """
+    Get a chunker's configured size and overlap.
+
+    Args:
+        name: "structured" or "recursive" (default from settings)
+
+    Returns:
+        Tuple of (name, size, overlap), in tokens for structured and characters for recursive
+    """
+    name = (name or settings.chunker).lower()
+    if name == "structured":
+        return name, settings.chunk_tokens, settings.chunk_overlap_tokens
+    return name, settings.chunk_size, settings.chunk_overlap
@@ -0,0 +1,232 @@
+"""
+Context assembly for RAG prompts.
+Dedupes overlapping chunks, merges neighbouring chunks of the same document
+and fills a token budget in order of relevance, cutting passages that do not
+fit at a sentence boundary.
+"""
+from typing import Any, Dict, List, Optional
+import re
+
+from app.config import settings
+from app.metrics import registry
+from app.rag.tokens import estimate_tokens
+
+
+CONTEXT_TOKENS_SAVED = registry.histogram(
+    "chatbot_context_tokens_saved",
+    "Prompt tokens saved per request by deduping, merging and budgeting retrieved chunks",
+    buckets=(0, 25, 50, 100, 250, 500, 1000, 2000, 4000, 8000)
+)
+
+
+# Shortest suffix/prefix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 8
+
+# Where a passage can be cut: after sentence-ending punctuation or at a line break
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\S+")
+
+
+def merge_overlapping(first: str, second: str, max_overlap: int) -> str:
+    """
+    Join two consecutive chunks, dropping the text they share.
+
+    Args:
+        first: The earlier chunk
+        second: The following chunk
+        max_overlap: Longest overlap to look for, in characters
+
+    Returns:
+        The merged text
+    """
+    longest = min(len(first), len(second), max_overlap)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+
+    # The splitter trims whitespace at chunk edges, so retry on stripped text
+    first_stripped = first.rstrip()
+    second_stripped = second.lstrip()
+    longest = min(len(first_stripped), len(second_stripped), max_overlap)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if first_stripped.endswith(second_stripped[:size]):
+            return first_stripped + second_stripped[size:]
+
+    return f"{first}\n{second}"
+
+
+def truncate_to_tokens(text: str, max_tokens: int, at_sentence: bool = True) -> str:
+    """
+    Cut a text to its leading sentences that fit a token budget.
+
+    Args:
+        text: The text to cut
+        max_tokens: Maximum size of the result in tokens
+        at_sentence: If False and not even the first sentence fits, cut between words instead
+
+    Returns:
+        The cut text, or "" if nothing fits
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    kept = _leading_within(text, max_tokens, _SENTENCE_BREAK, cut_before=True)
+    if not kept and not at_sentence:
+        kept = _leading_within(text, max_tokens, _WORD, cut_before=False)
+    return kept
+
+
+def _leading_within(text: str, max_tokens: int, boundaries: re.Pattern, cut_before: bool) -> str:
+    """Longest prefix of a text ending at a boundary match that fits a token budget."""
+    kept_end = 0
+    tokens = 0
+    for match in boundaries.finditer(text):
+        end = match.start() if cut_before else match.end()
+        tokens += estimate_tokens(text[kept_end:end])
+        if tokens > max_tokens:
+            break
+        kept_end = end
+    return text[:kept_end].rstrip()
+
+
+class ContextBuilder:
+    """Builds a deduplicated, token-budgeted context from retrieved chunks."""
+
+    def __init__(self, token_budget: Optional[int] = None, max_overlap: Optional[int] = None):
+        """
+        Initialize the context builder.
+
+        Args:
+            token_budget: Maximum context size in tokens (default from settings)
+            max_overlap: Longest chunk overlap to remove, in characters
+        """
+        self.token_budget = token_budget or settings.context_token_budget
+        self.max_overlap = max_overlap or settings.chunk_overlap * 2
+
+    def _document_key(self, doc: Dict[str, Any]) -> Any:
+        """Get the key identifying the document a chunk came from."""
+        metadata = doc.get("metadata", {})
+        return metadata.get("document_id", metadata.get("filename"))
+
+    def _join(self, passage: Dict[str, Any], doc: Dict[str, Any]) -> str:
+        """Append the next chunk of a document to a passage, without the text they share."""
+        start = doc["metadata"].get("char_start")
+        if passage["char_end"] is None or start is None:
+            return merge_overlapping(passage["content"], doc["content"], self.max_overlap)
+
+        # Chunks with source offsets overlap by exactly this many characters
+        shared = passage["char_end"] - start
+        if shared <= 0:
+            return f"{passage['content']}\n{doc['content']}"
+        return passage["content"] + doc["content"][shared:]
+
+    def _merge_passages(self, relevant_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge adjacent chunks of the same document into passages.
+
+        Args:
+            relevant_docs: Retrieved chunks with content, metadata and relevance
+
+        Returns:
+            Passages with merged content, best relevance and source filename
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for doc in relevant_docs:
+            groups.setdefault(self._document_key(doc), []).append(doc)
+
+        passages = []
+        for key, docs in groups.items():
+            if key is None or any("chunk_index" not in d.get("metadata", {}) for d in docs):
+                # Without positional metadata every chunk stands alone
+                for doc in docs:
+                    passages.append({
+                        "content": doc["content"],
+                        "relevance": doc.get("relevance", 0.0),
+                        "filename": doc.get("metadata", {}).get("filename", "Unknown")
+                    })
+                continue
+
+            docs = sorted(docs, key=lambda d: d["metadata"]["chunk_index"])
+            current = None
+            for doc in docs:
+                index = doc["metadata"]["chunk_index"]
+                if current is not None and index == current["last_index"]:
+                    continue  # Same chunk retrieved twice
+                if current is not None and index == current["last_index"] + 1:
+                    current["content"] = self._join(current, doc)
+                    current["relevance"] = max(current["relevance"], doc.get("relevance", 0.0))
+                    current["last_index"] = index
+                    current["char_end"] = doc["metadata"].get("char_end")
+                    continue
+                if current is not None:
+                    passages.append(current)
+                current = {
+                    "content": doc["content"],
+                    "relevance": doc.get("relevance", 0.0),
+                    "filename": doc["metadata"].get("filename", "Unknown"),
+                    "last_index": index,
+                    "char_end": doc["metadata"].get("char_end")
+                }
+            passages.append(current)
+
+        # Drop exact duplicates (the same text ingested under several documents)
+        seen = set()
+        unique = []
+        for passage in sorted(passages, key=lambda p: p["relevance"], reverse=True):
+            fingerprint = " ".join(passage["content"].split()).lower()
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            unique.append(passage)
+
+        return unique
+
+    def build(self, relevant_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the context string for a set of retrieved chunks.
+
+        Args:
+            relevant_docs: Retrieved chunks, ideally sorted by relevance
+
+        Returns:
+            Dictionary with the context, its sources, tokens used and tokens
+            saved compared to concatenating every retrieved chunk
+        """
+        if not relevant_docs:
+            return {"context": "", "sources": [], "tokens_used": 0, "tokens_saved": 0}
+
+        raw_tokens = sum(estimate_tokens(doc["content"]) for doc in relevant_docs)
+
+        context_parts = []
+        sources = []
+        tokens_used = 0
+        for passage in self._merge_passages(relevant_docs):
+            label = f"[Source {len(context_parts) + 1}]: "
+            part = label + passage["content"]
+            part_tokens = estimate_tokens(part)
+            if tokens_used + part_tokens > self.token_budget:
+                # Keep the sentences that fit. The first passage is cut between
+                # words if it must, so a confident retrieval never loses all context.
+                content = truncate_to_tokens(
+                    passage["content"],
+                    self.token_budget - tokens_used - estimate_tokens(label),
+                    at_sentence=bool(context_parts)
+                )
+                if not content:
+                    continue  # A smaller, less relevant passage may still fit
+                part = label + content
+                part_tokens = estimate_tokens(part)
+            context_parts.append(part)
+            tokens_used += part_tokens
+            if passage["filename"] not in sources:
+                sources.append(passage["filename"])
+
+        tokens_saved = max(raw_tokens - tokens_used, 0)
+        CONTEXT_TOKENS_SAVED.observe(tokens_saved)
+
+        return {
+            "context": "\n\n".join(context_parts),
+            "sources": sources,
+            "tokens_used": tokens_used,
+            "tokens_saved": tokens_saved
+        }
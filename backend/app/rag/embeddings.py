@@ -0,0 +1,236 @@
+"""
+Embedding model runtimes.
+The default runtime runs all-MiniLM-L6-v2 through sentence-transformers on
+PyTorch. The ONNX runtime loads an exported (optionally int8-quantized) copy
+of the same model and its fast tokenizer from a local directory, without
+importing torch or touching the network.
+"""
+from typing import Any, Dict, List, Optional
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.config import settings
+
+
+EMBEDDING_RUNTIMES = ("torch", "onnx")
+
+# Texts embedded by both runtimes to check that they stay compatible
+REFERENCE_TEXTS = [
+    "What are your business hours?",
+    "How much does the premium plan cost per month?",
+    "I want a refund for my last order.",
+    "Can I talk to a human agent please?",
+    "Our support team is available Monday to Friday, 9am to 6pm EST.",
+    "Shipping is free on orders over $50 and usually takes 3-5 business days.",
+    "To reset your password, click 'Forgot password' on the login page and follow the link we email you.",
+    "hi",
+    "Refunds are processed within 5-7 business days after we receive the returned item. " * 20,
+]
+
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """
+    Compare two sets of embeddings of the same texts.
+
+    Args:
+        reference: (n x dim) embeddings from the reference runtime
+        candidate: (n x dim) embeddings from the runtime being checked
+
+    Returns:
+        Dictionary with min/mean cosine similarity and max absolute difference
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    cosines = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+    return {
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "max_abs_diff": round(float(np.abs(reference - candidate).max()), 5)
+    }
+
+
+class OnnxEmbeddings:
+    """
+    Sentence embeddings from an exported ONNX model.
+
+    Mirrors the sentence-transformers pipeline of all-MiniLM-L6-v2: WordPiece
+    tokenization, mean pooling over the attention mask and L2 normalization.
+    Exposes the same embed_documents/embed_query interface as LangChain
+    embeddings. Create model directories with export_embedding_model.py.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        threads: Optional[int] = None,
+        batch_size: int = 32,
+        verify: Optional[bool] = None,
+        model_file: Optional[str] = None
+    ):
+        """
+        Load the model and tokenizer.
+
+        Args:
+            model_path: Directory with the ONNX model, tokenizer.json and embedding_config.json
+            threads: Intra-op threads (default from settings, 0 lets onnxruntime decide)
+            batch_size: Number of texts run through the model at once
+            verify: Check compatibility against the exported reference embeddings
+            model_file: Model file inside model_path (default from embedding_config.json)
+
+        Raises:
+            FileNotFoundError: If the model directory is incomplete
+            RuntimeError: If outputs drift beyond settings.embedding_compat_tolerance
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_path = model_path or settings.onnx_model_path
+        self.batch_size = batch_size
+
+        config_path = os.path.join(self.model_path, "embedding_config.json")
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(
+                f"No exported embedding model in {self.model_path}; run export_embedding_model.py first"
+            )
+        with open(config_path) as f:
+            self.config: Dict[str, Any] = json.load(f)
+
+        self.max_seq_length = self.config.get("max_seq_length", 256)
+        self.normalize = self.config.get("normalize", True)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        pad_token = self.config.get("pad_token", "[PAD]")
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = settings.onnx_threads if threads is None else threads
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(self.model_path, model_file or self.config.get("model_file", "model.onnx")),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        if settings.onnx_verify_on_load if verify is None else verify:
+            report = self.verify()
+            if report and report["min_cosine"] < settings.embedding_compat_tolerance:
+                raise RuntimeError(
+                    f"ONNX embeddings drifted from the reference model "
+                    f"(min cosine {report['min_cosine']} < {settings.embedding_compat_tolerance})"
+                )
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Tokenize, run the model and pool one batch of texts."""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into a float32 array.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            (n x dim) array of embeddings in input order
+        """
+        if not texts:
+            return np.empty((0, self.config.get("dimension", 384)), dtype=np.float32)
+
+        # Same preprocessing as LangChain's HuggingFaceEmbeddings
+        texts = [text.replace("\n", " ") for text in texts]
+
+        # Batch texts of similar length together to minimise padding
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings = [None] * len(texts)
+        for start in range(0, len(texts), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for position, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                embeddings[position] = vector
+        return np.stack(embeddings).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of documents."""
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self.encode([text])[0].tolist()
+
+    def verify(self) -> Optional[Dict[str, float]]:
+        """
+        Compare outputs with the reference embeddings saved at export time.
+
+        Returns:
+            Comparison from compare_embeddings, or None if no reference was saved
+        """
+        reference_path = os.path.join(self.model_path, "reference_embeddings.npy")
+        if not os.path.exists(reference_path):
+            return None
+        texts = self.config.get("reference_texts", REFERENCE_TEXTS)
+        return compare_embeddings(np.load(reference_path), self.encode(texts))
+
+
+def create_embeddings(runtime: Optional[str] = None) -> Any:
+    """
+    Create the embedding model for a runtime.
+
+    Args:
+        runtime: "torch" or "onnx" (default from settings)
+
+    Returns:
+        Object with embed_documents and embed_query methods
+    """
+    runtime = (runtime or settings.embedding_runtime).lower()
+    if runtime == "onnx":
+        return OnnxEmbeddings()
+    if runtime == "torch":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(
+            model_name=settings.embedding_model_name,
+            model_kwargs={'device': 'cpu'}
+        )
+    raise ValueError(f"Unknown embedding runtime: {runtime} (expected one of {', '.join(EMBEDDING_RUNTIMES)})")
+
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings() -> Any:
+    """Get the embedding model shared by ingestion and retrieval, loading it once."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = create_embeddings()
+    return _embeddings
+
+
+def embeddings_loaded() -> bool:
+    """Check whether the shared embedding model has been loaded."""
+    return _embeddings is not None
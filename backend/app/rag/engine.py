@@ -2,20 +2,42 @@
 RAG Engine - Orchestrates the complete RAG pipeline.
 Combines retrieval, generation, and confidence scoring.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+import asyncio
+import threading
+import time
 
 from app.config import settings
-from app.rag.retriever import document_retriever
+from app.metrics import timed
+from app.rag.retriever import get_document_retriever
+from app.rag.context import ContextBuilder
+from app.rag.parents import parent_store
+from app.rag.rewriter import query_rewriter
+from app.rag.prefetch import retrieval_prefetcher
+from app.rag.cache import semantic_cache
+from app.agent.router import intent_router
+from app.agent.matcher import demo_matcher
 
 
 class RAGEngine:
     """Main RAG engine that orchestrates retrieval and generation."""
     
-    def __init__(self):
-        """Initialize the RAG engine."""
-        self.retriever = document_retriever
+    def __init__(self, retriever=None):
+        """
+        Initialize the RAG engine.
+        
+        Args:
+            retriever: Document retriever (default: the shared retriever)
+        """
+        self.retriever = retriever if retriever is not None else get_document_retriever()
         self.confidence_threshold = settings.confidence_threshold
+        self.context_builder = ContextBuilder()
+        self.parent_store = parent_store
+        self.rewriter = query_rewriter
+        self.prefetcher = retrieval_prefetcher
+        self.router = intent_router
+        self.cache = semantic_cache
     
     async def generate_response(
         self,
@@ -23,16 +45,22 @@ class RAGEngine:
         bot_id: int,
         system_prompt: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
-        session_id: Optional[int] = None
+        session_id: Optional[int] = None,
+        knowledge_base_version: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Generate a response to a user query using RAG.
+        Near-duplicate questions are answered from the semantic cache, and
+        retrieval already done for the message's draft is reused.
         
         Args:
             query: The user's question
             bot_id: The bot ID for knowledge base filtering
             system_prompt: The bot's system prompt
             conversation_history: Previous messages in the conversation
+            session_id: Chat session ID, to claim the draft's prefetched retrieval
+            knowledge_base_version: The bot's knowledge base version, if the caller
+                already read it (otherwise it is read when needed)
             
         Returns:
             Dictionary with response, confidence, sources, and metadata
@@ -41,58 +69,195 @@ class RAGEngine:
         confidence = 1.0
         sources = []
         retrieved_chunks = 0
+        context_tokens = 0
+        context_tokens_saved = 0
+        
+        # Small talk and lead-capture turns never use knowledge base context
+        route = self.router.route(query) if settings.intent_routing_enabled else None
+        needs_retrieval = route is None or route["needs_retrieval"]
         
         # Try to retrieve from knowledge base if it exists
-        has_knowledge_base = self.retriever.check_collection_exists(bot_id)
+        has_knowledge_base = needs_retrieval and self.retriever.check_collection_exists(bot_id)
+        query_embedding = None
+        
+        # Follow-ups ("what about the enterprise one?") are also searched as
+        # rewrites built from the previous user turns
+        queries = self._retrieval_queries(query, conversation_history) if has_knowledge_base else [query]
+        
+        # Follow-ups like "what about that?" depend on history, so never share answers
+        cacheable = (
+            has_knowledge_base
+            and settings.semantic_cache_enabled
+            and len(queries) == 1
+            and demo_matcher.detect_context_from_history(query, conversation_history) is None
+        )
+        
+        # Cached answers and prefetched chunks are only valid for the current knowledge base
+        if knowledge_base_version is None and (cacheable or (has_knowledge_base and session_id is not None)):
+            knowledge_base_version = await self._knowledge_base_version(bot_id)
+        
+        # The message's draft may already have been searched while it was typed
+        prefetched = None
+        if has_knowledge_base and session_id is not None:
+            prefetched = await self.prefetcher.take(
+                session_id, query, self._prefetch_key(bot_id, queries, knowledge_base_version)
+            )
+        
+        if has_knowledge_base:
+            # One batched embedding call for the message and its rewrites, off the
+            # event loop so pings and cancel frames are still handled meanwhile
+            if prefetched:
+                query_embeddings = prefetched["embeddings"]
+            else:
+                query_embeddings = await asyncio.to_thread(self.retriever.embed_queries, queries)
+            query_embedding = query_embeddings[0]
+        
+        if cacheable:
+            with timed("cache_lookup"):
+                cached_response = self.cache.lookup(bot_id, query_embedding, knowledge_base_version)
+            if cached_response is not None:
+                cached_response["timestamp"] = datetime.utcnow().isoformat()
+                cached_response["cached"] = True
+                return cached_response
         
         if has_knowledge_base:
             # Retrieve relevant documents
-            relevant_docs, confidence = await self.retriever.hybrid_search(
-                query=query,
-                bot_id=bot_id,
-                top_k=settings.retrieval_top_k
-            )
+            if prefetched:
+                relevant_docs, confidence = prefetched["results"], prefetched["confidence"]
+            else:
+                relevant_docs, confidence = await self.retriever.hybrid_search(
+                    query=query,
+                    bot_id=bot_id,
+                    top_k=settings.retrieval_top_k,
+                    query_embedding=query_embedding,
+                    rewrites=queries[1:],
+                    rewrite_embeddings=query_embeddings[1:]
+                )
             
             if relevant_docs and confidence >= self.confidence_threshold:
-                context = self._build_context(relevant_docs)
-                sources = [doc["metadata"].get("filename", "Unknown") for doc in relevant_docs[:3]]
+                with timed("context_build"):
+                    built_context = self._build_context(relevant_docs)
+                context = built_context["context"]
+                sources = built_context["sources"]
+                context_tokens = built_context["tokens_used"]
+                context_tokens_saved = built_context["tokens_saved"]
                 retrieved_chunks = len(relevant_docs)
         
         # ALWAYS generate response using LLM (with or without context)
-        response_text = await self._generate_with_llm(
-            query=query,
-            context=context,
-            system_prompt=system_prompt,
-            conversation_history=conversation_history,
-            session_id=session_id
-        )
+        with timed("generation"):
+            response_text = await self._generate_with_llm(
+                query=query,
+                context=context,
+                system_prompt=system_prompt,
+                conversation_history=conversation_history,
+                session_id=session_id
+            )
         
-        return {
+        response = {
             "response": response_text,
             "confidence": confidence,
             "sources": sources,
             "timestamp": datetime.utcnow().isoformat(),
-            "retrieved_chunks": retrieved_chunks
+            "retrieved_chunks": retrieved_chunks,
+            "context_tokens": context_tokens,
+            "context_tokens_saved": context_tokens_saved,
+            "intent": route["category"] if route else None,
+            "cached": False
         }
+        
+        if cacheable:
+            self.cache.store(bot_id, query_embedding, response, knowledge_base_version)
+        
+        return response
+    
+    def _retrieval_queries(self, query: str, conversation_history: Optional[List[Dict[str, str]]]) -> List[str]:
+        """The message, plus rewrites for follow-ups built from the previous user turns."""
+        if not settings.query_rewrite_enabled:
+            return [query]
+        return self.rewriter.rewrite(query, conversation_history)
+    
+    def _prefetch_key(self, bot_id: int, queries: List[str], version: int) -> Tuple[int, Tuple[str, ...], int]:
+        """What a retrieval depends on: the bot, the queries and the knowledge base version."""
+        return bot_id, tuple(queries), version
     
-    def _build_context(self, relevant_docs: List[Dict[str, Any]]) -> str:
+    async def _knowledge_base_version(self, bot_id: int) -> int:
+        """Read a bot's knowledge base version for callers that did not pass it."""
+        from app.database import AsyncSessionLocal
+        from app.rag.stats import get_knowledge_base_version
+        
+        async with AsyncSessionLocal() as db:
+            with timed("db_read"):
+                return await get_knowledge_base_version(db, bot_id)
+    
+    async def prefetch_retrieval(
+        self,
+        draft: str,
+        bot_id: int,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        knowledge_base_version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
         """
-        Build context string from relevant documents.
+        Speculatively embed and search a message that is still being typed.
+        The embedding runs off the event loop so real messages keep flowing.
         
         Args:
-            relevant_docs: List of retrieved documents
+            draft: The message typed so far
+            bot_id: The bot ID for knowledge base filtering
+            conversation_history: Previous messages in the conversation
+            knowledge_base_version: The bot's knowledge base version (read if not given)
             
         Returns:
-            Formatted context string
+            Prefetched retrieval for RetrievalPrefetcher, or None if the draft
+            would not use the knowledge base
         """
-        if not relevant_docs:
-            return ""
+        if settings.intent_routing_enabled:
+            route = self.router.route(draft)
+            if route is not None and not route["needs_retrieval"]:
+                return None
+        if not self.retriever.check_collection_exists(bot_id):
+            return None
         
-        context_parts = []
-        for i, doc in enumerate(relevant_docs[:3], 1):  # Top 3 chunks
-            context_parts.append(f"[Source {i}]: {doc['content']}")
+        start = time.perf_counter()
+        if knowledge_base_version is None:
+            knowledge_base_version = await self._knowledge_base_version(bot_id)
+        # Rewrite as if sent: the history then ends with the message itself
+        history = list(conversation_history or []) + [{"role": "user", "content": draft}]
+        queries = self._retrieval_queries(draft, history)
+        embeddings = await asyncio.to_thread(self.retriever.embed_queries, queries)
+        results, confidence = await self.retriever.hybrid_search(
+            query=draft,
+            bot_id=bot_id,
+            top_k=settings.retrieval_top_k,
+            query_embedding=embeddings[0],
+            rewrites=queries[1:],
+            rewrite_embeddings=embeddings[1:]
+        )
+        return {
+            "key": self._prefetch_key(bot_id, queries, knowledge_base_version),
+            "embeddings": embeddings,
+            "results": results,
+            "confidence": confidence,
+            "seconds": time.perf_counter() - start
+        }
+    
+    def _build_context(self, relevant_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the context from relevant documents.
+        With parent retrieval, matched chunks are first replaced by the
+        (deduplicated) parent sections they belong to. Overlapping and
+        adjacent passages are merged and the result is limited to the
+        configured token budget.
         
-        return "\n\n".join(context_parts)
+        Args:
+            relevant_docs: List of retrieved documents
+            
+        Returns:
+            Dictionary with context string, sources, tokens used and tokens saved
+        """
+        if settings.parent_retrieval_enabled:
+            with timed("parent_expansion"):
+                relevant_docs = self.parent_store.expand(relevant_docs)
+        return self.context_builder.build(relevant_docs)
     
     async def _generate_with_llm(
         self,
@@ -198,5 +363,15 @@ class RAGEngine:
         }
 
 
-# Global instance
-rag_engine = RAGEngine()
+_rag_engine: Optional[RAGEngine] = None
+_rag_engine_lock = threading.Lock()
+
+
+def get_rag_engine() -> RAGEngine:
+    """Get the shared RAG engine, loading retrieval models on first use."""
+    global _rag_engine
+    if _rag_engine is None:
+        with _rag_engine_lock:
+            if _rag_engine is None:
+                _rag_engine = RAGEngine()
+    return _rag_engine
@@ -0,0 +1,73 @@
+"""
+Text extraction for knowledge base documents.
+Turns uploaded file bytes (PDF, TXT, Markdown) into plain text.
+"""
+import io
+import os
+
+
+# File extensions accepted by the ingestion pipeline
+SUPPORTED_EXTENSIONS = {"pdf", "txt", "md", "markdown"}
+
+
+def get_file_extension(filename: str) -> str:
+    """
+    Get the lower-cased extension of a filename without the dot.
+
+    Args:
+        filename: File name or path
+
+    Returns:
+        Extension such as "pdf", or an empty string
+    """
+    return os.path.splitext(filename)[1].lstrip(".").lower()
+
+
+def extract_text_from_pdf(pdf_content: bytes) -> str:
+    """
+    Extract text from PDF file content.
+
+    Args:
+        pdf_content: PDF file content as bytes
+
+    Returns:
+        Extracted text
+    """
+    import pypdf
+
+    try:
+        pdf_file = io.BytesIO(pdf_content)
+        pdf_reader = pypdf.PdfReader(pdf_file)
+
+        text_parts = []
+        for page_num, page in enumerate(pdf_reader.pages):
+            text = page.extract_text()
+            if text.strip():
+                text_parts.append(f"[Page {page_num + 1}]\n{text}")
+
+        return "\n\n".join(text_parts)
+
+    except Exception as e:
+        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+
+
+def extract_text(filename: str, content: bytes) -> str:
+    """
+    Extract text from a supported file based on its extension.
+
+    Args:
+        filename: Name of the file (used to pick the extractor)
+        content: Raw file content
+
+    Returns:
+        Extracted text
+    """
+    extension = get_file_extension(filename)
+
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {extension or 'none'}")
+
+    if extension == "pdf":
+        return extract_text_from_pdf(content)
+
+    return content.decode("utf-8", errors="replace")
@@ -2,47 +2,80 @@
 Document ingestion and chunking for RAG.
 Processes documents, splits them into chunks, and stores embeddings.
 """
-from typing import List, Dict, Any
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+from typing import List, Dict, Any, Optional
+import threading
+import time
+import uuid
 
 from app.config import settings
+from app.metrics import INGEST_SECONDS, INGESTED_CHUNKS, timed
+from app.rag.chunking import StructuredChunker, create_chunker
+from app.rag.embeddings import get_embeddings
+from app.rag.parents import ParentStore, assign_parents, parent_store as shared_parent_store
+from app.rag.vectorstore import get_vector_store
 
 
 class DocumentIngestion:
     """Handles document processing and embedding storage."""
     
-    def __init__(self):
-        """Initialize the ingestion pipeline with text splitter and embeddings."""
-        # Initialize text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.chunk_size,
-            chunk_overlap=settings.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+    def __init__(
+        self,
+        embeddings=None,
+        vector_store=None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        chunker: Optional[str] = None,
+        parent_tokens: Optional[int] = None,
+        parent_store: Optional[ParentStore] = None
+    ):
+        """
+        Initialize the ingestion pipeline with chunker and embeddings.
         
-        # Initialize embeddings model (using free HuggingFace embeddings)
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
+        Args:
+            embeddings: Embeddings model (default: the shared model)
+            vector_store: Vector store (default: the shared store)
+            chunk_size: Maximum chunk size, in tokens for the structured chunker and
+                characters for the recursive one (default from settings)
+            chunk_overlap: Overlap between neighbouring chunks, in the same unit (default from settings)
+            chunker: "structured" or "recursive" (default from settings)
+            parent_tokens: Parent section size in tokens, 0 to store no parents
+                (default from settings when parent retrieval is enabled)
+            parent_store: Store for parent sections (default: the shared store)
+        """
+        self.chunker = create_chunker(chunker, chunk_size, chunk_overlap)
         
-        # Initialize ChromaDB client
-        self.chroma_client = chromadb.PersistentClient(
-            path=settings.chroma_path,
-            settings=ChromaSettings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
+        # Parents are located by character offset, so they need the structured chunker
+        if parent_tokens is None:
+            parent_tokens = settings.parent_chunk_tokens if settings.parent_retrieval_enabled else 0
+        self.parent_chunker = (
+            StructuredChunker(parent_tokens, 0)
+            if parent_tokens and isinstance(self.chunker, StructuredChunker)
+            else None
         )
+        self.parent_store = parent_store if parent_store is not None else shared_parent_store
+        
+        # Embeddings model shared with retrieval (PyTorch or ONNX runtime)
+        self.embeddings = embeddings if embeddings is not None else get_embeddings()
+        
+        # Vector store backend (ChromaDB by default)
+        self.vector_store = vector_store if vector_store is not None else get_vector_store()
+    
+    def chunk_document(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Split text into chunks with positional metadata.
+        
+        Args:
+            text: The text content to chunk
+            
+        Returns:
+            List of chunks with content and metadata (char_start, char_end,
+            token_count, page and section from the structured chunker)
+        """
+        return self.chunker.chunk(text)
     
     def chunk_text(self, text: str) -> List[str]:
         """
-        Split text into chunks using recursive character splitting.
+        Split text into chunks.
         
         Args:
             text: The text content to chunk
@@ -50,8 +83,7 @@ class DocumentIngestion:
         Returns:
             List of text chunks
         """
-        chunks = self.text_splitter.split_text(text)
-        return chunks
+        return [chunk["content"] for chunk in self.chunk_document(text)]
     
     async def ingest_document(
         self,
@@ -60,7 +92,7 @@ class DocumentIngestion:
         bot_id: int
     ) -> Dict[str, Any]:
         """
-        Ingest a document: chunk it, generate embeddings, and store in ChromaDB.
+        Ingest a document: chunk it, generate embeddings, and store them in the vector store.
         
         Args:
             content: The document text content
@@ -70,21 +102,34 @@ class DocumentIngestion:
         Returns:
             Dictionary with ingestion results
         """
+        start = time.perf_counter()
+        
         # Chunk the document
-        chunks = self.chunk_text(content)
+        with timed("chunking"):
+            chunk_documents = self.chunk_document(content)
+        chunks = [chunk["content"] for chunk in chunk_documents]
         
         if not chunks:
+            INGEST_SECONDS.observe(time.perf_counter() - start, outcome="empty")
             return {
                 "success": False,
                 "error": "No chunks generated from document",
                 "chunk_count": 0
             }
         
+        # Each child records the offset of the parent section it belongs to
+        parents = None
+        if self.parent_chunker is not None and metadata.get("document_id") is not None:
+            with timed("chunking"):
+                parents = self.parent_chunker.chunk(content)
+            assign_parents(chunk_documents, parents)
+        
         # Add bot_id to metadata for filtering
         enhanced_metadata = []
-        for i, chunk in enumerate(chunks):
+        for i, chunk in enumerate(chunk_documents):
             chunk_metadata = {
                 **metadata,
+                **chunk["metadata"],
                 "bot_id": bot_id,
                 "chunk_index": i,
                 "chunk_count": len(chunks)
@@ -92,21 +137,33 @@ class DocumentIngestion:
             enhanced_metadata.append(chunk_metadata)
         
         try:
-            # Get or create collection for this bot
-            collection_name = f"{settings.chroma_collection_name}_bot_{bot_id}"
+            collection_name = self.vector_store.collection_name(bot_id)
             
-            # Create vector store
-            vectorstore = Chroma(
-                client=self.chroma_client,
-                collection_name=collection_name,
-                embedding_function=self.embeddings
-            )
+            # Stable IDs let chunks be found again by document
+            document_id = metadata.get("document_id")
+            if document_id is not None:
+                ids = [f"doc{document_id}_chunk{i}" for i in range(len(chunks))]
+            else:
+                ids = [str(uuid.uuid4()) for _ in chunks]
             
-            # Add documents to vector store
-            vectorstore.add_texts(
-                texts=chunks,
-                metadatas=enhanced_metadata
-            )
+            # Store parent sections before the children become searchable
+            if parents is not None:
+                with timed("parent_write"):
+                    self.parent_store.save(bot_id, document_id, parents)
+            
+            # Embed chunks and add them to the vector store
+            with timed("ingest_embedding"):
+                embeddings = self.embeddings.embed_documents(chunks)
+            with timed("vector_write"):
+                self.vector_store.add(
+                    bot_id=bot_id,
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=chunks,
+                    metadatas=enhanced_metadata
+                )
+            INGESTED_CHUNKS.inc(len(chunks))
+            INGEST_SECONDS.observe(time.perf_counter() - start, outcome="success")
             
             return {
                 "success": True,
@@ -116,12 +173,38 @@ class DocumentIngestion:
             }
         
         except Exception as e:
+            INGEST_SECONDS.observe(time.perf_counter() - start, outcome="error")
             return {
                 "success": False,
                 "error": str(e),
                 "chunk_count": len(chunks)
             }
     
+    def delete_document_chunks(self, bot_id: int, document_id: int) -> Dict[str, Any]:
+        """
+        Remove all chunks of a document from a bot's collection.
+        
+        Args:
+            bot_id: The bot ID the document belongs to
+            document_id: The database ID of the document
+            
+        Returns:
+            Dictionary with deletion results
+        """
+        try:
+            self.vector_store.delete_document(bot_id, document_id)
+            self.parent_store.delete(bot_id, document_id)
+            
+            return {
+                "success": True,
+                "collection_name": self.vector_store.collection_name(bot_id)
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     def get_collection_stats(self, bot_id: int) -> Dict[str, Any]:
         """
         Get statistics about a bot's knowledge base collection.
@@ -133,13 +216,10 @@ class DocumentIngestion:
             Dictionary with collection statistics
         """
         try:
-            collection_name = f"{settings.chroma_collection_name}_bot_{bot_id}"
-            collection = self.chroma_client.get_collection(name=collection_name)
-            
             return {
                 "success": True,
-                "collection_name": collection_name,
-                "document_count": collection.count(),
+                "collection_name": self.vector_store.collection_name(bot_id),
+                "document_count": self.vector_store.count(bot_id),
             }
         except Exception as e:
             return {
@@ -149,5 +229,15 @@ class DocumentIngestion:
             }
 
 
-# Global instance
-document_ingestion = DocumentIngestion()
+_document_ingestion: Optional[DocumentIngestion] = None
+_document_ingestion_lock = threading.Lock()
+
+
+def get_document_ingestion() -> DocumentIngestion:
+    """Get the shared ingestion pipeline, creating it on first use."""
+    global _document_ingestion
+    if _document_ingestion is None:
+        with _document_ingestion_lock:
+            if _document_ingestion is None:
+                _document_ingestion = DocumentIngestion()
+    return _document_ingestion
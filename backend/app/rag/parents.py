@@ -0,0 +1,207 @@
+"""
+Parent-document store for small-to-big retrieval.
+Small child chunks are embedded for precise matching; the larger parent
+section each child belongs to is stored here, keyed by document ID and
+character offset, and replaces the child when the prompt context is built.
+The parents of one document are stored together as compressed JSON.
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+from app.config import settings
+
+
+# Documents whose parents are kept in memory
+PARENT_CACHE_DOCUMENTS = 256
+
+
+def assign_parents(chunks: List[Dict[str, Any]], parents: List[Dict[str, Any]]) -> None:
+    """
+    Record the parent of each child chunk in its metadata (parent_start).
+
+    A child belongs to the parent its first character falls in. Both lists
+    come from the structured chunker, so they carry char_start offsets.
+
+    Args:
+        chunks: Child chunks (content and metadata), updated in place
+        parents: Parent sections of the same text, in order
+    """
+    starts = [parent["metadata"]["char_start"] for parent in parents]
+    for chunk in chunks:
+        index = max(bisect_right(starts, chunk["metadata"]["char_start"]) - 1, 0)
+        chunk["metadata"]["parent_start"] = starts[index]
+
+
+class ParentStore:
+    """Stores parent sections per document and expands retrieved children to them."""
+
+    def __init__(self, path: Optional[str] = None, cache_documents: int = PARENT_CACHE_DOCUMENTS):
+        """
+        Initialize the store.
+
+        Args:
+            path: Directory holding the parent sections (default from settings)
+            cache_documents: Number of documents whose parents stay in memory
+        """
+        self.path = path or settings.parent_store_path
+        self.cache_documents = cache_documents
+        self._cache: "OrderedDict[Tuple[int, int], Tuple[List[int], List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _file(self, bot_id: int, document_id: int) -> str:
+        return os.path.join(self.path, f"bot_{bot_id}", f"doc_{document_id}.json.z")
+
+    def save(self, bot_id: int, document_id: int, parents: List[Dict[str, Any]]) -> int:
+        """
+        Store a document's parent sections, replacing any previous ones.
+
+        Args:
+            bot_id: The bot the document belongs to
+            document_id: The database ID of the document
+            parents: Parent chunks (content and metadata with char_start and char_end)
+
+        Returns:
+            Bytes written
+        """
+        records = [{**parent["metadata"], "content": parent["content"]} for parent in parents]
+        data = zlib.compress(json.dumps(records, separators=(",", ":")).encode("utf-8"))
+
+        path = self._file(bot_id, document_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial sections
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._cache.pop((bot_id, document_id), None)
+        return len(data)
+
+    def _load(self, bot_id: int, document_id: int) -> Optional[Tuple[List[int], List[Dict[str, Any]]]]:
+        """Load a document's parents (and their start offsets), most recently used first in memory."""
+        key = (bot_id, document_id)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        try:
+            with open(self._file(bot_id, document_id), "rb") as f:
+                records = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        except FileNotFoundError:
+            return None  # Ingested without parents; not cached so later writes are seen
+
+        loaded = ([record["char_start"] for record in records], records)
+        with self._lock:
+            self._cache[key] = loaded
+            while len(self._cache) > self.cache_documents:
+                self._cache.popitem(last=False)
+        return loaded
+
+    def get(self, bot_id: int, document_id: int, offset: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the parent section containing a character offset.
+
+        Args:
+            bot_id: The bot the document belongs to
+            document_id: The database ID of the document
+            offset: Character offset into the document text
+
+        Returns:
+            The parent (metadata fields plus content and index), or None if the document has no parents
+        """
+        loaded = self._load(bot_id, document_id)
+        if loaded is None:
+            return None
+        starts, records = loaded
+        index = max(bisect_right(starts, offset) - 1, 0)
+        return {**records[index], "index": index}
+
+    def expand(self, relevant_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Replace retrieved child chunks with their parent sections.
+
+        Children of the same parent collapse into one result with the best
+        relevance, at the position of its best child. Chunks without a
+        stored parent are kept as they are.
+
+        Args:
+            relevant_docs: Retrieved chunks with content, metadata and relevance, best first
+
+        Returns:
+            Deduplicated parents (and parentless chunks) in retrieval order
+        """
+        expanded: List[Dict[str, Any]] = []
+        seen: Dict[Tuple[int, int, int], Dict[str, Any]] = {}
+        for doc in relevant_docs:
+            metadata = doc.get("metadata", {})
+            bot_id, document_id = metadata.get("bot_id"), metadata.get("document_id")
+            offset = metadata.get("parent_start", metadata.get("char_start"))
+            parent = None
+            if bot_id is not None and document_id is not None and offset is not None:
+                parent = self.get(bot_id, document_id, offset)
+            if parent is None:
+                expanded.append(doc)
+                continue
+
+            key = (bot_id, document_id, parent["char_start"])
+            if key in seen:
+                seen[key]["relevance"] = max(seen[key]["relevance"], doc.get("relevance", 0.0))
+                seen[key]["children"] += 1
+                continue
+
+            parent_metadata = {name: value for name, value in parent.items() if name not in ("content", "index")}
+            seen[key] = {
+                "content": parent["content"],
+                "metadata": {
+                    "bot_id": bot_id,
+                    "document_id": document_id,
+                    "filename": metadata.get("filename", "Unknown"),
+                    **parent_metadata,
+                    # Neighbouring parents of a document merge in the context builder
+                    "chunk_index": parent["index"]
+                },
+                "relevance": doc.get("relevance", 0.0),
+                "children": 1
+            }
+            expanded.append(seen[key])
+        return expanded
+
+    def delete(self, bot_id: int, document_id: int) -> bool:
+        """
+        Delete a document's parent sections.
+
+        Returns:
+            True if sections were removed, False if the document had none
+        """
+        with self._lock:
+            self._cache.pop((bot_id, document_id), None)
+        try:
+            os.remove(self._file(bot_id, document_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def size_bytes(self, bot_id: Optional[int] = None) -> int:
+        """Get the stored size of all parent sections, or of one bot's."""
+        root = self.path if bot_id is None else os.path.join(self.path, f"bot_{bot_id}")
+        return sum(
+            os.path.getsize(os.path.join(directory, name))
+            for directory, _, names in os.walk(root) for name in names
+        )
+
+
+# Global instance
+parent_store = ParentStore()
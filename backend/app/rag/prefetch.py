@@ -0,0 +1,235 @@
+"""
+Speculative retrieval for messages still being typed.
+The chat widget sends "draft" frames while the user types. The latest draft
+of a session is embedded and searched in the background, and when the sent
+message turns out to match it, the RAG engine uses the prefetched embeddings
+and chunks instead of computing them again. Speculation is throttled per
+session and capped per worker, and a newer draft cancels the one in
+progress. A message never waits for speculation, except to finish searching
+the very same text.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+import time
+
+from app.config import settings
+from app.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionDrafts:
+    """Speculation state of one chat session."""
+
+    def __init__(self):
+        self.text: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self.last_started = float("-inf")
+        self.entry: Optional[Dict[str, Any]] = None
+
+
+class RetrievalPrefetcher:
+    """Runs retrieval for each session's latest draft and hands it to the matching message."""
+
+    def __init__(
+        self,
+        min_interval_ms: Optional[float] = None,
+        max_concurrent: Optional[int] = None,
+        min_chars: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            min_interval_ms: Shortest time between speculative retrievals of a session
+            max_concurrent: Most speculative retrievals running at once on this worker
+            min_chars: Shortest draft worth retrieving for
+            ttl_seconds: Maximum age of a prefetched result
+        """
+        self.min_interval = (
+            settings.prefetch_min_interval_ms if min_interval_ms is None else min_interval_ms
+        ) / 1000
+        self.max_concurrent = max_concurrent or settings.prefetch_max_concurrent
+        self.min_chars = settings.prefetch_min_chars if min_chars is None else min_chars
+        self.ttl_seconds = ttl_seconds or settings.prefetch_ttl_seconds
+
+        self._sessions: Dict[int, _SessionDrafts] = {}
+        self._running = 0
+
+        # Prefetch statistics
+        self.drafts = 0
+        self.speculations = 0
+        self.superseded = 0
+        self.skipped = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def draft(self, session_id: int, text: str, speculate: Callable[[str], Awaitable[Optional[Dict[str, Any]]]]) -> bool:
+        """
+        Schedule speculative retrieval for a session's latest draft.
+        Returns at once; the retrieval runs as a background task that starts
+        no sooner than min_interval after the session's previous one.
+
+        Args:
+            session_id: Chat session ID
+            text: The message being typed
+            speculate: Coroutine function retrieving for a draft; returns an entry
+                with a "key" (see take) or None when the draft needs no retrieval
+
+        Returns:
+            False if the draft was ignored (too short, or unchanged)
+        """
+        text = text.strip()
+        if len(text) < self.min_chars:
+            return False
+        state = self._sessions.setdefault(session_id, _SessionDrafts())
+        if text == state.text:
+            return False
+
+        self.drafts += 1
+        if state.task is not None and not state.task.done():
+            state.task.cancel()
+            self.superseded += 1
+        state.text = text
+        state.entry = None
+        state.task = asyncio.create_task(self._speculate(state, text, speculate))
+        return True
+
+    async def _speculate(self, state: _SessionDrafts, text: str, speculate) -> Optional[Dict[str, Any]]:
+        """Retrieve for a draft once the session's throttle allows it, and return the entry."""
+        wait = state.last_started + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)  # A newer draft cancels this while it waits
+        if self._running >= self.max_concurrent:
+            self.skipped += 1
+            return None
+
+        state.last_started = time.monotonic()
+        state.running = True
+        self._running += 1
+        try:
+            entry = await speculate(text)
+        except Exception:
+            logger.warning("Speculative retrieval failed", exc_info=True)
+            return None
+        finally:
+            state.running = False
+            self._running -= 1
+
+        if entry is not None:
+            entry["stored_at"] = time.monotonic()
+            self.speculations += 1
+            # A message that claimed this search gets the entry as the task's result
+            if state.text == text:
+                state.entry = entry
+        return entry
+
+    async def take(self, session_id: int, message: str, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Claim the prefetched retrieval for a sent message.
+        If the message's draft is still being searched, the search is
+        finished rather than started over: the message claims the task, so a
+        draft typed meanwhile cannot cancel it. A draft still waiting for its
+        turn is cancelled. Any other speculation of the session is discarded.
+
+        Args:
+            session_id: Chat session ID
+            message: The sent message
+            key: What the retrieval depends on (bot, queries, knowledge base version);
+                must equal the entry's key
+
+        Returns:
+            The prefetched entry, or None if there is no usable one
+        """
+        state = self._sessions.get(session_id)
+        if state is None or state.text is None:
+            return None
+
+        task = state.task
+        entry = state.entry
+        if task is not None and not task.done():
+            if state.running and state.text == message.strip():
+                state.task = None
+                try:
+                    # shield() keeps the search alive if this turn is cancelled
+                    entry = await asyncio.shield(task)
+                except asyncio.CancelledError:
+                    if not task.cancelled():
+                        raise  # This turn itself was cancelled
+                    entry = None
+                if state.task is not None:
+                    # A newer draft arrived meanwhile; leave its speculation alone
+                    return self._claim(entry, key)
+            else:
+                task.cancel()
+                self.superseded += 1
+                entry = None
+
+        state.entry, state.text = None, None
+        return self._claim(entry, key)
+
+    def _claim(self, entry: Optional[Dict[str, Any]], key: Hashable) -> Optional[Dict[str, Any]]:
+        """Count a claim and return the entry if it is for this key and still fresh."""
+        if (
+            entry is None
+            or entry["key"] != key
+            or time.monotonic() - entry["stored_at"] > self.ttl_seconds
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.saved_seconds += entry.get("seconds", 0.0)
+        return entry
+
+    def discard(self, session_id: int):
+        """Cancel and forget a session's speculation (its last connection closed)."""
+        state = self._sessions.pop(session_id, None)
+        if state is not None and state.task is not None and not state.task.done():
+            state.task.cancel()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get speculation and hit-rate statistics."""
+        claims = self.hits + self.misses
+        return {
+            "drafts": self.drafts,
+            "speculations": self.speculations,
+            "superseded": self.superseded,
+            "skipped": self.skipped,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / claims, 4) if claims else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3)
+        }
+
+
+# Global instance
+retrieval_prefetcher = RetrievalPrefetcher()
+
+
+registry.counter_callback(
+    "chatbot_prefetch_claims_total",
+    "Sent messages with a draft, by whether its prefetched retrieval was used",
+    lambda: {("hit",): retrieval_prefetcher.hits, ("miss",): retrieval_prefetcher.misses},
+    ["result"]
+)
+registry.counter_callback(
+    "chatbot_prefetch_speculations_total",
+    "Speculative retrievals for drafts, by outcome",
+    lambda: {
+        ("completed",): retrieval_prefetcher.speculations,
+        ("superseded",): retrieval_prefetcher.superseded,
+        ("skipped",): retrieval_prefetcher.skipped
+    },
+    ["result"]
+)
+registry.counter_callback(
+    "chatbot_prefetch_saved_seconds_total",
+    "Retrieval time sent messages skipped thanks to prefetching",
+    lambda: retrieval_prefetcher.saved_seconds
+)
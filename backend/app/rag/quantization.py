@@ -0,0 +1,79 @@
+"""
+Embedding quantization for the in-process vector store.
+int8 keeps one signed byte per dimension plus a per-vector scale (4x
+smaller than float32); binary keeps one bit per dimension (32x smaller) for
+a Hamming pre-pass. The best candidates are rescored against a rescoring
+copy of the vectors (float16 by default), which costs disk but not scan
+time; without the copy the codes' own scores rank the results.
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+
+def validate_quantization(mode: str) -> str:
+    """Normalize a quantization mode name, raising ValueError if unknown."""
+    mode = (mode or "none").lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode} (expected one of {', '.join(QUANTIZATION_MODES)})")
+    return mode
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize float vectors to int8 with a symmetric per-vector scale.
+
+    Args:
+        vectors: (n x dim) float32 array
+
+    Returns:
+        Tuple of (int8 codes, float32 scales) where vector ~= codes * scale
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Reconstruct float32 vectors from int8 codes and scales."""
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def pack_binary(vectors: np.ndarray) -> np.ndarray:
+    """Pack the sign of every dimension into bits (one byte per 8 dimensions)."""
+    return np.packbits(vectors > 0, axis=-1)
+
+
+def unpack_binary(bits: np.ndarray, dim: int) -> np.ndarray:
+    """Reconstruct unit float32 vectors of +-1/sqrt(dim) from packed signs."""
+    signs = np.unpackbits(bits, axis=-1, count=dim).astype(np.float32) * 2 - 1
+    return signs / np.sqrt(dim)
+
+
+def binary_similarities(distances: np.ndarray, dim: int) -> np.ndarray:
+    """Estimate cosine similarity from Hamming distances (random-hyperplane estimate)."""
+    return np.cos(np.pi * distances.astype(np.float32) / dim)
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(bits: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """
+    Hamming distance between a packed query and every packed row.
+
+    Args:
+        bits: (n x bytes) uint8 array of packed rows
+        query_bits: (bytes,) uint8 array of the packed query
+
+    Returns:
+        (n,) array of differing bit counts
+    """
+    differing = np.bitwise_xor(bits, query_bits)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(differing).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[differing].sum(axis=1, dtype=np.int32)
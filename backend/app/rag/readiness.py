@@ -0,0 +1,58 @@
+"""
+Readiness of the lazily loaded RAG components.
+The embedding model and vector store load on first use; at startup they are
+warmed up in a background thread so /health and CRUD routes answer at once
+while /ready reports when chat retrieval can be served without a stall.
+"""
+from typing import Any, Dict, Optional
+import logging
+import time
+
+from app.rag.embeddings import embeddings_loaded
+from app.rag.vectorstore import vector_store_loaded
+
+
+logger = logging.getLogger(__name__)
+
+_load_started_at: Optional[float] = None
+_load_seconds: Optional[float] = None
+_load_error: Optional[str] = None
+
+
+def load_rag_components():
+    """Load the embedding model, vector store and RAG engine (blocking)."""
+    global _load_started_at, _load_seconds, _load_error
+    from app.rag.engine import get_rag_engine
+    from app.rag.ingestion import get_document_ingestion
+
+    _load_started_at = time.perf_counter()
+    _load_error = None
+    try:
+        get_rag_engine()
+        get_document_ingestion()
+        _load_seconds = round(time.perf_counter() - _load_started_at, 3)
+        logger.info("✅ RAG components loaded in %ss", _load_seconds)
+    except Exception as e:
+        _load_error = str(e)
+        logger.error("Failed to load RAG components: %s", _load_error)
+
+
+def get_readiness() -> Dict[str, Any]:
+    """
+    Report which RAG components are loaded.
+
+    Returns:
+        Dictionary with overall readiness, per-component status, load time and any load error
+    """
+    components = {
+        "embeddings": embeddings_loaded(),
+        "vector_store": vector_store_loaded()
+    }
+    loading = _load_started_at is not None and _load_seconds is None and _load_error is None
+    return {
+        "ready": all(components.values()) and not loading and _load_error is None,
+        "components": components,
+        "loading": loading,
+        "load_seconds": _load_seconds,
+        "error": _load_error
+    }
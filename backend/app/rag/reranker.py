@@ -0,0 +1,240 @@
+"""
+Cross-encoder reranking of retrieved chunks.
+A cross-encoder reads the query and a chunk together, which ranks far better
+than comparing two independently computed embeddings but costs a model run
+per pair. Only the top candidates from vector search are rescored, in
+batches, under a per-request time budget; when the budget runs out the
+candidates keep their original order. The ONNX runtime loads a model
+exported by export_reranker_model.py without importing torch.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.metrics import registry, timed
+
+
+logger = logging.getLogger(__name__)
+
+RERANKS = registry.counter(
+    "chatbot_reranks_total",
+    "Rerank requests by result (reranked, over_budget or error)",
+    ["result"]
+)
+
+
+class Reranker(ABC):
+    """Budgeted batch reranking shared by all cross-encoder backends."""
+
+    def __init__(self, batch_size: Optional[int] = None, budget_ms: Optional[float] = None):
+        """
+        Initialize the reranker.
+
+        Args:
+            batch_size: Query/chunk pairs scored per model run (default from settings)
+            budget_ms: Time allowed per request, 0 for no limit (default from settings)
+        """
+        self.batch_size = batch_size or settings.rerank_batch_size
+        self.budget_ms = settings.rerank_budget_ms if budget_ms is None else budget_ms
+
+        # Moving average of the scoring cost of one pair; a batch that would
+        # end past the deadline is not started
+        self.seconds_per_pair: Optional[float] = None
+
+    @abstractmethod
+    def _score_batch(self, query: str, passages: List[str]) -> List[float]:
+        """Score one batch of query/passage pairs (higher is more relevant)."""
+
+    def score(self, query: str, passages: List[str], deadline: Optional[float] = None) -> Optional[List[float]]:
+        """
+        Score passages against a query, stopping at the deadline.
+
+        Args:
+            query: The user's query
+            passages: Candidate chunk texts
+            deadline: time.perf_counter() value to finish by (None for no limit)
+
+        Returns:
+            One score per passage, or None if the deadline was (or would be) missed
+        """
+        scores: List[float] = []
+        for start in range(0, len(passages), self.batch_size):
+            batch = passages[start:start + self.batch_size]
+            batch_start = time.perf_counter()
+            if (
+                deadline is not None
+                and self.seconds_per_pair is not None
+                and batch_start + self.seconds_per_pair * len(batch) > deadline
+            ):
+                return None
+
+            scores.extend(self._score_batch(query, batch))
+
+            now = time.perf_counter()
+            per_pair = (now - batch_start) / len(batch)
+            self.seconds_per_pair = (
+                per_pair if self.seconds_per_pair is None else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+            )
+            if deadline is not None and now > deadline:
+                return None
+        return scores
+
+    def rerank(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        top_k: Optional[int] = None,
+        budget_ms: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Reorder retrieved chunks by cross-encoder score.
+
+        Args:
+            query: The user's query
+            results: Retrieved chunks (dicts with content), best first
+            top_k: Number of results to keep (default: all)
+            budget_ms: Time allowed for this request (default: self.budget_ms)
+
+        Returns:
+            Tuple of (results, whether they were reranked). Reranked results
+            carry a rerank_score; otherwise the original order is kept.
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        deadline = time.perf_counter() + budget_ms / 1000 if budget_ms > 0 else None
+
+        try:
+            with timed("rerank"):
+                scores = self.score(query, [result["content"] for result in results], deadline)
+        except Exception as e:
+            logger.error("Rerank error: %s", e)
+            RERANKS.inc(result="error")
+            return results[:top_k], False
+
+        if scores is None:
+            RERANKS.inc(result="over_budget")
+            return results[:top_k], False
+
+        RERANKS.inc(result="reranked")
+        for result, score in zip(results, scores):
+            result["rerank_score"] = float(score)
+        ranked = sorted(results, key=lambda result: result["rerank_score"], reverse=True)
+        return ranked[:top_k], True
+
+
+class OnnxCrossEncoder(Reranker):
+    """
+    Cross-encoder (e.g. ms-marco-MiniLM-L-6-v2) exported to ONNX.
+
+    Tokenizes each pair as [CLS] query [SEP] passage [SEP] and uses the
+    model's single relevance logit as the score. Create model directories
+    with export_reranker_model.py.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        threads: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        budget_ms: Optional[float] = None,
+        max_seq_length: Optional[int] = None
+    ):
+        """
+        Load the model and tokenizer.
+
+        Args:
+            model_path: Directory with the ONNX model, tokenizer.json and reranker_config.json
+            threads: Intra-op threads (default from settings, 0 lets onnxruntime decide)
+            batch_size: Pairs scored per model run (default from settings)
+            budget_ms: Time allowed per request (default from settings)
+            max_seq_length: Tokens per pair (default from settings)
+
+        Raises:
+            FileNotFoundError: If the model directory is incomplete
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        super().__init__(batch_size, budget_ms)
+        self.model_path = model_path or settings.rerank_model_path
+
+        config_path = os.path.join(self.model_path, "reranker_config.json")
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(
+                f"No exported reranker model in {self.model_path}; run export_reranker_model.py first"
+            )
+        with open(config_path) as f:
+            self.config: Dict[str, Any] = json.load(f)
+
+        # Chunks are short; a tighter limit than the model's keeps batches fast
+        self.max_seq_length = min(
+            max_seq_length or settings.rerank_max_seq_length,
+            self.config.get("max_seq_length", 512)
+        )
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        pad_token = self.config.get("pad_token", "[PAD]")
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = settings.onnx_threads if threads is None else threads
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(self.model_path, self.config.get("model_file", "model.onnx")),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        # One full batch initializes the session and seeds the cost estimate,
+        # so the first request's budget check has something to go on
+        self.score("warm up", ["warm up " * (self.max_seq_length // 4)] * self.batch_size)
+
+    def _score_batch(self, query: str, passages: List[str]) -> List[float]:
+        encodings = self.tokenizer.encode_batch([(query, passage) for passage in passages])
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        }
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        logits = self.session.run(None, feeds)[0]
+        # One relevance logit per pair (the last column for two-class heads)
+        return logits.reshape(len(passages), -1)[:, -1].tolist()
+
+
+_reranker: Optional[Reranker] = None
+_reranker_loaded = False
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[Reranker]:
+    """
+    Get the shared reranker, loading it on first use.
+
+    Returns:
+        The reranker, or None if reranking is disabled or the model failed to load
+    """
+    global _reranker, _reranker_loaded
+    if not settings.rerank_enabled:
+        return None
+    if not _reranker_loaded:
+        with _reranker_lock:
+            if not _reranker_loaded:
+                try:
+                    _reranker = OnnxCrossEncoder()
+                except Exception as e:
+                    # Retrieval keeps working in vector order without the model
+                    logger.warning("Reranker disabled: %s", e)
+                _reranker_loaded = True
+    return _reranker
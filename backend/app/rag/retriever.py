@@ -2,40 +2,133 @@
 Document retrieval for RAG.
 Implements hybrid search (vector similarity + keyword matching).
 """
-from typing import List, Dict, Any, Tuple
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+from typing import List, Dict, Any, Tuple, Optional
+import asyncio
+import logging
+import threading
+import time
 
 from app.config import settings
+from app.metrics import timed
+from app.rag.calibration import confidence_calibrator
+from app.rag.embeddings import get_embeddings
+from app.rag.reranker import get_reranker
+from app.rag.vectorstore import get_vector_store
+
+
+logger = logging.getLogger(__name__)
+
+
+# Rank offset of reciprocal rank fusion (Cormack et al.); dampens the weight of the very top ranks
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Fuse several rankings of retrieved chunks into one.
+
+    A chunk scores the sum of 1 / (k + rank) over the rankings it appears in,
+    so chunks that several queries agree on rise to the top. Each fused
+    chunk keeps its best relevance.
+
+    Args:
+        rankings: Retrieved chunks per query, best first
+        k: Rank offset
+
+    Returns:
+        Deduplicated chunks ordered by fused score, with a fusion_score
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            key = result.get("id") or result["content"]
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**result, "fusion_score": 0.0}
+            else:
+                entry["relevance"] = max(entry["relevance"], result["relevance"])
+            entry["fusion_score"] += 1.0 / (k + rank + 1)
+    return sorted(fused.values(), key=lambda result: result["fusion_score"], reverse=True)
 
 
 class DocumentRetriever:
     """Handles retrieval of relevant documents for user queries."""
     
-    def __init__(self):
-        """Initialize the retriever with embeddings and ChromaDB client."""
-        # Initialize embeddings model
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
-        
-        # Initialize ChromaDB client
-        self.chroma_client = chromadb.PersistentClient(
-            path=settings.chroma_path,
-            settings=ChromaSettings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
+    def __init__(
+        self,
+        embeddings=None,
+        vector_store=None,
+        keyword_boost: Optional[float] = None,
+        keyword_boost_max: Optional[float] = None,
+        calibrator=None,
+        reranker=None,
+        rerank_candidates: Optional[int] = None
+    ):
+        """
+        Initialize the retriever with embeddings and the vector store.
+        
+        Args:
+            embeddings: Embeddings model (default: the shared model)
+            vector_store: Vector store (default: the shared store)
+            keyword_boost: Relevance added per query keyword found in a chunk (default from settings)
+            keyword_boost_max: Cap on the keyword boost of one chunk (default from settings)
+            calibrator: Maps retrieval scores to confidence (default: the shared calibrator)
+            reranker: Cross-encoder reranker (default: the shared one if RERANK_ENABLED, False disables)
+            rerank_candidates: Chunks fetched and rescored when reranking (default from settings)
+        """
+        # Embeddings model shared with ingestion (PyTorch or ONNX runtime)
+        self.embeddings = embeddings if embeddings is not None else get_embeddings()
+        
+        # Vector store backend (ChromaDB by default)
+        self.vector_store = vector_store if vector_store is not None else get_vector_store()
+        
+        # Moving average of one vector search, to keep rewrite searches within budget
+        self.search_seconds: Optional[float] = None
+        
+        self.keyword_boost = settings.keyword_boost if keyword_boost is None else keyword_boost
+        self.keyword_boost_max = settings.keyword_boost_max if keyword_boost_max is None else keyword_boost_max
+        self.calibrator = calibrator if calibrator is not None else confidence_calibrator
+        
+        # Optional second stage; None when disabled or the model is missing
+        if reranker is None:
+            reranker = get_reranker()
+        self.reranker = reranker or None
+        self.rerank_candidates = rerank_candidates or settings.rerank_candidates
+    
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a query once so it can be shared by caching and retrieval.
+        
+        Args:
+            query: The user's query
+            
+        Returns:
+            Query embedding vector
+        """
+        with timed("embedding"):
+            return self.embeddings.embed_query(query)
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed several queries (a message and its rewrites) in one batched call.
+        
+        Args:
+            queries: The queries to embed
+            
+        Returns:
+            One embedding per query
+        """
+        if len(queries) == 1:
+            return [self.embed_query(queries[0])]
+        with timed("embedding"):
+            return self.embeddings.embed_documents(queries)
     
     async def retrieve_relevant_docs(
         self,
         query: str,
         bot_id: int,
-        top_k: int = None
+        top_k: int = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents for a query using vector similarity search.
@@ -44,6 +137,7 @@ class DocumentRetriever:
             query: The user's query
             bot_id: The bot ID to search within
             top_k: Number of top results to return (default from settings)
+            query_embedding: Precomputed query embedding (embedded here if omitted)
             
         Returns:
             List of relevant documents with metadata and scores
@@ -52,35 +146,33 @@ class DocumentRetriever:
             top_k = settings.retrieval_top_k
         
         try:
-            collection_name = f"{settings.chroma_collection_name}_bot_{bot_id}"
-            
-            # Create vector store
-            vectorstore = Chroma(
-                client=self.chroma_client,
-                collection_name=collection_name,
-                embedding_function=self.embeddings
-            )
-            
-            # Perform similarity search with scores
-            results = vectorstore.similarity_search_with_score(
-                query=query,
-                k=top_k
+            # Perform similarity search with scores; embedding and search are
+            # CPU-bound, so they run off the event loop
+            if query_embedding is None:
+                query_embedding = await asyncio.to_thread(self.embed_query, query)
+            start = time.perf_counter()
+            with timed("vector_search"):
+                results = await asyncio.to_thread(self.vector_store.query, bot_id, query_embedding, top_k)
+            elapsed = time.perf_counter() - start
+            self.search_seconds = (
+                elapsed if self.search_seconds is None else 0.8 * self.search_seconds + 0.2 * elapsed
             )
             
             # Format results
             formatted_results = []
-            for doc, score in results:
+            for result in results:
                 formatted_results.append({
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "score": float(score),
-                    "relevance": self._calculate_relevance(score)
+                    "id": result.get("id"),
+                    "content": result["content"],
+                    "metadata": result["metadata"],
+                    "score": result["distance"],
+                    "relevance": self._calculate_relevance(result["distance"])
                 })
             
             return formatted_results
         
         except Exception as e:
-            print(f"Retrieval error: {str(e)}")
+            logger.error("Retrieval error: %s", e)
             return []
     
     def _calculate_relevance(self, distance_score: float) -> float:
@@ -89,62 +181,97 @@ class DocumentRetriever:
         Lower distance = higher relevance.
         
         Args:
-            distance_score: The distance score from similarity search
+            distance_score: Cosine distance from similarity search
             
         Returns:
-            Relevance score between 0 and 1
+            Cosine similarity, clipped to 0-1
         """
-        # ChromaDB uses L2 distance, convert to similarity score
-        # Using exponential decay: relevance = e^(-distance)
-        import math
-        relevance = math.exp(-distance_score)
-        return min(max(relevance, 0.0), 1.0)
+        return min(max(1.0 - distance_score, 0.0), 1.0)
     
     async def hybrid_search(
         self,
         query: str,
         bot_id: int,
-        top_k: int = None
+        top_k: int = None,
+        query_embedding: Optional[List[float]] = None,
+        rewrites: Optional[List[str]] = None,
+        rewrite_embeddings: Optional[List[List[float]]] = None,
+        rewrite_budget_ms: Optional[float] = None
     ) -> Tuple[List[Dict[str, Any]], float]:
         """
         Perform hybrid search combining vector similarity and keyword matching.
+        With rewrites (see QueryRewriter), each rewritten query is searched
+        too and the rankings are fused; rewrite searches that would run past
+        the time budget are skipped. With a reranker, more candidates are
+        fetched and the cross-encoder picks the top_k (vector order is kept
+        if it runs over budget). The confidence is the top relevance mapped
+        through the bot's calibration.
         
         Args:
             query: The user's query
             bot_id: The bot ID to search within
             top_k: Number of top results to return
+            query_embedding: Precomputed query embedding
+            rewrites: Additional retrieval queries built from the conversation
+            rewrite_embeddings: Precomputed embeddings of the rewrites (see embed_queries)
+            rewrite_budget_ms: Time the rewrite searches may add (default from settings, 0 for no limit)
             
         Returns:
-            Tuple of (relevant documents, confidence score)
+            Tuple of (relevant documents, calibrated confidence)
         """
+        if top_k is None:
+            top_k = settings.retrieval_top_k
+        candidates = max(top_k, self.rerank_candidates) if self.reranker else top_k
+        
         # Retrieve documents
-        results = await self.retrieve_relevant_docs(query, bot_id, top_k)
+        results = await self.retrieve_relevant_docs(query, bot_id, candidates, query_embedding)
+        self._apply_keyword_boost(query, results)
+        
+        if rewrites:
+            budget_ms = settings.query_rewrite_budget_ms if rewrite_budget_ms is None else rewrite_budget_ms
+            deadline = time.perf_counter() + budget_ms / 1000 if budget_ms > 0 else None
+            rankings = [results]
+            for i, rewrite in enumerate(rewrites):
+                # Skip searches predicted to end past the deadline
+                if deadline is not None and time.perf_counter() + (self.search_seconds or 0.0) > deadline:
+                    break
+                embedding = rewrite_embeddings[i] if rewrite_embeddings else None
+                ranking = await self.retrieve_relevant_docs(rewrite, bot_id, candidates, embedding)
+                self._apply_keyword_boost(rewrite, ranking)
+                rankings.append(ranking)
+            if len(rankings) > 1:
+                results = reciprocal_rank_fusion(rankings)[:candidates]
         
         if not results:
             return [], 0.0
         
-        # Calculate overall confidence based on top result
-        confidence = results[0]["relevance"] if results else 0.0
-        
-        # Apply keyword boosting (simple implementation)
-        query_keywords = set(query.lower().split())
-        for result in results:
-            content_lower = result["content"].lower()
-            keyword_matches = sum(1 for kw in query_keywords if kw in content_lower)
-            
-            # Boost score if keywords match
-            if keyword_matches > 0:
-                boost = min(keyword_matches * 0.05, 0.2)  # Max 20% boost
-                result["relevance"] = min(result["relevance"] + boost, 1.0)
-        
-        # Re-sort by boosted relevance
-        results.sort(key=lambda x: x["relevance"], reverse=True)
+        # Cross-encoder inference is CPU-bound; keep it off the event loop.
+        # The most contextual rewrite reads best on its own.
+        if self.reranker:
+            rerank_query = rewrites[-1] if rewrites else query
+            results, _ = await asyncio.to_thread(self.reranker.rerank, rerank_query, results, top_k)
         
-        # Recalculate confidence
-        confidence = results[0]["relevance"] if results else 0.0
+        # Calculate overall confidence based on the best-matching result
+        confidence = self.calibrator.calibrate(bot_id, max(result["relevance"] for result in results))
         
         return results, confidence
     
+    def _apply_keyword_boost(self, query: str, results: List[Dict[str, Any]]):
+        """Boost the relevance of chunks containing query words and re-sort them (simple implementation)."""
+        with timed("keyword_boost"):
+            query_keywords = set(query.lower().split())
+            for result in results:
+                content_lower = result["content"].lower()
+                keyword_matches = sum(1 for kw in query_keywords if kw in content_lower)
+                
+                # Boost score if keywords match
+                if keyword_matches > 0:
+                    boost = min(keyword_matches * self.keyword_boost, self.keyword_boost_max)
+                    result["relevance"] = min(result["relevance"] + boost, 1.0)
+            
+            # Re-sort by boosted relevance
+            results.sort(key=lambda x: x["relevance"], reverse=True)
+    
     def check_collection_exists(self, bot_id: int) -> bool:
         """
         Check if a collection exists for a bot.
@@ -155,13 +282,18 @@ class DocumentRetriever:
         Returns:
             True if collection exists, False otherwise
         """
-        try:
-            collection_name = f"{settings.chroma_collection_name}_bot_{bot_id}"
-            self.chroma_client.get_collection(name=collection_name)
-            return True
-        except Exception:
-            return False
+        return self.vector_store.exists(bot_id)
+
+
+_document_retriever: Optional[DocumentRetriever] = None
+_document_retriever_lock = threading.Lock()
 
 
-# Global instance
-document_retriever = DocumentRetriever()
+def get_document_retriever() -> DocumentRetriever:
+    """Get the shared retriever, creating it on first use."""
+    global _document_retriever
+    if _document_retriever is None:
+        with _document_retriever_lock:
+            if _document_retriever is None:
+                _document_retriever = DocumentRetriever()
+    return _document_retriever
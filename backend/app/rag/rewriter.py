@@ -0,0 +1,163 @@
+"""
+Conversation-aware query construction for retrieval.
+Follow-ups like "what about the enterprise one?" say little on their own, so
+they retrieve poorly. The rewriter turns the latest message and the recent
+user turns into a few retrieval queries: the message itself, the message
+with "the X one" resolved against the previous question, and the message
+with the previous question's topic words carried over. The retriever embeds
+them in one batch, searches each and fuses the rankings.
+"""
+from typing import Dict, List, Optional
+import re
+
+from app.config import settings
+
+
+# Openers that continue the previous question rather than start a new one
+FOLLOW_UP_PREFIXES = (
+    "what about", "how about", "and ", "also", "tell me more", "more about",
+    "what if", "same for", "is it", "is that", "does it", "does that", "do they",
+    "can it", "which one", "how so"
+)
+
+# Words that point back at something mentioned earlier
+REFERENCE_WORDS = {
+    "it", "its", "that", "this", "those", "these", "they", "them", "their",
+    "one", "ones", "same", "other", "another", "else"
+}
+
+# Words that never carry the topic of a question
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "for", "with", "at", "by",
+    "from", "about", "as", "into", "than", "then", "so", "is", "are", "was", "were", "be", "been",
+    "do", "does", "did", "have", "has", "had", "can", "could", "will", "would", "should", "may",
+    "might", "must", "i", "me", "my", "we", "our", "you", "your", "he", "she", "it", "its", "they",
+    "them", "their", "this", "that", "these", "those", "what", "which", "who", "whom", "whose",
+    "when", "where", "why", "how", "much", "many", "any", "some", "all", "there", "here", "not",
+    "no", "yes", "please", "tell", "know", "want", "like", "get", "also", "more", "one", "ones",
+    "same", "other", "another", "else", "just", "really", "ok", "okay", "thanks", "hi", "hello"
+}
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9'$%.-]*[a-z0-9%]|[a-z0-9]")
+_ONE = re.compile(r"\b(the|a|an|that|this)\s+(\w+)\s+ones?\b", re.IGNORECASE)
+_NOUN_PHRASE = re.compile(r"\b(?:the|a|an|your|my|our)\s+(\w+)\s+([a-z]+)\b", re.IGNORECASE)
+
+
+def _content_words(text: str) -> List[str]:
+    """Topic words of a text, in order and without repeats."""
+    words: List[str] = []
+    for word in _WORD.findall(text.lower()):
+        if word not in STOPWORDS and word not in words:
+            words.append(word)
+    return words
+
+
+class QueryRewriter:
+    """Builds retrieval queries for a message from the recent conversation."""
+
+    def __init__(
+        self,
+        max_queries: Optional[int] = None,
+        history_turns: Optional[int] = None,
+        max_follow_up_words: int = 10,
+        max_carried_words: int = 6
+    ):
+        """
+        Initialize the rewriter.
+
+        Args:
+            max_queries: Most retrieval queries per message, including the message itself (default from settings)
+            history_turns: Previous user messages considered (default from settings)
+            max_follow_up_words: Longest message still treated as a possible follow-up
+            max_carried_words: Most topic words carried over from earlier messages
+        """
+        self.max_queries = max_queries or settings.query_rewrite_max_queries
+        self.history_turns = history_turns or settings.query_rewrite_history_turns
+        self.max_follow_up_words = max_follow_up_words
+        self.max_carried_words = max_carried_words
+
+    def is_follow_up(self, query: str) -> bool:
+        """
+        Check whether a message depends on the previous turns.
+
+        Args:
+            query: The user's latest message
+
+        Returns:
+            True for short messages that refer back ("what about it?", "the enterprise one?")
+        """
+        words = _WORD.findall(query.lower())
+        if not words or len(words) > self.max_follow_up_words:
+            return False
+        normalized = " ".join(words) + " "
+        return normalized.startswith(FOLLOW_UP_PREFIXES) or any(word in REFERENCE_WORDS for word in words)
+
+    def _previous_questions(self, query: str, conversation_history: Optional[List[Dict[str, str]]]) -> List[str]:
+        """Earlier user messages, most recent first, excluding the current one."""
+        questions: List[str] = []
+        skipped_current = False
+        for message in reversed(conversation_history or []):
+            if message.get("role") != "user":
+                continue
+            content = message.get("content", "")
+            if not skipped_current and content.strip() == query.strip():
+                skipped_current = True  # The history already includes the latest message
+                continue
+            skipped_current = True
+            questions.append(content)
+            if len(questions) >= self.history_turns:
+                break
+        return questions
+
+    def rewrite(self, query: str, conversation_history: Optional[List[Dict[str, str]]] = None) -> List[str]:
+        """
+        Build retrieval queries for a message.
+
+        Args:
+            query: The user's latest message
+            conversation_history: Previous messages (role and content), oldest first
+
+        Returns:
+            Retrieval queries, the message itself first; just [query] for
+            standalone messages
+        """
+        if self.max_queries <= 1 or not self.is_follow_up(query):
+            return [query]
+        previous = self._previous_questions(query, conversation_history)
+        if not previous:
+            return [query]
+
+        queries = [query]
+        previous_words = [word for text in previous for word in _content_words(text)]
+
+        # Resolve "the enterprise one" to "the enterprise plan" with the head
+        # noun of the previous question ("the professional plan")
+        phrases = [
+            (match.group(1).lower(), match.group(2).lower())
+            for match in _NOUN_PHRASE.finditer(previous[0])
+            if match.group(2).lower() not in STOPWORDS
+        ]
+        modifier, head = phrases[-1] if phrases else (None, None)
+        if head is None:
+            head = next((word for word in reversed(_content_words(previous[0])) if word.isalpha()), None)
+        replaced = set()
+        if head:
+            resolved = _ONE.sub(lambda match: f"{match.group(1)} {match.group(2)} {head}", query)
+            if resolved != query:
+                queries.append(resolved)
+                replaced.add(modifier)  # "enterprise" replaces "professional"; don't carry both
+
+        # Carry the earlier topic words the message leaves out
+        query_words = set(_content_words(queries[-1]))
+        carried = []
+        for word in previous_words:
+            if word not in query_words and word not in replaced and word not in carried:
+                carried.append(word)
+        if carried:
+            queries.append(f"{queries[-1]} {' '.join(carried[:self.max_carried_words])}")
+
+        return queries[:self.max_queries]
+
+
+# Global instance
+query_rewriter = QueryRewriter()
@@ -0,0 +1,141 @@
+"""
+Per-bot knowledge base statistics.
+Kept up to date by the ingestion and deletion paths so listing endpoints
+never have to count vectors in ChromaDB. Every change also bumps the bot's
+knowledge base version, which the semantic cache and retrieval prefetching
+compare against, in every worker and process.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import KnowledgeBaseStats
+
+
+async def _apply_delta(
+    db: AsyncSession,
+    bot_id: int,
+    documents: int,
+    chunks: int,
+    tokens: int,
+    size_bytes: int,
+    ingested: bool
+) -> None:
+    """Add deltas to a bot's stats row, creating it if needed, and bump its version."""
+    now = datetime.utcnow()
+    values = {
+        "document_count": KnowledgeBaseStats.document_count + documents,
+        "chunk_count": KnowledgeBaseStats.chunk_count + chunks,
+        "token_count": KnowledgeBaseStats.token_count + tokens,
+        "byte_count": KnowledgeBaseStats.byte_count + size_bytes,
+        "updated_at": now,
+        # Committed with the change, so cached answers go stale exactly when it lands
+        "version": KnowledgeBaseStats.version + 1
+    }
+    if ingested:
+        values["last_ingested_at"] = now
+
+    # One upsert, so concurrent first uploads for a bot cannot both insert
+    statement = insert(KnowledgeBaseStats).values(
+        bot_id=bot_id,
+        document_count=max(documents, 0),
+        chunk_count=max(chunks, 0),
+        token_count=max(tokens, 0),
+        byte_count=max(size_bytes, 0),
+        last_ingested_at=now if ingested else None,
+        updated_at=now,
+        version=1
+    )
+    await db.execute(statement.on_conflict_do_update(index_elements=[KnowledgeBaseStats.bot_id], set_=values))
+
+
+async def record_ingestion(
+    db: AsyncSession,
+    bot_id: int,
+    documents: int,
+    chunks: int,
+    tokens: int,
+    size_bytes: int
+) -> None:
+    """
+    Record newly ingested documents in a bot's stats.
+    The caller commits the session.
+
+    Args:
+        db: Database session
+        bot_id: The bot the documents belong to
+        documents: Number of documents ingested
+        chunks: Number of chunks embedded
+        tokens: Estimated token count of the documents
+        size_bytes: Uncompressed size of the documents in bytes
+    """
+    await _apply_delta(db, bot_id, documents, chunks, tokens, size_bytes, ingested=True)
+
+
+async def record_deletion(
+    db: AsyncSession,
+    bot_id: int,
+    chunks: int,
+    tokens: int,
+    size_bytes: int
+) -> None:
+    """
+    Record a deleted document in a bot's stats.
+    The caller commits the session.
+
+    Args:
+        db: Database session
+        bot_id: The bot the document belonged to
+        chunks: Number of chunks the document had
+        tokens: Estimated token count of the document
+        size_bytes: Uncompressed size of the document in bytes
+    """
+    await _apply_delta(db, bot_id, -1, -chunks, -tokens, -size_bytes, ingested=False)
+
+
+async def get_knowledge_base_version(db: AsyncSession, bot_id: int) -> int:
+    """
+    Get a bot's knowledge base version.
+
+    Args:
+        db: Database session
+        bot_id: The bot
+
+    Returns:
+        Number of committed knowledge base changes (0 for a bot without documents)
+    """
+    result = await db.execute(
+        select(KnowledgeBaseStats.version).where(KnowledgeBaseStats.bot_id == bot_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+
+def serialize_stats(stats: Optional[KnowledgeBaseStats]) -> Dict[str, Any]:
+    """
+    Convert a stats row into a response dictionary.
+
+    Args:
+        stats: Stats row, or None for a bot without documents
+
+    Returns:
+        Dictionary with document, chunk, token and byte counts
+    """
+    if stats is None:
+        return {
+            "documents": 0,
+            "chunks": 0,
+            "tokens": 0,
+            "bytes": 0,
+            "last_ingested_at": None
+        }
+
+    return {
+        "documents": stats.document_count,
+        "chunks": stats.chunk_count,
+        "tokens": stats.token_count,
+        "bytes": stats.byte_count,
+        "last_ingested_at": stats.last_ingested_at.isoformat() if stats.last_ingested_at else None
+    }
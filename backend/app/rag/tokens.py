@@ -0,0 +1,23 @@
+"""
+Token counting helpers for knowledge base accounting and context budgets.
+"""
+import re
+
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text.
+
+    Approximates WordPiece tokenization: every word or punctuation mark is
+    one token, and long words are split into additional ~8 character pieces.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return sum(1 + (len(piece) - 1) // 8 for piece in _WORD_PATTERN.findall(text))
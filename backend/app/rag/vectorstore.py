@@ -0,0 +1,836 @@
+"""
+Vector store backends for per-bot knowledge bases.
+ChromaDB is the default; the in-process NumPy and HNSW backends keep each
+bot's normalized embeddings in a memory-mapped file and search them without
+a client round-trip.
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.config import settings
+from app.rag.quantization import (
+    hamming_distances,
+    pack_binary,
+    binary_similarities,
+    dequantize_int8,
+    quantize_int8,
+    unpack_binary,
+    validate_quantization,
+)
+
+
+class VectorStore(ABC):
+    """Interface shared by all vector store backends."""
+
+    # Largest number of records accepted by a single add() call
+    max_batch_size: int = 5000
+
+    # Whether bots can store int8 or binary quantized embeddings
+    supports_quantization: bool = False
+
+    @abstractmethod
+    def add(
+        self,
+        bot_id: int,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Add embedded chunks to a bot's collection.
+
+        Args:
+            bot_id: The bot the chunks belong to
+            ids: Unique chunk IDs
+            embeddings: Chunk embeddings
+            documents: Chunk texts
+            metadatas: Chunk metadata
+        """
+
+    @abstractmethod
+    def query(self, bot_id: int, embedding: List[float], k: int) -> List[Dict[str, Any]]:
+        """
+        Find the chunks nearest to a query embedding.
+
+        Args:
+            bot_id: The bot to search within
+            embedding: Query embedding
+            k: Number of results
+
+        Returns:
+            List of results with id, content, metadata and distance (cosine
+            distance, 1 - cosine similarity), nearest first
+        """
+
+    @abstractmethod
+    def delete_document(self, bot_id: int, document_id: int) -> None:
+        """
+        Remove every chunk of a document from a bot's collection.
+
+        Args:
+            bot_id: The bot the document belongs to
+            document_id: The database ID of the document
+        """
+
+    @abstractmethod
+    def count(self, bot_id: int) -> int:
+        """Get the number of chunks stored for a bot."""
+
+    @abstractmethod
+    def exists(self, bot_id: int) -> bool:
+        """Check whether a bot has a collection."""
+
+    def collection_name(self, bot_id: int) -> str:
+        """Get the collection name used for a bot."""
+        return f"{settings.chroma_collection_name}_bot_{bot_id}"
+
+    def get_quantization(self, bot_id: int) -> str:
+        """Get the quantization mode of a bot's collection."""
+        return "none"
+
+    def set_quantization(self, bot_id: int, mode: str) -> None:
+        """
+        Switch a bot's collection to another quantization mode, re-encoding
+        any embeddings it already holds.
+
+        Args:
+            bot_id: The bot whose collection to convert
+            mode: "none", "int8" or "binary"
+
+        Raises:
+            ValueError: If the mode is unknown or the backend cannot quantize
+        """
+        if validate_quantization(mode) != "none":
+            raise ValueError(f"The {type(self).__name__} backend does not support quantized embeddings")
+
+
+class ChromaVectorStore(VectorStore):
+    """Vector store backed by a persistent ChromaDB client."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the ChromaDB client.
+
+        Args:
+            path: ChromaDB directory (default from settings)
+        """
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        self.client = chromadb.PersistentClient(
+            path=path or settings.chroma_path,
+            settings=ChromaSettings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+        get_max_batch_size = getattr(self.client, "get_max_batch_size", None)
+        if get_max_batch_size is not None:
+            self.max_batch_size = get_max_batch_size()
+
+    def add(
+        self,
+        bot_id: int,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Add embedded chunks to the bot's collection, in batches ChromaDB accepts."""
+        collection = self.client.get_or_create_collection(
+            name=self.collection_name(bot_id),
+            embedding_function=None,
+            metadata={"hnsw:space": "cosine"}
+        )
+        for start in range(0, len(ids), self.max_batch_size):
+            end = start + self.max_batch_size
+            collection.add(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=documents[start:end],
+                metadatas=metadatas[start:end]
+            )
+
+    def query(self, bot_id: int, embedding: List[float], k: int) -> List[Dict[str, Any]]:
+        """Find the nearest chunks with ChromaDB's HNSW index, as cosine distances."""
+        collection = self.client.get_collection(name=self.collection_name(bot_id))
+        results = collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
+        # Collections created before cosine space use squared L2, which is
+        # twice the cosine distance for the unit vectors we store
+        scale = 0.5 if (collection.metadata or {}).get("hnsw:space", "l2") == "l2" else 1.0
+        return [
+            {"id": chunk_id, "content": content, "metadata": metadata or {}, "distance": float(distance) * scale}
+            for chunk_id, content, metadata, distance in zip(
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0]
+            )
+        ]
+
+    def delete_document(self, bot_id: int, document_id: int) -> None:
+        """Remove a document's chunks by their document_id metadata."""
+        collection = self.client.get_collection(name=self.collection_name(bot_id))
+        collection.delete(where={"document_id": document_id})
+
+    def count(self, bot_id: int) -> int:
+        """Get the number of chunks in the bot's collection (0 if it has none)."""
+        try:
+            return self.client.get_collection(name=self.collection_name(bot_id)).count()
+        except Exception:
+            return 0
+
+    def exists(self, bot_id: int) -> bool:
+        """Check whether ChromaDB has a collection for the bot."""
+        try:
+            self.client.get_collection(name=self.collection_name(bot_id))
+            return True
+        except Exception:
+            return False
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+@contextmanager
+def _exclusive_file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on a file, shared with other processes (workers, the bulk ingestion CLI)."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_atomically(path: str, data: bytes):
+    """Write a file under a temporary name and rename it into place."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class _NumpyIndex:
+    """
+    One bot's embedding matrix in memory-mapped files plus its records.
+    The manifest names the current file of every array and publishes the row
+    count; readers never look past it. Appends grow the current files in
+    place. Rewrites and conversions write new files, named after the next
+    generation, and publish them with the manifest, so a reader always maps
+    files that match the count it read. Writers hold an exclusive file lock,
+    so several processes can share an index.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dtype: np.dtype,
+        quantization: str = "none",
+        rescore_multiplier: int = 20,
+        rescore_dtype: Optional[np.dtype] = np.dtype(np.float16)
+    ):
+        self.path = path
+        self.default_dtype = dtype
+        self.rescore_dtype = rescore_dtype
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        # Precision of the stored vectors; None when a quantized index keeps only its codes
+        self.dtype: Optional[np.dtype] = self._vectors_dtype(quantization)
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.lock_path = os.path.join(path, "write.lock")
+
+        self.manifest: Dict[str, Any] = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.records: List[Dict[str, Any]] = []
+        self._loaded_stamp: Optional[tuple] = None
+
+        # Guards loading, searching and writing within the process; the file
+        # lock guards writes across processes
+        self.lock = threading.RLock()
+        self._write_depth = 0
+
+    @property
+    def count(self) -> int:
+        return self.manifest.get("count", 0)
+
+    @property
+    def matrix(self) -> Optional[np.ndarray]:
+        return self.arrays.get("vectors")
+
+    @property
+    def generation(self) -> int:
+        return self.manifest.get("generation", 0)
+
+    def _has_manifest(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def exists(self) -> bool:
+        """Whether the index has ever held vectors (a mode set on an empty bot does not count)."""
+        return self._has_manifest() and bool(self.manifest.get("dim"))
+
+    def _file_path(self, file_name: str) -> str:
+        return os.path.join(self.path, file_name)
+
+    @staticmethod
+    def _file_name(name: str, generation: int) -> str:
+        return f"{name}.{generation}.jsonl" if name == "records" else f"{name}.{generation}.bin"
+
+    @contextmanager
+    def _file_locked(self) -> Iterator[None]:
+        """Hold the cross-process write lock (re-entrant within the process)."""
+        with self.lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+
+            os.makedirs(self.path, exist_ok=True)
+            with _exclusive_file_lock(self.lock_path):
+                self._write_depth = 1
+                try:
+                    yield
+                finally:
+                    self._write_depth = 0
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Hold the write locks and start from the index's latest state."""
+        with self._file_locked():
+            self.refresh()
+            yield
+
+    def _vectors_dtype(self, quantization: str) -> Optional[np.dtype]:
+        """Precision a mode stores vectors in: the store's dtype, or the rescoring copy's."""
+        return self.default_dtype if quantization == "none" else self.rescore_dtype
+
+    def _layout(self, quantization: str, dim: int, dtype: Optional[np.dtype]) -> Dict[str, tuple]:
+        """
+        Arrays used by a quantization mode: name -> (dtype, row width or None for scalars).
+        Quantized modes keep the compact codes that every query scans, plus (unless
+        dtype is None) a memory-mapped rescoring copy of the vectors, of which
+        searches only read the rows they rescore.
+        """
+        layout = {"vectors": (dtype, dim)} if dtype is not None else {}
+        if quantization == "int8":
+            layout["codes"] = (np.dtype(np.int8), dim)
+            layout["scales"] = (np.dtype(np.float32), None)
+        elif quantization == "binary":
+            layout["bits"] = (np.dtype(np.uint8), (dim + 7) // 8)
+        return layout
+
+    def _encode_codes(self, vectors: np.ndarray, quantization: str) -> Dict[str, np.ndarray]:
+        """Encode normalized float32 vectors into the scanned arrays of a quantization mode."""
+        if quantization == "int8":
+            codes, scales = quantize_int8(vectors)
+            return {"codes": codes, "scales": scales}
+        if quantization == "binary":
+            return {"bits": pack_binary(vectors)}
+        return {}
+
+    def _encode(self, vectors: np.ndarray, quantization: str) -> Dict[str, np.ndarray]:
+        """Encode normalized float32 vectors into every array of the index's current layout."""
+        arrays = self._encode_codes(vectors, quantization)
+        if self.dtype is not None:
+            arrays["vectors"] = vectors.astype(self.dtype)
+        return arrays
+
+    def _float_vectors(self) -> np.ndarray:
+        """The rows as float32, decoded from the codes if the index keeps no vectors."""
+        if self.matrix is not None:
+            return np.asarray(self.matrix, dtype=np.float32)
+        if self.quantization == "int8":
+            vectors = dequantize_int8(self.arrays["codes"], self.arrays["scales"])
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        return unpack_binary(self.arrays["bits"], self.manifest["dim"])
+
+    def refresh(self):
+        """Reload the index if another process or thread changed it."""
+        with self.lock:
+            # A rewrite may delete the files of the manifest just read; read it again
+            for attempt in range(3):
+                try:
+                    self._load()
+                    return
+                except FileNotFoundError:
+                    if attempt == 2:
+                        raise
+
+    def _load(self):
+        if not self._has_manifest():
+            return
+        stat = os.stat(self.manifest_path)
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp == self._loaded_stamp:
+            return
+
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        self.manifest = manifest
+        self.dtype = np.dtype(manifest["dtype"]) if manifest.get("dtype") else None
+        self.quantization = manifest.get("quantization", "none")
+
+        count = manifest["count"]
+        files = manifest.get("files", {})
+        arrays = {}
+        records = []
+        if count:
+            for name, (dtype, width) in self._layout(self.quantization, manifest["dim"], self.dtype).items():
+                shape = (count, width) if width else (count,)
+                arrays[name] = np.memmap(self._file_path(files[name]), dtype=dtype, mode="r", shape=shape)
+
+            # Records beyond the manifest count belong to an unfinished append
+            with open(self._file_path(files["records"]), encoding="utf-8") as f:
+                for line in f:
+                    if len(records) == count:
+                        break
+                    records.append(json.loads(line))
+
+        self.arrays = arrays
+        self.records = records
+        self._loaded_stamp = stamp
+        self._after_load()
+
+    def _after_load(self):
+        """Hook for subclasses that keep extra in-memory structures (runs under the index lock)."""
+
+    def _write_manifest(self, count: int, dim: int, records_bytes: int, generation: int, files: Dict[str, str]):
+        """Atomically publish a new row count and the files holding the rows."""
+        _write_atomically(self.manifest_path, json.dumps({
+            "count": count,
+            "dim": dim,
+            "dtype": self.dtype.name if self.dtype is not None else None,
+            "quantization": self.quantization,
+            "records_bytes": records_bytes,
+            "generation": generation,
+            "files": files
+        }).encode("utf-8"))
+
+    @staticmethod
+    def _encode_records(records: List[Dict[str, Any]]) -> bytes:
+        return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+    def append(self, vectors: np.ndarray, records: List[Dict[str, Any]]):
+        """Append normalized vectors and their records."""
+        with self._writing():
+            if self.count and vectors.shape[1] != self.manifest["dim"]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index ({self.manifest['dim']})")
+
+            files = dict(self.manifest.get("files", {}))
+            arrays = self._encode(vectors, self.quantization)
+            arrays["records"] = None
+            # Truncate leftovers from an interrupted append before writing
+            records_bytes = self.manifest.get("records_bytes", 0)
+            encoded_records = self._encode_records(records)
+            for name, data in arrays.items():
+                file_name = files.setdefault(name, self._file_name(name, self.generation))
+                if data is None:
+                    size, payload = records_bytes, encoded_records
+                else:
+                    size, payload = self.count * data.itemsize * int(np.prod(data.shape[1:])), data.tobytes()
+                with open(self._file_path(file_name), "ab") as f:
+                    f.truncate(size)
+                    f.write(payload)
+
+            self._write_manifest(
+                self.count + len(records),
+                vectors.shape[1],
+                records_bytes + len(encoded_records),
+                self.generation,
+                files
+            )
+            self.refresh()
+
+    def _replace(
+        self,
+        arrays: Dict[str, np.ndarray],
+        records: Optional[List[Dict[str, Any]]],
+        quantization: str,
+        dtype: Optional[np.dtype]
+    ):
+        """
+        Replace files of the index under a new generation, possibly switching
+        quantization mode and vector precision. Arrays not given (such as
+        unchanged vectors, or records when None) keep their files.
+        Must be called while writing.
+        """
+        dim = self.manifest.get("dim", 0)
+        generation = self.generation + 1
+        previous_files = dict(self.manifest.get("files", {}))
+        files = {
+            name: file_name for name, file_name in previous_files.items()
+            if name == "records" or name in self._layout(quantization, dim, dtype)
+        }
+
+        for name, data in arrays.items():
+            files[name] = self._file_name(name, generation)
+            _write_atomically(self._file_path(files[name]), data.tobytes())
+        if records is None:
+            records_bytes = self.manifest.get("records_bytes", 0)
+            count = self.count
+        else:
+            encoded_records = self._encode_records(records)
+            files["records"] = self._file_name("records", generation)
+            _write_atomically(self._file_path(files["records"]), encoded_records)
+            records_bytes = len(encoded_records)
+            count = len(records)
+
+        # Publishing the manifest switches readers to the new files; a new
+        # generation also tells derived structures (HNSW graphs) to rebuild
+        self.quantization = quantization
+        self.dtype = dtype
+        self._write_manifest(count, dim, records_bytes, generation, files)
+
+        for file_name in set(previous_files.values()) - set(files.values()):
+            try:
+                os.remove(self._file_path(file_name))
+            except OSError:
+                pass  # Still mapped by a reader on Windows; no manifest refers to it
+        self.refresh()
+
+    def delete_document(self, document_id: int):
+        """Rewrite the index without the rows of a document."""
+        with self._writing():
+            keep = np.array(
+                [i for i, record in enumerate(self.records) if record["metadata"].get("document_id") != document_id],
+                dtype=np.int64
+            )
+            if len(keep) == self.count:
+                return
+            arrays = {name: np.asarray(array[keep]) for name, array in self.arrays.items()}
+            self._replace(arrays, [self.records[i] for i in keep], self.quantization, self.dtype)
+
+    def convert(self, quantization: str):
+        """
+        Switch the index to another quantization mode. Codes are encoded from the
+        stored vectors, which are kept, re-encoded in the new mode's precision or
+        dropped. Converting back is lossless only from a float32 rescoring copy;
+        without any copy the vectors are decoded from the codes.
+        """
+        with self._writing():
+            if self._has_manifest() and quantization == self.quantization:
+                return
+            dtype = self._vectors_dtype(quantization)
+            # Without rows there is nothing to encode: the mode is only remembered
+            # for the first append (exists() stays false until vectors arrive)
+            arrays = {}
+            if self.count:
+                vectors = self._float_vectors()
+                arrays = self._encode_codes(vectors, quantization)
+                if dtype is not None and dtype != self.dtype:
+                    arrays["vectors"] = vectors.astype(dtype)
+            self._replace(arrays, None, quantization, dtype)
+
+    def similarities(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of the query to every row, or to the selected rows, at full precision."""
+        return self._blocked_dot(self.matrix if rows is None else self.matrix[rows], query)
+
+    @staticmethod
+    def _blocked_dot(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Dot products with the query, upcasting half-precision and int8 rows in cache-sized blocks."""
+        if matrix.dtype == np.float32:
+            return matrix @ query
+        scores = np.empty(len(matrix), dtype=np.float32)
+        block = 1024
+        for start in range(0, len(matrix), block):
+            scores[start:start + block] = matrix[start:start + block].astype(np.float32) @ query
+        return scores
+
+    def search(self, query: np.ndarray, k: int) -> List[tuple]:
+        """Return (row, similarity) pairs for the top-k rows."""
+        k = min(k, self.count)
+        if self.quantization == "none":
+            scores = self.similarities(query)
+            return [(int(row), float(scores[row])) for row in _top_k(scores, k)]
+
+        # Scan the compact codes, then rescore the best candidates with the vectors
+        if self.quantization == "binary":
+            distances = hamming_distances(self.arrays["bits"], pack_binary(query))
+            approximate = binary_similarities(distances, self.manifest["dim"])
+        else:
+            approximate = self._blocked_dot(self.arrays["codes"], query) * self.arrays["scales"]
+        if self.matrix is None:
+            return [(int(row), float(approximate[row])) for row in _top_k(approximate, k)]
+        candidates = np.sort(_top_k(approximate, min(k * self.rescore_multiplier, self.count)))
+        scores = self.similarities(query, candidates)
+        return [(int(candidates[i]), float(scores[i])) for i in _top_k(scores, k)]
+
+
+class _HnswIndex(_NumpyIndex):
+    """NumPy index with an HNSW graph for approximate search on large corpora."""
+
+    def __init__(self, path: str, dtype: np.dtype, **kwargs):
+        super().__init__(path, dtype, **kwargs)
+        self.graph_path = os.path.join(path, "hnsw.bin")
+        self.graph_meta_path = os.path.join(path, "hnsw.json")
+        self.graph = None
+        self.graph_rows = 0
+        self.graph_generation = -1
+
+    def _load_graph(self, generation: int):
+        """Load the saved graph if it matches this generation, else start an empty one."""
+        import hnswlib
+
+        graph = hnswlib.Index(space="ip", dim=self.manifest["dim"])
+        saved = {}
+        if os.path.exists(self.graph_meta_path):
+            with open(self.graph_meta_path) as f:
+                saved = json.load(f)
+
+        if saved.get("generation") == generation and 0 < saved.get("rows", 0) <= self.count:
+            graph.load_index(self.graph_path, max_elements=max(self.count, 1))
+            self.graph_rows = saved["rows"]
+        else:
+            graph.init_index(
+                max_elements=max(self.count, 1),
+                M=settings.hnsw_m,
+                ef_construction=settings.hnsw_ef_construction
+            )
+            self.graph_rows = 0
+
+        self.graph = graph
+        self.graph_generation = generation
+
+    def _after_load(self):
+        """Bring the graph up to date with the loaded rows and save it for other processes."""
+        if not self.count:
+            return
+        generation = self.generation
+        if self.graph is None or self.graph_generation != generation or self.graph_rows > self.count:
+            self._load_graph(generation)
+
+        # Insert rows appended since the graph was last saved
+        if self.graph_rows < self.count:
+            self.graph.resize_index(self.count)
+            new_rows = np.asarray(self.matrix[self.graph_rows:self.count], dtype=np.float32)
+            self.graph.add_items(new_rows, np.arange(self.graph_rows, self.count))
+            self.graph_rows = self.count
+            with self._file_locked():
+                tmp_path = self.graph_path + ".tmp"
+                self.graph.save_index(tmp_path)
+                os.replace(tmp_path, self.graph_path)
+                _write_atomically(
+                    self.graph_meta_path,
+                    json.dumps({"generation": generation, "rows": self.graph_rows}).encode("utf-8")
+                )
+
+    def search(self, query: np.ndarray, k: int) -> List[tuple]:
+        """Return (row, similarity) pairs for the approximate top-k rows."""
+        k = min(k, self.count)
+        self.graph.set_ef(max(settings.hnsw_ef_search, k))
+        labels, distances = self.graph.knn_query(query.reshape(1, -1), k=k)
+        # hnswlib's inner-product distance is 1 - similarity
+        return [(int(row), 1.0 - float(distance)) for row, distance in zip(labels[0], distances[0])]
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector store doing exact search with a vectorized dot product."""
+
+    index_class = _NumpyIndex
+    max_batch_size = 100000
+    supports_quantization = True
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dtype: Optional[str] = None,
+        quantization: Optional[str] = None,
+        rescore_multiplier: Optional[int] = None,
+        rescore_dtype: Optional[str] = None
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            path: Directory holding one sub-directory per bot (default from settings)
+            dtype: Storage precision for new indexes, "float32" or "float16"
+            quantization: Default mode for new indexes, "none", "int8" or "binary"
+            rescore_multiplier: Quantized searches rescore k * multiplier candidates
+            rescore_dtype: Precision of the copy quantized indexes rescore with,
+                "float32", "float16" or "none" to keep only the codes
+        """
+        self.path = path or settings.vector_store_path
+        self.dtype = np.dtype(dtype or settings.vector_store_dtype)
+        self.quantization = validate_quantization(quantization or settings.vector_quantization)
+        self.rescore_multiplier = rescore_multiplier or settings.vector_rescore_multiplier
+        rescore_dtype = rescore_dtype or settings.vector_rescore_dtype
+        self.rescore_dtype = None if rescore_dtype == "none" else np.dtype(rescore_dtype)
+        self._indexes: Dict[int, _NumpyIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, bot_id: int) -> _NumpyIndex:
+        """Get a bot's index, reloaded if another process or thread changed it."""
+        with self._lock:
+            index = self._indexes.get(bot_id)
+            if index is None:
+                index = self.index_class(
+                    os.path.join(self.path, self.collection_name(bot_id)),
+                    self.dtype,
+                    quantization=self.quantization,
+                    rescore_multiplier=self.rescore_multiplier,
+                    rescore_dtype=self.rescore_dtype
+                )
+                self._indexes[bot_id] = index
+        index.refresh()
+        return index
+
+    @staticmethod
+    def _normalize(embeddings: Any) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(
+        self,
+        bot_id: int,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Append normalized embeddings and their records to the bot's index files."""
+        records = [
+            {"id": chunk_id, "content": content, "metadata": metadata}
+            for chunk_id, content, metadata in zip(ids, documents, metadatas)
+        ]
+        self._index(bot_id).append(self._normalize(embeddings), records)
+
+    def query(self, bot_id: int, embedding: List[float], k: int) -> List[Dict[str, Any]]:
+        """Find the nearest chunks by cosine similarity to the normalized query."""
+        index = self._index(bot_id)
+        query = self._normalize(embedding)
+        # A concurrent reload must not swap rows and records mid-search
+        with index.lock:
+            if not index.count:
+                return []
+            return [
+                {
+                    "id": index.records[row]["id"],
+                    "content": index.records[row]["content"],
+                    "metadata": index.records[row]["metadata"],
+                    "distance": max(1.0 - similarity, 0.0)
+                }
+                for row, similarity in index.search(query, k)
+            ]
+
+    def delete_document(self, bot_id: int, document_id: int) -> None:
+        """Rewrite the bot's index without the document's rows."""
+        self._index(bot_id).delete_document(document_id)
+
+    def count(self, bot_id: int) -> int:
+        """Get the number of rows in the bot's index."""
+        return self._index(bot_id).count
+
+    def exists(self, bot_id: int) -> bool:
+        """Check whether the bot's index has ever held vectors."""
+        return self._index(bot_id).exists()
+
+    def get_quantization(self, bot_id: int) -> str:
+        """Get the quantization mode of the bot's index."""
+        return self._index(bot_id).quantization
+
+    def set_quantization(self, bot_id: int, mode: str) -> None:
+        """Switch the bot's index to another quantization mode (see _NumpyIndex.convert)."""
+        self._index(bot_id).convert(validate_quantization(mode))
+
+
+class HnswVectorStore(NumpyVectorStore):
+    """In-process vector store with an HNSW graph (requires hnswlib)."""
+
+    index_class = _HnswIndex
+
+    # hnswlib keeps float32 copies of every vector, so quantization would not save memory
+    supports_quantization = False
+    get_quantization = VectorStore.get_quantization
+    set_quantization = VectorStore.set_quantization
+
+    def __init__(self, path: Optional[str] = None, dtype: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            path: Directory holding one sub-directory per bot (default from settings)
+            dtype: Storage precision for new indexes, "float32" or "float16"
+        """
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError as e:
+            raise ImportError("The hnsw vector store backend requires hnswlib: pip install hnswlib") from e
+        super().__init__(path, dtype, quantization="none")
+
+
+VECTOR_STORE_BACKENDS = {
+    "chroma": ChromaVectorStore,
+    "numpy": NumpyVectorStore,
+    "hnsw": HnswVectorStore,
+}
+
+
+def create_vector_store(backend: Optional[str] = None, **kwargs) -> VectorStore:
+    """
+    Create a vector store for the configured backend.
+
+    Args:
+        backend: "chroma", "numpy" or "hnsw" (default from settings)
+        **kwargs: Backend-specific options such as path
+
+    Returns:
+        Vector store instance
+    """
+    backend = (backend or settings.vector_store_backend).lower()
+    if backend not in VECTOR_STORE_BACKENDS:
+        raise ValueError(f"Unknown vector store backend: {backend}")
+    return VECTOR_STORE_BACKENDS[backend](**kwargs)
+
+
+_vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Get the shared vector store, creating it on first use."""
+    global _vector_store
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = create_vector_store()
+    return _vector_store
+
+
+def vector_store_loaded() -> bool:
+    """Check whether the shared vector store has been created."""
+    return _vector_store is not None
@@ -1,7 +1,7 @@
 """
 Pydantic schemas for request/response validation.
 """
-from app.schemas.bot import BotCreate, BotResponse
+from app.schemas.bot import BotCreate, BotResponse, BotUpdate
 from app.schemas.chat import (
     SessionCreate,
     SessionResponse,
@@ -17,6 +17,7 @@ from app.schemas.stats import DashboardStatsResponse
 __all__ = [
     "BotCreate",
     "BotResponse",
+    "BotUpdate",
     "SessionCreate",
     "SessionResponse",
     "MessageCreate",
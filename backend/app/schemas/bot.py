@@ -3,7 +3,10 @@ Bot-related Pydantic schemas.
 """
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
+
+
+QuantizationMode = Literal["none", "int8", "binary"]
 
 
 class BotCreate(BaseModel):
@@ -11,6 +14,7 @@ class BotCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
     system_prompt: str = Field(..., min_length=1)
     welcome_message: str = Field(..., min_length=1)
+    embedding_quantization: Optional[QuantizationMode] = None
 
 
 class BotResponse(BaseModel):
@@ -19,6 +23,7 @@ class BotResponse(BaseModel):
     name: str
     system_prompt: str
     welcome_message: str
+    embedding_quantization: Optional[str] = None
     created_at: datetime
     
     model_config = {"from_attributes": True}
@@ -29,3 +34,4 @@ class BotUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=255)
     system_prompt: Optional[str] = Field(None, min_length=1)
     welcome_message: Optional[str] = Field(None, min_length=1)
+    embedding_quantization: Optional[QuantizationMode] = None
@@ -0,0 +1,492 @@
+"""
+Request tracing for chat turns, uploads and REST requests.
+Every chat turn and upload gets a trace id and a span, and every pipeline
+stage timed with app.metrics.timed() becomes a child span. Finished spans
+go through a queue-based logging handler, so the request path only
+enqueues. A listener thread writes them as JSON lines and, if
+OTLP_ENDPOINT is set, batches them to an OpenTelemetry collector
+(OTLP/HTTP JSON). Application log records (the "app" loggers) share the
+queue and listener.
+"""
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.profiling import slow_traces
+
+
+TRACE_LOGGER = "chatbot.trace"
+
+# Parent of the application's module loggers (logging.getLogger(__name__))
+APP_LOGGER = "app"
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_ERROR = 2
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Trace and parent span id from a W3C traceparent header, if valid."""
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2]
+
+
+class RequestTrace:
+    """Span of one chat turn, upload or REST request and its stage spans."""
+
+    def __init__(
+        self,
+        kind: str,
+        attributes: Dict[str, Any],
+        trace_id: Optional[str] = None,
+        parent_span_id: Optional[str] = None
+    ):
+        self.kind = kind
+        self.attributes = attributes
+        self.trace_id = trace_id or new_trace_id()
+        self.span_id = new_span_id()
+        self.parent_span_id = parent_span_id
+        self.started_at = datetime.utcnow()
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.stages: List[Dict[str, Any]] = []
+        self.error = False
+
+    def record(self, stage: str, started: float, seconds: float, error: bool = False):
+        """Add a stage that started at perf_counter() time `started`."""
+        entry = {
+            "stage": stage,
+            "span_id": new_span_id(),
+            "offset_ms": round((started - self.start) * 1000, 2),
+            "duration_ms": round(seconds * 1000, 2)
+        }
+        if error:
+            entry["error"] = True
+        self.stages.append(entry)
+
+    def to_dict(self, total_seconds: float) -> Dict[str, Any]:
+        """Summary kept by slow-request capture."""
+        return {
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(total_seconds * 1000, 2),
+            **self.attributes,
+            "stages": [{key: value for key, value in stage.items() if key != "span_id"} for stage in self.stages]
+        }
+
+    def spans(self, total_seconds: float) -> List[Dict[str, Any]]:
+        """The request span and its stage spans, as exported records."""
+        spans = []
+        for stage in self.stages:
+            start_ns = self.start_ns + int(stage["offset_ms"] * 1e6)
+            spans.append({
+                "trace_id": self.trace_id,
+                "span_id": stage["span_id"],
+                "parent_span_id": self.span_id,
+                "name": stage["stage"],
+                "kind": "stage",
+                "start_unix_nano": start_ns,
+                "end_unix_nano": start_ns + int(stage["duration_ms"] * 1e6),
+                "duration_ms": stage["duration_ms"],
+                "attributes": {},
+                "error": stage.get("error", False)
+            })
+        spans.append({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.kind,
+            "kind": "request",
+            "start_unix_nano": self.start_ns,
+            "end_unix_nano": self.start_ns + int(total_seconds * 1e9),
+            "duration_ms": round(total_seconds * 1000, 2),
+            "attributes": self.attributes,
+            "error": self.error
+        })
+        return spans
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("chatbot_request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the chat turn, upload or request running in this context, if any."""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_request(
+    kind: str,
+    slow_capture: bool = True,
+    traceparent: Optional[str] = None,
+    **attributes: Any
+) -> Iterator[Optional[RequestTrace]]:
+    """
+    Trace a chat turn, upload or request and the stages timed inside it.
+    Nested inside another trace (an upload inside its REST request), it
+    becomes a child span of that trace.
+
+    Args:
+        kind: Span name: "chat_turn", "upload" or "http"
+        slow_capture: Keep the trace if it runs over SLOW_TRACE_THRESHOLD_MS
+        traceparent: W3C traceparent header to continue a caller's trace
+        **attributes: Identifiers stored with the span (session_id, bot_id, ...)
+
+    Yields:
+        The trace, or None when neither tracing nor slow capture is on
+    """
+    capture = slow_capture and settings.slow_trace_threshold_ms > 0
+    if not settings.tracing_enabled and not capture:
+        yield None
+        return
+
+    parent = _current_trace.get()
+    if parent is not None:
+        trace = RequestTrace(kind, attributes, parent.trace_id, parent.span_id)
+    else:
+        trace = RequestTrace(kind, attributes, *(parse_traceparent(traceparent) or ()))
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.error = True
+        raise
+    finally:
+        _current_trace.reset(token)
+        total = time.perf_counter() - trace.start
+        if capture and total * 1000 >= settings.slow_trace_threshold_ms:
+            slow_traces.add(trace.to_dict(total))
+        if settings.tracing_enabled:
+            tracer.emit(trace.spans(total))
+
+
+class SpanQueueHandler(QueueHandler):
+    """Queue handler that keeps span and log records as they are and drops them when the queue is full."""
+
+    def __init__(self, span_queue: queue.Queue):
+        super().__init__(span_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _RecordFilter(logging.Filter):
+    """Pass only span records, or only application log records."""
+
+    def __init__(self, spans: bool):
+        super().__init__()
+        self.spans = spans
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return (record.name == TRACE_LOGGER) == self.spans
+
+
+class FlushingQueueListener(QueueListener):
+    """Queue listener that lets idle handlers flush partial batches on a timer."""
+
+    def __init__(self, record_queue: queue.Queue, *handlers: logging.Handler, flush_check_seconds: float = 1.0):
+        super().__init__(record_queue, *handlers)
+        self.flush_check_seconds = flush_check_seconds
+
+    def dequeue(self, block: bool):
+        while True:
+            try:
+                return self.queue.get(block, self.flush_check_seconds if block else None)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    flush_due = getattr(handler, "flush_due", None)
+                    if flush_due is not None:
+                        flush_due()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per span."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, default=str, separators=(",", ":"))
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str) -> Dict[str, Any]:
+    """
+    Build an OTLP/HTTP JSON export request.
+
+    Args:
+        spans: Span records from RequestTrace.spans()
+        service_name: Reported as the service.name resource attribute
+
+    Returns:
+        ExportTraceServiceRequest body
+    """
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": SPAN_KIND_SERVER if span["kind"] == "request" else SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(span["start_unix_nano"]),
+            "endTimeUnixNano": str(span["end_unix_nano"]),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in span["attributes"].items() if value is not None
+            ]
+        }
+        if span["parent_span_id"]:
+            otlp_span["parentSpanId"] = span["parent_span_id"]
+        if span["error"]:
+            otlp_span["status"] = {"code": STATUS_ERROR}
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "chatbot"}, "spans": otlp_spans}]
+        }]
+    }
+
+
+class OTLPSpanHandler(logging.Handler):
+    """Batch span records and POST them to an OTLP/HTTP collector (runs on the listener thread)."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str,
+        batch_size: int = 64,
+        flush_interval: float = 5.0,
+        timeout: float = 5.0
+    ):
+        super().__init__()
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.buffer: List[Dict[str, Any]] = []
+        self.last_flush = time.monotonic()
+        self.exported = 0
+        self.failed = 0
+
+    def emit(self, record: logging.LogRecord):
+        self.buffer.append(record.msg)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        else:
+            self.flush_due()
+
+    def flush_due(self):
+        """Send a partial batch once flush_interval has passed (also called while traffic is idle)."""
+        if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        body = json.dumps(to_otlp(batch, self.service_name)).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning("OTLP export to %s failed: %s", self.url, e)
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class Tracer:
+    """Owns the record queue, its listener thread, the span exporters and the application log handler."""
+
+    def __init__(self):
+        self.logger = logging.getLogger(TRACE_LOGGER)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.app_logger = logging.getLogger(APP_LOGGER)
+        self.queue_handler: Optional[SpanQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.handlers: List[logging.Handler] = []
+        self.log_handler: Optional[logging.Handler] = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self.listener is not None
+
+    def start(
+        self,
+        handlers: Optional[List[logging.Handler]] = None,
+        log_handler: Optional[logging.Handler] = None
+    ):
+        """
+        Start the listener thread.
+
+        Args:
+            handlers: Span exporters (default from settings when tracing is enabled:
+                JSON lines to TRACE_LOG_FILE or stderr, plus OTLP when OTLP_ENDPOINT is set)
+            log_handler: Handler for application log records (default: text lines to stderr)
+        """
+        with self._lock:
+            if self.listener is not None:
+                return
+            self.handlers = handlers if handlers is not None else self._default_handlers()
+            for handler in self.handlers:
+                handler.addFilter(_RecordFilter(spans=True))
+            self.log_handler = log_handler or self._default_log_handler()
+            self.log_handler.addFilter(_RecordFilter(spans=False))
+
+            self.queue_handler = SpanQueueHandler(queue.Queue(settings.trace_queue_size))
+            self.logger.addHandler(self.queue_handler)
+            self.app_logger.addHandler(self.queue_handler)
+            self.app_logger.setLevel(logging.INFO)
+            self.app_logger.propagate = False
+
+            # Wake up often enough to send partial OTLP batches on time when traffic stops
+            flush_check_seconds = min(
+                [handler.flush_interval for handler in self.handlers if isinstance(handler, OTLPSpanHandler)],
+                default=1.0
+            )
+            self.listener = FlushingQueueListener(
+                self.queue_handler.queue,
+                *self.handlers,
+                self.log_handler,
+                flush_check_seconds=flush_check_seconds
+            )
+            self.listener.start()
+
+    def stop(self):
+        """Write out queued records, flush the exporters and stop the listener."""
+        with self._lock:
+            if self.listener is None:
+                return
+            self.listener.stop()
+            self.logger.removeHandler(self.queue_handler)
+            self.app_logger.removeHandler(self.queue_handler)
+            self.app_logger.propagate = True
+            for handler in self.handlers + [self.log_handler]:
+                handler.close()
+            self.listener = None
+
+    def emit(self, spans: List[Dict[str, Any]]):
+        """Queue finished spans for export without blocking."""
+        if self.listener is None:
+            self.start()
+        for span in spans:
+            self.logger.info(span)
+
+    @property
+    def dropped(self) -> int:
+        return self.queue_handler.dropped if self.queue_handler else 0
+
+    def _default_handlers(self) -> List[logging.Handler]:
+        if not settings.tracing_enabled:
+            return []
+        if settings.trace_log_file:
+            lines = logging.FileHandler(settings.trace_log_file, encoding="utf-8")
+        else:
+            lines = logging.StreamHandler(sys.stderr)
+        lines.setFormatter(JsonLinesFormatter())
+        handlers = [lines]
+        if settings.otlp_endpoint:
+            handlers.append(OTLPSpanHandler(
+                settings.otlp_endpoint,
+                settings.trace_service_name,
+                batch_size=settings.otlp_batch_size,
+                flush_interval=settings.otlp_flush_interval_seconds
+            ))
+        return handlers
+
+    @staticmethod
+    def _default_log_handler() -> logging.Handler:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        return handler
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware giving every REST request a span.
+    Continues the caller's trace from a traceparent header and returns the
+    trace id in X-Trace-Id. WebSocket connections pass through: each chat
+    turn is its own trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.tracing_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        with trace_request("http", slow_capture=False, traceparent=traceparent,
+                           method=scope["method"], path=scope["path"]) as trace:
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    trace.attributes["status_code"] = message["status"]
+                    if message["status"] >= 500:
+                        trace.error = True
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace.trace_id.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -0,0 +1,37 @@
+"""
+Relay hub for the socket WebSocket backplane.
+Run one hub per deployment and point every API worker at it with
+BACKPLANE_BACKEND=socket and BACKPLANE_URL.
+
+Usage:
+    python backplane_hub.py [--url tcp://0.0.0.0:8765]
+"""
+import argparse
+import asyncio
+
+from app.api.backplane import BackplaneHub
+from app.config import settings
+
+
+async def serve(url: str):
+    """Run the hub until interrupted."""
+    hub = BackplaneHub(url)
+    await hub.start()
+    print(f"📡 Backplane hub listening on {url}")
+    try:
+        await hub.serve_forever()
+    finally:
+        await hub.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the WebSocket backplane relay hub")
+    parser.add_argument("--url", default=settings.backplane_url, help="tcp://host:port or unix:///path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args().url))
+    except KeyboardInterrupt:
+        print("👋 Backplane hub stopped")
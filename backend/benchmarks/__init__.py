@@ -0,0 +1,4 @@
+"""
+Benchmarks and replay tools for the chatbot backend.
+Run from the backend directory, e.g. `python -m benchmarks.replay_routing`.
+"""
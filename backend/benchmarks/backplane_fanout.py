@@ -0,0 +1,197 @@
+"""
+Multi-process fan-out benchmark for the WebSocket backplane.
+Starts a relay hub (socket backend) and several worker processes that all
+subscribe to the same sessions and publish to them, like API workers whose
+clients share sessions. Reports delivery throughput, end-to-end latency and
+whether every worker received every message.
+
+Usage:
+    python -m benchmarks.backplane_fanout [--workers 4] [--sessions 50] [--messages 2000] [--rate 500]
+    python -m benchmarks.backplane_fanout --backend redis --url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_worker(args: argparse.Namespace) -> dict:
+    """Subscribe, wait for the go signal, publish and count deliveries."""
+    from app.api.backplane import create_backplane
+
+    kwargs = {"url": args.url} if args.backend != "memory" else {}
+    backplane = create_backplane(args.backend, **kwargs)
+    expected = args.messages * args.workers
+    latencies = []
+    remote = 0
+    done = asyncio.Event()
+
+    async def deliver(session_id: int, message: dict):
+        nonlocal remote
+        latencies.append(time.time() - message["sent_at"])
+        if message["worker"] != args.worker:
+            remote += 1
+        if len(latencies) >= expected:
+            done.set()
+
+    await backplane.start(deliver)
+    for session_id in range(args.sessions):
+        await backplane.subscribe(session_id)
+    if hasattr(backplane, "connected"):
+        await asyncio.wait_for(backplane.connected.wait(), timeout=10)
+
+    print("ready", flush=True)
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline)
+
+    payload = "x" * args.payload_bytes
+    start = time.perf_counter()
+    for i in range(args.messages):
+        await backplane.publish(i % args.sessions, {
+            "role": "assistant",
+            "content": payload,
+            "worker": args.worker,
+            "sent_at": time.time()
+        })
+        if args.rate:
+            delay = start + (i + 1) / args.rate - time.perf_counter()
+            await asyncio.sleep(max(delay, 0))
+        elif i % 64 == 0:
+            # Let the reader task run, as an API worker would between messages
+            await asyncio.sleep(0)
+    publish_seconds = time.perf_counter() - start
+
+    try:
+        await asyncio.wait_for(done.wait(), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    await backplane.close()
+
+    latencies_ms = [latency * 1000 for latency in latencies] or [0.0]
+    return {
+        "worker": args.worker,
+        "expected": expected,
+        "received": len(latencies),
+        "remote": remote,
+        "publish_seconds": round(publish_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "p50_ms": round(statistics.median(latencies_ms), 2),
+        "p99_ms": round(_percentile(latencies_ms, 0.99), 2)
+    }
+
+
+def _start_hub(url: str) -> subprocess.Popen:
+    hub = subprocess.Popen(
+        [sys.executable, "backplane_hub.py", "--url", url],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    hub.stdout.readline()  # "listening" banner
+    return hub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-process WebSocket fan-out")
+    parser.add_argument("--backend", default="socket", choices=["memory", "socket", "redis"], help="Backplane backend")
+    parser.add_argument("--url", default=None, help="Hub or Redis URL (default: a hub on a temporary Unix socket)")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    parser.add_argument("--sessions", type=int, default=50, help="Sessions every worker subscribes to")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages published per worker")
+    parser.add_argument("--rate", type=float, default=0, help="Messages/s per worker (0 = as fast as possible)")
+    parser.add_argument("--payload-bytes", type=int, default=512, help="Message content size")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for deliveries")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(asyncio.run(run_worker(args))), flush=True)
+        return
+
+    if args.backend == "memory":
+        args.workers = 1  # the in-memory backplane cannot cross processes
+
+    hub = None
+    tmp_dir = tempfile.mkdtemp()
+    if args.backend == "socket":
+        args.url = args.url or f"unix://{os.path.join(tmp_dir, 'backplane.sock')}"
+        hub = _start_hub(args.url)
+    elif args.backend == "redis":
+        args.url = args.url or "redis://localhost:6379/0"
+
+    command = [
+        sys.executable, "-m", "benchmarks.backplane_fanout",
+        "--backend", args.backend,
+        "--workers", str(args.workers),
+        "--sessions", str(args.sessions),
+        "--messages", str(args.messages),
+        "--rate", str(args.rate),
+        "--payload-bytes", str(args.payload_bytes),
+        "--timeout", str(args.timeout)
+    ]
+    if args.url:
+        command += ["--url", args.url]
+
+    try:
+        workers = [
+            subprocess.Popen(command + ["--worker", str(i)], cwd=BACKEND_DIR,
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            for i in range(args.workers)
+        ]
+        for worker in workers:
+            if worker.stdout.readline().strip() != "ready":
+                raise RuntimeError("worker failed to start")
+        for worker in workers:
+            worker.stdin.write("go\n")
+            worker.stdin.flush()
+        results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+    finally:
+        if hub is not None:
+            hub.terminate()
+            hub.wait()
+
+    published = args.messages * args.workers
+    delivered = sum(r["received"] for r in results)
+    elapsed = max(r["elapsed_seconds"] for r in results)
+    report = {
+        "backend": args.backend,
+        "workers": args.workers,
+        "sessions": args.sessions,
+        "published": published,
+        "delivered": delivered,
+        "expected_deliveries": published * args.workers,
+        "complete": all(r["received"] == r["expected"] for r in results),
+        "deliveries_per_second": round(delivered / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(r["p50_ms"] for r in results), 2),
+        "p99_ms": max(r["p99_ms"] for r in results),
+        "per_worker": results
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.backend} backplane: {args.workers} workers x {args.sessions} sessions, "
+          f"{published} messages published")
+    print(f"  delivered {delivered}/{report['expected_deliveries']} "
+          f"({report['deliveries_per_second']} deliveries/s)")
+    print(f"  latency p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms")
+    print("✅ Every worker received every message" if report["complete"] else "❌ Deliveries were lost")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Compare document chunkers.
+Chunks synthetic markdown and PDF-style ([Page N] markers, wrapped lines)
+documents of several sizes with the structured chunker, LangChain's
+recursive character splitter as configured for ingestion, and the same
+LangChain splitter measuring length in estimated tokens (recursive-tokens,
+what it takes to fit chunks to the model's window with LangChain). Reports
+throughput (MB/s), chunk counts, chunk length in estimated tokens, and how
+many chunks exceed the embedding model's 256-token window. With --tokenizer the limit is checked with the
+model's real tokenizer instead of the estimate.
+
+Usage:
+    python -m benchmarks.chunking [--sizes-kb 100 1000 5000] [--chunkers structured recursive recursive-tokens]
+    python -m benchmarks.chunking --tokenizer ./models/all-MiniLM-L6-v2-onnx/tokenizer.json --json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable, List
+
+# Longest input (in tokens) of the default embedding model
+MODEL_MAX_TOKENS = 256
+
+CHUNKERS = ["structured", "recursive", "recursive-tokens"]
+
+WORDS = (
+    "refund order invoice shipping account billing plan support customer payment "
+    "return policy business days warranty delivery address subscription upgrade "
+    "the a of to and in for with on is are be can will your our we you"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 24))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 8)))
+
+
+def markdown_document(size_bytes: int, seed: int = 0) -> str:
+    """Markdown with headings, paragraphs and bullet lists."""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    section = 0
+    while size < size_bytes:
+        section += 1
+        block = [f"## Section {section}: {rng.choice(WORDS).title()} {rng.choice(WORDS)}"]
+        for _ in range(rng.randint(1, 4)):
+            block.append(_paragraph(rng))
+        if rng.random() < 0.5:
+            block.append(f"{rng.choice(WORDS).title()} options:")
+            block.append("\n".join(f"- {_sentence(rng)}" for _ in range(rng.randint(2, 6))))
+        text = "\n\n".join(block)
+        parts.append(text)
+        size += len(text) + 2
+    return "\n\n".join(parts)
+
+
+def pdf_document(size_bytes: int, seed: int = 0) -> str:
+    """Extracted PDF text: page markers and paragraphs hard-wrapped at 80 columns."""
+    rng = random.Random(seed)
+    pages: List[str] = []
+    size = 0
+    while size < size_bytes:
+        paragraphs = []
+        for _ in range(rng.randint(3, 6)):
+            words = _paragraph(rng).split()
+            lines, line = [], []
+            for word in words:
+                if sum(len(w) + 1 for w in line) + len(word) > 80:
+                    lines.append(" ".join(line))
+                    line = []
+                line.append(word)
+            lines.append(" ".join(line))
+            paragraphs.append("\n".join(lines))
+        text = f"[Page {len(pages) + 1}]\n" + "\n\n".join(paragraphs)
+        pages.append(text)
+        size += len(text) + 2
+    return "\n\n".join(pages)
+
+
+def _load_token_counter(path: str) -> Callable[[str], int]:
+    """Count tokens with a tokenizer.json, including [CLS] and [SEP]."""
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(path)
+    tokenizer.no_truncation()
+    return lambda text: len(tokenizer.encode(text).ids)
+
+
+def _create_chunker(name: str) -> Any:
+    """Create a chunker with its configured size and overlap."""
+    from app.rag.chunking import RecursiveChunker, chunker_settings, create_chunker
+    from app.rag.tokens import estimate_tokens
+
+    if name != "recursive-tokens":
+        _, size, overlap = chunker_settings(name)
+        return create_chunker(name, size, overlap), size, overlap
+
+    # LangChain sized in tokens, with the structured chunker's limits
+    _, size, overlap = chunker_settings("structured")
+    return RecursiveChunker(size, overlap, length_function=estimate_tokens), size, overlap
+
+
+def run_single(chunker_name: str, kind: str, text: str, count_tokens: Callable[[str], int], repeat: int) -> dict:
+    """Time one chunker on one document and measure its chunks."""
+    from app.rag.tokens import estimate_tokens
+
+    chunker, size, overlap = _create_chunker(chunker_name)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = chunker.chunk(text)
+        timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+
+    estimated = [estimate_tokens(chunk["content"]) for chunk in chunks]
+    counted = [count_tokens(chunk["content"]) for chunk in chunks]
+    megabytes = len(text.encode("utf-8")) / (1024 * 1024)
+    return {
+        "chunker": chunker_name,
+        "document": kind,
+        "size_kb": round(len(text) / 1024),
+        "chunk_size": size,
+        "chunk_overlap": overlap,
+        "seconds": round(seconds, 4),
+        "mb_per_second": round(megabytes / seconds, 2) if seconds else 0.0,
+        "chunks": len(chunks),
+        "tokens_p50": statistics.median(estimated) if estimated else 0,
+        "tokens_max": max(estimated, default=0),
+        "over_limit": sum(tokens > MODEL_MAX_TOKENS for tokens in counted),
+        "with_offsets": all("char_start" in chunk["metadata"] for chunk in chunks)
+    }
+
+
+def main():
+    from app.rag.tokens import estimate_tokens
+
+    parser = argparse.ArgumentParser(description="Benchmark document chunkers")
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[100, 1000, 5000], help="Document sizes in KB")
+    parser.add_argument("--chunkers", nargs="+", choices=CHUNKERS, default=CHUNKERS, help="Chunkers to compare")
+    parser.add_argument("--documents", nargs="+", choices=["markdown", "pdf"], default=["markdown", "pdf"], help="Document styles")
+    parser.add_argument("--tokenizer", default=None, help="tokenizer.json used to check the model's token limit (default: the estimate)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per document (the fastest is reported)")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    count_tokens = _load_token_counter(args.tokenizer) if args.tokenizer else estimate_tokens
+    generators = {"markdown": markdown_document, "pdf": pdf_document}
+
+    results = []
+    for size_kb in args.sizes_kb:
+        for kind in args.documents:
+            text = generators[kind](size_kb * 1024)
+            for chunker_name in args.chunkers:
+                results.append(run_single(chunker_name, kind, text, count_tokens, args.repeat))
+
+    report = {
+        "token_counter": args.tokenizer or "estimate",
+        "model_max_tokens": MODEL_MAX_TOKENS,
+        "results": results
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Token limit {MODEL_MAX_TOKENS}, counted with {report['token_counter']}\n")
+    print(f"{'chunker':>16} {'doc':>8} {'KB':>6} {'size':>5} {'seconds':>8} {'MB/s':>7} "
+          f"{'chunks':>7} {'tok p50':>7} {'tok max':>7} {'>limit':>6} {'offsets':>7}")
+    for r in results:
+        print(f"{r['chunker']:>16} {r['document']:>8} {r['size_kb']:>6} {r['chunk_size']:>5} {r['seconds']:>8} "
+              f"{r['mb_per_second']:>7} {r['chunks']:>7} {r['tokens_p50']:>7} {r['tokens_max']:>7} "
+              f"{r['over_limit']:>6} {str(r['with_offsets']):>7}")
+
+
+if __name__ == "__main__":
+    main()
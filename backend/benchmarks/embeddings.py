@@ -0,0 +1,128 @@
+"""
+Compare embedding runtimes.
+Reports startup time, RSS, queries/sec and chunks/sec for the PyTorch model
+and its ONNX export (int8 and float32), plus how closely each matches the
+PyTorch embeddings. Every runtime runs in a fresh subprocess so startup and
+RSS include the imports it needs.
+
+Usage:
+    python -m benchmarks.embeddings [--runtimes torch onnx onnx-fp32] [--model-path ./models/...]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+
+def _rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_single(runtime: str, model_path: str, queries: int, chunks: int) -> dict:
+    """Load one runtime and measure it."""
+    start = time.perf_counter()
+    from app.rag.embeddings import REFERENCE_TEXTS, OnnxEmbeddings, create_embeddings
+
+    if runtime == "torch":
+        embeddings = create_embeddings("torch")
+    else:
+        model_file = "model.onnx" if runtime == "onnx-fp32" else None
+        embeddings = OnnxEmbeddings(model_path, verify=False, model_file=model_file)
+    embeddings.embed_query("warm up")
+    startup_seconds = time.perf_counter() - start
+    startup_rss = _rss_mb()
+
+    query_texts = [f"How do I change the billing address on invoice {i}?" for i in range(queries)]
+    start = time.perf_counter()
+    for text in query_texts:
+        embeddings.embed_query(text)
+    queries_per_second = queries / (time.perf_counter() - start)
+
+    chunk_text = "Refunds are processed within 5-7 business days after we receive the returned item. " * 10
+    start = time.perf_counter()
+    embeddings.embed_documents([f"{i} {chunk_text}" for i in range(chunks)])
+    chunks_per_second = chunks / (time.perf_counter() - start)
+
+    return {
+        "runtime": runtime,
+        "startup_seconds": round(startup_seconds, 3),
+        "startup_rss_mb": round(startup_rss, 1),
+        "peak_rss_mb": round(_rss_mb(), 1),
+        "torch_imported": "torch" in sys.modules,
+        "queries_per_second": round(queries_per_second, 1),
+        "chunks_per_second": round(chunks_per_second, 1),
+        "reference_embeddings": embeddings.embed_documents(REFERENCE_TEXTS)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding runtimes")
+    parser.add_argument("--runtimes", nargs="+", default=["torch", "onnx", "onnx-fp32"], help="Runtimes to compare")
+    parser.add_argument("--model-path", default=None, help="Exported ONNX model directory")
+    parser.add_argument("--queries", type=int, default=200, help="Single-query embeddings to time")
+    parser.add_argument("--chunks", type=int, default=256, help="Chunks embedded in one batch call")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        from app.config import settings
+
+        model_path = args.model_path or settings.onnx_model_path
+        print(json.dumps(run_single(args.single, model_path, args.queries, args.chunks)))
+        return
+
+    results = []
+    for runtime in args.runtimes:
+        command = [
+            sys.executable, "-m", "benchmarks.embeddings",
+            "--single", runtime,
+            "--queries", str(args.queries),
+            "--chunks", str(args.chunks)
+        ]
+        if args.model_path:
+            command += ["--model-path", args.model_path]
+        completed = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+            results.append({"runtime": runtime, "error": error})
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    # Compatibility is measured against the PyTorch embeddings when available
+    from app.rag.embeddings import compare_embeddings
+
+    reference = next((r["reference_embeddings"] for r in results if r.get("runtime") == "torch" and "error" not in r), None)
+    for result in results:
+        embeddings = result.pop("reference_embeddings", None)
+        if reference is not None and embeddings is not None:
+            result.update(compare_embeddings(reference, embeddings))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'runtime':<10} {'startup s':>9} {'rss MB':>7} {'torch':>6} {'q/s':>8} {'chunks/s':>9} {'min cos':>8} {'max diff':>9}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['runtime']:<10}  error: {result['error']}")
+            continue
+        print(
+            f"{result['runtime']:<10} {result['startup_seconds']:>9} {result['peak_rss_mb']:>7} "
+            f"{str(result['torch_imported']):>6} {result['queries_per_second']:>8} {result['chunks_per_second']:>9} "
+            f"{result.get('min_cosine', '-'):>8} {result.get('max_abs_diff', '-'):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
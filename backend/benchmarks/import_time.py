@@ -0,0 +1,122 @@
+"""
+Import-time regression guard for the API entry point.
+Runs `python -X importtime -c "import app.main"` in fresh interpreters and
+reports the total import time, the slowest modules, and whether any heavy
+ML dependency (torch, chromadb, ...) was imported eagerly.
+
+Usage:
+    python -m benchmarks.import_time [--runs 5] [--top 15] [--max-ms 2500]
+
+Exits with status 1 if a heavy module is imported or the median import time
+exceeds --max-ms, so it can run in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+
+# Modules that must only load on first use of the RAG pipeline
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "chromadb",
+    "langchain_community",
+    "langchain_text_splitters",
+    "onnxruntime",
+    "hnswlib",
+    "pypdf",
+]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str = "app.main") -> Dict[str, int]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        Mapping of every imported module to its cumulative import time in microseconds
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=BACKEND_DIR
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative_us, name = line.split("|")
+        timings[name.strip()] = int(cumulative_us)
+    return timings
+
+
+def heavy_modules_imported(timings: Dict[str, int]) -> List[str]:
+    """Heavy modules (or their submodules) present in an import trace."""
+    return sorted({
+        heavy for heavy in HEAVY_MODULES
+        for name in timings
+        if name == heavy or name.startswith(heavy + ".")
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the API entry point")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to list")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    totals_ms = [timings[args.module] / 1000 for timings in runs]
+    heavy = heavy_modules_imported(runs[-1])
+
+    # Slowest direct dependencies, taken from the last (warm file cache) run
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    slowest = [(name, us) for name, us in slowest if name != args.module and "." not in name][:args.top]
+
+    report = {
+        "module": args.module,
+        "median_ms": round(statistics.median(totals_ms), 1),
+        "min_ms": round(min(totals_ms), 1),
+        "max_ms": round(max(totals_ms), 1),
+        "modules_imported": len(runs[-1]),
+        "heavy_modules_imported": heavy,
+        "slowest": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in slowest]
+    }
+
+    failed = bool(heavy) or (args.max_ms is not None and report["median_ms"] > args.max_ms)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: median {report['median_ms']} ms "
+              f"(min {report['min_ms']}, max {report['max_ms']}, {args.runs} runs, "
+              f"{report['modules_imported']} modules)\n")
+        for entry in report["slowest"]:
+            print(f"  {entry['cumulative_ms']:>8} ms  {entry['module']}")
+        print()
+        if heavy:
+            print(f"❌ Heavy modules imported eagerly: {', '.join(heavy)}")
+        elif args.max_ms is not None and report["median_ms"] > args.max_ms:
+            print(f"❌ Median import time {report['median_ms']} ms exceeds {args.max_ms} ms")
+        else:
+            print("✅ No heavy ML modules imported at startup")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
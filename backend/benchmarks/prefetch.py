@@ -0,0 +1,167 @@
+"""
+Latency saved by prefetching retrieval for draft messages.
+Indexes the seed_data.py knowledge base and replays the conversations in
+benchmarks/data/follow_ups.jsonl (a question, then a follow-up) through the
+RAG engine twice. The baseline run sends each message as it is. The
+prefetch run first types it: a draft is sent at every word pause
+(the widget's debounce), --word-ms apart, and the message goes out
+--think-ms after the last draft. Drafts pass through a RetrievalPrefetcher
+with the configured throttle, as "draft" frames do.
+
+Reports turn latency (p50/p99/mean, demo generation delay off) for both
+runs, the time saved, how many messages found their retrieval prefetched,
+and how many speculative retrievals each message cost. A word every 300 ms
+is already fast typing. When drafts come faster than the throttle, the
+last one can still be waiting when the message is sent, and the message
+then retrieves as usual.
+
+Usage:
+    python -m benchmarks.prefetch
+    python -m benchmarks.prefetch --word-ms 120 --think-ms 100 --min-interval-ms 300 --json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+
+from benchmarks.query_rewrite import FOLLOW_UPS_PATH
+from benchmarks.retrieval_eval import BACKEND_DIR, BOT_ID, _percentile, build_index, load_labels
+
+
+def sessions_from_labels(labels):
+    """A conversation per follow-up: the earlier turns, then the follow-up."""
+    sessions = []
+    for label in labels:
+        history = label["history"]
+        turns = []
+        for i, message in enumerate(history):
+            if message["role"] != "user":
+                continue
+            following = history[i + 1] if i + 1 < len(history) else None
+            reply = following["content"] if following and following["role"] == "assistant" else None
+            turns.append((message["content"], reply))
+        sessions.append(turns + [(label["query"], None)])
+    return sessions
+
+
+async def replay(engine, session_id: int, turns, args, drafts: bool) -> list:
+    """Send a conversation's messages (typing drafts first) and time each turn."""
+    history = []
+    latencies = []
+    for message, reply in turns:
+        if drafts:
+            words = message.split()
+            for i in range(1, len(words) + 1):
+                speculate = partial(
+                    engine.prefetch_retrieval, bot_id=BOT_ID, conversation_history=list(history), knowledge_base_version=1
+                )
+                engine.prefetcher.draft(session_id, " ".join(words[:i]), speculate)
+                await asyncio.sleep((args.word_ms if i < len(words) else args.think_ms) / 1000)
+
+        history.append({"role": "user", "content": message})
+        start = time.perf_counter()
+        await engine.generate_response(message, BOT_ID, "You are a helpful assistant.", list(history),
+                                      session_id=session_id, knowledge_base_version=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if reply:
+            history.append({"role": "assistant", "content": reply})
+    return latencies
+
+
+def _latency(values) -> dict:
+    return {
+        "p50_ms": round(_percentile(values, 0.5), 3),
+        "p99_ms": round(_percentile(values, 0.99), 3),
+        "mean_ms": round(statistics.mean(values), 3)
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    from seed_data import SAMPLE_DOCUMENTS
+    from app.config import settings
+    from app.rag.embeddings import get_embeddings
+    from app.rag.engine import RAGEngine
+    from app.rag.prefetch import RetrievalPrefetcher
+    from app.rag.retriever import DocumentRetriever
+
+    # Time retrieval, not the demo engine's simulated typing or cached answers
+    settings.demo_delay_min_seconds = 0
+    settings.demo_delay_max_seconds = 0
+    settings.semantic_cache_enabled = False
+
+    sessions = sessions_from_labels(load_labels(args.labels, SAMPLE_DOCUMENTS))
+    embeddings = get_embeddings()
+    backend = args.backend or settings.vector_store_backend
+
+    with tempfile.TemporaryDirectory() as path:
+        index = await build_index(
+            SAMPLE_DOCUMENTS, embeddings, backend, path, settings.chunk_tokens, settings.chunk_overlap_tokens, "structured"
+        )
+        engine = RAGEngine(DocumentRetriever(embeddings, index["store"], reranker=False))
+        engine.prefetcher = RetrievalPrefetcher(min_interval_ms=args.min_interval_ms)
+
+        # Warm up the model
+        await engine.generate_response("warm up", BOT_ID, "", [])
+
+        baseline, prefetched = [], []
+        for i, turns in enumerate(sessions):
+            baseline.extend(await replay(engine, 2 * i, turns, args, drafts=False))
+            prefetched.extend(await replay(engine, 2 * i + 1, turns, args, drafts=True))
+
+    metrics = engine.prefetcher.get_metrics()
+    base_latency, prefetch_latency = _latency(baseline), _latency(prefetched)
+    return {
+        "backend": backend,
+        "sessions": len(sessions),
+        "messages": len(prefetched),
+        "word_ms": args.word_ms,
+        "think_ms": args.think_ms,
+        "min_interval_ms": args.min_interval_ms,
+        "baseline": base_latency,
+        "prefetch": prefetch_latency,
+        "saved_p50_ms": round(base_latency["p50_ms"] - prefetch_latency["p50_ms"], 3),
+        "saved_mean_ms": round(base_latency["mean_ms"] - prefetch_latency["mean_ms"], 3),
+        "hit_rate": round(metrics["hits"] / len(prefetched), 4),
+        "speculations_per_message": round(metrics["speculations"] / len(prefetched), 2),
+        "superseded_per_message": round(metrics["superseded"] / len(prefetched), 2),
+        "prefetcher": metrics
+    }
+
+
+def main():
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Measure the latency saved by prefetching retrieval for drafts")
+    parser.add_argument("--word-ms", type=float, default=300, help="Time between drafts while typing")
+    parser.add_argument("--think-ms", type=float, default=200, help="Time between the last draft and sending")
+    parser.add_argument("--min-interval-ms", type=float, default=settings.prefetch_min_interval_ms, help="Per-session speculation throttle")
+    parser.add_argument("--backend", default=None, help="Vector store backend (default from settings)")
+    parser.add_argument("--labels", default=FOLLOW_UPS_PATH, help="Conversations to replay (JSON lines)")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['messages']} messages in {report['sessions']} sessions, {report['backend']} backend, "
+          f"drafts every {report['word_ms']} ms, sent {report['think_ms']} ms after the last, "
+          f"throttle {report['min_interval_ms']} ms\n")
+    print(f"{'':>9} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name in ("baseline", "prefetch"):
+        r = report[name]
+        print(f"{name:>9} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['mean_ms']:>8}")
+    print(f"\nSaved per message: p50 {report['saved_p50_ms']:.3f} ms, mean {report['saved_mean_ms']:.3f} ms")
+    print(f"Prefetched: {report['hit_rate']:.1%} of messages, "
+          f"{report['speculations_per_message']} speculative retrievals per message "
+          f"({report['superseded_per_message']} superseded)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Measure recall and latency of quantized embeddings.
+Builds the same synthetic corpus in every quantization mode of the NumPy
+vector store and compares top-k results against exact float32 search.
+Quantized modes scan their codes, then rescore k * multiplier candidates
+against a memory-mapped rescoring copy of the vectors ("copy": float16,
+float32, or none to rank by the codes alone). "disk B/vec" is everything
+stored per vector and "shrink" compares it with float32; "scan B/vec" is
+what every query reads.
+
+Usage:
+    python -m benchmarks.quantization [--size 50000] [--rescore 1 4 10 20] [--copies float16 none]
+
+The corpus is clustered (topics plus per-chunk noise) so that nearest
+neighbours are meaningful, like chunks of real help-center articles.
+Queries are perturbed copies of corpus vectors.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.rag.vectorstore import NumpyVectorStore
+
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def make_corpus(size: int, queries: int, topics: int, seed: int = 0):
+    """Generate clustered unit vectors and perturbed query vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, topics, size)] + 0.6 * rng.standard_normal((size, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    sources = rng.integers(0, size, queries)
+    query_vectors = vectors[sources] + 0.4 * rng.standard_normal((queries, DIM)).astype(np.float32) / np.sqrt(DIM)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return vectors, query_vectors
+
+
+def build_store(
+    path: str,
+    vectors: np.ndarray,
+    quantization: str,
+    rescore_multiplier: int,
+    rescore_dtype: str
+) -> NumpyVectorStore:
+    """Create a store in one quantization mode and load the corpus into it."""
+    store = NumpyVectorStore(
+        path=path, quantization=quantization, rescore_multiplier=rescore_multiplier, rescore_dtype=rescore_dtype
+    )
+    for offset in range(0, len(vectors), store.max_batch_size):
+        batch = vectors[offset:offset + store.max_batch_size]
+        store.add(
+            bot_id=1,
+            ids=[str(offset + i) for i in range(len(batch))],
+            embeddings=batch,
+            documents=[""] * len(batch),
+            metadatas=[{}] * len(batch)
+        )
+    return store
+
+
+def index_bytes(path: str) -> Dict[str, int]:
+    """Size of each vector file in a store directory, keyed by kind ("vectors", "codes", ...)."""
+    sizes = {}
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(".bin"):
+                kind = name.split(".")[0]
+                sizes[kind] = sizes.get(kind, 0) + os.path.getsize(os.path.join(root, name))
+    return sizes
+
+
+def evaluate(store: NumpyVectorStore, query_vectors: np.ndarray, truth: List[set], k: int) -> Dict[str, float]:
+    """Recall@k against exact results plus query latency percentiles."""
+    store.query(1, query_vectors[0], k)  # warm the memory map
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(query_vectors, truth):
+        start = time.perf_counter()
+        results = store.query(1, query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected & {result["id"] for result in results})
+
+    return {
+        "recall": round(hits / (k * len(truth)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized embeddings")
+    parser.add_argument("--size", type=int, default=50000, help="Number of corpus vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--topics", type=int, default=200, help="Number of clusters in the corpus")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 10, 20], help="Rescore multipliers for quantized modes")
+    parser.add_argument("--copies", nargs="+", default=["float16", "none"], help="Rescoring copies for quantized modes")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    vectors, query_vectors = make_corpus(args.size, args.queries, args.topics)
+
+    # Without a copy there is nothing to rescore, so one run per mode
+    runs = [("none", "float32", 1)] + [
+        (mode, copy, multiplier)
+        for mode in ("int8", "binary")
+        for copy in args.copies
+        for multiplier in (args.rescore if copy != "none" else [1])
+    ]
+    results = []
+    truth = None
+    with tempfile.TemporaryDirectory() as root:
+        for quantization, copy, multiplier in runs:
+            path = os.path.join(root, f"{quantization}_{copy}_{multiplier}")
+            store = build_store(path, vectors, quantization, multiplier, copy)
+            if truth is None:
+                truth = [{result["id"] for result in store.query(1, query, args.k)} for query in query_vectors]
+
+            sizes = index_bytes(path)
+            # Bytes read for every query; quantized modes only touch candidate float32 rows
+            scanned = sizes.get("bits") or sizes.get("codes", 0) + sizes.get("scales", 0) or sizes["vectors"]
+            report = {
+                "quantization": quantization,
+                "rescore_copy": copy if quantization != "none" else None,
+                "rescore_multiplier": multiplier if quantization != "none" and copy != "none" else None,
+                "disk_bytes_per_vector": round(sum(sizes.values()) / args.size, 1),
+                "scanned_bytes_per_vector": round(scanned / args.size, 1),
+                **evaluate(store, query_vectors, truth, args.k)
+            }
+            results.append(report)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]
+    print(f"{args.size} vectors x {DIM} dims, {args.queries} queries, recall@{args.k} vs exact float32\n")
+    print(
+        f"{'mode':<8} {'copy':<8} {'rescore':>7} {'disk B/vec':>10} {'shrink':>7} {'scan B/vec':>10} "
+        f"{'recall':>7} {'p50 ms':>7} {'p99 ms':>7}"
+    )
+    for result in results:
+        shrink = baseline["disk_bytes_per_vector"] / result["disk_bytes_per_vector"]
+        copy = result["rescore_copy"] or "-"
+        rescore = result["rescore_multiplier"] or "-"
+        print(
+            f"{result['quantization']:<8} {copy:<8} {rescore:>7} {result['disk_bytes_per_vector']:>10} "
+            f"{shrink:>6.1f}x {result['scanned_bytes_per_vector']:>10} {result['recall']:>7} "
+            f"{result['p50_ms']:>7} {result['p99_ms']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
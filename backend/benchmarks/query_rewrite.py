@@ -0,0 +1,139 @@
+"""
+Evaluate conversation-aware query rewriting on follow-up questions.
+Indexes the seed_data.py knowledge base and replays the labelled follow-ups
+in benchmarks/data/follow_ups.jsonl ("what about the enterprise one?" after
+a question about the professional plan). Each follow-up is retrieved twice:
+with the raw message, as before, and with QueryRewriter's rewrites embedded
+in one batch, searched and fused.
+
+Reports recall@1/@k and MRR for both, the latency of embedding plus search
+(p50/p99) and the latency rewriting adds, and how many queries were
+searched. It also checks how often standalone questions from
+benchmarks/data/retrieval_eval.jsonl are mistaken for follow-ups.
+
+Usage:
+    python -m benchmarks.query_rewrite
+    python -m benchmarks.query_rewrite --top-k 3 --budget-ms 20 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.retrieval_eval import BACKEND_DIR, BOT_ID, LABELS_PATH, _percentile, build_index, is_relevant, load_labels
+
+FOLLOW_UPS_PATH = os.path.join(BACKEND_DIR, "benchmarks", "data", "follow_ups.jsonl")
+
+
+async def replay(label, retriever, rewriter, top_k: int, rewrite: bool, budget_ms: float) -> dict:
+    """Retrieve one follow-up and score the ranking."""
+    history = label["history"] + [{"role": "user", "content": label["query"]}]
+    start = time.perf_counter()
+    queries = rewriter.rewrite(label["query"], history) if rewrite else [label["query"]]
+    embeddings = retriever.embed_queries(queries)
+    results, _ = await retriever.hybrid_search(
+        label["query"], BOT_ID, top_k, embeddings[0],
+        rewrites=queries[1:], rewrite_embeddings=embeddings[1:], rewrite_budget_ms=budget_ms
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    relevant = [is_relevant(result["content"], label) for result in results]
+    first = relevant.index(True) + 1 if True in relevant else None
+    return {"first": first, "ms": elapsed_ms, "queries": len(queries)}
+
+
+def _scores(rows, top_k: int) -> dict:
+    queries = len(rows)
+    return {
+        "recall@1": round(sum(row["first"] == 1 for row in rows) / queries, 4),
+        "recall@k": round(sum(row["first"] is not None and row["first"] <= top_k for row in rows) / queries, 4),
+        "mrr": round(statistics.mean(1 / row["first"] if row["first"] else 0.0 for row in rows), 4),
+        "p50_ms": round(_percentile([row["ms"] for row in rows], 0.5), 3),
+        "p99_ms": round(_percentile([row["ms"] for row in rows], 0.99), 3),
+        "avg_queries": round(statistics.mean(row["queries"] for row in rows), 2)
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    from seed_data import SAMPLE_DOCUMENTS
+    from app.config import settings
+    from app.rag.embeddings import get_embeddings
+    from app.rag.retriever import DocumentRetriever
+    from app.rag.rewriter import QueryRewriter
+
+    follow_ups = load_labels(args.labels, SAMPLE_DOCUMENTS)
+    standalone = load_labels(LABELS_PATH, None)
+    embeddings = get_embeddings()
+    backend = args.backend or settings.vector_store_backend
+    rewriter = QueryRewriter(max_queries=args.max_queries)
+
+    with tempfile.TemporaryDirectory() as path:
+        index = await build_index(
+            SAMPLE_DOCUMENTS, embeddings, backend, path, settings.chunk_tokens, settings.chunk_overlap_tokens, "structured"
+        )
+        retriever = DocumentRetriever(embeddings, index["store"], reranker=False)
+
+        # Warm up the model and the search cost estimate
+        await retriever.hybrid_search("warm up", BOT_ID, args.top_k, retriever.embed_query("warm up"))
+
+        baseline, rewritten = [], []
+        for label in follow_ups:
+            baseline.append(await replay(label, retriever, rewriter, args.top_k, False, args.budget_ms))
+            rewritten.append(await replay(label, retriever, rewriter, args.top_k, True, args.budget_ms))
+
+    # A standalone question after an unrelated one should not be rewritten
+    history = [{"role": "user", "content": "How much is the professional plan?"}]
+    false_positives = sum(
+        len(rewriter.rewrite(label["query"], history + [{"role": "user", "content": label["query"]}])) > 1
+        for label in standalone
+    )
+
+    base_scores, rewrite_scores = _scores(baseline, args.top_k), _scores(rewritten, args.top_k)
+    return {
+        "backend": backend,
+        "follow_ups": len(follow_ups),
+        "top_k": args.top_k,
+        "budget_ms": args.budget_ms,
+        "baseline": base_scores,
+        "rewritten": rewrite_scores,
+        "added_p50_ms": round(rewrite_scores["p50_ms"] - base_scores["p50_ms"], 3),
+        "added_p99_ms": round(rewrite_scores["p99_ms"] - base_scores["p99_ms"], 3),
+        "standalone_rewritten": round(false_positives / len(standalone), 4)
+    }
+
+
+def main():
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Evaluate query rewriting on follow-up questions")
+    parser.add_argument("--top-k", type=int, default=settings.retrieval_top_k, help="Results per query")
+    parser.add_argument("--max-queries", type=int, default=settings.query_rewrite_max_queries, help="Retrieval queries per message")
+    parser.add_argument("--budget-ms", type=float, default=settings.query_rewrite_budget_ms, help="Time rewrite searches may add (0 = no limit)")
+    parser.add_argument("--backend", default=None, help="Vector store backend (default from settings)")
+    parser.add_argument("--labels", default=FOLLOW_UPS_PATH, help="Labelled follow-ups (JSON lines)")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['follow_ups']} follow-ups, {report['backend']} backend, top {report['top_k']}, "
+          f"rewrite budget {report['budget_ms']} ms\n")
+    print(f"{'':>10} {'R@1':>6} {'R@k':>6} {'MRR':>6} {'p50 ms':>7} {'p99 ms':>7} {'queries':>7}")
+    for name in ("baseline", "rewritten"):
+        r = report[name]
+        print(f"{name:>10} {r['recall@1']:>6} {r['recall@k']:>6} {r['mrr']:>6} {r['p50_ms']:>7} "
+              f"{r['p99_ms']:>7} {r['avg_queries']:>7}")
+    print(f"\nAdded latency: p50 {report['added_p50_ms']:+.3f} ms, p99 {report['added_p99_ms']:+.3f} ms")
+    print(f"Standalone questions rewritten: {report['standalone_rewritten']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Replay a traffic log through the intent router.
+Reports the fraction of knowledge base retrievals that pre-routing avoids.
+
+Usage:
+    python -m benchmarks.replay_routing [--log benchmarks/data/sample_traffic.jsonl]
+    python -m benchmarks.replay_routing --database ./chatbot.db
+
+A traffic log is a JSON-lines file with one {"message": "..."} object per
+user turn. With --database, user messages are read from the messages table.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Iterator
+
+from app.agent.router import IntentRouter
+
+
+DEFAULT_LOG = os.path.join(os.path.dirname(__file__), "data", "sample_traffic.jsonl")
+
+
+def iter_log_messages(path: str) -> Iterator[str]:
+    """Yield user messages from a JSON-lines traffic log."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)["message"]
+
+
+def iter_database_messages(path: str) -> Iterator[str]:
+    """Yield user messages stored in a SQLite chatbot database."""
+    connection = sqlite3.connect(path)
+    try:
+        for (content,) in connection.execute(
+            "SELECT content FROM messages WHERE role = 'user' ORDER BY id"
+        ):
+            yield content
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay traffic through the intent router")
+    parser.add_argument("--log", default=DEFAULT_LOG, help="JSON-lines traffic log")
+    parser.add_argument("--database", help="SQLite database to read user messages from")
+    parser.add_argument("--verbose", action="store_true", help="Print every routing decision")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    messages = iter_database_messages(args.database) if args.database else iter_log_messages(args.log)
+
+    router = IntentRouter()
+    start = time.perf_counter()
+    for message in messages:
+        decision = router.route(message)
+        if args.verbose:
+            action = "retrieve" if decision["needs_retrieval"] else "skip    "
+            print(f"{action}  {decision['category']:<14} {message}")
+    elapsed = time.perf_counter() - start
+
+    report = router.get_metrics()
+    report["routing_us_per_message"] = round(elapsed / report["total_routed"] * 1e6, 2) if report["total_routed"] else 0.0
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Messages replayed:    {report['total_routed']}")
+    print(f"Retrievals avoided:   {report['retrievals_skipped']} ({report['skip_rate']:.1%})")
+    for category, count in sorted(report["skipped_by_category"].items()):
+        print(f"  {category:<18} {count}")
+    print(f"Routing cost:         {report['routing_us_per_message']} µs/message")
+
+
+if __name__ == "__main__":
+    main()
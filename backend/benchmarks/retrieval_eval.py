@@ -0,0 +1,337 @@
+"""
+Offline retrieval quality and latency evaluation.
+Indexes the seed_data.py knowledge base once per chunking configuration and
+runs a labelled query set (original questions plus paraphrases, see
+benchmarks/data/retrieval_eval.jsonl) through DocumentRetriever.hybrid_search
+for every top-k and keyword boost setting. A retrieved chunk is relevant
+when it contains one of the query's answer spans, so the labels survive
+re-chunking.
+
+Reports recall@1/@3/@k (a query counts as recalled when any chunk holding
+its answer is in the top k), MRR, nDCG@k, recall on paraphrases only,
+search latency (p50/p99, query embedding excluded) and index size per
+configuration. Chunk sizes and overlaps are in the chunker's unit: tokens
+for the structured chunker, characters for the recursive one.
+
+With --parent-tokens, small chunks are searched and each result is expanded
+to its (deduplicated) parent section before scoring, as the chat pipeline
+does with PARENT_RETRIEVAL_ENABLED. The report adds the parent store size
+and the retrieved context size in tokens, and search latency includes the
+expansion. With --rerank every configuration is also run through the
+cross-encoder reranker, reporting the quality and latency deltas and the
+share of queries reranked within the time budget.
+
+Usage:
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --chunk-sizes 200 400 800 --overlaps 0 100 --top-k 3 5 --keyword-boost 0 0.05
+    python -m benchmarks.retrieval_eval --chunker structured recursive
+    python -m benchmarks.retrieval_eval --chunk-sizes 64 96 192 --parent-tokens 0 384
+    python -m benchmarks.retrieval_eval --rerank --rerank-candidates 10 20 --rerank-budget-ms 150
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LABELS_PATH = os.path.join(BACKEND_DIR, "benchmarks", "data", "retrieval_eval.jsonl")
+OUT_OF_SCOPE_PATH = os.path.join(BACKEND_DIR, "benchmarks", "data", "out_of_scope.jsonl")
+BOT_ID = 1
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def load_labels(path: str, documents: Optional[List[Dict[str, str]]]) -> List[Dict[str, Any]]:
+    """
+    Load the labelled queries and check every answer span against the corpus.
+
+    Args:
+        path: JSON-lines file with query, document, answers and paraphrase fields
+        documents: The corpus (title and content of each document), or None to skip the check
+
+    Returns:
+        The labelled queries
+    """
+    contents = {doc["title"]: normalize(doc["content"]) for doc in documents or []}
+    labels = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            label = json.loads(line)
+            if documents is None:
+                labels.append(label)
+                continue
+            content = contents.get(label["document"])
+            if content is None:
+                raise ValueError(f"{label['id']}: unknown document '{label['document']}'")
+            if not any(normalize(answer) in content for answer in label["answers"]):
+                raise ValueError(f"{label['id']}: no answer span found in '{label['document']}'")
+            labels.append(label)
+    return labels
+
+
+def is_relevant(chunk: str, label: Dict[str, Any]) -> bool:
+    text = normalize(chunk)
+    return any(normalize(answer) in text for answer in label["answers"])
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def _directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+async def build_index(
+    documents,
+    embeddings,
+    backend: str,
+    path: str,
+    chunk_size: int,
+    overlap: int,
+    chunker: Optional[str] = None,
+    parent_tokens: int = 0
+) -> dict:
+    """Chunk, embed and store the corpus the way uploads do."""
+    from app.rag.ingestion import DocumentIngestion
+    from app.rag.parents import ParentStore
+    from app.rag.vectorstore import create_vector_store
+
+    vector_path = os.path.join(path, "vectors")
+    store = create_vector_store(backend, path=vector_path)
+    parent_store = ParentStore(os.path.join(path, "parents"))
+    ingestion = DocumentIngestion(
+        embeddings, store, chunk_size=chunk_size, chunk_overlap=overlap, chunker=chunker,
+        parent_tokens=parent_tokens, parent_store=parent_store
+    )
+    chunks = []
+    parents = []
+    start = time.perf_counter()
+    for document_id, doc in enumerate(documents, start=1):
+        result = await ingestion.ingest_document(
+            content=doc["content"],
+            metadata={"filename": f"{doc['title']}.txt", "document_id": document_id},
+            bot_id=BOT_ID
+        )
+        if not result["success"]:
+            raise RuntimeError(f"Ingesting {doc['title']} failed: {result.get('error')}")
+        chunks.extend(ingestion.chunk_text(doc["content"]))
+        if ingestion.parent_chunker is not None:
+            parents.extend(parent["content"] for parent in ingestion.parent_chunker.chunk(doc["content"]))
+    return {
+        "store": store,
+        "chunks": chunks,
+        # Small-to-big: results are expanded to parents, which the labels are scored on
+        "parents": parents,
+        "parent_store": parent_store if parents else None,
+        "build_seconds": round(time.perf_counter() - start, 3),
+        "index_bytes": _directory_bytes(vector_path),
+        "parent_bytes": parent_store.size_bytes()
+    }
+
+
+async def evaluate(labels, query_embeddings, retriever, index: dict, top_k: int) -> dict:
+    """Run every labelled query and score the ranking."""
+    from app.rag.tokens import estimate_tokens
+
+    hits = {1: 0, 3: 0, top_k: 0}
+    paraphrase_hits = paraphrases = reranked = 0
+    reciprocal_ranks, ndcgs, latencies, context_tokens = [], [], [], []
+    parent_store = index.get("parent_store")
+    candidates = index["parents"] if parent_store else index["chunks"]
+
+    for label, embedding in zip(labels, query_embeddings):
+        start = time.perf_counter()
+        results, _ = await retriever.hybrid_search(label["query"], BOT_ID, top_k, embedding)
+        if parent_store:
+            results = parent_store.expand(results)
+        latencies.append((time.perf_counter() - start) * 1000)
+        context_tokens.append(sum(estimate_tokens(result["content"]) for result in results))
+        reranked += any("rerank_score" in result for result in results)
+
+        relevant = [is_relevant(result["content"], label) for result in results]
+        first = relevant.index(True) + 1 if True in relevant else None
+        for k in hits:
+            hits[k] += first is not None and first <= k
+        if label["paraphrase"]:
+            paraphrases += 1
+            paraphrase_hits += first is not None
+        reciprocal_ranks.append(1 / first if first else 0.0)
+
+        # Binary gains; the ideal ranking puts every relevant chunk of the index first
+        dcg = sum(1 / math.log2(rank + 2) for rank, rel in enumerate(relevant) if rel)
+        ideal_count = min(top_k, sum(is_relevant(chunk, label) for chunk in candidates))
+        idcg = sum(1 / math.log2(rank + 2) for rank in range(ideal_count))
+        ndcgs.append(dcg / idcg if idcg else 0.0)
+
+    queries = len(labels)
+    return {
+        "recall@1": round(hits[1] / queries, 4),
+        "recall@3": round(hits[3] / queries, 4),
+        "recall@k": round(hits[top_k] / queries, 4),
+        "paraphrase_recall@k": round(paraphrase_hits / paraphrases, 4) if paraphrases else None,
+        "mrr": round(statistics.mean(reciprocal_ranks), 4),
+        "ndcg@k": round(statistics.mean(ndcgs), 4),
+        "search_p50_ms": round(_percentile(latencies, 0.5), 3),
+        "search_p99_ms": round(_percentile(latencies, 0.99), 3),
+        # Retrieved text handed to the context builder, before its token budget
+        "context_tokens": round(statistics.mean(context_tokens), 1),
+        # Share of queries the reranker finished within its budget
+        "reranked": round(reranked / queries, 4) if getattr(retriever, "reranker", None) else None
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    from seed_data import SAMPLE_DOCUMENTS
+    from app.config import settings
+    from app.rag.chunking import chunker_settings
+    from app.rag.embeddings import get_embeddings
+    from app.rag.retriever import DocumentRetriever
+
+    labels = load_labels(args.labels, SAMPLE_DOCUMENTS)
+    embeddings = get_embeddings()
+    backend = args.backend or settings.vector_store_backend
+    reranker = None
+    if args.rerank:
+        from app.rag.reranker import OnnxCrossEncoder
+        reranker = OnnxCrossEncoder(args.rerank_model, budget_ms=args.rerank_budget_ms)
+
+    # Query embeddings do not depend on the configuration: embed once
+    embed_ms, query_embeddings = [], []
+    for label in labels:
+        start = time.perf_counter()
+        query_embeddings.append(embeddings.embed_query(label["query"]))
+        embed_ms.append((time.perf_counter() - start) * 1000)
+
+    results = []
+    configs = []
+    for chunker in args.chunker:
+        _, default_size, default_overlap = chunker_settings(chunker)
+        configs.extend(
+            (chunker, chunk_size, overlap, parent_tokens)
+            for chunk_size, overlap, parent_tokens in itertools.product(
+                args.chunk_sizes or [default_size], args.overlaps or [default_overlap], args.parent_tokens
+            )
+            # Parents are located by offset, which only the structured chunker records
+            if overlap < chunk_size and (parent_tokens == 0 or chunker == "structured" and parent_tokens > chunk_size)
+        )
+    for chunker, chunk_size, overlap, parent_tokens in configs:
+        with tempfile.TemporaryDirectory() as path:
+            index = await build_index(
+                SAMPLE_DOCUMENTS, embeddings, backend, path, chunk_size, overlap, chunker, parent_tokens
+            )
+            for top_k, boost in itertools.product(args.top_k, args.keyword_boost):
+                # Baseline first, then each reranked variant against it
+                variants = [(False, None)] + [(reranker, n) for n in args.rerank_candidates if reranker]
+                baseline = None
+                for variant_reranker, candidates in variants:
+                    retriever = DocumentRetriever(
+                        embeddings, index["store"], keyword_boost=boost,
+                        reranker=variant_reranker, rerank_candidates=candidates
+                    )
+                    scores = await evaluate(labels, query_embeddings, retriever, index, top_k)
+                    row = {
+                        "chunker": chunker,
+                        "chunk_size": chunk_size,
+                        "chunk_overlap": overlap,
+                        "parent_tokens": parent_tokens,
+                        "top_k": top_k,
+                        "keyword_boost": boost,
+                        "rerank_candidates": candidates,
+                        **scores,
+                        "chunks": len(index["chunks"]),
+                        "index_bytes": index["index_bytes"],
+                        "parent_bytes": index["parent_bytes"],
+                        "build_seconds": index["build_seconds"]
+                    }
+                    if baseline is None:
+                        baseline = row
+                    else:
+                        row["delta"] = {
+                            metric: round(row[metric] - baseline[metric], 4)
+                            for metric in ("recall@1", "recall@k", "mrr", "ndcg@k", "search_p50_ms", "search_p99_ms")
+                        }
+                    results.append(row)
+
+    return {
+        "backend": backend,
+        "queries": len(labels),
+        "paraphrases": sum(label["paraphrase"] for label in labels),
+        "embed_p50_ms": round(_percentile(embed_ms, 0.5), 3),
+        "embed_p99_ms": round(_percentile(embed_ms, 0.99), 3),
+        "configs": results
+    }
+
+
+def main():
+    from app.config import settings
+    from app.rag.chunking import CHUNKERS
+
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency over a parameter sweep")
+    parser.add_argument("--chunker", nargs="+", choices=CHUNKERS, default=[settings.chunker], help="Chunkers to compare")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=None, help="Chunk sizes in the chunker's unit (default from settings)")
+    parser.add_argument("--overlaps", type=int, nargs="+", default=None, help="Chunk overlaps in the chunker's unit (default from settings)")
+    parser.add_argument("--parent-tokens", type=int, nargs="+", default=[0], help="Parent section sizes for small-to-big retrieval (0 = chunks only)")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[settings.retrieval_top_k], help="Results per query")
+    parser.add_argument("--keyword-boost", type=float, nargs="+", default=[settings.keyword_boost], help="Boost per keyword match (0 = vector only)")
+    parser.add_argument("--backend", default=None, help="Vector store backend (default from settings)")
+    parser.add_argument("--rerank", action="store_true", help="Also evaluate with the cross-encoder reranker")
+    parser.add_argument("--rerank-model", default=settings.rerank_model_path, help="Exported reranker model directory")
+    parser.add_argument("--rerank-candidates", type=int, nargs="+", default=[settings.rerank_candidates], help="Chunks rescored per query")
+    parser.add_argument("--rerank-budget-ms", type=float, default=settings.rerank_budget_ms, help="Rerank time budget per query (0 = no limit)")
+    parser.add_argument("--labels", default=LABELS_PATH, help="Labelled queries (JSON lines)")
+    parser.add_argument("--min-recall", type=float, default=None, help="Fail if any configuration's recall@k is lower")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['queries']} queries ({report['paraphrases']} paraphrases), {report['backend']} backend, "
+              f"query embedding p50 {report['embed_p50_ms']} ms / p99 {report['embed_p99_ms']} ms\n")
+        print(f"{'chunker':>10} {'size':>5} {'overlap':>7} {'parent':>6} {'k':>3} {'boost':>6} {'rerank':>6} {'R@1':>6} {'R@3':>6} {'R@k':>6} "
+              f"{'para':>6} {'MRR':>6} {'nDCG':>6} {'p50 ms':>7} {'p99 ms':>7} {'ctx tok':>7} {'chunks':>6} {'index KB':>9} "
+              f"{'parent KB':>9}")
+        for r in report["configs"]:
+            print(f"{r['chunker']:>10} {r['chunk_size']:>5} {r['chunk_overlap']:>7} {r['parent_tokens'] or '-':>6} {r['top_k']:>3} {r['keyword_boost']:>6} "
+                  f"{r['rerank_candidates'] or '-':>6} {r['recall@1']:>6} {r['recall@3']:>6} {r['recall@k']:>6} "
+                  f"{r['paraphrase_recall@k']:>6} {r['mrr']:>6} {r['ndcg@k']:>6} {r['search_p50_ms']:>7} "
+                  f"{r['search_p99_ms']:>7} {r['context_tokens']:>7} {r['chunks']:>6} {r['index_bytes'] / 1024:>9.1f} "
+                  f"{r['parent_bytes'] / 1024:>9.1f}")
+            if "delta" in r:
+                d = r["delta"]
+                print(f"{'':>46} reranked {r['reranked']:.0%} in budget: R@1 {d['recall@1']:+.4f}  "
+                      f"R@k {d['recall@k']:+.4f}  MRR {d['mrr']:+.4f}  nDCG {d['ndcg@k']:+.4f}  "
+                      f"p50 {d['search_p50_ms']:+.3f} ms  p99 {d['search_p99_ms']:+.3f} ms")
+
+    if args.min_recall is not None:
+        failing = [r for r in report["configs"] if r["recall@k"] < args.min_recall]
+        if failing:
+            print(f"❌ {len(failing)} configuration(s) below recall@k {args.min_recall}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Broadcast fan-out with deliberately slow consumers.
+Every session has several fast tabs and one slow tab (each send takes
+--slow-ms). Compares the old sequential broadcast, which awaits each send in
+turn, with the per-connection send queues under both slow-consumer policies,
+and reports delivery latency to the fast tabs and what happened to the slow
+ones.
+
+Usage:
+    python -m benchmarks.slow_consumers [--sessions 20] [--fast-tabs 3] [--messages 50] [--slow-ms 200]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.api.backplane import InMemoryBackplane
+from app.api.websocket import ConnectionManager
+
+
+class BenchWebSocket:
+    """WebSocket stand-in that takes `delay` seconds per send and records latency."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.latencies = []
+        self.closed = False
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - message["sent_at"])
+
+    async def send_text(self, data):
+        await self.send_json(json.loads(data))
+
+    async def close(self, code=1000, reason=None):
+        self.closed = True
+
+
+class SequentialManager(ConnectionManager):
+    """The previous broadcast: await every connection's send in order."""
+
+    async def connect(self, websocket, session_id):
+        await websocket.accept()
+        self.active_connections.setdefault(session_id, []).append(websocket)
+
+    async def broadcast(self, message, session_id):
+        for connection in self.active_connections.get(session_id, []):
+            await connection.send_json(message)
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    """Broadcast to every session at the configured rate and collect latencies."""
+    if mode == "sequential":
+        manager = SequentialManager(InMemoryBackplane())
+    else:
+        manager = ConnectionManager(
+            InMemoryBackplane(),
+            max_queue=args.queue_size,
+            policy=mode,
+            timeout_ms=args.timeout_ms
+        )
+
+    fast, slow = [], []
+    for session_id in range(args.sessions):
+        # The slow tab connects first, so a sequential broadcast waits on it
+        websocket = BenchWebSocket(args.slow_ms / 1000)
+        slow.append(websocket)
+        await manager.connect(websocket, session_id)
+        for _ in range(args.fast_tabs):
+            websocket = BenchWebSocket(0)
+            fast.append(websocket)
+            await manager.connect(websocket, session_id)
+
+    async def publish(session_id: int):
+        for _ in range(args.messages):
+            await manager.broadcast({"content": "x" * 256, "sent_at": time.perf_counter()}, session_id)
+            await asyncio.sleep(1 / args.rate)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(publish(session_id) for session_id in range(args.sessions)))
+    publish_seconds = time.perf_counter() - start
+
+    expected = args.messages * len(fast)
+    deadline = time.perf_counter() + args.drain_seconds
+    while sum(len(ws.latencies) for ws in fast) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    stats = manager.get_stats() if mode != "sequential" else {}
+    await manager.close()
+
+    fast_ms = [latency * 1000 for ws in fast for latency in ws.latencies]
+    return {
+        "mode": mode,
+        "publish_seconds": round(publish_seconds, 2),
+        "fast_delivered": len(fast_ms),
+        "fast_expected": expected,
+        "fast_p50_ms": round(statistics.median(fast_ms), 2) if fast_ms else None,
+        "fast_p99_ms": round(_percentile(fast_ms, 0.99), 2),
+        "slow_delivered": sum(len(ws.latencies) for ws in slow),
+        "slow_disconnected": sum(ws.closed for ws in slow),
+        "dropped": stats.get("messages_dropped", 0)
+    }
+
+
+async def run(args: argparse.Namespace) -> list:
+    return [await run_mode(mode, args) for mode in args.modes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark broadcasts with slow WebSocket consumers")
+    parser.add_argument("--modes", nargs="+", default=["sequential", "drop_oldest", "disconnect"], help="Broadcast modes")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent sessions")
+    parser.add_argument("--fast-tabs", type=int, default=3, help="Fast connections per session")
+    parser.add_argument("--messages", type=int, default=50, help="Broadcasts per session")
+    parser.add_argument("--rate", type=float, default=20, help="Broadcasts/s per session")
+    parser.add_argument("--slow-ms", type=float, default=200, help="Send time of the slow tab")
+    parser.add_argument("--queue-size", type=int, default=16, help="Per-connection queue size")
+    parser.add_argument("--timeout-ms", type=float, default=1000, help="Slow-consumer timeout (disconnect policy)")
+    parser.add_argument("--drain-seconds", type=float, default=30, help="Max wait for fast tabs after publishing")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.sessions} sessions x ({args.fast_tabs} fast + 1 slow tab @ {args.slow_ms} ms/send), "
+          f"{args.messages} broadcasts each at {args.rate}/s\n")
+    print(f"{'mode':<12} {'publish s':>9} {'fast p50':>9} {'fast p99':>9} {'fast recv':>11} "
+          f"{'slow recv':>9} {'dropped':>8} {'kicked':>7}")
+    for r in results:
+        print(f"{r['mode']:<12} {r['publish_seconds']:>9} {str(r['fast_p50_ms']):>9} {r['fast_p99_ms']:>9} "
+              f"{r['fast_delivered']:>5}/{r['fast_expected']:<5} {r['slow_delivered']:>9} "
+              f"{r['dropped']:>8} {r['slow_disconnected']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Compare vector store backends on synthetic corpora.
+Reports add throughput, query latency (p50/p99) and peak RSS per backend
+and corpus size. Every run happens in a fresh subprocess so RSS figures
+are not polluted by earlier runs.
+
+Usage:
+    python -m benchmarks.vector_store [--sizes 1000 10000 50000] [--backends chroma numpy hnsw]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def _rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_single(backend: str, size: int, queries: int, k: int, dtype: str) -> dict:
+    """Build one corpus in a temporary directory and time queries against it."""
+    from app.rag.vectorstore import create_vector_store
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query_vectors = rng.standard_normal((queries, DIM)).astype(np.float32)
+
+    baseline_rss = _rss_mb()
+    with tempfile.TemporaryDirectory() as path:
+        kwargs = {"path": path}
+        if backend != "chroma":
+            kwargs["dtype"] = dtype
+        store = create_vector_store(backend, **kwargs)
+
+        start = time.perf_counter()
+        batch = min(store.max_batch_size, 5000)
+        for offset in range(0, size, batch):
+            rows = range(offset, min(offset + batch, size))
+            store.add(
+                bot_id=1,
+                ids=[f"doc{i}_chunk0" for i in rows],
+                embeddings=vectors[offset:offset + len(rows)].tolist(),
+                documents=[f"chunk {i}" for i in rows],
+                metadatas=[{"document_id": i} for i in rows]
+            )
+        add_seconds = time.perf_counter() - start
+
+        # First query pays for loading the index (and building HNSW graphs)
+        start = time.perf_counter()
+        store.query(1, query_vectors[0].tolist(), k)
+        first_query_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for query in query_vectors:
+            start = time.perf_counter()
+            store.query(1, query.tolist(), k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "backend": backend,
+        "size": size,
+        "add_seconds": round(add_seconds, 3),
+        "first_query_ms": round(first_query_ms, 3),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "query_p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "peak_rss_mb": round(_rss_mb(), 1),
+        "rss_growth_mb": round(_rss_mb() - baseline_rss, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Corpus sizes")
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy", "hnsw"], help="Backends to compare")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per run")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--dtype", default="float32", help="Storage dtype for in-process backends")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    parser.add_argument("--single", nargs=2, metavar=("BACKEND", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        backend, size = args.single
+        print(json.dumps(run_single(backend, int(size), args.queries, args.k, args.dtype)))
+        return
+
+    results = []
+    for size in args.sizes:
+        for backend in args.backends:
+            completed = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.vector_store",
+                    "--single", backend, str(size),
+                    "--queries", str(args.queries),
+                    "--k", str(args.k),
+                    "--dtype", args.dtype
+                ],
+                capture_output=True,
+                text=True,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            )
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+                results.append({"backend": backend, "size": size, "error": error})
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'backend':<8} {'size':>7} {'add s':>8} {'first ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'rss MB':>8} {'+rss MB':>8}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<8} {result['size']:>7}  error: {result['error']}")
+            continue
+        print(
+            f"{result['backend']:<8} {result['size']:>7} {result['add_seconds']:>8} "
+            f"{result['first_query_ms']:>9} {result['query_p50_ms']:>8} {result['query_p99_ms']:>8} "
+            f"{result['peak_rss_mb']:>8} {result['rss_growth_mb']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Serialization microbenchmarks for the chat WebSocket protocols.
+Encodes the frames of one chat turn (user echo, typing indicator, assistant
+reply) the way the previous code did (model_dump, then json.dumps for every
+connection) and with each codec, encoding once per broadcast. Reports CPU
+per turn and the bytes each connection receives, raw and after
+permessage-deflate (with and without context takeover).
+
+Usage:
+    python -m benchmarks.ws_codecs [--tabs 3] [--turns 2000]
+"""
+import argparse
+import json
+import time
+import zlib
+from datetime import datetime
+
+from app.agent.demo_responses import DEMO_RESPONSES
+from app.api.codecs import JSON_CODEC, ORIGIN_KEY, get_codec
+from app.schemas import ChatMessageResponse
+
+
+# Realistic answers and questions: the demo engine's responses and keywords
+CATEGORIES = [
+    data for data in DEMO_RESPONSES.values()
+    if isinstance(data, dict) and data.get("responses") and data.get("keywords")
+]
+SOURCES = ["pricing.md", "plans/enterprise.pdf", "faq.txt"]
+
+
+def turn_models(turn: int):
+    """Response models for one turn, as the endpoint builds them."""
+    category = CATEGORIES[turn % len(CATEGORIES)]
+    question = f"Can you tell me about {category['keywords'][turn % len(category['keywords'])]}?"
+    answer = category["responses"][turn % len(category["responses"])]
+    return [
+        ChatMessageResponse(role="user", content=question, session_id=42, timestamp=datetime.utcnow()),
+        {"role": "system", "content": "typing", "session_id": 42},
+        ChatMessageResponse(role="assistant", content=answer, session_id=42, timestamp=datetime.utcnow(),
+                            confidence=0.92, sources=SOURCES[:turn % 4]),
+    ]
+
+
+def legacy_turn(models, tabs: int):
+    """Previous path: model_dump per frame, json.dumps (send_json) per connection."""
+    frames = []
+    for model in models:
+        message = model if isinstance(model, dict) else model.model_dump(mode="json")
+        encoded = [json.dumps(message, separators=(",", ":"), ensure_ascii=False) for _ in range(tabs)]
+        frames.append(encoded[0])
+    return frames
+
+
+def codec_turn(codec, models, tabs: int):
+    """Codec path: model_dump once, encode once per variant (own echo vs other tabs)."""
+    frames = []
+    for i, model in enumerate(models):
+        message = model if isinstance(model, dict) else model.model_dump(mode="json")
+        if i == 0:
+            message = {**message, ORIGIN_KEY: "sender", "client_id": 1}
+            own = codec.encode(message, own_echo=True)
+            if tabs > 1:
+                codec.encode(message)
+            frames.append(own)
+        else:
+            frames.append(codec.encode(message))
+    return [frame for frame in frames if frame is not None]
+
+
+def _size(frame) -> int:
+    return len(frame) if isinstance(frame, bytes) else len(frame.encode("utf-8"))
+
+
+def deflated_size(frames, context_takeover: bool) -> float:
+    """Average deflated bytes per turn for one connection."""
+    total = 0
+    compressor = zlib.compressobj(wbits=-15)
+    for frame in frames:
+        data = frame if isinstance(frame, bytes) else frame.encode("utf-8")
+        if not context_takeover:
+            compressor = zlib.compressobj(wbits=-15)
+        # permessage-deflate strips the trailing 00 00 ff ff of a sync flush
+        total += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return total
+
+
+def bench(name: str, encode_turn, turns: int, tabs: int) -> dict:
+    models = [turn_models(turn) for turn in range(turns)]
+    start = time.perf_counter()
+    sent = [encode_turn(turn, tabs) for turn in models]
+    elapsed = time.perf_counter() - start
+
+    # The sender's connection, over the whole run
+    flat = [frame for frames in sent for frame in frames]
+    return {
+        "protocol": name,
+        "us_per_turn": round(elapsed / turns * 1e6, 1),
+        "frames_per_turn": len(sent[0]),
+        "bytes_per_turn": round(sum(_size(frame) for frame in flat) / turns, 1),
+        "deflate_bytes_per_turn": round(deflated_size(flat, context_takeover=False) / turns, 1),
+        "deflate_ctx_bytes_per_turn": round(deflated_size(flat, context_takeover=True) / turns, 1)
+    }
+
+
+def bench_decode(turns: int) -> dict:
+    """Decode cost of an incoming client frame per protocol."""
+    frame = {"message": "How much does the pro plan cost?", "id": 17}
+    results = {}
+    for name, codec in [("json", JSON_CODEC), ("compact-json", get_codec("chat.compact.json")),
+                        ("msgpack", get_codec("chat.compact.msgpack"))]:
+        if codec is None:
+            continue
+        data = codec.dumps(frame)
+        start = time.perf_counter()
+        for _ in range(turns):
+            codec.loads(data)
+        results[name] = round((time.perf_counter() - start) / turns * 1e6, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat WebSocket serialization")
+    parser.add_argument("--tabs", type=int, default=3, help="Connections per session")
+    parser.add_argument("--turns", type=int, default=2000, help="Chat turns to encode")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    protocols = [("legacy", legacy_turn)]
+    for subprotocol, name in [(None, "json"), ("chat.compact.json", "compact-json"), ("chat.compact.msgpack", "msgpack")]:
+        codec = JSON_CODEC if subprotocol is None else get_codec(subprotocol)
+        if codec is None:
+            print(f"⚠️  {name} unavailable (missing optional dependency)")
+            continue
+        protocols.append((name, lambda models, tabs, codec=codec: codec_turn(codec, models, tabs)))
+
+    results = [bench(name, encode_turn, args.turns, args.tabs) for name, encode_turn in protocols]
+    report = {"tabs": args.tabs, "turns": args.turns, "encode": results, "decode_us": bench_decode(args.turns * 10)}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"One chat turn fanned out to {args.tabs} tabs, {args.turns} turns\n")
+    print(f"{'protocol':<13} {'us/turn':>8} {'frames':>7} {'bytes':>7} {'deflate':>8} {'deflate+ctx':>12}")
+    for r in results:
+        print(f"{r['protocol']:<13} {r['us_per_turn']:>8} {r['frames_per_turn']:>7} {r['bytes_per_turn']:>7} "
+              f"{r['deflate_bytes_per_turn']:>8} {r['deflate_ctx_bytes_per_turn']:>12}")
+    print("\nDecode of a client frame (us): " + ", ".join(f"{k} {v}" for k, v in report["decode_us"].items()))
+
+
+if __name__ == "__main__":
+    main()
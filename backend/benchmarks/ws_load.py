@@ -0,0 +1,405 @@
+"""
+Load harness for the chat WebSocket.
+Opens a swarm of concurrent `/ws/chat/{session_id}` connections and has each
+client hold a conversation drawn from the demo engine's keyword mix,
+waiting for every answer before sending the next message. Reports how many
+connections were held, connect latency, messages/sec and turn latency
+percentiles, plus the server's own send-queue stats.
+
+By default it starts its own server (uvicorn, zero-latency demo engine,
+fresh RAM-backed SQLite database) so runs are reproducible; point --url at a running
+deployment to measure that instead.
+
+Usage:
+    python -m benchmarks.ws_load [--clients 200] [--messages 20] [--workers 1]
+    python -m benchmarks.ws_load --url http://staging:8000 --clients 2000 --json
+    python -m benchmarks.ws_load --max-p99-ms 250 --min-throughput 500   # CI gate
+
+Exits with status 1 if a gate fails.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from app.agent.demo_responses import DEMO_RESPONSES
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUESTION_TEMPLATES = [
+    "{keyword}",
+    "Can you tell me about {keyword}?",
+    "I have a question about {keyword}",
+    "What are the options for {keyword}?",
+    "how does {keyword} work for a team of 20 people",
+]
+
+# --protocol choices and the subprotocol each one requests
+PROTOCOLS = {"json": None, "compact-json": "chat.compact.json", "msgpack": "chat.compact.msgpack"}
+
+# Messages that match no category and exercise the fallback path
+OFF_TOPIC = [
+    "What's the weather like on Mars?",
+    "Tell me a joke about databases",
+    "asdf qwerty",
+]
+
+
+def build_message_mix(seed: int = 7, off_topic_share: float = 0.1) -> List[str]:
+    """
+    Realistic user messages drawn from the demo engine's keywords.
+
+    Args:
+        seed: Random seed so runs are reproducible
+        off_topic_share: Fraction of messages no category matches
+
+    Returns:
+        Pool of user messages to sample from
+    """
+    rng = random.Random(seed)
+    messages = []
+    for data in DEMO_RESPONSES.values():
+        if not isinstance(data, dict):
+            continue
+        for keyword in data.get("keywords", []):
+            messages.append(rng.choice(QUESTION_TEMPLATES).format(keyword=keyword))
+    off_topic_count = int(len(messages) * off_topic_share / (1 - off_topic_share))
+    messages += [rng.choice(OFF_TOPIC) for _ in range(off_topic_count)]
+    rng.shuffle(messages)
+    return messages
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p90/p99/max of a list of milliseconds."""
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+    return {"p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "max": round(ordered[-1], 2)}
+
+
+def _raise_open_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def memory_database_dir() -> str:
+    """
+    Scratch directory for a RAM-backed SQLite database.
+    A file on tmpfs keeps per-connection transactions (a shared :memory:
+    connection would interleave concurrent sessions' commits).
+    """
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="chatbot-load-", dir=root)
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    """Start uvicorn with the zero-latency demo engine."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DEMO_DELAY_MIN_SECONDS": str(args.demo_delay_ms / 1000),
+        "DEMO_DELAY_MAX_SECONDS": str(args.demo_delay_ms / 1000),
+        "RAG_PRELOAD": "true",
+    }
+    if args.memory_db:
+        args.db_dir = memory_database_dir()
+        env["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(args.db_dir, 'chatbot.db')}"
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers),
+        "--log-level", "warning",
+        "--no-access-log",
+    ]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL if not args.server_logs else None,
+                              stderr=subprocess.DEVNULL if not args.server_logs else None)
+    args.url = f"http://127.0.0.1:{port}"
+    return server
+
+
+async def wait_until_ready(client, timeout: float):
+    """Poll /ready until the RAG components are loaded."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+
+
+class ClientStats:
+    """Measurements from the whole swarm."""
+
+    def __init__(self):
+        self.connect_ms: List[float] = []
+        self.turn_ms: List[float] = []
+        self.connect_failures = 0
+        self.turn_errors = 0
+        self.disconnects = 0
+        self.held = 0
+        self.peak_held = 0
+        self.bytes_received = 0
+
+
+async def run_client(index: int, session_id: int, args: argparse.Namespace,
+                     mix: List[str], stats: ClientStats, start_gate: asyncio.Event):
+    """One simulated visitor: connect, chat, hold the connection, leave."""
+    import websockets
+
+    codec = None
+    subprotocols = None
+    if PROTOCOLS[args.protocol]:
+        from app.api.codecs import get_codec
+        codec = get_codec(PROTOCOLS[args.protocol])
+        subprotocols = [codec.subprotocol]
+
+    ws_url = args.url.replace("http", "ws", 1) + f"/ws/chat/{session_id}"
+    rng = random.Random(args.seed + index)
+
+    def decode(frame):
+        stats.bytes_received += len(frame)
+        return codec.loads(frame) if codec else json.loads(frame)
+
+    def encode(message: dict):
+        return codec.dumps(message) if codec else json.dumps(message)
+
+    started = time.perf_counter()
+    try:
+        websocket = await asyncio.wait_for(websockets.connect(
+            ws_url,
+            subprotocols=subprotocols,
+            compression="deflate" if args.deflate else None,
+            max_size=None,
+            open_timeout=args.timeout
+        ), args.timeout)
+    except Exception:
+        stats.connect_failures += 1
+        return
+    held = False
+    try:
+        decode(await asyncio.wait_for(websocket.recv(), args.timeout))  # welcome
+        stats.connect_ms.append((time.perf_counter() - started) * 1000)
+        held = True
+        stats.held += 1
+        stats.peak_held = max(stats.peak_held, stats.held)
+
+        await start_gate.wait()
+        for turn in range(args.messages):
+            if args.think_ms:
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+            sent_at = time.perf_counter()
+            await websocket.send(encode({"message": rng.choice(mix), "id": turn}))
+            while True:
+                frame = decode(await asyncio.wait_for(websocket.recv(), args.timeout))
+                if frame.get("role") == "assistant":
+                    stats.turn_ms.append((time.perf_counter() - sent_at) * 1000)
+                    break
+                if frame.get("role") == "system" and frame.get("content") in ("error", "busy", "cancelled"):
+                    stats.turn_errors += 1
+                    break
+
+        # Keep the connection open to measure how many the worker can hold
+        if args.hold_seconds:
+            await asyncio.sleep(args.hold_seconds)
+    except Exception as e:
+        if not held:
+            stats.connect_failures += 1
+        elif isinstance(e, asyncio.TimeoutError):
+            stats.turn_errors += 1
+        else:
+            stats.disconnects += 1
+    finally:
+        if held:
+            stats.held -= 1
+        await websocket.close()
+
+
+async def run_swarm(args: argparse.Namespace) -> dict:
+    """Create sessions, ramp up the clients and collect the report."""
+    import httpx
+
+    mix = build_message_mix(args.seed)
+    stats = ClientStats()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        await wait_until_ready(client, args.ready_timeout)
+        bot = (await client.post("/api/v1/bots", json={
+            "name": "Load Test Bot",
+            "system_prompt": "You are a helpful support assistant.",
+            "welcome_message": "Hi! How can I help?"
+        })).json()
+
+        semaphore = asyncio.Semaphore(32)
+
+        async def create_session(i: int) -> int:
+            async with semaphore:
+                response = await client.post("/api/v1/chat/session", json={
+                    "bot_id": bot["id"], "visitor_id": f"load-{args.seed}-{i}"
+                })
+                return response.json()["id"]
+
+        session_ids = await asyncio.gather(*(create_session(i) for i in range(args.clients)))
+
+        start_gate = asyncio.Event()
+        ramp_started = time.perf_counter()
+        tasks = []
+        for i, session_id in enumerate(session_ids):
+            tasks.append(asyncio.create_task(run_client(i, session_id, args, mix, stats, start_gate)))
+            if args.ramp_rate:
+                await asyncio.sleep(1 / args.ramp_rate)
+        while stats.held + stats.connect_failures + stats.disconnects < args.clients:
+            if time.perf_counter() - ramp_started > args.timeout + args.clients / max(args.ramp_rate, 1):
+                break
+            await asyncio.sleep(0.01)
+        ramp_seconds = time.perf_counter() - ramp_started
+
+        chat_started = time.perf_counter()
+        start_gate.set()
+        if args.hold_seconds:
+            # Sample the server while every client is connected
+            await asyncio.sleep(min(args.hold_seconds / 2, 5))
+        server_stats = await fetch_server_stats(client)
+        await asyncio.gather(*tasks)
+        chat_seconds = time.perf_counter() - chat_started - args.hold_seconds
+
+    answered = len(stats.turn_ms)
+    return {
+        "url": args.url,
+        "clients": args.clients,
+        "messages_per_client": args.messages,
+        "protocol": args.protocol,
+        "deflate": args.deflate,
+        "connections": {
+            "established": len(stats.connect_ms),
+            "failed": stats.connect_failures,
+            "peak_concurrent": stats.peak_held,
+            "ramp_seconds": round(ramp_seconds, 2),
+            "connect_ms": percentiles(stats.connect_ms)
+        },
+        "messages": {
+            "answered": answered,
+            "errors": stats.turn_errors,
+            "disconnects": stats.disconnects,
+            "per_second": round(answered / chat_seconds, 1) if chat_seconds > 0 else None,
+            "turn_ms": percentiles(stats.turn_ms),
+            "bytes_received": stats.bytes_received
+        },
+        "server": server_stats
+    }
+
+
+async def fetch_server_stats(client) -> Optional[dict]:
+    """The serving worker's send-queue stats, if the admin login works."""
+    try:
+        login = await client.post("/api/v1/login", json={
+            "username": os.environ.get("ADMIN_USERNAME", "admin"),
+            "password": os.environ.get("ADMIN_PASSWORD", "admin")
+        })
+        token = login.json()["access_token"]
+        return (await client.get("/api/v1/admin/websockets", headers={"x-token": token})).json()
+    except Exception:
+        return None
+
+
+def check_gates(report: dict, args: argparse.Namespace) -> List[str]:
+    """Regression gates that failed."""
+    failures = []
+    if report["connections"]["failed"] or report["messages"]["disconnects"]:
+        failures.append("connections failed or dropped")
+    if args.max_p99_ms is not None and (report["messages"]["turn_ms"]["p99"] or 0) > args.max_p99_ms:
+        failures.append(f"turn p99 {report['messages']['turn_ms']['p99']} ms > {args.max_p99_ms} ms")
+    if args.min_throughput is not None and (report["messages"]["per_second"] or 0) < args.min_throughput:
+        failures.append(f"{report['messages']['per_second']} messages/s < {args.min_throughput}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chat WebSocket")
+    parser.add_argument("--url", default=None, help="Running server (default: start one)")
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent WebSocket clients")
+    parser.add_argument("--messages", type=int, default=20, help="Messages each client sends")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause before each message")
+    parser.add_argument("--ramp-rate", type=float, default=500, help="New connections per second (0 = all at once)")
+    parser.add_argument("--hold-seconds", type=float, default=0, help="Keep connections open after chatting")
+    parser.add_argument("--protocol", default="json", choices=list(PROTOCOLS), help="WebSocket protocol")
+    parser.add_argument("--deflate", action="store_true", help="Negotiate permessage-deflate")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned server")
+    parser.add_argument("--demo-delay-ms", type=float, default=0, help="Demo engine delay for the spawned server")
+    parser.add_argument("--file-db", dest="memory_db", action="store_false", help="Use DATABASE_URL instead of a RAM-backed SQLite file")
+    parser.add_argument("--server-logs", action="store_true", help="Show the spawned server's output")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-operation timeout in seconds")
+    parser.add_argument("--ready-timeout", type=float, default=120, help="Wait for /ready")
+    parser.add_argument("--seed", type=int, default=7, help="Message mix and visitor seed")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="Fail if turn p99 exceeds this")
+    parser.add_argument("--min-throughput", type=float, default=None, help="Fail below this many messages/s")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    _raise_open_file_limit()
+    server = start_server(args) if args.url is None else None
+    try:
+        report = asyncio.run(run_swarm(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            if args.memory_db:
+                shutil.rmtree(args.db_dir, ignore_errors=True)
+
+    failures = check_gates(report, args)
+    report["gate_failures"] = failures
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        connections, messages = report["connections"], report["messages"]
+        print(f"{args.clients} clients x {args.messages} messages against {report['url']} ({args.protocol})\n")
+        print(f"  connections   {connections['established']} held (peak {connections['peak_concurrent']}), "
+              f"{connections['failed']} failed, ramp {connections['ramp_seconds']}s, "
+              f"connect p50 {connections['connect_ms']['p50']} ms / p99 {connections['connect_ms']['p99']} ms")
+        print(f"  messages      {messages['answered']} answered, {messages['errors']} errors, "
+              f"{messages['disconnects']} disconnects, {messages['per_second']} msg/s")
+        turn = messages["turn_ms"]
+        print(f"  turn latency  p50 {turn['p50']} ms, p90 {turn['p90']} ms, p99 {turn['p99']} ms, max {turn['max']} ms")
+        if report["server"]:
+            print(f"  server        send p99 {report['server']['send_latency_p99_ms']} ms, "
+                  f"max queue depth {report['server']['queue_depth_max']}, "
+                  f"{report['server']['messages_dropped']} dropped")
+        print()
+        print("\n".join(f"❌ {failure}" for failure in failures) if failures else "✅ Within limits")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Fit a bot's confidence calibration from labelled queries.
+Runs the retrieval evaluation queries (benchmarks/data/retrieval_eval.jsonl,
+answerable from the seed_data.py knowledge base) plus out-of-scope queries
+against the bot's knowledge base. Each query gives the top relevance score
+and whether the retrieved context contains the answer; a logistic curve
+fitted on those pairs becomes the bot's score -> confidence mapping. The
+RAG engine compares that confidence with CONFIDENCE_THRESHOLD before using
+retrieved context.
+
+Usage:
+    python calibrate_confidence.py --bot-id 1
+    python calibrate_confidence.py --bot-id 2 --labels my_labels.jsonl --negatives my_out_of_scope.jsonl
+    python calibrate_confidence.py --bot-id 1 --dry-run
+    python calibrate_confidence.py --bot-id 1 --reset
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+from typing import Any, Dict, List
+
+from app.config import settings
+from app.database import AsyncSessionLocal, Bot, init_db
+from app.rag.calibration import sigmoid, confidence_calibrator, fit_platt
+from app.rag.retriever import get_document_retriever
+from benchmarks.retrieval_eval import LABELS_PATH, OUT_OF_SCOPE_PATH, is_relevant, load_labels
+
+
+def score_curve(scores: List[float], answered: List[bool], slope: float, intercept: float) -> Dict[str, Any]:
+    """Log loss, Brier score and gating outcome of one calibration curve."""
+    confidences = [sigmoid(slope * score + intercept) for score in scores]
+    log_loss = -sum(
+        math.log(max(p if label else 1.0 - p, 1e-12)) for p, label in zip(confidences, answered)
+    ) / len(scores)
+    brier = sum((p - label) ** 2 for p, label in zip(confidences, answered)) / len(scores)
+    used = [p >= settings.confidence_threshold for p in confidences]
+    positives = sum(answered)
+    return {
+        "log_loss": round(log_loss, 4),
+        "brier": round(brier, 4),
+        # Answered queries whose context is used, unanswered queries whose context is dropped
+        "answered_used": round(sum(u and a for u, a in zip(used, answered)) / positives, 4),
+        "unanswered_dropped": round(
+            sum(not u and not a for u, a in zip(used, answered)) / (len(scores) - positives), 4
+        ),
+        "confidences": confidences
+    }
+
+
+def print_reliability(confidences: List[float], answered: List[bool], bins: int = 5):
+    """Print predicted confidence against the observed answer rate per bin."""
+    print(f"  {'confidence':>12} {'queries':>8} {'predicted':>10} {'observed':>9}")
+    for i in range(bins):
+        low, high = i / bins, (i + 1) / bins
+        members = [
+            (p, a) for p, a in zip(confidences, answered)
+            if low <= p < high or (i == bins - 1 and p == 1.0)
+        ]
+        if not members:
+            continue
+        predicted = sum(p for p, _ in members) / len(members)
+        observed = sum(a for _, a in members) / len(members)
+        print(f"  {low:>5.1f} - {high:<4.1f} {len(members):>8} {predicted:>10.3f} {observed:>9.3f}")
+
+
+async def calibrate(args: argparse.Namespace):
+    """Collect (score, answered) pairs for a bot, fit the curve and store it."""
+    await init_db()
+
+    async with AsyncSessionLocal() as db:
+        bot = await db.get(Bot, args.bot_id)
+        if not bot:
+            print(f"❌ Bot {args.bot_id} not found")
+            sys.exit(1)
+
+    if args.reset:
+        confidence_calibrator.delete(bot.id)
+        print(f"🗑️  Calibration removed, bot {bot.id} uses the default curve")
+        return
+
+    retriever = get_document_retriever()
+    if not retriever.check_collection_exists(bot.id):
+        print(f"❌ Bot {bot.id} has no knowledge base (run seed_data.py or upload documents)")
+        sys.exit(1)
+
+    # Answer spans are only checked against the seed corpus for the bundled labels
+    from seed_data import SAMPLE_DOCUMENTS
+    labels = load_labels(args.labels, SAMPLE_DOCUMENTS if args.labels == LABELS_PATH else None)
+    with open(args.negatives, encoding="utf-8") as f:
+        labels += [{**json.loads(line), "answers": []} for line in f if line.strip()]
+
+    print(f"🎯 Calibrating bot {bot.id} ({bot.name}) on {len(labels)} queries, top {args.top_k}...")
+    scores, answered = [], []
+    for label in labels:
+        results, _ = await retriever.hybrid_search(label["query"], bot.id, args.top_k)
+        scores.append(results[0]["relevance"] if results else 0.0)
+        answered.append(any(is_relevant(result["content"], label) for result in results))
+
+    try:
+        fit = fit_platt(scores, answered)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    current = confidence_calibrator.get(bot.id) or {
+        "slope": settings.calibration_default_slope,
+        "intercept": settings.calibration_default_intercept
+    }
+    before = score_curve(scores, answered, current["slope"], current["intercept"])
+    after = score_curve(scores, answered, fit["slope"], fit["intercept"])
+
+    print(f"\n  {sum(answered)} answered / {len(answered) - sum(answered)} unanswered by the retrieved context")
+    print(f"  Curve: confidence = sigmoid({fit['slope']:.3f} * score + {fit['intercept']:.3f})")
+    print(f"\n  {'':<18} {'log loss':>9} {'brier':>7} {'answered used':>14} {'unanswered dropped':>19}")
+    for name, result in (("current curve", before), ("fitted curve", after)):
+        print(f"  {name:<18} {result['log_loss']:>9} {result['brier']:>7} "
+              f"{result['answered_used']:>14} {result['unanswered_dropped']:>19}")
+    print(f"  (gating at CONFIDENCE_THRESHOLD={settings.confidence_threshold})\n")
+    print_reliability(after["confidences"], answered)
+
+    if args.dry_run:
+        print("\n🧪 Dry run, calibration not stored")
+        return
+    if fit["slope"] <= 0:
+        # Higher scores must mean higher confidence, or gating would invert
+        print("\n❌ Scores do not separate answered from unanswered queries, calibration not stored")
+        sys.exit(1)
+
+    confidence_calibrator.save(bot.id, {
+        **fit,
+        "queries": len(labels),
+        "answered": sum(answered),
+        "top_k": args.top_k,
+        "embedding_model": settings.embedding_model_name,
+        "log_loss": after["log_loss"],
+        "brier": after["brier"]
+    })
+    print(f"\n✅ Calibration stored for bot {bot.id}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fit a bot's retrieval confidence calibration")
+    parser.add_argument("--bot-id", type=int, required=True, help="Bot to calibrate")
+    parser.add_argument("--labels", default=LABELS_PATH, help="Answerable queries with answer spans (JSON lines)")
+    parser.add_argument("--negatives", default=OUT_OF_SCOPE_PATH, help="Queries the knowledge base cannot answer (JSON lines)")
+    parser.add_argument("--top-k", type=int, default=settings.retrieval_top_k, help="Results per query")
+    parser.add_argument("--dry-run", action="store_true", help="Report the fit without storing it")
+    parser.add_argument("--reset", action="store_true", help="Remove the bot's calibration")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(calibrate(parse_args()))
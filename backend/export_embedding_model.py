@@ -0,0 +1,132 @@
+"""
+Export the embedding model to ONNX for EMBEDDING_RUNTIME=onnx.
+Exports the transformer, applies int8 dynamic quantization, saves the fast
+tokenizer and reference embeddings, and checks the result against PyTorch.
+Needs torch, sentence-transformers and onnx once; serving only needs
+onnxruntime and tokenizers.
+
+Usage:
+    python export_embedding_model.py [--output ./models/all-MiniLM-L6-v2-onnx] [--no-quantize]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from app.config import settings
+from app.rag.embeddings import REFERENCE_TEXTS, OnnxEmbeddings, compare_embeddings
+
+
+def export_model(args: argparse.Namespace):
+    """Export, quantize and verify the embedding model."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(args.output, exist_ok=True)
+    print(f"📦 Loading {args.model}...")
+    model = SentenceTransformer(args.model, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    if not getattr(tokenizer, "is_fast", False):
+        print("❌ The model has no fast tokenizer (tokenizer.json)")
+        sys.exit(1)
+    tokenizer.save_pretrained(args.output)
+
+    class LastHiddenState(torch.nn.Module):
+        """Expose only the token embeddings used for mean pooling."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    model_path = os.path.join(args.output, "model.onnx")
+    export_kwargs = {"dynamo": False} if "dynamo" in torch.onnx.export.__code__.co_varnames else {}
+    torch.onnx.export(
+        LastHiddenState(transformer),
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        model_path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "token_type_ids": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"}
+        },
+        opset_version=14,
+        **export_kwargs
+    )
+    print(f"✅ Exported {model_path}")
+
+    model_file = "model.onnx"
+    if not args.no_quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            model_path,
+            os.path.join(args.output, "model_quantized.onnx"),
+            weight_type=QuantType.QInt8
+        )
+        model_file = "model_quantized.onnx"
+        print(f"✅ Quantized weights to int8 ({model_file})")
+
+    # Reference embeddings let the server verify compatibility without torch
+    reference = model.encode(
+        [text.replace("\n", " ") for text in REFERENCE_TEXTS],
+        convert_to_numpy=True
+    ).astype(np.float32)
+    np.save(os.path.join(args.output, "reference_embeddings.npy"), reference)
+
+    with open(os.path.join(args.output, "embedding_config.json"), "w") as f:
+        json.dump({
+            "source_model": args.model,
+            "model_file": model_file,
+            "max_seq_length": model.max_seq_length,
+            "dimension": int(reference.shape[1]),
+            "normalize": any(type(module).__name__ == "Normalize" for module in model),
+            "pad_token": tokenizer.pad_token,
+            "reference_texts": REFERENCE_TEXTS
+        }, f, indent=2)
+
+    embeddings = OnnxEmbeddings(args.output, verify=False)
+    report = compare_embeddings(reference, embeddings.encode(REFERENCE_TEXTS))
+    size_mb = os.path.getsize(os.path.join(args.output, model_file)) / (1024 * 1024)
+
+    print(f"\n📏 Model size:        {size_mb:.1f} MB")
+    print(f"🎯 Min cosine:        {report['min_cosine']}")
+    print(f"🎯 Mean cosine:       {report['mean_cosine']}")
+    print(f"🎯 Max abs diff:      {report['max_abs_diff']}")
+
+    if report["min_cosine"] < args.tolerance:
+        print(f"❌ Below tolerance {args.tolerance}; existing collections would not match")
+        sys.exit(1)
+    print(f"✅ Compatible with {args.model} (tolerance {args.tolerance})")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--model", default=settings.embedding_model_name, help="sentence-transformers model name")
+    parser.add_argument("--output", default=settings.onnx_model_path, help="Output model directory")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep float32 weights")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=settings.embedding_compat_tolerance,
+        help="Minimum cosine similarity to the PyTorch embeddings"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    export_model(parse_args())
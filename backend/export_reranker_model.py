@@ -0,0 +1,147 @@
+"""
+Export the cross-encoder reranker to ONNX for RERANK_ENABLED=true.
+Exports the sequence classification model, applies int8 dynamic
+quantization, saves the fast tokenizer and checks the scores against
+sentence-transformers. Needs torch, sentence-transformers and onnx once;
+serving only needs onnxruntime and tokenizers.
+
+Usage:
+    python export_reranker_model.py [--model cross-encoder/ms-marco-MiniLM-L-6-v2] [--output ./models/ms-marco-MiniLM-L-6-v2-onnx] [--no-quantize]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from app.config import settings
+from app.rag.reranker import OnnxCrossEncoder
+
+
+# Query/passage pairs scored by both runtimes to check that they agree
+REFERENCE_PAIRS = [
+    ("How much is the pro plan?", "Professional Plan - $149/month: up to 5 chatbots and priority support."),
+    ("How much is the pro plan?", "Our office is open Monday to Friday, 9am to 6pm EST."),
+    ("Do you offer refunds?", "Yes, we offer a 30-day money-back guarantee if you're not satisfied."),
+    ("Do you offer refunds?", "Upload PDF, TXT or Markdown files to build the knowledge base."),
+    ("How do I contact support?", "Email us at support@example.com or use the chat widget on our website."),
+    ("How do I contact support?", "Refunds are processed within 5-7 business days. " * 20),
+]
+
+
+def export_model(args: argparse.Namespace):
+    """Export, quantize and verify the reranker model."""
+    import torch
+    from sentence_transformers import CrossEncoder
+
+    os.makedirs(args.output, exist_ok=True)
+    print(f"📦 Loading {args.model}...")
+    cross_encoder = CrossEncoder(args.model, device="cpu")
+    model = cross_encoder.model.eval()
+    tokenizer = cross_encoder.tokenizer
+
+    if not getattr(tokenizer, "is_fast", False):
+        print("❌ The model has no fast tokenizer (tokenizer.json)")
+        sys.exit(1)
+    tokenizer.save_pretrained(args.output)
+
+    class Logits(torch.nn.Module):
+        """Expose only the relevance logits."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids
+            ).logits
+
+    sample = tokenizer([("export query", "export passage")], return_tensors="pt")
+    model_path = os.path.join(args.output, "model.onnx")
+    export_kwargs = {"dynamo": False} if "dynamo" in torch.onnx.export.__code__.co_varnames else {}
+    torch.onnx.export(
+        Logits(model).eval(),
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        model_path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "token_type_ids": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"}
+        },
+        opset_version=14,
+        **export_kwargs
+    )
+    print(f"✅ Exported {model_path}")
+
+    model_file = "model.onnx"
+    if not args.no_quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            model_path,
+            os.path.join(args.output, "model_quantized.onnx"),
+            weight_type=QuantType.QInt8
+        )
+        model_file = "model_quantized.onnx"
+        print(f"✅ Quantized weights to int8 ({model_file})")
+
+    max_seq_length = min(args.max_seq_length, tokenizer.model_max_length)
+    with open(os.path.join(args.output, "reranker_config.json"), "w") as f:
+        json.dump({
+            "source_model": args.model,
+            "model_file": model_file,
+            "max_seq_length": max_seq_length,
+            "pad_token": tokenizer.pad_token
+        }, f, indent=2)
+
+    # Compare raw logits at the same truncation length
+    with torch.no_grad():
+        features = tokenizer(
+            [query for query, _ in REFERENCE_PAIRS],
+            [passage for _, passage in REFERENCE_PAIRS],
+            padding=True,
+            truncation=True,
+            max_length=max_seq_length,
+            return_tensors="pt"
+        )
+        reference = model(**features).logits.reshape(len(REFERENCE_PAIRS), -1)[:, -1].numpy()
+
+    reranker = OnnxCrossEncoder(args.output, max_seq_length=max_seq_length)
+    scores = np.array([reranker.score(query, [passage])[0] for query, passage in REFERENCE_PAIRS])
+    max_diff = float(np.abs(reference - scores).max())
+    # Each query's relevant passage must still win
+    order_kept = all(
+        (scores[i] > scores[i + 1]) == (reference[i] > reference[i + 1])
+        for i in range(0, len(REFERENCE_PAIRS), 2)
+    )
+    size_mb = os.path.getsize(os.path.join(args.output, model_file)) / (1024 * 1024)
+
+    print(f"\n📏 Model size:        {size_mb:.1f} MB")
+    print(f"🎯 Max score diff:    {max_diff:.4f}")
+    print(f"🎯 Ranking agrees:    {order_kept}")
+
+    if not order_kept or max_diff > args.tolerance:
+        print(f"❌ ONNX scores drifted from {args.model} (tolerance {args.tolerance})")
+        sys.exit(1)
+    print(f"✅ Compatible with {args.model} (tolerance {args.tolerance})")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export the cross-encoder reranker to ONNX")
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2", help="sentence-transformers CrossEncoder name")
+    parser.add_argument("--output", default=settings.rerank_model_path, help="Output model directory")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep float32 weights")
+    parser.add_argument("--max-seq-length", type=int, default=512, help="Longest pair the model is exported for")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Largest allowed logit difference")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    export_model(parse_args())
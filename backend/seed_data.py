@@ -7,41 +7,17 @@ import sys
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import AsyncSessionLocal, Bot, ChatSession, Message, Lead
-from app.rag.ingestion import document_ingestion
+from app.rag.ingestion import get_document_ingestion
 from datetime import datetime, timedelta
 import random
 import uuid
 
 
-async def seed_database():
-    """Seed the database with sample bot and knowledge base."""
-    print("🌱 Starting database seeding...")
-    
-    async with AsyncSessionLocal() as db:
-        try:
-            # Create a sample bot
-            print("\n📦 Creating sample bot...")
-            sample_bot = Bot(
-                name="Demo Support Bot",
-                system_prompt="""You are a helpful and friendly customer support assistant. 
-Your goal is to assist customers with their questions and concerns.
-Be polite, professional, and provide accurate information based on the knowledge base.
-If you don't know something, be honest and offer to connect them with a human agent.
-When appropriate, ask for contact information to follow up.""",
-                welcome_message="Hello! 👋 I'm your AI support assistant. How can I help you today?"
-            )
-            db.add(sample_bot)
-            await db.commit()
-            await db.refresh(sample_bot)
-            print(f"✅ Bot created with ID: {sample_bot.id}")
-            
-            # Add sample knowledge base content
-            print("\n📚 Adding sample knowledge base content...")
-            
-            sample_documents = [
-                {
-                    "title": "Company Information",
-                    "content": """
+# Sample knowledge base (also the corpus of benchmarks.retrieval_eval)
+SAMPLE_DOCUMENTS = [
+    {
+        "title": "Company Information",
+        "content": """
 About Our Company:
 We are a leading provider of AI-powered customer support solutions.
 Founded in 2024, our mission is to help businesses provide exceptional customer service 
@@ -59,10 +35,10 @@ Our Values:
 3. Transparency: We believe in honest and open communication
 4. Quality: We deliver reliable and accurate solutions
 """
-                },
-                {
-                    "title": "Pricing Information",
-                    "content": """
+    },
+    {
+        "title": "Pricing Information",
+        "content": """
 Pricing Plans:
 
 Starter Plan - $49/month
@@ -99,10 +75,10 @@ All plans include:
 
 Special Offer: Get 20% off annual plans!
 """
-                },
-                {
-                    "title": "Product Features",
-                    "content": """
+    },
+    {
+        "title": "Product Features",
+        "content": """
 Key Features:
 
 AI-Powered Chat:
@@ -148,10 +124,10 @@ Security:
 - Data residency options
 - Regular security audits
 """
-                },
-                {
-                    "title": "Getting Started Guide",
-                    "content": """
+    },
+    {
+        "title": "Getting Started Guide",
+        "content": """
 Getting Started with Our Platform:
 
 Step 1: Sign Up
@@ -192,10 +168,10 @@ Step 6: Optimize
 
 Need help? Contact our support team at support@example.com or schedule a demo call!
 """
-                },
-                {
-                    "title": "FAQ",
-                    "content": """
+    },
+    {
+        "title": "FAQ",
+        "content": """
 Frequently Asked Questions:
 
 Q: How long does setup take?
@@ -228,14 +204,40 @@ A: Yes, we offer a 30-day money-back guarantee if you're not satisfied.
 Q: How do I get support?
 A: Email us at support@example.com, use the chat widget on our website, or schedule a call.
 """
-                }
-            ]
+    }
+]
+
+
+async def seed_database():
+    """Seed the database with sample bot and knowledge base."""
+    print("🌱 Starting database seeding...")
+    
+    async with AsyncSessionLocal() as db:
+        try:
+            # Create a sample bot
+            print("\n📦 Creating sample bot...")
+            sample_bot = Bot(
+                name="Demo Support Bot",
+                system_prompt="""You are a helpful and friendly customer support assistant. 
+Your goal is to assist customers with their questions and concerns.
+Be polite, professional, and provide accurate information based on the knowledge base.
+If you don't know something, be honest and offer to connect them with a human agent.
+When appropriate, ask for contact information to follow up.""",
+                welcome_message="Hello! 👋 I'm your AI support assistant. How can I help you today?"
+            )
+            db.add(sample_bot)
+            await db.commit()
+            await db.refresh(sample_bot)
+            print(f"✅ Bot created with ID: {sample_bot.id}")
+            
+            # Add sample knowledge base content
+            print("\n📚 Adding sample knowledge base content...")
             
             # Ingest each document
-            for doc in sample_documents:
+            for doc in SAMPLE_DOCUMENTS:
                 print(f"\n  📄 Ingesting: {doc['title']}")
                 
-                result = await document_ingestion.ingest_document(
+                result = await get_document_ingestion().ingest_document(
                     content=doc['content'],
                     metadata={
                         "filename": f"{doc['title']}.txt",
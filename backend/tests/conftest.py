@@ -4,8 +4,10 @@ Pytest configuration and fixtures.
 import pytest
 import asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from app.database import Base
+from app.database import Base, get_db
+from app.main import app
 
 
 # Use a separate test database
@@ -23,15 +25,29 @@ def event_loop():
 @pytest.fixture(scope="function", autouse=True)
 async def setup_test_database():
     """Set up test database before each test and tear down after."""
-    # Create test engine
-    engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+    # Create test engine (one shared connection so the in-memory database persists)
+    engine = create_async_engine(TEST_DATABASE_URL, echo=False, poolclass=StaticPool)
+    TestSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
     
     # Create all tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     
+    async def override_get_db():
+        async with TestSessionLocal() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+    
+    app.dependency_overrides[get_db] = override_get_db
+    
     yield
     
+    app.dependency_overrides.pop(get_db, None)
+    
     # Drop all tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
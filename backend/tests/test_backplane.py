@@ -0,0 +1,118 @@
+"""
+Test WebSocket broadcasts through the backplane.
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.api.backplane import BackplaneHub, InMemoryBackplane, SocketBackplane, _encode_frame, create_backplane
+from app.api.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """Records the JSON messages sent to it."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        self.subprotocol = subprotocol
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    async def send_bytes(self, data):
+        import msgpack
+        self.sent.append(msgpack.unpackb(data))
+
+
+async def wait_until(predicate, timeout: float = 5.0):
+    """Poll until predicate() is true."""
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_local_connections():
+    """Test that a broadcast reaches every local connection of the session only."""
+    manager = ConnectionManager(InMemoryBackplane())
+    first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await manager.connect(first, 1)
+    await manager.connect(second, 1)
+    await manager.connect(other, 2)
+
+    await manager.broadcast({"content": "hello"}, 1)
+    await wait_until(lambda: first.sent and second.sent)
+    await manager.close()
+
+    assert first.sent == second.sent == [{"content": "hello"}]
+    assert other.sent == []
+
+
+@pytest.mark.asyncio
+async def test_broadcast_crosses_workers_through_hub(tmp_path):
+    """Test that two managers on one hub see each other's session broadcasts."""
+    url = f"unix://{tmp_path / 'hub.sock'}"
+    hub = BackplaneHub(url)
+    await hub.start()
+    workers = [ConnectionManager(SocketBackplane(url)) for _ in range(2)]
+    sockets = [FakeWebSocket() for _ in workers]
+    try:
+        for manager, websocket in zip(workers, sockets):
+            await manager.connect(websocket, 7)
+            await asyncio.wait_for(manager.backplane.connected.wait(), timeout=5)
+        # Let the hub register both subscriptions
+        await wait_until(lambda: len(hub.subscribers.get(7, ())) == 2)
+
+        await workers[0].broadcast({"content": "from worker 0"}, 7)
+        await wait_until(lambda: sockets[0].sent and sockets[1].sent)
+
+        assert sockets[0].sent == [{"content": "from worker 0"}]
+        assert sockets[1].sent == [{"content": "from worker 0"}]
+    finally:
+        for manager in workers:
+            await manager.close()
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_bad_frames_do_not_stop_delivery(tmp_path):
+    """Test that a malformed frame or a failing delivery is skipped and later frames still arrive."""
+    url = f"unix://{tmp_path / 'hub.sock'}"
+    hub = BackplaneHub(url)
+    await hub.start()
+    backplane = SocketBackplane(url)
+    delivered = []
+
+    async def deliver(session_id, message):
+        if message.get("content") == "boom":
+            raise RuntimeError("socket went away")
+        delivered.append(message)
+
+    try:
+        await backplane.start(deliver)
+        await backplane.subscribe(7)
+        await asyncio.wait_for(backplane.connected.wait(), timeout=5)
+        await wait_until(lambda: len(hub.subscribers.get(7, ())) == 1)
+
+        writer = next(iter(hub.subscribers[7]))
+        writer.write(b"not json\n")
+        writer.write(b'{"session": 7}\n')
+        writer.write(_encode_frame({"session": 7, "message": {"content": "boom"}}))
+        writer.write(_encode_frame({"session": 7, "message": {"content": "hello"}}))
+        await wait_until(lambda: delivered)
+
+        assert delivered == [{"content": "hello"}]
+        assert not backplane._task.done()
+    finally:
+        await backplane.close()
+        await hub.close()
+
+
+def test_unknown_backplane():
+    """Test that an unknown backplane backend is rejected."""
+    with pytest.raises(ValueError):
+        create_backplane("carrier-pigeon")
@@ -0,0 +1,57 @@
+"""
+Test the content-addressed document blob store.
+"""
+import os
+import time
+
+from app.blobstore import BlobStore
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    """Test that stored text can be read back by its digest."""
+    store = BlobStore(root=str(tmp_path))
+    digest, size = store.put("Hello, knowledge base! ✨")
+
+    assert len(digest) == 64
+    assert size == len("Hello, knowledge base! ✨".encode("utf-8"))
+    assert store.exists(digest)
+    assert store.get(digest) == "Hello, knowledge base! ✨"
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    """Test that identical bodies share one blob."""
+    store = BlobStore(root=str(tmp_path))
+    first, _ = store.put("same body " * 100)
+    second, _ = store.put("same body " * 100)
+
+    assert first == second
+    assert len([p for p in tmp_path.rglob("*.z")]) == 1
+
+
+def test_delete(tmp_path):
+    """Test deleting a blob."""
+    store = BlobStore(root=str(tmp_path))
+    digest, _ = store.put("temporary")
+
+    assert store.delete(digest) is True
+    assert not store.exists(digest)
+    assert store.delete(digest) is False
+
+
+def test_delete_keeps_recently_stored_blobs(tmp_path):
+    """Test that a blob stored (or stored again) within the grace period survives a delete."""
+    store = BlobStore(root=str(tmp_path))
+    digest, _ = store.put("shared body")
+    path = store._path(digest)
+    an_hour_ago = time.time() - 3600
+    os.utime(path, (an_hour_ago, an_hour_ago))
+
+    # Another upload of the same content, not yet committed
+    store.put("shared body")
+    assert store.delete(digest, min_age_seconds=60) is False
+    assert store.get(digest) == "shared body"
+
+    os.utime(path, (an_hour_ago, an_hour_ago))
+    assert store.delete(digest, min_age_seconds=60) is True
+    assert not store.exists(digest)
+    assert os.listdir(os.path.dirname(path)) == []
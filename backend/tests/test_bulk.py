@@ -0,0 +1,45 @@
+"""
+Test archive unpacking limits for bulk ingestion.
+"""
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from app.rag.bulk import ArchiveLimitError, iter_archive
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def make_tar(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("filename, make", [("docs.zip", make_zip), ("docs.tar.gz", make_tar)])
+def test_archive_limits(filename, make):
+    """Test that archives over the member or size limit are rejected before any file is yielded."""
+    files = {"a.txt": b"Refunds take 14 days.", "b.md": b"# Hours", "image.png": b"\0" * 10}
+    assert [name for name, _ in iter_archive(make(files), filename, max_members=3, max_bytes=100)] == ["a.txt", "b.md"]
+
+    with pytest.raises(ArchiveLimitError):
+        next(iter_archive(make(files), filename, max_members=2, max_bytes=100))
+
+    # Highly compressible content counts at its uncompressed size
+    bomb = {"a.txt": b"Refunds take 14 days.", "bomb.txt": b"0" * 1_000_000}
+    with pytest.raises(ArchiveLimitError):
+        next(iter_archive(make(bomb), filename, max_members=10, max_bytes=100_000))
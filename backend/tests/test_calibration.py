@@ -0,0 +1,72 @@
+"""
+Test confidence calibration and calibrated retrieval gating.
+"""
+import os
+
+import pytest
+
+from app.agent.tools import AgentTools
+from app.rag.calibration import ConfidenceCalibrator, fit_platt, sigmoid
+from app.rag.retriever import DocumentRetriever
+
+
+class FixedStore:
+    """Returns the same chunk, at a fixed cosine distance, for every query."""
+
+    def __init__(self, distance):
+        self.distance = distance
+
+    def query(self, bot_id, embedding, k):
+        return [{"id": "c0", "content": "Refunds within 30 days", "metadata": {}, "distance": self.distance}]
+
+
+def test_fit_separates_answered_queries():
+    """Test that the fitted curve is monotone and puts each class on its side of 0.5."""
+    answered = [0.62, 0.66, 0.7, 0.71, 0.74, 0.78, 0.8, 0.83, 0.41]
+    unanswered = [0.18, 0.22, 0.25, 0.3, 0.33, 0.35, 0.38, 0.42, 0.64]
+    fit = fit_platt(answered + unanswered, [True] * len(answered) + [False] * len(unanswered))
+
+    assert fit["slope"] > 0
+    assert sigmoid(fit["slope"] * 0.8 + fit["intercept"]) > 0.8
+    assert sigmoid(fit["slope"] * 0.2 + fit["intercept"]) < 0.2
+
+    with pytest.raises(ValueError):
+        fit_platt([0.5, 0.7], [True, True])
+
+
+def test_fits_are_stored_per_bot(tmp_path):
+    """Test that a stored fit is picked up by other instances and can be reset."""
+    writer = ConfidenceCalibrator(path=str(tmp_path))
+    reader = ConfidenceCalibrator(path=str(tmp_path))
+    default = reader.calibrate(1, 0.5)
+
+    writer.save(1, {"slope": 10.0, "intercept": -5.0})
+    assert reader.calibrate(1, 0.5) == pytest.approx(0.5)
+    assert reader.get(2) is None
+    assert os.path.exists(tmp_path / "bot_1.json")
+
+    writer.delete(1)
+    assert reader.calibrate(1, 0.5) == pytest.approx(default)
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_returns_calibrated_confidence(tmp_path):
+    """Test that relevance is cosine similarity and confidence goes through the bot's curve."""
+    calibrator = ConfidenceCalibrator(path=str(tmp_path))
+    calibrator.save(1, {"slope": 10.0, "intercept": -4.0})
+    retriever = DocumentRetriever(
+        embeddings=object(), vector_store=FixedStore(0.3), keyword_boost=0.0, calibrator=calibrator
+    )
+
+    results, confidence = await retriever.hybrid_search("refund policy", 1, top_k=1, query_embedding=[1.0])
+
+    assert results[0]["relevance"] == pytest.approx(0.7)
+    assert confidence == pytest.approx(sigmoid(10.0 * 0.7 - 4.0))
+
+
+def test_escalation_uses_calibrated_threshold():
+    """Test that low calibrated confidence escalates, as does asking for a person."""
+    assert AgentTools.should_escalate_to_human("what are your hours?", 0.3)
+    assert not AgentTools.should_escalate_to_human("what are your hours?", 0.6)
+    assert not AgentTools.should_escalate_to_human("what are your hours?", 0.3, threshold=0.2)
+    assert AgentTools.should_escalate_to_human("can I talk to a real person?", 0.9)
@@ -0,0 +1,67 @@
+"""
+Test structure-aware chunking.
+"""
+from app.rag.chunking import StructuredChunker, create_chunker
+from app.rag.tokens import estimate_tokens
+
+
+PDF_TEXT = (
+    "[Page 1]\n"
+    "Returns Policy\n\n"
+    "Items can be returned within 30 days of delivery.\n"
+    "Refunds are issued to the original payment method.\n\n"
+    "[Page 2]\n"
+    "Shipping:\n"
+    "- Standard shipping takes 5-7 business days.\n"
+    "- Express shipping takes 1-2 business days.\n"
+)
+
+
+def test_offsets_point_at_chunk_text():
+    """Test that every chunk is exactly text[char_start:char_end]."""
+    text = "# Guide\n\n" + "\n\n".join(f"Paragraph {i} about refunds and billing. " * 12 for i in range(20))
+    chunks = StructuredChunker(max_tokens=64, overlap_tokens=16).chunk(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        assert text[metadata["char_start"]:metadata["char_end"]] == chunk["content"]
+        assert metadata["token_count"] == estimate_tokens(chunk["content"])
+
+
+def test_pages_and_sections_are_recorded():
+    """Test that chunks never cross page markers and carry page and section."""
+    chunks = StructuredChunker(max_tokens=192).chunk(PDF_TEXT)
+
+    assert [chunk["metadata"]["page"] for chunk in chunks] == [1, 2]
+    assert all("[Page" not in chunk["content"] for chunk in chunks)
+    assert chunks[0]["content"].startswith("Returns Policy")
+    assert chunks[1]["metadata"]["section"] == "Shipping"
+    assert chunks[1]["content"].endswith("1-2 business days.")
+
+
+def test_chunks_fit_the_token_limit():
+    """Test that oversized paragraphs are split at sentences and words."""
+    text = "Refunds take five to seven business days to appear. " * 200 + "\n\n" + "x" * 5000
+    chunks = StructuredChunker(max_tokens=50, overlap_tokens=10).chunk(text)
+
+    assert all(estimate_tokens(chunk["content"]) <= 50 for chunk in chunks)
+    # Sentence boundaries are kept where they exist
+    assert all(chunk["content"].endswith(".") for chunk in chunks if "Refunds" in chunk["content"])
+
+
+def test_headings_start_chunks():
+    """Test that a heading opens a new chunk and stays with the text under it."""
+    text = "## Pricing\n\nStarter Plan - $49/month\n\n## Support\n\nEmail support@example.com."
+    chunks = StructuredChunker(max_tokens=192).chunk(text)
+
+    assert [chunk["metadata"]["section"] for chunk in chunks] == ["Pricing", "Support"]
+    assert chunks[1]["content"] == "## Support\n\nEmail support@example.com."
+
+
+def test_create_chunker_recursive():
+    """Test that the recursive chunker is still available without offsets."""
+    chunks = create_chunker("recursive", 50, 10).chunk("word " * 40)
+
+    assert len(chunks) > 1
+    assert all(chunk["metadata"] == {} for chunk in chunks)
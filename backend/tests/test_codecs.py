@@ -0,0 +1,57 @@
+"""
+Test WebSocket protocol negotiation and compact frames.
+"""
+import pytest
+
+from app.api.backplane import InMemoryBackplane
+from app.api.codecs import JSON_CODEC, ORIGIN_KEY, get_codec, negotiate_codec
+from app.api.websocket import ConnectionManager
+from tests.test_backplane import FakeWebSocket, wait_until
+
+
+ECHO = {"role": "user", "content": "Where is my order?", "session_id": 3,
+        "timestamp": "2024-01-01T00:00:00", "confidence": None, "sources": None}
+TYPING = {"role": "system", "content": "typing", "session_id": 3}
+
+
+def test_json_is_default():
+    """Test that clients offering no known subprotocol keep the JSON protocol."""
+    assert negotiate_codec([]) is JSON_CODEC
+    assert negotiate_codec(["chat.v9"]) is JSON_CODEC
+    assert negotiate_codec(["chat.v9", "chat.compact.json"]).name == "compact-json"
+
+
+def test_compact_frames():
+    """Test acks for the sender's own echo, folded typing and dropped empty fields."""
+    codec = get_codec("chat.compact.json")
+    echo = {**ECHO, ORIGIN_KEY: "abc", "client_id": 7}
+
+    ack = codec.loads(codec.encode(echo, own_echo=True))
+    assert ack == {"type": "ack", "id": 7, "session_id": 3, "timestamp": "2024-01-01T00:00:00", "typing": True}
+
+    other_tab = codec.loads(codec.encode(echo))
+    assert other_tab["content"] == "Where is my order?" and other_tab["typing"] is True
+    assert "confidence" not in other_tab and ORIGIN_KEY not in other_tab
+
+    assert codec.encode(TYPING) is None
+    # The JSON protocol only strips routing metadata
+    assert JSON_CODEC.loads(JSON_CODEC.encode(echo)) == {**ECHO, "client_id": 7}
+
+
+@pytest.mark.asyncio
+async def test_mixed_protocols_in_one_session():
+    """Test that each connection of a session gets frames in its own protocol."""
+    pytest.importorskip("msgpack")
+    manager = ConnectionManager(InMemoryBackplane())
+    legacy, compact = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(legacy, 3)
+    await manager.connect(compact, 3, negotiate_codec(["chat.compact.msgpack"]))
+    assert compact.subprotocol == "chat.compact.msgpack"
+
+    await manager.broadcast({**ECHO, ORIGIN_KEY: manager.connection_id(compact)}, 3)
+    await manager.broadcast(TYPING, 3)
+    await wait_until(lambda: len(legacy.sent) == 2 and compact.sent)
+    await manager.close()
+
+    assert legacy.sent == [ECHO, TYPING]
+    assert [frame.get("type") for frame in compact.sent] == ["ack"]
@@ -0,0 +1,98 @@
+"""
+Test token-budgeted context assembly.
+"""
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.rag.context import CONTEXT_TOKENS_SAVED, ContextBuilder, merge_overlapping
+
+
+def _chunks(text, chunk_size=200, chunk_overlap=50):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_text(text)
+
+
+def _doc(content, document_id, chunk_index, relevance=0.8, filename="doc.txt"):
+    return {
+        "content": content,
+        "metadata": {"document_id": document_id, "chunk_index": chunk_index, "filename": filename},
+        "relevance": relevance
+    }
+
+
+def test_merge_overlapping_removes_shared_text():
+    """Test that the overlap between consecutive chunks appears once."""
+    text = " ".join(f"word{i}" for i in range(120))
+    chunks = _chunks(text)
+    merged = merge_overlapping(chunks[0], chunks[1], max_overlap=100)
+
+    assert merged == text[:len(merged)]
+
+
+def test_adjacent_chunks_are_merged_and_deduped():
+    """Test that adjacent chunks of one document become a single passage."""
+    text = " ".join(f"word{i}" for i in range(120))
+    chunks = _chunks(text)
+    docs = [_doc(chunk, document_id=1, chunk_index=i) for i, chunk in enumerate(chunks[:3])]
+    docs.append(_doc(chunks[0], document_id=1, chunk_index=0))
+
+    requests, saved = CONTEXT_TOKENS_SAVED.count(), CONTEXT_TOKENS_SAVED.sum()
+    result = ContextBuilder(token_budget=10000, max_overlap=100).build(docs)
+
+    assert result["context"].count("[Source") == 1
+    assert CONTEXT_TOKENS_SAVED.count() == requests + 1
+    assert CONTEXT_TOKENS_SAVED.sum() == saved + result["tokens_saved"]
+    assert result["context"].count("word10 ") == 1
+    assert result["tokens_saved"] > 0
+    assert result["sources"] == ["doc.txt"]
+
+
+def test_token_budget_keeps_most_relevant_passages():
+    """Test that passages are added by relevance until the budget is full."""
+    docs = [
+        _doc("low relevance " * 50, document_id=1, chunk_index=0, relevance=0.2, filename="low.txt"),
+        _doc("high relevance " * 50, document_id=2, chunk_index=0, relevance=0.9, filename="high.txt"),
+    ]
+
+    result = ContextBuilder(token_budget=200).build(docs)
+
+    assert "high relevance" in result["context"]
+    assert "low relevance" not in result["context"]
+    assert result["sources"] == ["high.txt"]
+
+
+def test_empty_input():
+    """Test that no documents produce an empty context."""
+    result = ContextBuilder().build([])
+
+    assert result["context"] == ""
+    assert result["tokens_saved"] == 0
+
+
+def test_chunks_with_offsets_merge_exactly():
+    """Test that overlapping chunks with source offsets join without repeating text."""
+    text = "Refunds take 5-7 business days. Contact support for help with returns."
+    docs = [
+        {"content": text[0:40], "metadata": {"document_id": 1, "chunk_index": 0, "char_start": 0, "char_end": 40}},
+        {"content": text[32:], "metadata": {"document_id": 1, "chunk_index": 1, "char_start": 32, "char_end": len(text)}},
+    ]
+
+    result = ContextBuilder(token_budget=10000).build(docs)
+
+    assert result["context"] == f"[Source 1]: {text}"
+
+
+def test_oversized_passage_is_cut_at_a_sentence():
+    """Test that a passage larger than the budget keeps its leading sentences instead of being dropped."""
+    sentences = [f"Plan {i} includes {i * 10} seats and priority support." for i in range(1, 31)]
+    text = " ".join(sentences)
+    docs = [
+        {"content": text[0:600], "metadata": {"document_id": 1, "chunk_index": 0, "char_start": 0, "char_end": 600}},
+        {"content": text[550:], "metadata": {"document_id": 1, "chunk_index": 1, "char_start": 550, "char_end": len(text)}},
+    ]
+
+    result = ContextBuilder(token_budget=60).build(docs)
+
+    assert result["context"].startswith(f"[Source 1]: {sentences[0]}")
+    assert result["context"].endswith(".")
+    assert 0 < result["tokens_used"] <= 60
+    assert result["sources"] == ["Unknown"]
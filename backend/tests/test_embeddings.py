@@ -0,0 +1,29 @@
+"""
+Test the embedding runtime helpers.
+"""
+import pytest
+
+from app.rag.embeddings import compare_embeddings, create_embeddings
+
+
+def test_compare_embeddings():
+    """Test the compatibility report between two runtimes."""
+    report = compare_embeddings([[1.0, 0.0], [0.0, 1.0]], [[1.0, 0.0], [0.6, 0.8]])
+    assert report["min_cosine"] == pytest.approx(0.8)
+    assert report["mean_cosine"] == pytest.approx(0.9)
+    assert report["max_abs_diff"] == pytest.approx(0.6)
+
+
+def test_onnx_runtime_requires_exported_model(tmp_path, monkeypatch):
+    """Test that the ONNX runtime fails clearly when no model was exported."""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    monkeypatch.setattr("app.rag.embeddings.settings.onnx_model_path", str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        create_embeddings("onnx")
+
+
+def test_unknown_runtime():
+    """Test that an unknown runtime name is rejected."""
+    with pytest.raises(ValueError):
+        create_embeddings("tensorflow")
@@ -0,0 +1,52 @@
+"""
+Test pipeline metrics and the /metrics endpoint.
+"""
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.metrics import STAGE_SECONDS, MetricsRegistry, timed
+
+
+def test_histogram_text_format():
+    """Test cumulative buckets, sum and count in the Prometheus text format."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, stage="embedding")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP demo_seconds Demo latency", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{stage="embedding",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="embedding",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="embedding",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{stage="embedding"} 2.55' in lines
+    assert 'demo_seconds_count{stage="embedding"} 3' in lines
+
+
+def test_failed_stage_is_not_observed():
+    """Test that a stage that raises is not recorded as a latency sample."""
+    before = STAGE_SECONDS.count(stage="test_stage")
+    with timed("test_stage"):
+        pass
+    with pytest.raises(RuntimeError):
+        with timed("test_stage"):
+            raise RuntimeError("boom")
+    assert STAGE_SECONDS.count(stage="test_stage") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    """Test that /metrics serves stage histograms, connection gauges and cache counters."""
+    with timed("vector_search"):
+        pass
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'chatbot_stage_seconds_count{stage="vector_search"}' in body
+    assert "# TYPE chatbot_websocket_connections gauge" in body
+    assert 'chatbot_semantic_cache_lookups_total{result="hit"}' in body
@@ -0,0 +1,75 @@
+"""
+Test the migration of a database created with the original schema.
+"""
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import migrations
+from app.blobstore import BlobStore
+from app.database import Base
+from app.migrations import run_migrations
+
+
+# Tables as the first release created them, before documents.content moved to the blob store
+BASELINE_SCHEMA = [
+    "CREATE TABLE bots (id INTEGER NOT NULL, name VARCHAR(255) NOT NULL, system_prompt TEXT NOT NULL, "
+    "welcome_message TEXT NOT NULL, created_at DATETIME, PRIMARY KEY (id))",
+    "CREATE INDEX ix_bots_id ON bots (id)",
+    "CREATE TABLE documents (id INTEGER NOT NULL, bot_id INTEGER NOT NULL, filename VARCHAR(255) NOT NULL, "
+    "content TEXT NOT NULL, chunk_count INTEGER, created_at DATETIME, PRIMARY KEY (id), "
+    "FOREIGN KEY(bot_id) REFERENCES bots (id))",
+    "CREATE INDEX ix_documents_id ON documents (id)"
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("drop_column", [True, False])
+async def test_baseline_database_moves_content_to_blob_store(tmp_path, monkeypatch, drop_column):
+    """Test that bodies reach the blob store and the content column is dropped (or rebuilt away)."""
+    store = BlobStore(root=str(tmp_path))
+    monkeypatch.setattr(migrations, "blob_store", store)
+    if not drop_column:
+        # Take the table rebuild path used by SQLite versions before 3.35
+        monkeypatch.setattr(migrations, "SQLITE_DROP_COLUMN_VERSION", (999, 0, 0))
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            await conn.execute(text(statement))
+        await conn.execute(text(
+            "INSERT INTO bots (id, name, system_prompt, welcome_message) VALUES (1, 'Support', 'Be helpful.', 'Hi!')"
+        ))
+        await conn.execute(text(
+            "INSERT INTO documents (id, bot_id, filename, content, chunk_count, created_at) VALUES "
+            "(1, 1, 'refunds.txt', 'Refunds are issued within 14 days.', 2, '2024-01-01 00:00:00'), "
+            "(2, 1, 'failed.pdf', '', 0, '2024-01-02 00:00:00')"
+        ))
+
+    # As init_db() does on startup
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+
+    async with engine.begin() as conn:
+        columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns("documents"))
+        indexes = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("documents"))
+        rows = (await conn.execute(text(
+            "SELECT id, filename, content_hash, content_size, token_count, chunk_count FROM documents ORDER BY id"
+        ))).all()
+        stats = (await conn.execute(text(
+            "SELECT document_count, chunk_count, byte_count, version FROM knowledge_base_stats WHERE bot_id = 1"
+        ))).one()
+
+        # Running again on the migrated database changes nothing
+        assert await migrations.migrate_document_content(conn) == 0
+    await engine.dispose()
+
+    assert "content" not in {column["name"] for column in columns}
+    assert {"ix_documents_id", "ix_documents_content_hash"} <= {index["name"] for index in indexes}
+    assert rows[0].filename == "refunds.txt"
+    assert store.get(rows[0].content_hash) == "Refunds are issued within 14 days."
+    assert (rows[0].content_size, rows[0].chunk_count) == (34, 2)
+    assert rows[0].token_count > 0
+    assert tuple(stats) == (1, 2, 34, 1)
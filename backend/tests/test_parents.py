@@ -0,0 +1,65 @@
+"""
+Test parent-document (small-to-big) retrieval.
+"""
+import pytest
+
+from app.rag.ingestion import DocumentIngestion
+from app.rag.parents import ParentStore
+from app.rag.vectorstore import NumpyVectorStore
+
+
+DOCUMENT = "\n\n".join(
+    f"## Topic {i}\n\n" + " ".join(f"Fact {i}.{j} about topic {i}." for j in range(12))
+    for i in range(4)
+)
+
+
+class WordCountEmbeddings:
+    """Embeds text as counts of a few topic words."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [text.count(f"topic {i}") + 0.01 for i in range(4)]
+
+
+@pytest.mark.asyncio
+async def test_children_expand_to_stored_parents(tmp_path):
+    """Test that small chunks are indexed and expand to deduplicated parents."""
+    parent_store = ParentStore(str(tmp_path / "parents"))
+    vector_store = NumpyVectorStore(path=str(tmp_path / "vectors"))
+    ingestion = DocumentIngestion(
+        WordCountEmbeddings(), vector_store,
+        chunk_size=24, chunk_overlap=0, parent_tokens=120, parent_store=parent_store
+    )
+
+    result = await ingestion.ingest_document(DOCUMENT, {"filename": "facts.md", "document_id": 7}, bot_id=1)
+    assert result["success"]
+    children = vector_store.query(1, WordCountEmbeddings().embed_query("topic 2"), k=result["chunk_count"])
+    assert len(children) > 4
+
+    # Every child lies inside the parent it points at
+    for child in children:
+        metadata = child["metadata"]
+        parent = parent_store.get(1, 7, metadata["parent_start"])
+        assert parent["char_start"] <= metadata["char_start"] and metadata["char_end"] <= parent["char_end"]
+        assert DOCUMENT[parent["char_start"]:parent["char_end"]] == parent["content"]
+
+    top = [dict(child, relevance=1 - child["distance"]) for child in children[:3]]
+    expanded = parent_store.expand(top)
+    assert len(expanded) < len(top)
+    assert "## Topic 2" in expanded[0]["content"]
+    assert expanded[0]["relevance"] == top[0]["relevance"]
+    assert sum(parent["children"] for parent in expanded) == len(top)
+
+    ingestion.delete_document_chunks(1, 7)
+    assert parent_store.get(1, 7, 0) is None
+    assert vector_store.count(1) == 0
+
+
+def test_chunks_without_parents_are_kept(tmp_path):
+    """Test that chunks ingested without parents pass through unchanged."""
+    docs = [{"content": "Refund policy", "metadata": {"bot_id": 1, "document_id": 3, "char_start": 0}}]
+
+    assert ParentStore(str(tmp_path)).expand(docs) == docs
@@ -0,0 +1,70 @@
+"""
+Test ordered, cancellable processing of a session's messages.
+"""
+import asyncio
+
+import pytest
+
+from app.api.pipeline import SessionPipeline
+from tests.test_backplane import wait_until
+
+
+async def generate(message: str, delay: float) -> str:
+    await asyncio.sleep(delay)
+    return f"reply to {message}"
+
+
+@pytest.mark.asyncio
+async def test_messages_processed_in_order():
+    """Test that queued messages are answered one at a time, in arrival order."""
+    replies = []
+
+    async def handler(pipeline, message):
+        reply, _ = await pipeline.run_cancellable(generate, message, 0.01)
+        replies.append(reply)
+
+    pipeline = SessionPipeline(1, handler, cancel_on_new_message=False)
+    for message in ["a", "b", "c"]:
+        assert pipeline.submit(message)
+    await wait_until(lambda: len(replies) == 3)
+    await pipeline.close()
+
+    assert replies == ["reply to a", "reply to b", "reply to c"]
+
+
+@pytest.mark.asyncio
+async def test_new_message_cancels_generation():
+    """Test that a new message cancels the slow generation in flight."""
+    outcomes = []
+
+    async def handler(pipeline, message):
+        delay = 10 if message == "slow" else 0
+        reply, cancelled = await pipeline.run_cancellable(generate, message, delay)
+        outcomes.append("cancelled" if cancelled else reply)
+
+    pipeline = SessionPipeline(1, handler, cancel_on_new_message=True)
+    pipeline.submit("slow")
+    await wait_until(lambda: pipeline._in_flight is not None)
+    pipeline.submit("fast")
+    await wait_until(lambda: len(outcomes) == 2, timeout=1)
+    await pipeline.close()
+
+    assert outcomes == ["cancelled", "reply to fast"]
+    assert pipeline.cancelled_turns == 1
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_queue_full():
+    """Test that submissions beyond max_pending are refused."""
+    started = asyncio.Event()
+
+    async def handler(pipeline, message):
+        started.set()
+        await asyncio.sleep(10)
+
+    pipeline = SessionPipeline(1, handler, max_pending=1, cancel_on_new_message=False)
+    assert pipeline.submit("first")
+    await asyncio.wait_for(started.wait(), timeout=1)
+    assert pipeline.submit("second")
+    assert pipeline.submit("third") is False
+    await pipeline.close()
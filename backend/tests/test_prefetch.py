@@ -0,0 +1,155 @@
+"""
+Test speculative retrieval for draft messages.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.rag.calibration import ConfidenceCalibrator
+from app.rag.engine import RAGEngine
+from app.rag.prefetch import RetrievalPrefetcher
+from app.rag.retriever import DocumentRetriever
+from app.rag.vectorstore import NumpyVectorStore
+
+
+def recording_speculation(calls, delay=0.01):
+    async def speculate(text):
+        calls.append(text)
+        await asyncio.sleep(delay)
+        return {"key": text, "seconds": delay}
+    return speculate
+
+
+@pytest.mark.asyncio
+async def test_newer_drafts_supersede_and_are_throttled():
+    """Test that only the latest draft is retrieved, at most once per interval."""
+    prefetcher = RetrievalPrefetcher(min_interval_ms=100, max_concurrent=4, min_chars=3, ttl_seconds=60)
+    calls = []
+    speculate = recording_speculation(calls)
+
+    for draft in ("how much", "how much is the", "how much is the professional plan?"):
+        assert prefetcher.draft(1, draft, speculate)
+    assert not prefetcher.draft(1, "hi", speculate)
+    await asyncio.sleep(0.03)
+    assert calls == ["how much is the professional plan?"]
+    assert prefetcher.superseded == 2
+
+    # The next draft waits out the interval
+    prefetcher.draft(1, "how much is the enterprise plan?", speculate)
+    await asyncio.sleep(0.03)
+    assert len(calls) == 1
+    await asyncio.sleep(0.1)
+    assert calls[-1] == "how much is the enterprise plan?"
+
+
+@pytest.mark.asyncio
+async def test_sent_message_claims_matching_draft():
+    """Test that a message takes its draft's retrieval, joining it if still running."""
+    prefetcher = RetrievalPrefetcher(min_interval_ms=0, max_concurrent=4, min_chars=3, ttl_seconds=60)
+    calls = []
+    speculate = recording_speculation(calls, delay=0.05)
+
+    prefetcher.draft(1, "refund policy", speculate)
+    await asyncio.sleep(0.01)
+    entry = await prefetcher.take(1, "refund policy", "refund policy")
+    assert entry["key"] == "refund policy"
+    assert prefetcher.hits == 1
+
+    # A different message (or a stale knowledge base) misses
+    prefetcher.draft(1, "refund policy days", speculate)
+    await asyncio.sleep(0.06)
+    assert await prefetcher.take(1, "refund policy days?", "refund policy days?") is None
+    assert prefetcher.misses == 1
+
+    # Sessions without drafts are not counted
+    assert await prefetcher.take(2, "refund policy", "refund policy") is None
+    assert prefetcher.misses == 1
+
+
+class CountingEmbeddings:
+    """Embeds text as counts of a few topic words, counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[text.lower().count(word) + 0.01 for word in ("refund", "plan", "hours")] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.mark.asyncio
+async def test_engine_reuses_prefetched_retrieval(tmp_path, monkeypatch):
+    """Test that a sent message matching its draft skips embedding and search."""
+    monkeypatch.setattr(settings, "demo_delay_min_seconds", 0)
+    monkeypatch.setattr(settings, "demo_delay_max_seconds", 0)
+    monkeypatch.setattr(settings, "semantic_cache_enabled", False)
+    embeddings = CountingEmbeddings()
+    store = NumpyVectorStore(path=str(tmp_path))
+    contents = ["Refunds are issued within 14 days.", "The professional plan costs $99/month."]
+    store.add(1, ["0", "1"], embeddings.embed_documents(contents), contents, [{"filename": "faq.md"}] * 2)
+    retriever = DocumentRetriever(
+        embeddings, store, calibrator=ConfidenceCalibrator(str(tmp_path / "calibration")), reranker=False
+    )
+    engine = RAGEngine(retriever)
+    engine.prefetcher = RetrievalPrefetcher(min_interval_ms=0, max_concurrent=4, min_chars=3, ttl_seconds=60)
+
+    query = "How long do refunds take?"
+    engine.prefetcher.draft(5, query, lambda draft: engine.prefetch_retrieval(draft, 1, [], knowledge_base_version=1))
+    await asyncio.sleep(0.05)
+    calls = embeddings.calls
+
+    response = await engine.generate_response(
+        query, 1, "You are helpful.", [{"role": "user", "content": query}], session_id=5,
+        knowledge_base_version=1
+    )
+    assert engine.prefetcher.hits == 1
+    assert embeddings.calls == calls
+    assert response["retrieved_chunks"] == 2
+
+
+class SlowEmbeddings(CountingEmbeddings):
+    """CountingEmbeddings that take a while, like a real model."""
+
+    def embed_documents(self, texts):
+        time.sleep(0.05)
+        return super().embed_documents(texts)
+
+
+@pytest.mark.asyncio
+async def test_draft_typed_during_claim_does_not_cancel_message(tmp_path, monkeypatch):
+    """Test draft -> message -> draft: the message keeps the search it joined and gets its reply."""
+    monkeypatch.setattr(settings, "demo_delay_min_seconds", 0)
+    monkeypatch.setattr(settings, "demo_delay_max_seconds", 0)
+    monkeypatch.setattr(settings, "semantic_cache_enabled", False)
+    embeddings = SlowEmbeddings()
+    store = NumpyVectorStore(path=str(tmp_path))
+    contents = ["Refunds are issued within 14 days.", "The professional plan costs $99/month."]
+    store.add(1, ["0", "1"], CountingEmbeddings().embed_documents(contents), contents, [{"filename": "faq.md"}] * 2)
+    retriever = DocumentRetriever(
+        embeddings, store, calibrator=ConfidenceCalibrator(str(tmp_path / "calibration")), reranker=False
+    )
+    engine = RAGEngine(retriever)
+    engine.prefetcher = RetrievalPrefetcher(min_interval_ms=0, max_concurrent=4, min_chars=3, ttl_seconds=60)
+
+    def speculate(draft):
+        return engine.prefetch_retrieval(draft, 1, [], knowledge_base_version=1)
+
+    query = "How long do refunds take?"
+    engine.prefetcher.draft(5, query, speculate)
+    await asyncio.sleep(0.01)  # The draft's search is running
+    turn = asyncio.create_task(engine.generate_response(
+        query, 1, "You are helpful.", [{"role": "user", "content": query}], session_id=5,
+        knowledge_base_version=1
+    ))
+    await asyncio.sleep(0.01)  # The message is waiting for that search
+    engine.prefetcher.draft(5, "And what about the professional plan?", speculate)
+
+    response = await turn
+    assert response["response"]
+    assert response["retrieved_chunks"] == 2
+    assert engine.prefetcher.hits == 1
@@ -0,0 +1,73 @@
+"""
+Test the sampling profiler and slow-request capture.
+"""
+import threading
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.main import app
+from app.metrics import timed
+from app.profiling import SamplingProfiler, slow_traces
+from app.tracing import trace_request
+
+
+ADMIN = {"x-token": "admin-secret-token"}
+
+
+def busy_spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_collapses_hot_frames():
+    """Test that a busy thread shows up in the collapsed stacks."""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_spin, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        result = SamplingProfiler().run(0.3, interval_ms=5)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = result["collapsed"].splitlines()
+    assert result["samples"] > 10
+    spinner = [line for line in lines if line.startswith("spinner;")]
+    assert spinner and all("busy_spin (test_profiling.py:" in line for line in spinner)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_slow_turn_keeps_stage_trace(monkeypatch):
+    """Test that only turns over the threshold are captured, with their stages."""
+    monkeypatch.setattr(settings, "slow_trace_threshold_ms", 20)
+    slow_traces.clear()
+
+    with trace_request("chat_turn", session_id=1):
+        with timed("db_read"):
+            pass
+    with trace_request("chat_turn", session_id=2):
+        with timed("generation"):
+            time.sleep(0.03)
+
+    traces = slow_traces.recent()
+    assert [trace["session_id"] for trace in traces] == [2]
+    assert traces[0]["duration_ms"] >= 20
+    assert [stage["stage"] for stage in traces[0]["stages"]] == ["generation"]
+
+
+@pytest.mark.asyncio
+async def test_profile_endpoint_is_opt_in(monkeypatch):
+    """Test that the profiler needs an admin token and PROFILING_ENABLED."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.get("/api/v1/admin/profile")).status_code == 401
+        assert (await client.get("/api/v1/admin/profile", headers=ADMIN)).status_code == 404
+
+        monkeypatch.setattr(settings, "profiling_enabled", True)
+        response = await client.get("/api/v1/admin/profile?seconds=0.1&interval_ms=5", headers=ADMIN)
+
+    assert response.status_code == 200
+    assert int(response.headers["x-profile-samples"]) > 0
+    assert "MainThread;" in response.text
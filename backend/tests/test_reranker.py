@@ -0,0 +1,105 @@
+"""
+Test cross-encoder reranking and its time budget.
+"""
+import time
+
+import pytest
+
+from app.rag.calibration import ConfidenceCalibrator
+from app.rag.reranker import Reranker
+from app.rag.retriever import DocumentRetriever
+
+
+class WordOverlapReranker(Reranker):
+    """Scores a passage by the query words it contains."""
+
+    def __init__(self, delay=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.batches = 0
+
+    def _score_batch(self, query, passages):
+        self.batches += 1
+        time.sleep(self.delay)
+        words = query.lower().split()
+        return [sum(word in passage.lower() for word in words) for passage in passages]
+
+
+class CandidateStore:
+    """Returns chunks in a fixed vector order and records how many were asked for."""
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.requested = None
+
+    def query(self, bot_id, embedding, k):
+        self.requested = k
+        return [
+            {"id": str(i), "content": content, "metadata": {}, "distance": 0.1 * (i + 1)}
+            for i, content in enumerate(self.contents[:k])
+        ]
+
+
+def chunks(*contents):
+    return [{"content": content} for content in contents]
+
+
+def test_rerank_orders_by_cross_encoder_score():
+    """Test that candidates are reordered, scored and cut to top_k."""
+    reranker = WordOverlapReranker(batch_size=2, budget_ms=0)
+    results, reranked = reranker.rerank(
+        "refund policy days",
+        chunks("Office hours", "Refund policy", "Refunds take 5 days under our policy"),
+        top_k=2
+    )
+
+    assert reranked
+    assert [result["content"] for result in results] == ["Refunds take 5 days under our policy", "Refund policy"]
+    assert results[0]["rerank_score"] == 3
+    assert reranker.batches == 2
+
+
+def test_over_budget_keeps_original_order():
+    """Test that a request over budget falls back to the vector order."""
+    candidates = chunks("a", "refund b", "refund c", "d", "refund e", "f")
+    reranker = WordOverlapReranker(delay=0.02, batch_size=2, budget_ms=30)
+
+    results, reranked = reranker.rerank("refund", list(candidates), top_k=3)
+    assert not reranked
+    assert [result["content"] for result in results] == ["a", "refund b", "refund c"]
+    assert all("rerank_score" not in result for result in results)
+
+    # Once the cost per pair is known, a batch that cannot finish is never started
+    batches = reranker.batches
+    assert reranker.rerank("refund", list(candidates), budget_ms=5) == (candidates, False)
+    assert reranker.batches == batches
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_reranks_extra_candidates(tmp_path):
+    """Test that hybrid search fetches rerank_candidates chunks and returns the reranked top_k."""
+    store = CandidateStore(["Office hours", "Shipping times", "Pricing plans", "Refund policy: 30 days"])
+    retriever = DocumentRetriever(
+        embeddings=object(),
+        vector_store=store,
+        keyword_boost=0.0,
+        calibrator=ConfidenceCalibrator(path=str(tmp_path)),
+        reranker=WordOverlapReranker(budget_ms=0),
+        rerank_candidates=4
+    )
+
+    results, confidence = await retriever.hybrid_search("refund policy", 1, top_k=2, query_embedding=[1.0])
+
+    assert store.requested == 4
+    assert len(results) == 2 and results[0]["content"] == "Refund policy: 30 days"
+    # Confidence still comes from the best vector relevance among the returned chunks
+    assert confidence == pytest.approx(retriever.calibrator.calibrate(1, 0.9))
+
+
+def test_backend_without_scoring_fails_at_construction():
+    """Test that a backend missing _score_batch cannot be created."""
+    class Unfinished(Reranker):
+        pass
+
+    with pytest.raises(TypeError):
+        Unfinished()
@@ -0,0 +1,39 @@
+"""
+Test the retrieval evaluation harness.
+"""
+import pytest
+
+from benchmarks.retrieval_eval import LABELS_PATH, evaluate, load_labels
+from seed_data import SAMPLE_DOCUMENTS
+
+
+class RankedRetriever:
+    """Returns a fixed ranking for every query."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def hybrid_search(self, query, bot_id, top_k, query_embedding):
+        return [{"content": chunk} for chunk in self.chunks[:top_k]], 1.0
+
+
+def test_labels_match_seed_documents():
+    """Test that every labelled answer span still exists in the seed corpus."""
+    labels = load_labels(LABELS_PATH, SAMPLE_DOCUMENTS)
+    assert len(labels) > 50
+    assert sum(label["paraphrase"] for label in labels) >= len(labels) / 2
+
+
+@pytest.mark.asyncio
+async def test_ranking_metrics():
+    """Test recall, MRR and nDCG for an answer found at rank 2."""
+    label = {"query": "pro plan?", "answers": ["$149/month"], "paraphrase": False}
+    chunks = ["Starter Plan - $49/month", "Professional Plan - $149/month", "FAQ"]
+    index = {"chunks": chunks}
+
+    scores = await evaluate([label], [None], RankedRetriever(chunks), index, top_k=3)
+
+    assert scores["recall@1"] == 0.0
+    assert scores["recall@3"] == scores["recall@k"] == 1.0
+    assert scores["mrr"] == 0.5
+    assert scores["ndcg@k"] == 0.6309
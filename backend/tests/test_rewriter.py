@@ -0,0 +1,95 @@
+"""
+Test conversation-aware query rewriting and rank fusion.
+"""
+import time
+
+import pytest
+
+from app.rag.calibration import ConfidenceCalibrator
+from app.rag.retriever import DocumentRetriever, reciprocal_rank_fusion
+from app.rag.rewriter import QueryRewriter
+
+
+HISTORY = [
+    {"role": "user", "content": "How much does the professional plan cost?"},
+    {"role": "assistant", "content": "The professional plan is $99/month."}
+]
+
+
+def test_follow_up_is_resolved_against_previous_question():
+    """Test that "the X one" takes the previous head noun and topic words carry over."""
+    rewriter = QueryRewriter(max_queries=3, history_turns=2)
+    query = "What about the enterprise one?"
+
+    queries = rewriter.rewrite(query, HISTORY + [{"role": "user", "content": query}])
+
+    assert queries[0] == query
+    assert queries[1] == "What about the enterprise plan?"
+    assert "cost" in queries[2] and "professional" not in queries[2]
+
+
+def test_standalone_question_is_not_rewritten():
+    """Test that self-contained questions and first messages retrieve as they are."""
+    rewriter = QueryRewriter(max_queries=3, history_turns=2)
+
+    assert rewriter.rewrite("Which integrations are available for Slack and Microsoft Teams?", HISTORY) == [
+        "Which integrations are available for Slack and Microsoft Teams?"
+    ]
+    assert rewriter.rewrite("What about it?", []) == ["What about it?"]
+    assert QueryRewriter(max_queries=1).rewrite("What about it?", HISTORY) == ["What about it?"]
+
+
+def test_rank_fusion_favours_agreement():
+    """Test that chunks found by several queries rank first and keep their best relevance."""
+    first = [{"id": "a", "content": "A", "relevance": 0.9}, {"id": "b", "content": "B", "relevance": 0.8}]
+    second = [{"id": "b", "content": "B", "relevance": 0.95}, {"id": "c", "content": "C", "relevance": 0.7}]
+
+    fused = reciprocal_rank_fusion([first, second])
+
+    assert [result["id"] for result in fused] == ["b", "a", "c"]
+    assert fused[0]["relevance"] == 0.95
+
+
+class QueryStore:
+    """Returns a ranking per query embedding, optionally slowly."""
+
+    def __init__(self, rankings, delay=0.0):
+        self.rankings = rankings
+        self.delay = delay
+        self.queries = 0
+
+    def query(self, bot_id, embedding, k):
+        self.queries += 1
+        time.sleep(self.delay)
+        return [
+            {"id": content, "content": content, "metadata": {}, "distance": 0.1 * (rank + 1)}
+            for rank, content in enumerate(self.rankings[embedding[0]][:k])
+        ]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_rewrites_within_budget(tmp_path):
+    """Test that rewrite rankings are fused and skipped once the budget would be exceeded."""
+    rankings = {0: ["Starter plan", "Refunds"], 1: ["Enterprise plan", "Starter plan"], 2: ["Enterprise SLA"]}
+    calibrator = ConfidenceCalibrator(str(tmp_path))
+
+    store = QueryStore(rankings)
+    retriever = DocumentRetriever(object(), store, keyword_boost=0.0, calibrator=calibrator, reranker=False)
+    results, _ = await retriever.hybrid_search(
+        "what about the enterprise one?", 1, 3, [0],
+        rewrites=["the enterprise plan", "the enterprise plan sla"], rewrite_embeddings=[[1], [2]],
+        rewrite_budget_ms=0
+    )
+    assert store.queries == 3
+    assert results[0]["content"] == "Starter plan"
+    assert [result["content"] for result in results][1:] == ["Enterprise plan", "Enterprise SLA"]
+
+    slow = QueryStore(rankings, delay=0.02)
+    retriever = DocumentRetriever(object(), slow, keyword_boost=0.0, calibrator=calibrator, reranker=False)
+    results, _ = await retriever.hybrid_search(
+        "what about the enterprise one?", 1, 3, [0],
+        rewrites=["the enterprise plan", "the enterprise plan sla"], rewrite_embeddings=[[1], [2]],
+        rewrite_budget_ms=30
+    )
+    assert slow.queries == 2
+    assert "Enterprise SLA" not in {result["content"] for result in results}
@@ -0,0 +1,67 @@
+"""
+Test intent pre-routing.
+"""
+from app.agent.router import IntentRouter
+
+
+def test_small_talk_skips_retrieval():
+    """Test that greetings, thanks and goodbyes do not need retrieval."""
+    router = IntentRouter()
+
+    assert router.classify("hi")["category"] == "greetings"
+    assert router.classify("Thanks!")["category"] == "thanks"
+    assert router.classify("bye")["category"] == "goodbye"
+    assert not router.classify("hello there")["needs_retrieval"]
+
+
+def test_questions_need_retrieval():
+    """Test that knowledge-seeking messages are retrieved, even with a greeting."""
+    router = IntentRouter()
+
+    assert router.classify("which plan is best?")["needs_retrieval"]
+    assert router.classify("hi, what does the pro plan cost?")["needs_retrieval"]
+    assert router.classify("what's your phone number?")["needs_retrieval"]
+
+
+def test_contact_details_are_lead_capture():
+    """Test that messages carrying contact details skip retrieval."""
+    router = IntentRouter()
+
+    decision = router.classify("my email is jane@company.com")
+    assert decision == {"category": "lead_capture", "needs_retrieval": False}
+    assert not router.classify("call me at 555-010-1234")["needs_retrieval"]
+
+
+def test_small_talk_with_a_question_needs_retrieval():
+    """Test that a greeting or thanks followed by a question is retrieved."""
+    router = IntentRouter()
+
+    for message in (
+        "hi, do you ship to canada?",
+        "hello, where is your office located?",
+        "thanks, do you ship to canada?",
+        "hey, do you ship to canada"
+    ):
+        assert router.classify(message)["needs_retrieval"], message
+
+
+def test_lead_keywords_without_contact_details_need_retrieval():
+    """Test that only messages carrying contact details and no question skip as lead capture."""
+    router = IntentRouter()
+
+    assert router.classify("can I book a room for 4 nights in July?")["needs_retrieval"]
+    assert router.classify("where do I register my warranty?")["needs_retrieval"]
+    assert router.classify("I'm interested, sign me up")["needs_retrieval"]
+    assert router.classify("my email is jane@company.com, do you ship to canada?")["needs_retrieval"]
+
+
+def test_route_records_metrics():
+    """Test that routing decisions are counted."""
+    router = IntentRouter()
+    router.route("hi")
+    router.route("how much does it cost?")
+
+    metrics = router.get_metrics()
+    assert metrics["total_routed"] == 2
+    assert metrics["retrievals_skipped"] == 1
+    assert metrics["skipped_by_category"] == {"greetings": 1}
@@ -0,0 +1,50 @@
+"""
+Test the semantic answer cache.
+"""
+from app.rag.cache import SemanticCache
+
+
+RESPONSE = {"response": "Our plans start at $49/month.", "confidence": 0.9, "sources": ["pricing.txt"]}
+
+
+def test_near_duplicate_query_hits():
+    """Test that a query within the similarity threshold returns the cached answer."""
+    cache = SemanticCache(max_entries=10, similarity_threshold=0.95, ttl_seconds=60)
+    cache.store(1, [1.0, 0.0, 0.0], RESPONSE)
+
+    assert cache.lookup(1, [0.99, 0.05, 0.0]) == RESPONSE
+    assert cache.lookup(1, [0.0, 1.0, 0.0]) is None
+    assert cache.lookup(2, [1.0, 0.0, 0.0]) is None
+
+    metrics = cache.get_metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 2
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted when full."""
+    cache = SemanticCache(max_entries=2, similarity_threshold=0.99, ttl_seconds=60)
+    cache.store(1, [1.0, 0.0, 0.0], {"response": "a"})
+    cache.store(1, [0.0, 1.0, 0.0], {"response": "b"})
+    cache.lookup(1, [1.0, 0.0, 0.0])  # "a" becomes most recently used
+    cache.store(1, [0.0, 0.0, 1.0], {"response": "c"})
+
+    assert cache.lookup(1, [1.0, 0.0, 0.0]) == {"response": "a"}
+    assert cache.lookup(1, [0.0, 1.0, 0.0]) is None
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_invalidation_on_knowledge_base_change():
+    """Test that a newer knowledge base version drops that bot's answers only."""
+    cache = SemanticCache(max_entries=10, similarity_threshold=0.95, ttl_seconds=60)
+    cache.store(1, [1.0, 0.0], RESPONSE, version=3)
+    cache.store(2, [1.0, 0.0], RESPONSE, version=3)
+
+    # Another worker (or the bulk ingestion CLI) changed bot 1's documents
+    assert cache.lookup(1, [1.0, 0.0], version=4) is None
+    assert cache.lookup(2, [1.0, 0.0], version=3) == RESPONSE
+    assert cache.get_metrics()["invalidations"] == 1
+
+    # An answer built before the change is not stored
+    cache.store(1, [1.0, 0.0], RESPONSE, version=3)
+    assert cache.lookup(1, [1.0, 0.0], version=4) is None
@@ -0,0 +1,78 @@
+"""
+Test per-connection send queues and slow-consumer policies.
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.api.sender import ConnectionSender, SendMetrics
+from app.api.websocket import ConnectionManager
+from app.api.backplane import InMemoryBackplane
+from tests.test_backplane import FakeWebSocket, wait_until
+
+
+class SlowWebSocket(FakeWebSocket):
+    """Takes `delay` seconds to send each message."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.close_code = None
+
+    async def send_text(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(data))
+
+    async def close(self, code=1000, reason=None):
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_slow_connection_does_not_delay_others():
+    """Test that a fast tab receives a broadcast while a slow tab is still sending."""
+    manager = ConnectionManager(InMemoryBackplane())
+    slow, fast = SlowWebSocket(delay=10), FakeWebSocket()
+    await manager.connect(slow, 1)
+    await manager.connect(fast, 1)
+
+    await manager.broadcast({"n": 1}, 1)
+    await manager.broadcast({"n": 2}, 1)
+    await wait_until(lambda: len(fast.sent) == 2, timeout=1)
+
+    assert slow.sent == []
+    assert manager.get_stats()["queue_depth_max"] == 1
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy():
+    """Test that a full queue drops its oldest messages and keeps order."""
+    metrics = SendMetrics()
+    websocket = SlowWebSocket(delay=0.05)
+    sender = ConnectionSender(websocket, metrics, max_queue=2, policy="drop_oldest")
+    sender.enqueue(json.dumps({"n": 0}))
+    await asyncio.sleep(0)  # writer picks up the first message
+    for n in range(1, 5):
+        sender.enqueue(json.dumps({"n": n}))
+    await wait_until(lambda: len(websocket.sent) == 3)
+    await sender.close()
+
+    # {"n": 0} was already being sent; 1 and 2 were dropped
+    assert [m["n"] for m in websocket.sent] == [0, 3, 4]
+    assert metrics.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_consumer():
+    """Test that a send exceeding the timeout disconnects the client."""
+    metrics = SendMetrics()
+    websocket = SlowWebSocket(delay=1)
+    sender = ConnectionSender(websocket, metrics, policy="disconnect", timeout_ms=20)
+    sender.enqueue(json.dumps({"n": 0}))
+    await wait_until(lambda: websocket.close_code is not None)
+
+    assert websocket.close_code == 1013
+    assert metrics.disconnected == 1
+    assert sender.enqueue(json.dumps({"n": 1})) is False
+    await sender.close()
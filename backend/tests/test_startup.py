@@ -0,0 +1,38 @@
+"""
+Test that startup stays fast and readiness is reported separately from health.
+"""
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from benchmarks.import_time import heavy_modules_imported, measure_import
+
+
+def test_main_does_not_import_ml_dependencies():
+    """Test that importing app.main loads no ML model or vector store libraries."""
+    assert heavy_modules_imported(measure_import("app.main")) == []
+
+
+@pytest.mark.asyncio
+async def test_ready_reports_unloaded_components(monkeypatch):
+    """Test that /ready returns 503 until the RAG components are loaded."""
+    monkeypatch.setattr("app.rag.readiness.embeddings_loaded", lambda: False)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        health = await client.get("/health")
+        ready = await client.get("/ready")
+
+    assert health.status_code == 200
+    assert ready.status_code == 503
+    assert ready.json()["components"]["embeddings"] is False
+
+
+@pytest.mark.asyncio
+async def test_ready_when_components_loaded(monkeypatch):
+    """Test that /ready returns 200 once the RAG components are loaded."""
+    monkeypatch.setattr("app.rag.readiness.embeddings_loaded", lambda: True)
+    monkeypatch.setattr("app.rag.readiness.vector_store_loaded", lambda: True)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
@@ -0,0 +1,75 @@
+"""
+Test per-bot knowledge base statistics and their backfill.
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, Bot, Document, KnowledgeBaseStats
+from app.migrations import backfill_knowledge_base_stats
+from app.rag.stats import get_knowledge_base_version, record_deletion, record_ingestion, serialize_stats
+
+
+@pytest.fixture
+async def db_engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def get_stats(session: AsyncSession, bot_id: int):
+    result = await session.execute(
+        select(KnowledgeBaseStats)
+        .where(KnowledgeBaseStats.bot_id == bot_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+@pytest.mark.asyncio
+async def test_ingestion_and_deletion_update_stats(db_engine):
+    """Test that ingestions create and add to a bot's row and deletions subtract."""
+    async with async_sessionmaker(db_engine, expire_on_commit=False)() as session:
+        session.add(Bot(id=1, name="Support", system_prompt="Be helpful.", welcome_message="Hi!"))
+        await session.commit()
+        assert serialize_stats(await get_stats(session, 1))["documents"] == 0
+
+        await record_ingestion(session, 1, documents=1, chunks=4, tokens=300, size_bytes=1200)
+        await record_ingestion(session, 1, documents=2, chunks=6, tokens=500, size_bytes=2000)
+        await session.commit()
+        stats = serialize_stats(await get_stats(session, 1))
+        assert (stats["documents"], stats["chunks"], stats["tokens"], stats["bytes"]) == (3, 10, 800, 3200)
+        assert stats["last_ingested_at"] is not None
+
+        await record_deletion(session, 1, chunks=4, tokens=300, size_bytes=1200)
+        await session.commit()
+        stats = serialize_stats(await get_stats(session, 1))
+        assert (stats["documents"], stats["chunks"], stats["tokens"], stats["bytes"]) == (2, 6, 500, 2000)
+
+        # Every committed change bumps the version the semantic cache compares against
+        assert await get_knowledge_base_version(session, 1) == 3
+        assert await get_knowledge_base_version(session, 2) == 0
+
+
+@pytest.mark.asyncio
+async def test_backfill_skips_failed_uploads(db_engine):
+    """Test that the backfill counts only ingested documents, like live accounting."""
+    async with async_sessionmaker(db_engine, expire_on_commit=False)() as session:
+        session.add(Bot(id=1, name="Support", system_prompt="Be helpful.", welcome_message="Hi!"))
+        session.add_all([
+            Document(bot_id=1, filename="a.txt", content_size=100, token_count=25, chunk_count=2),
+            Document(bot_id=1, filename="b.txt", content_size=50, token_count=10, chunk_count=1),
+            Document(bot_id=1, filename="failed.pdf", content_size=900, token_count=0, chunk_count=0)
+        ])
+        await session.commit()
+
+    async with db_engine.begin() as conn:
+        assert await backfill_knowledge_base_stats(conn) == 1
+        assert await backfill_knowledge_base_stats(conn) == 0
+
+    async with async_sessionmaker(db_engine, expire_on_commit=False)() as session:
+        stats = serialize_stats(await get_stats(session, 1))
+    assert (stats["documents"], stats["chunks"], stats["tokens"], stats["bytes"]) == (2, 3, 35, 150)
@@ -0,0 +1,125 @@
+"""
+Test request tracing, the JSON-lines span log and OTLP export.
+"""
+import io
+import json
+import logging
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.main import app
+from app.metrics import timed
+from app.tracing import JsonLinesFormatter, OTLPSpanHandler, parse_traceparent, trace_request, tracer
+from trace_collector import LocalCollector
+
+
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+    """Enable tracing; the test starts the tracer with its own exporters."""
+    monkeypatch.setattr(settings, "tracing_enabled", True)
+    yield tracer
+    tracer.stop()
+
+
+def traced_turn():
+    with trace_request("chat_turn", session_id=7):
+        with timed("db_read"):
+            pass
+        with timed("generation"):
+            pass
+
+
+def test_parse_traceparent():
+    """Test that only well-formed W3C traceparent headers are continued."""
+    assert parse_traceparent(TRACEPARENT) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+
+
+def test_spans_written_as_json_lines(tracing):
+    """Test that a turn and its stages are logged as linked spans, one JSON object per line."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonLinesFormatter())
+    tracing.start([handler])
+
+    traced_turn()
+    tracing.stop()
+
+    spans = [json.loads(line) for line in stream.getvalue().splitlines()]
+    turn = spans[-1]
+    assert [span["name"] for span in spans] == ["db_read", "generation", "chat_turn"]
+    assert turn["attributes"] == {"session_id": 7} and turn["parent_span_id"] is None
+    assert all(span["trace_id"] == turn["trace_id"] for span in spans)
+    assert all(span["parent_span_id"] == turn["span_id"] for span in spans[:-1])
+
+
+def test_otlp_export_to_local_collector(tracing):
+    """Test that spans reach an OTLP/HTTP collector with their parent links."""
+    collector = LocalCollector()
+    collector.start()
+    try:
+        tracing.start([OTLPSpanHandler(collector.endpoint, "chatbot-test", batch_size=100)])
+        traced_turn()
+        traced_turn()
+        tracing.stop()
+    finally:
+        collector.close()
+
+    assert collector.requests == 1
+    assert len(collector.spans) == 6
+    turns = [span for span in collector.spans if span["name"] == "chat_turn"]
+    assert len({span["traceId"] for span in turns}) == 2
+    assert turns[0]["service"] == "chatbot-test" and turns[0]["kind"] == 2
+    assert {"key": "session_id", "value": {"intValue": "7"}} in turns[0]["attributes"]
+    stages = [span for span in collector.spans if span["name"] != "chat_turn"]
+    assert {span["parentSpanId"] for span in stages} == {span["spanId"] for span in turns}
+
+
+@pytest.mark.asyncio
+async def test_rest_request_continues_caller_trace(tracing):
+    """Test that REST requests join the caller's trace and return its id."""
+    tracing.start([logging.NullHandler()])
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/health", headers={"traceparent": TRACEPARENT})
+
+    assert response.headers["x-trace-id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+def test_otlp_partial_batch_flushed_when_idle(tracing):
+    """Test that spans reach the collector after flush_interval even when no more traffic arrives."""
+    collector = LocalCollector()
+    collector.start()
+    try:
+        tracing.start([OTLPSpanHandler(collector.endpoint, "chatbot-test", batch_size=100, flush_interval=0.05)])
+        traced_turn()
+        for _ in range(100):
+            if collector.requests:
+                break
+            time.sleep(0.02)
+        assert collector.requests == 1
+        assert len(collector.spans) == 3
+    finally:
+        tracing.stop()
+        collector.close()
+
+
+def test_application_logs_share_the_listener(tracing):
+    """Test that app log records are written by the listener, apart from span exporters."""
+    spans, logs = io.StringIO(), io.StringIO()
+    span_handler = logging.StreamHandler(spans)
+    span_handler.setFormatter(JsonLinesFormatter())
+    tracing.start([span_handler], log_handler=logging.StreamHandler(logs))
+
+    logging.getLogger("app.api.websocket").info("Client disconnected from session %s", 7)
+    traced_turn()
+    tracing.stop()
+
+    assert logs.getvalue() == "Client disconnected from session 7\n"
+    assert len(spans.getvalue().splitlines()) == 3
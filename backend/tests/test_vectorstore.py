@@ -0,0 +1,152 @@
+"""
+Test the in-process vector store backends.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.rag.vectorstore import HnswVectorStore, NumpyVectorStore
+
+
+def _add_documents(store):
+    store.add(
+        bot_id=1,
+        ids=["doc1_chunk0", "doc1_chunk1", "doc2_chunk0"],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.0, 0.0, 1.0]],
+        documents=["pricing", "hours", "refunds"],
+        metadatas=[{"document_id": 1}, {"document_id": 1}, {"document_id": 2}]
+    )
+
+
+@pytest.mark.parametrize("store_class", [NumpyVectorStore, HnswVectorStore])
+def test_add_query_delete(tmp_path, store_class):
+    """Test that chunks can be added, searched and deleted by document."""
+    if store_class is HnswVectorStore:
+        pytest.importorskip("hnswlib")
+    store = store_class(path=str(tmp_path))
+    assert not store.exists(1)
+
+    _add_documents(store)
+    assert store.exists(1)
+    assert store.count(1) == 3
+
+    results = store.query(1, [0.1, 0.9, 0.0], k=2)
+    assert [result["content"] for result in results] == ["hours", "pricing"]
+    assert results[0]["distance"] < results[1]["distance"]
+    assert results[1]["distance"] == pytest.approx(1 - 0.1 / np.hypot(0.1, 0.9), abs=1e-3)  # Cosine distance
+
+    store.delete_document(1, 1)
+    assert store.count(1) == 1
+    assert [result["id"] for result in store.query(1, [0.0, 1.0, 0.0], k=3)] == ["doc2_chunk0"]
+
+
+def test_index_is_shared_between_instances(tmp_path):
+    """Test that a second store instance sees rows appended by the first."""
+    writer = NumpyVectorStore(path=str(tmp_path), dtype="float16")
+    reader = NumpyVectorStore(path=str(tmp_path))
+    _add_documents(writer)
+    assert reader.count(1) == 3
+
+    writer.add(1, ["doc3_chunk0"], [[1.0, 1.0, 0.0]], ["contact"], [{"document_id": 3}])
+    assert reader.query(1, [1.0, 1.0, 0.0], k=1)[0]["content"] == "contact"
+    assert reader.query(1, [1.0, 1.0, 0.0], k=1)[0]["distance"] == pytest.approx(0.0, abs=1e-3)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_search_and_conversion(tmp_path, quantization):
+    """Test that quantized indexes find the same neighbours and convert back losslessly from a float32 copy."""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 64)).astype(np.float32)
+    store = NumpyVectorStore(path=str(tmp_path), quantization="none", rescore_dtype="float32")
+    store.add(1, [str(i) for i in range(500)], vectors, [""] * 500, [{"document_id": i % 5} for i in range(500)])
+    query = vectors[42] + 0.05 * rng.standard_normal(64).astype(np.float32)
+    exact = [result["id"] for result in store.query(1, query, k=3)]
+
+    store.set_quantization(1, quantization)
+    assert store.get_quantization(1) == quantization
+    files = os.listdir(tmp_path / store.collection_name(1))
+    assert any(name.startswith("bits.") for name in files) == (quantization == "binary")
+    assert any(name.startswith("codes.") for name in files) == (quantization == "int8")
+    assert store.query(1, query, k=1)[0]["id"] == "42"
+    assert store.query(1, query, k=1)[0]["distance"] == pytest.approx(
+        NumpyVectorStore(path=str(tmp_path)).query(1, query, k=1)[0]["distance"]
+    )
+
+    store.delete_document(1, 0)
+    assert store.count(1) == 400
+
+    store.set_quantization(1, "none")
+    assert [result["id"] for result in store.query(1, query, k=3)] == exact
+    assert store.query(1, query, k=1)[0]["distance"] == pytest.approx(
+        1.0 - float(vectors[42] @ query / np.linalg.norm(vectors[42]) / np.linalg.norm(query)), abs=1e-6
+    )
+
+
+@pytest.mark.parametrize("rescore_dtype", ["float16", "none"])
+def test_quantized_index_shrinks_on_disk(tmp_path, rescore_dtype):
+    """Test that a float16 rescoring copy, or none, makes quantized indexes smaller than float32."""
+    rng = np.random.default_rng(2)
+    vectors = rng.standard_normal((400, 64)).astype(np.float32)
+    query = vectors[7] + 0.05 * rng.standard_normal(64).astype(np.float32)
+
+    def vector_bytes(store):
+        directory = os.path.join(store.path, store.collection_name(1))
+        return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory) if name.endswith(".bin"))
+
+    sizes = {}
+    for quantization in ("none", "int8", "binary"):
+        store = NumpyVectorStore(path=str(tmp_path / quantization), quantization=quantization, rescore_dtype=rescore_dtype)
+        store.add(1, [str(i) for i in range(400)], vectors, [""] * 400, [{"document_id": 1}] * 400)
+        assert store.query(1, query, k=1)[0]["id"] == "7"
+        sizes[quantization] = vector_bytes(store)
+    assert sizes["int8"] < sizes["none"] and sizes["binary"] < sizes["int8"]
+    if rescore_dtype == "none":
+        # Only the codes are stored: 4x and 32x smaller, apart from int8's scales
+        assert sizes["int8"] == 400 * (64 + 4)
+        assert sizes["binary"] == sizes["none"] // 32
+
+    # Conversions keep working without a full-precision copy
+    store.set_quantization(1, "int8")
+    store.set_quantization(1, "none")
+    assert store.query(1, query, k=1)[0]["id"] == "7"
+
+
+def test_quantization_of_empty_bot_applies_to_first_upload(tmp_path):
+    """Test that a mode set before any upload is kept without creating a collection."""
+    store = NumpyVectorStore(path=str(tmp_path), quantization="none")
+    store.set_quantization(1, "binary")
+    assert not store.exists(1)
+
+    _add_documents(store)
+    assert store.exists(1)
+    assert store.get_quantization(1) == "binary"
+
+
+def test_quantization_rejected_by_unsupported_backend(tmp_path):
+    """Test that HNSW stores refuse quantized modes."""
+    pytest.importorskip("hnswlib")
+    with pytest.raises(ValueError):
+        HnswVectorStore(path=str(tmp_path)).set_quantization(1, "int8")
+
+
+def test_rewrite_keeps_other_instances_consistent(tmp_path):
+    """Test that an instance reading the same files (another process) follows a delete."""
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((50, 16)).astype(np.float32)
+    writer = NumpyVectorStore(path=str(tmp_path))
+    reader = NumpyVectorStore(path=str(tmp_path))
+    writer.add(1, [str(i) for i in range(50)], vectors, [""] * 50, [{"document_id": i % 2} for i in range(50)])
+    assert reader.query(1, vectors[3], k=1)[0]["id"] == "3"
+
+    writer.delete_document(1, 1)
+    directory = tmp_path / writer.collection_name(1)
+    manifest = json.loads((directory / "manifest.json").read_text())
+    # Only the files the manifest names are left once the old generation is removed
+    assert set(os.listdir(directory)) == set(manifest["files"].values()) | {"manifest.json", "write.lock"}
+    assert reader.count(1) == 25
+    assert reader.query(1, vectors[4], k=1)[0]["id"] == "4"
+
+    reader.add(1, ["50"], vectors[3:4] * 2, [""], [{"document_id": 0}])
+    assert writer.count(1) == 26
@@ -0,0 +1,19 @@
+"""
+Test the WebSocket load harness helpers.
+"""
+from benchmarks.ws_load import OFF_TOPIC, build_message_mix, percentiles
+
+
+def test_message_mix_is_reproducible_and_realistic():
+    """Test that the mix is seeded and mostly hits demo engine categories."""
+    mix = build_message_mix(seed=3)
+    assert mix == build_message_mix(seed=3)
+    off_topic = sum(message in OFF_TOPIC for message in mix) / len(mix)
+    assert 0.05 < off_topic < 0.15
+
+
+def test_percentiles():
+    """Test latency percentiles of a report."""
+    report = percentiles([float(ms) for ms in range(1, 101)])
+    assert report == {"p50": 51.0, "p90": 91.0, "p99": 100.0, "max": 100.0}
+    assert percentiles([])["p99"] is None
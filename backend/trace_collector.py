@@ -0,0 +1,116 @@
+"""
+Local stand-in for an OpenTelemetry collector.
+Accepts OTLP/HTTP JSON trace exports on /v1/traces and prints one line per
+span, so the exporter can be checked without running a real collector.
+Point the backend at it with TRACING_ENABLED=true and OTLP_ENDPOINT.
+
+Usage:
+    python trace_collector.py [--host 127.0.0.1] [--port 4318] [--output spans.jsonl]
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+
+def flatten_export(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Spans of an ExportTraceServiceRequest, each with its service name."""
+    spans = []
+    for resource_spans in body.get("resourceSpans", []):
+        attributes = resource_spans.get("resource", {}).get("attributes", [])
+        service = next(
+            (a["value"].get("stringValue") for a in attributes if a["key"] == "service.name"), None
+        )
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                spans.append({"service": service, **span})
+    return spans
+
+
+class LocalCollector:
+    """OTLP/HTTP JSON receiver that keeps the spans it was sent."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        on_span: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.spans: List[Dict[str, Any]] = []
+        self.requests = 0
+        self.on_span = on_span
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/v1/traces":
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    spans = flatten_export(json.loads(self.rfile.read(length)))
+                except (ValueError, KeyError, AttributeError):
+                    self.send_error(400, "Invalid OTLP JSON")
+                    return
+                collector.requests += 1
+                collector.spans.extend(spans)
+                if collector.on_span:
+                    for span in spans:
+                        collector.on_span(span)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a local OTLP/HTTP trace collector stand-in")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=4318, help="Port (4318 is the OTLP/HTTP default)")
+    parser.add_argument("--output", default=None, help="Also append received spans to this JSON-lines file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+
+    def print_span(span: Dict[str, Any]):
+        start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+        parent = span.get("parentSpanId", "-")
+        print(f"{span['traceId']} {span['spanId']} <- {parent:<16} {span['name']:<16} {(end - start) / 1e6:9.2f} ms")
+        if output:
+            output.write(json.dumps(span) + "\n")
+            output.flush()
+
+    collector = LocalCollector(args.host, args.port, on_span=print_span)
+    print(f"📡 Trace collector listening on {collector.endpoint}/v1/traces")
+    try:
+        collector.server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Trace collector stopped")
+    finally:
+        collector.server.server_close()
+        if output:
+            output.close()
@@ -1,16 +1,26 @@
 import { Button } from "@/components/ui/Button";
 import { Input } from "@/components/ui/Input";
 import { SendHorizontal } from "lucide-react";
-import { useState, FormEvent } from "react";
+import { useEffect, useState, FormEvent } from "react";
+
+// Pause in typing after which the draft is sent for prefetching
+const DRAFT_DEBOUNCE_MS = 250;
 
 interface ChatInputProps {
     onSend: (message: string) => void;
+    onDraft?: (draft: string) => void;
     disabled?: boolean;
 }
 
-export function ChatInput({ onSend, disabled }: ChatInputProps) {
+export function ChatInput({ onSend, onDraft, disabled }: ChatInputProps) {
     const [message, setMessage] = useState("");
 
+    useEffect(() => {
+        if (!onDraft || !message.trim()) return;
+        const timer = setTimeout(() => onDraft(message), DRAFT_DEBOUNCE_MS);
+        return () => clearTimeout(timer);
+    }, [message, onDraft]);
+
     const handleSubmit = (e: FormEvent) => {
         e.preventDefault();
         if (message.trim()) {
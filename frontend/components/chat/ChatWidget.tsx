@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect, useRef } from "react";
+import { useState, useEffect, useRef, useCallback } from "react";
 import { MessageSquare, X } from "lucide-react";
 import { Button } from "@/components/ui/Button";
 import { Card } from "@/components/ui/Card";
@@ -97,6 +97,11 @@ export default function ChatWidget({ botId = 1 }: ChatWidgetProps) {
         messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
     }, [messages, isTyping, isOpen]);
 
+    // Drafts let the server prefetch retrieval while the user types
+    const handleDraft = useCallback((draft: string) => {
+        wsClient.current?.sendDraft(draft);
+    }, []);
+
     const handleSend = (content: string) => {
         if (!wsClient.current) return;
 
@@ -140,7 +145,11 @@ export default function ChatWidget({ botId = 1 }: ChatWidgetProps) {
                         <div ref={messagesEndRef} />
                     </div>
 
-                    <ChatInput onSend={handleSend} disabled={!sessionId} />
+                    <ChatInput
+                        onSend={handleSend}
+                        onDraft={handleDraft}
+                        disabled={!sessionId}
+                    />
                 </Card>
             )}
 
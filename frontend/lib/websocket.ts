@@ -43,6 +43,19 @@ export class WebSocketClient {
         }
     }
 
+    // Lets the server prefetch retrieval for the message being typed
+    sendDraft(draft: string) {
+        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+            this.ws.send(JSON.stringify({ type: "draft", message: draft }));
+        }
+    }
+
+    cancelResponse() {
+        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+            this.ws.send(JSON.stringify({ type: "cancel" }));
+        }
+    }
+
     onMessage(handler: MessageHandler) {
         this.messageHandlers.push(handler);
     }